@@ -0,0 +1,137 @@
+# app/api/deps.py
+"""
+Shared FastAPI dependencies.
+"""
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from typing import Dict, Optional
+import hmac
+
+from app.core.config import SERVICE_API_TOKEN
+from app.core.security import decode_token, TokenError, ACCESS_TOKEN
+from app.utils.projection import select_list, ProjectionError
+from app.utils.units import parse_display_units, UnitConversionError
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# The principal of a request made with SERVICE_API_TOKEN
+SERVICE_PRINCIPAL = {"id": None, "service": True}
+
+
+def _patient_from_claims(claims: dict) -> dict:
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "nic": claims.get("nic"),
+        "full_name": claims.get("name"),
+        "token_id": claims["jti"],
+        "token_expires_at": claims["exp"],
+    }
+
+
+def get_current_patient(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> dict:
+    """
+    Resolve the calling patient from the bearer access token alone.
+    No database query is made; the token signature is the proof of identity.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = decode_token(credentials.credentials, ACCESS_TOKEN)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _patient_from_claims(claims)
+
+
+def get_optional_patient(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Optional[dict]:
+    """Like get_current_patient, but returns None when no bearer token is sent."""
+    if credentials is None:
+        return None
+    return get_current_patient(credentials)
+
+
+def _is_service_token(token: str) -> bool:
+    return bool(SERVICE_API_TOKEN) and hmac.compare_digest(token.encode("utf-8"), SERVICE_API_TOKEN.encode("utf-8"))
+
+
+def get_service_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> dict:
+    """
+    Require the SERVICE_API_TOKEN bearer token (routes that cover every patient).
+    Patient tokens are a 403; with SERVICE_API_TOKEN unset every caller is refused.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not _is_service_token(credentials.credentials):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A service credential is required")
+    return SERVICE_PRINCIPAL
+
+
+def get_patient_or_service(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> dict:
+    """SERVICE_PRINCIPAL for the service token, else the patient of a valid access token (401 without one)."""
+    if credentials is not None and _is_service_token(credentials.credentials):
+        return SERVICE_PRINCIPAL
+    return get_current_patient(credentials)
+
+
+def ensure_nic_access(patient: Optional[dict], nic: str, required: bool = False) -> None:
+    """
+    Reject a token issued to a different patient than the NIC being accessed,
+    and with required, a request without a token (401).
+    """
+    if patient is None:
+        if required:
+            get_current_patient(None)
+        return
+    if patient.get("nic") != nic:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another patient's reports",
+        )
+
+
+def select_columns(table: str):
+    """
+    Dependency factory: the PostgREST select list for ?fields=&include= on
+    `table` (see app/utils/projection.py). Unknown names are a 400.
+    """
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated columns; relation.column for included relations"),
+        include: Optional[str] = Query(None, description="Comma-separated related resources to embed"),
+    ) -> str:
+        try:
+            return select_list(table, fields, include)
+        except ProjectionError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return dependency
+
+
+def display_units(
+    units: Optional[str] = Query(
+        None, description="Display units: a unit for every analyte that has it and/or Analyte:unit pairs, comma-separated"),
+) -> Dict[str, str]:
+    """?units= as parsed by app/utils/units.parse_display_units. Unknown units are a 400."""
+    try:
+        return parse_display_units(units)
+    except UnitConversionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
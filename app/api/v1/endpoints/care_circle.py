@@ -1,5 +1,5 @@
 # app/api/v1/endpoints/care_circle.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.care_circle_member import CareCircleMemberCreate, CareCircleMemberUpdate, CareCircleMemberOut
 from app.services.careCircleService import (
     create_care_circle_member,
@@ -10,6 +10,7 @@ from app.services.careCircleService import (
     delete_care_circle_member
 )
 from typing import List, Optional
+from app.api.deps import select_columns
 
 router = APIRouter(prefix="/care-circle", tags=["Care Circle"])
 
@@ -24,27 +25,28 @@ def add_member(member: CareCircleMemberCreate):
 
 # Read all
 @router.get("/members")
-def get_all_members(skip: int = 0, limit: int = 100, patient_id: Optional[str] = None):
-    """List all care circle members with pagination"""
-    result = list_care_circle_members(skip, limit, patient_id)
+def get_all_members(skip: int = 0, limit: int = 100, patient_id: Optional[str] = None,
+                    columns: str = Depends(select_columns("care_circle_members"))):
+    """List all care circle members with pagination (?fields=, ?include=patient)"""
+    result = list_care_circle_members(skip, limit, patient_id, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=500, detail=result.get("error", "Failed to retrieve members"))
     return result
 
 # Read by email
 @router.get("/members/email/{email}")
-def get_member_by_email(email: str):
+def get_member_by_email(email: str, columns: str = Depends(select_columns("care_circle_members"))):
     """Get a care circle member by email address"""
-    result = get_care_circle_member_by_email(email)
+    result = get_care_circle_member_by_email(email, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Member not found"))
     return result
 
 # Read single by ID
 @router.get("/members/{member_id}")
-def get_member_by_id(member_id: str):
+def get_member_by_id(member_id: str, columns: str = Depends(select_columns("care_circle_members"))):
     """Get a care circle member by UUID"""
-    result = get_care_circle_member_by_id(member_id)
+    result = get_care_circle_member_by_id(member_id, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Member not found"))
     return result
@@ -0,0 +1,110 @@
+# app/api/v1/endpoints/fhir.py
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from uuid import UUID
+
+from app.api.deps import get_current_patient, get_service_principal
+from app.services.fhir_export import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    PATIENT_COLUMNS,
+    delete_export,
+    export_file,
+    get_export,
+    run_export,
+    start_export,
+    stream_patient_record,
+)
+from app.services.patientService import get_patient_by_id
+from app.utils.fhir import operation_outcome
+
+router = APIRouter(prefix="/fhir", tags=["FHIR"])
+
+NDJSON = "application/fhir+ndjson"
+
+
+@router.get("/Patient/{patient_id}/$everything")
+async def export_patient_record(patient_id: UUID, patient: dict = Depends(get_current_patient)):
+    """
+    The calling patient's complete record as FHIR NDJSON (Patient,
+    DiagnosticReport, Observation, MedicationStatement), streamed a page of rows at a time
+    """
+    if str(patient_id) != patient["id"]:
+        raise HTTPException(status_code=403, detail="Not allowed to export another patient's record")
+
+    result = await run_in_threadpool(get_patient_by_id, str(patient_id), PATIENT_COLUMNS)
+    if not result.get("success"):
+        raise HTTPException(status_code=404, detail=result.get("error", "Patient not found"))
+    return StreamingResponse(
+        stream_patient_record(result["data"]),
+        media_type=NDJSON,
+        headers={"Content-Disposition": f'attachment; filename="patient-{patient_id}.ndjson"'},
+    )
+
+
+@router.api_route("/$export", methods=["GET", "POST"], status_code=202)
+def kick_off_export(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    _type: Optional[str] = Query(None, description="Comma-separated resource types (default: all)"),
+    service: dict = Depends(get_service_principal),
+):
+    """
+    Start a bulk export of every patient's record (FHIR Bulk Data $export).
+    Poll the Content-Location URL for the status and the NDJSON file URLs.
+    All bulk routes require the service token.
+    """
+    types = [t.strip() for t in _type.split(",") if t.strip()] if _type else None
+    result = start_export(types)
+    if not result.get("success"):
+        status_code = 400 if result.get("error", "").startswith("Unsupported") else 500
+        raise HTTPException(status_code=status_code, detail=result.get("error"))
+
+    job_id = result["data"]["job_id"]
+    background_tasks.add_task(run_export, job_id)
+    location = f"{str(request.url).split('?')[0]}/{job_id}"
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status_url": location},
+                        headers={"Content-Location": location})
+
+
+@router.get("/$export/{job_id}")
+def read_export_status(request: Request, job_id: str, service: dict = Depends(get_service_principal)):
+    """Bulk export status: 202 while running, then the manifest of output files"""
+    status = get_export(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+
+    if status["status"] == STATUS_FAILED:
+        return JSONResponse(status_code=500, content=operation_outcome(status["error"] or "Export failed"))
+    if status["status"] != STATUS_COMPLETED:
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": status["status"]},
+                            headers={"X-Progress": f"{status['patients']} patients exported", "Retry-After": "5"})
+
+    base = str(request.url).split("?")[0]
+    return {
+        "transactionTime": status["transaction_time"],
+        "request": base.rsplit("/", 1)[0],
+        "requiresAccessToken": True,
+        "output": [{"type": output["type"], "url": f"{base}/{output['file']}", "count": output["count"]}
+                   for output in status["output"]],
+        "error": [],
+    }
+
+
+@router.get("/$export/{job_id}/{file_name}")
+def download_export_file(job_id: str, file_name: str, service: dict = Depends(get_service_principal)):
+    """One NDJSON output file of a completed bulk export"""
+    path = export_file(job_id, file_name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Export file not found")
+    return FileResponse(path, media_type=NDJSON, filename=file_name)
+
+
+@router.delete("/$export/{job_id}", status_code=202)
+def cancel_export(job_id: str, service: dict = Depends(get_service_principal)):
+    """Cancel a bulk export, or delete its files once it has completed"""
+    if not delete_export(job_id):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return {"success": True, "job_id": job_id}
@@ -0,0 +1,23 @@
+# app/api/v1/endpoints/health.py
+from fastapi import APIRouter
+
+from app.core.health import liveness, readiness
+from app.core.responses import json_response
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def live():
+    """Liveness probe: the worker's event loop is responsive. No dependency calls."""
+    return liveness()
+
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once this worker has warmed up and its required
+    dependencies answer; 503 otherwise. Reports each dependency's check latency.
+    """
+    is_ready, report = readiness()
+    return json_response(report, status_code=200 if is_ready else 503, headers={"Cache-Control": "no-store"})
@@ -3,48 +3,61 @@ from sqlalchemy.orm import Session
 from app.schemas.health_metric import HealthMetricCreate, HealthMetricUpdate, HealthMetricRead
 from app.services.health_metric_service import HealthMetricService
 from app.models.health_metric import AnatomyCategory
-from app.core.database import get_db
+from app.core.database import get_session, run_db
+from app.api.deps import display_units
+from app.utils.units import convert_rows
 from uuid import UUID
 from typing import List, Optional
 
 router = APIRouter(prefix="/health", tags=["Health Metrics"])
 
+
+def _in_display_units(metrics, units: dict) -> List[dict]:
+    """Metrics as HealthMetricRead dicts in the ?units= display units (stored values are canonical)."""
+    rows = [HealthMetricRead.model_validate(metric).model_dump() for metric in metrics]
+    return convert_rows(rows, units, name_field="metric_name", fields=("value",))
+
+
 @router.post("/", response_model=HealthMetricRead, status_code=status.HTTP_201_CREATED)
-def create_health_metric(
+async def create_health_metric(
     metric_in: HealthMetricCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    return HealthMetricService.create_metric(db, metric_in)
+    return await run_db(db, HealthMetricService.create_metric, metric_in, commit=True)
 
 @router.get("/", response_model=List[HealthMetricRead])
-def get_health_metrics(
+async def get_health_metrics(
     user_id: UUID,
     anatomy_category: Optional[AnatomyCategory] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session),
+    units: dict = Depends(display_units)
 ):
-    return HealthMetricService.get_user_metrics(db, user_id, anatomy_category, skip, limit)
+    metrics = await run_db(db, HealthMetricService.get_user_metrics, user_id, anatomy_category, skip, limit)
+    return _in_display_units(metrics, units)
 
 @router.get("/{metric_id}", response_model=HealthMetricRead)
-def get_health_metric(
+async def get_health_metric(
     metric_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session),
+    units: dict = Depends(display_units)
 ):
-    return HealthMetricService.get_metric(db, metric_id)
+    metric = await run_db(db, HealthMetricService.get_metric, metric_id)
+    return _in_display_units([metric], units)[0]
 
 @router.put("/{metric_id}", response_model=HealthMetricRead)
-def update_health_metric(
+async def update_health_metric(
     metric_id: UUID,
     metric_in: HealthMetricUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    return HealthMetricService.update_metric(db, metric_id, metric_in)
+    return await run_db(db, HealthMetricService.update_metric, metric_id, metric_in, commit=True)
 
 @router.delete("/{metric_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_health_metric(
+async def delete_health_metric(
     metric_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    HealthMetricService.delete_metric(db, metric_id)
+    await run_db(db, HealthMetricService.delete_metric, metric_id, commit=True)
     return None
@@ -1,5 +1,5 @@
 # app/api/v1/endpoints/medication.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.medication import MedicationCreate, MedicationUpdate, MedicationOut
 from app.services.medicationService import (
     create_medication,
@@ -10,6 +10,7 @@ from app.services.medicationService import (
     delete_medication
 )
 from typing import List
+from app.api.deps import select_columns
 
 router = APIRouter(prefix="/medications", tags=["Medications"])
 
@@ -24,27 +25,28 @@ def add_medication(medication: MedicationCreate):
 
 # Read all
 @router.get("/")
-def get_all_medications(skip: int = 0, limit: int = 100):
-    """List all medications with pagination"""
-    result = list_medications(skip, limit)
+def get_all_medications(skip: int = 0, limit: int = 100, columns: str = Depends(select_columns("medications"))):
+    """List all medications with pagination (?fields=, ?include=patient)"""
+    result = list_medications(skip, limit, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=500, detail=result.get("error", "Failed to retrieve medications"))
     return result
 
 # Read by patient
 @router.get("/patient/{patient_id}")
-def get_patient_medications(patient_id: str, skip: int = 0, limit: int = 100):
+def get_patient_medications(patient_id: str, skip: int = 0, limit: int = 100,
+                            columns: str = Depends(select_columns("medications"))):
     """Get all medications for a specific patient"""
-    result = get_medications_by_patient(patient_id, skip, limit)
+    result = get_medications_by_patient(patient_id, skip, limit, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=500, detail=result.get("error", "Failed to retrieve medications"))
     return result
 
 # Read single by ID
 @router.get("/{medication_id}")
-def get_medication(medication_id: str):
+def get_medication(medication_id: str, columns: str = Depends(select_columns("medications"))):
     """Get a medication by UUID"""
-    result = get_medication_by_id(medication_id)
+    result = get_medication_by_id(medication_id, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Medication not found"))
     return result
@@ -1,9 +1,13 @@
 # app/api/v1/endpoints/patient.py
-from fastapi import APIRouter, HTTPException, Body
-from app.schemas.patient import PatientCreate, PatientUpdate, PatientOut, PatientLogin
+from fastapi import APIRouter, HTTPException, Body, Depends, Query
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientOut, PatientLogin, TokenRefresh, LogoutRequest
+from app.api.deps import get_current_patient, select_columns, display_units
 from app.services.patientService import (
     create_patient,
     authenticate_patient,
+    refresh_session,
+    logout_patient,
+    REFRESH_TOKEN_NOT_OWNED,
     get_patient_by_id,
     get_patient_by_email,
     get_patient_by_nic,
@@ -12,7 +16,11 @@ from app.services.patientService import (
     update_patient_password,
     delete_patient
 )
-from typing import List
+from app.services.dashboard_service import get_dashboard
+from app.services.latest_biomarker_service import get_latest_biomarkers
+from app.utils.projection import parse_list
+from app.utils.units import convert_rows
+from typing import List, Optional
 
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
@@ -28,48 +36,104 @@ def register_patient(patient: PatientCreate):
 
 @router.post("/login")
 def login_patient(login: PatientLogin):
-    """Login with email and password"""
+    """Login with email and password (returns access and refresh tokens)"""
     result = authenticate_patient(login)
     if not result.get("success"):
         raise HTTPException(status_code=401, detail=result.get("error", "Authentication failed"))
     return result
 
+@router.post("/token/refresh")
+def refresh_token(body: TokenRefresh):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    result = refresh_session(body.refresh_token)
+    if not result.get("success"):
+        raise HTTPException(status_code=401, detail=result.get("error", "Invalid refresh token"))
+    return result
+
+@router.post("/logout")
+def logout(body: LogoutRequest = Body(LogoutRequest()), current_patient: dict = Depends(get_current_patient)):
+    """Revoke the current access token (and optionally the refresh token)"""
+    result = logout_patient(current_patient, body.refresh_token)
+    if not result.get("success"):
+        error = result.get("error", "Failed to log out")
+        raise HTTPException(status_code=403 if error == REFRESH_TOKEN_NOT_OWNED else 500, detail=error)
+    return result
+
+# Current patient from token (must come before /{patient_id})
+@router.get("/me")
+def read_current_patient(current_patient: dict = Depends(get_current_patient)):
+    """Get the authenticated patient's identity from the access token (no database lookup)"""
+    data = {k: v for k, v in current_patient.items() if not k.startswith("token_")}
+    return {"success": True, "data": data}
+
 # Read all (must come before /{patient_id})
 @router.get("/")
-def read_all_patients(skip: int = 0, limit: int = 100):
-    """List all patients with pagination"""
-    result = list_patients(skip, limit)
+def read_all_patients(skip: int = 0, limit: int = 100, columns: str = Depends(select_columns("patients"))):
+    """List all patients with pagination (?fields=, ?include=reports,medications,care_circle_members)"""
+    result = list_patients(skip, limit, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=500, detail=result.get("error", "Failed to retrieve patients"))
     return result
 
 # Read by email (must come before /{patient_id})
 @router.get("/email/{email}")
-def read_patient_by_email(email: str):
+def read_patient_by_email(email: str, columns: str = Depends(select_columns("patients"))):
     """Get a patient by email address"""
-    result = get_patient_by_email(email)
+    result = get_patient_by_email(email, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Patient not found"))
     return result
 
 # Read by NIC (must come before /{patient_id})
 @router.get("/nic/{nic}")
-def read_patient_by_nic(nic: str):
+def read_patient_by_nic(nic: str, columns: str = Depends(select_columns("patients"))):
     """Get a patient by NIC"""
-    result = get_patient_by_nic(nic)
+    result = get_patient_by_nic(nic, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Patient not found"))
     return result
 
 # Read single by ID
 @router.get("/{patient_id}")
-def read_patient_by_id(patient_id: str):
+def read_patient_by_id(patient_id: str, columns: str = Depends(select_columns("patients"))):
     """Get a patient by UUID"""
-    result = get_patient_by_id(patient_id)
+    result = get_patient_by_id(patient_id, columns=columns)
     if not result.get("success"):
         raise HTTPException(status_code=404, detail=result.get("error", "Patient not found"))
     return result
 
+# Dashboard
+@router.get("/{patient_id}/dashboard")
+async def read_patient_dashboard(patient_id: str, patient: dict = Depends(get_current_patient)):
+    """
+    Get the calling patient, their latest reports with abnormal biomarkers, medications,
+    care circle and latest health metrics in one response (sections loaded concurrently,
+    cached per patient for DASHBOARD_CACHE_SECONDS). Sections that fail are null and
+    listed under "errors".
+    """
+    if patient_id != patient["id"]:
+        raise HTTPException(status_code=403, detail="Not allowed to view another patient's dashboard")
+    result = await get_dashboard(patient_id)
+    if not result.get("success"):
+        error = result.get("error", "Patient not found")
+        raise HTTPException(status_code=404 if error == "Patient not found" else 503, detail=error)
+    return result
+
+# Latest biomarker values
+@router.get("/{patient_id}/biomarkers/latest")
+def read_latest_biomarkers(
+    patient_id: str,
+    names: Optional[str] = Query(None, description="Comma-separated biomarker names (default: all)"),
+    columns: str = Depends(select_columns("patient_latest_biomarkers")),
+    units: dict = Depends(display_units)
+):
+    """Get the most recent value of each biomarker for a patient (?names=LDL Cholesterol,HbA1c, ?fields=, ?include=report, ?units=mmol/L)"""
+    result = get_latest_biomarkers(patient_id, parse_list(names), columns=columns)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to retrieve biomarkers"))
+    result["data"] = convert_rows(result["data"], units)
+    return result
+
 # Update
 @router.patch("/{patient_id}")
 def update_patient_endpoint(patient_id: str, updates: PatientUpdate):
@@ -1,37 +1,91 @@
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Path, Query
-from app.services.upload_service import upload_pdf_to_bucket, get_normalized_json, get_raw_json, list_user_reports
+from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, HTTPException, Path, Query, Request, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
+from app.services.upload_service import (
+    upload_pdf_to_bucket,
+    get_normalized_json_object,
+    get_raw_json_object,
+    list_user_reports,
+    create_signed_upload,
+    claim_uploaded_report,
+    parse_report_pdf_path,
+    create_signed_download,
+    processed_json_path,
+    report_pdf_path
+)
 from app.services.reportService import (
     get_report_by_id,
     get_report_by_file_id,
+    get_report_version,
     list_reports_by_patient,
     get_report_with_biomarkers,
     get_biomarkers_by_report
 )
 
 from app.services.patientService import get_patient_by_nic
+from app.services.batch_upload_service import (
+    batch_item,
+    items_from_zip,
+    ingest_batch,
+    process_batch_worker,
+    BatchError,
+    ERROR_TOO_LARGE
+)
+from app.services import idempotency_service
+from app.schemas.report import SignedUploadRequest, UploadFinalizeRequest
+from app.api.deps import get_current_patient, get_optional_patient, ensure_nic_access, select_columns, display_units
+from app.core.responses import json_response, embed_json_response
+from app.core.http_cache import (
+    cache_headers,
+    generation_etag,
+    generation_from_etags,
+    is_fresh,
+    not_modified,
+    parse_timestamp,
+    version_etag
+)
+from app.utils.projection import project_document
+from app.utils.units import convert_rows, display_key
+from typing import List, Optional
+from app.core.config import GCS_NOTIFICATION_TOKEN
+import base64
+import hmac
+import json
+import orjson
 import os
 import tempfile
+import time
 from app.workers.ocr_worker import process_document_worker
 
 router = APIRouter()
 
+UPLOAD_IDEMPOTENCY_SCOPE = "upload_report"
+
 @router.post("/upload")
 async def upload_report(
     nic: str,
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Upload a medical report PDF for OCR processing and normalization.
     Stores in Cloud Storage (organized by NIC) and Supabase database (by patient_id).
+
+    Send an Idempotency-Key header to make retries safe: a retry with the same
+    key and file returns the original response (with Idempotent-Replayed: true)
+    instead of storing and processing the report again.
     
     Args:
         nic: Patient's National Identity Card number (used for GCS folder structure)
         file: PDF file of medical report
+        idempotency_key: Client-generated key, unique per upload (e.g. a UUID)
         
     Returns:
         Status and file_id for tracking
     """
+    received_at = time.time()
+
     # Look up patient by NIC to get patient_id
     patient_result = get_patient_by_nic(nic)
     if not patient_result.get("success"):
@@ -43,15 +97,54 @@ async def upload_report(
     patient_data = patient_result.get("data")
     patient_id = patient_data.get("id")
     
+    content = await file.read()
+
+    file_id = None
+    claimed = False
+    if idempotency_key:
+        if len(idempotency_key) > idempotency_service.MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        claim = await run_in_threadpool(
+            idempotency_service.begin,
+            UPLOAD_IDEMPOTENCY_SCOPE,
+            idempotency_key,
+            idempotency_service.fingerprint(nic, content)
+        )
+        state = claim.get("state")
+        if state == idempotency_service.REPLAY:
+            return JSONResponse(content=claim["response"], headers={"Idempotent-Replayed": "true"})
+        if state == idempotency_service.IN_PROGRESS:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "1"}
+            )
+        if state == idempotency_service.MISMATCH:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different upload")
+        if not claim.get("success"):
+            # Key store unavailable: the derived file_id still keeps retries on one object/report
+            print(f"⚠️  Idempotency key store unavailable: {claim.get('error')}")
+        claimed = state == idempotency_service.NEW
+        file_id = idempotency_service.derive_file_id(UPLOAD_IDEMPOTENCY_SCOPE, nic, idempotency_key)
+
     temp_dir = tempfile.gettempdir()
     temp_path = os.path.join(temp_dir, file.filename)
 
     with open(temp_path, "wb") as f:
-        f.write(await file.read())
+        f.write(content)
 
     try:
-        # Upload to GCS using NIC for folder structure
-        upload_info = upload_pdf_to_bucket(temp_path, nic)
+        # Upload to GCS using NIC for folder structure, keeping the claim alive meanwhile
+        if claimed:
+            with idempotency_service.keep_claim(UPLOAD_IDEMPOTENCY_SCOPE, idempotency_key):
+                upload_info = upload_pdf_to_bucket(temp_path, nic, file_id=file_id)
+        else:
+            upload_info = upload_pdf_to_bucket(temp_path, nic, file_id=file_id)
+    except Exception:
+        if claimed:
+            await run_in_threadpool(idempotency_service.abandon, UPLOAD_IDEMPOTENCY_SCOPE, idempotency_key)
+        raise
     finally:
         if os.path.exists(temp_path):
             os.remove(temp_path)
@@ -63,42 +156,283 @@ async def upload_report(
         upload_info["gcs_uri"],
         nic,  # For GCS folder organization
         patient_id,  # For database storage
-        upload_info["file_id"]
+        upload_info["file_id"],
+        received_at,
+        pdf_bytes=content  # Lets the worker read the text layer without re-downloading
     )
 
-    return {
+    response = {
         "status": "uploaded",
         "message": "Report uploaded and processing started. Data will be saved to database when complete.",
         "file_id": upload_info["file_id"],
         "patient_nic": nic,
         "patient_id": patient_id
     }
+    if claimed:
+        await run_in_threadpool(idempotency_service.complete, UPLOAD_IDEMPOTENCY_SCOPE, idempotency_key, response)
+    return response
+
+
+@router.post("/upload/batch")
+async def upload_report_batch(
+    files: Optional[List[UploadFile]] = File(None, description="PDF files (multipart set)"),
+    nics: Optional[List[str]] = Form(None, description="NIC per file, in the same order (or one NIC for all files)"),
+    archive: Optional[UploadFile] = File(None, description="ZIP of PDFs; NICs from manifest.csv/json or {nic}/ folders"),
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """
+    Upload many lab report PDFs in one request.
+
+    Send either `files` with matching `nics`, or a ZIP `archive`. All NICs are
+    resolved with one database query, PDFs are uploaded to Cloud Storage
+    concurrently, and the accepted files are processed by one background job.
+
+    Returns:
+        batch_id, counts and a per-file list of {filename, nic, file_id, status, error}
+    """
+    received_at = time.time()
+
+    if archive is not None:
+        try:
+            items = await run_in_threadpool(items_from_zip, archive.file)
+        except BatchError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif files:
+        nics = nics or []
+        if len(nics) == 1:
+            nics = nics * len(files)
+        if len(nics) != len(files):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Got {len(files)} files but {len(nics)} NICs; send one NIC per file or a single NIC"
+            )
+        items = [batch_item(f.filename, nic, f.file.read) for f, nic in zip(files, nics)]
+    else:
+        raise HTTPException(status_code=400, detail="Send PDF files with NICs, or a ZIP archive")
+
+    result = await run_in_threadpool(ingest_batch, items)
+    if not result.get("success"):
+        status_code = 400 if result.get("kind") == ERROR_TOO_LARGE else 500
+        raise HTTPException(status_code=status_code, detail=result.get("error"))
+
+    if result["jobs"]:
+        background_tasks.add_task(process_batch_worker, result["batch_id"], result["jobs"], received_at)
+
+    statuses = [f["status"] for f in result["files"]]
+    return {
+        "status": "uploaded",
+        "batch_id": result["batch_id"],
+        "total": len(statuses),
+        "queued": statuses.count("queued"),
+        "rejected": statuses.count("rejected"),
+        "failed": statuses.count("failed"),
+        "files": result["files"]
+    }
+
+
+def _get_patient_id(nic: str) -> str:
+    patient_result = get_patient_by_nic(nic)
+    if not patient_result.get("success"):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Patient not found with NIC: {nic}. Please register the patient first."
+        )
+    return patient_result["data"]["id"]
+
+
+def _enqueue_uploaded_report(nic: str, patient_id: str, file_id: str, background_tasks: BackgroundTasks) -> dict:
+    """Claim a directly uploaded PDF and start OCR if this call won the claim."""
+    claim = claim_uploaded_report(nic, file_id)
+    if claim["claimed"]:
+        # No pdf_bytes: the worker downloads the PDF itself
+        background_tasks.add_task(process_document_worker, claim["gcs_uri"], nic, patient_id, file_id, time.time())
+    return claim
+
+
+@router.post("/uploads/signed-url")
+async def create_upload_url(request: SignedUploadRequest):
+    """
+    Get a V4 signed URL to upload a report PDF straight to Cloud Storage.
+
+    1. POST to `upload_url` with the returned `headers` and an empty body
+    2. PUT the PDF to the session URI in the response's `Location` header
+    3. Call `/uploads/{file_id}/finalize` (or let the storage notification do it)
+
+    Returns:
+        file_id, upload_url, required headers and expiry
+    """
+    _get_patient_id(request.nic)
+    try:
+        upload = create_signed_upload(request.nic)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not create upload URL: {str(e)}")
+
+    return {
+        "status": "success",
+        **upload,
+        "finalize_url": f"/api/v1/ocr/uploads/{upload['file_id']}/finalize"
+    }
+
+
+@router.post("/uploads/{file_id}/finalize")
+async def finalize_upload(
+    request: UploadFinalizeRequest,
+    file_id: str = Path(..., description="File ID returned by /uploads/signed-url"),
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """
+    Confirm a direct upload and start OCR processing.
+
+    Safe to call more than once: only the first call (or storage notification)
+    enqueues processing.
+
+    Raises:
+        404: Patient or uploaded file not found
+        400: Uploaded object is not an acceptable PDF
+    """
+    patient_id = _get_patient_id(request.nic)
+    try:
+        claim = _enqueue_uploaded_report(request.nic, patient_id, file_id, background_tasks)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finalizing upload: {str(e)}")
+
+    return {
+        "status": "processing" if claim["claimed"] else "already_processing",
+        "file_id": file_id,
+        "patient_nic": request.nic,
+        "patient_id": patient_id,
+        "size_bytes": claim["size_bytes"]
+    }
+
+
+@router.post("/uploads/notifications", include_in_schema=False)
+async def storage_notification(
+    request: Request,
+    token: str = Query(..., description="Shared secret configured on the Pub/Sub push subscription"),
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """
+    Pub/Sub push endpoint for Cloud Storage OBJECT_FINALIZE notifications.
+
+    Starts OCR for PDFs uploaded under users/{nic}/reports/ without waiting for
+    the client's finalize call. Always acknowledges (2xx) events it chooses to
+    ignore so Pub/Sub does not redeliver them.
+    """
+    if not GCS_NOTIFICATION_TOKEN or not hmac.compare_digest(
+        token.encode("utf-8"), GCS_NOTIFICATION_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Invalid notification token")
+
+    envelope = await request.json()
+    message = envelope.get("message") or {}
+    attributes = message.get("attributes") or {}
+    object_name = attributes.get("objectId")
+    if not object_name and message.get("data"):
+        object_name = json.loads(base64.b64decode(message["data"])).get("name")
+
+    if attributes.get("eventType", "OBJECT_FINALIZE") != "OBJECT_FINALIZE":
+        return {"status": "ignored", "reason": "event type"}
+
+    parsed = parse_report_pdf_path(object_name)
+    if not parsed:
+        return {"status": "ignored", "reason": "not a report upload"}
+    nic, file_id = parsed
+
+    patient_result = get_patient_by_nic(nic)
+    if not patient_result.get("success"):
+        return {"status": "ignored", "reason": "unknown patient"}
+
+    try:
+        claim = _enqueue_uploaded_report(nic, patient_result["data"]["id"], file_id, background_tasks)
+    except (FileNotFoundError, ValueError) as e:
+        return {"status": "ignored", "reason": str(e)}
+
+    return {"status": "processing" if claim["claimed"] else "already_processing", "file_id": file_id}
+
+
+DELIVERY_PATTERN = "^(inline|url|redirect)$"
+DOCUMENT_FIELDS_DESCRIPTION = "Comma-separated dotted paths to keep, e.g. biomarkers.name,biomarkers.value"
+
+
+def _deliver_signed(path: str, delivery: str, filename: Optional[str] = None):
+    """Return a signed URL (or a redirect to it) instead of the object content."""
+    try:
+        signed = create_signed_download(path, filename=filename)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not sign download URL: {str(e)}")
+    if delivery == "redirect":
+        return RedirectResponse(signed["url"], status_code=307, headers={"Cache-Control": "no-store"})
+    return {"status": "success", "delivery": "url", **signed}
+
+
+async def _stored_json_response(load, nic: str, file_id: str, fields: Optional[str], if_none_match: Optional[str]):
+    """
+    Serve stored report JSON with an ETag from its GCS generation. A matching
+    If-None-Match makes the download conditional, so GCS sends no body and
+    the client gets 304.
+    """
+    stored = await run_in_threadpool(load, nic, file_id, generation_from_etags(if_none_match, fields))
+    etag = generation_etag(stored["generation"], fields)
+    if stored["content"] is None or is_fresh(etag, if_none_match):
+        return not_modified(etag)
+
+    headers = cache_headers(etag)
+    if fields:
+        return json_response(
+            {"status": "success", "data": project_document(orjson.loads(stored["content"]), fields)},
+            headers=headers
+        )
+    # Stored JSON is passed through as-is rather than parsed and re-encoded
+    return embed_json_response({"status": "success"}, "data", stored["content"], headers=headers)
+
+
+def _report_validator(version: dict, *variant):
+    """ETag and Last-Modified for a report row version (updated_at, or created_at before any update)."""
+    changed = version.get("updated_at") or version.get("created_at")
+    return version_etag(version["id"], changed, *variant), parse_timestamp(changed)
 
 
 @router.get("/report/{nic}/{file_id}/normalized")
 async def get_normalized_report(
     nic: str = Path(..., description="Patient's National Identity Card number"),
-    file_id: str = Path(..., description="Unique file identifier")
+    file_id: str = Path(..., description="Unique file identifier"),
+    delivery: str = Query("inline", regex=DELIVERY_PATTERN, description="inline JSON, a signed url, or a redirect to it"),
+    patient: Optional[dict] = Depends(get_optional_patient),
+    fields: Optional[str] = Query(None, description=DOCUMENT_FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retrieve the normalized medical report JSON from Cloud Storage.
+
+    Responses carry an ETag (the object's GCS generation); send it back in
+    If-None-Match to get 304 Not Modified without the body.
     
     Args:
         nic: Patient's NIC (used for GCS folder path)
         file_id: File identifier returned from upload
+        delivery: "inline" (default) returns the JSON; "url" returns a short-lived
+            signed URL; "redirect" answers 307 to that URL
+        fields: Inline only - keep just these dotted paths of the document
         
     Returns:
-        Normalized medical report as JSON
+        Normalized medical report as JSON, or a signed URL
         
     Raises:
         404: If report not found or not yet processed
+        401: url/redirect without a bearer token
+        403: If the bearer token belongs to another patient
     """
+    # Signed URLs outlive the request and can be passed on, so they need the patient's token
+    ensure_nic_access(patient, nic, required=delivery != "inline")
+    if delivery != "inline":
+        return _deliver_signed(processed_json_path(nic, file_id, normalized=True), delivery)
+
     try:
-        normalized_data = get_normalized_json(nic, file_id)
-        return {
-            "status": "success",
-            "data": normalized_data
-        }
+        return await _stored_json_response(get_normalized_json_object, nic, file_id, fields, if_none_match)
     except FileNotFoundError as e:
         raise HTTPException(
             status_code=404,
@@ -114,27 +448,41 @@ async def get_normalized_report(
 @router.get("/report/{nic}/{file_id}/raw")
 async def get_raw_report(
     nic: str = Path(..., description="Patient's National Identity Card number"),
-    file_id: str = Path(..., description="Unique file identifier")
+    file_id: str = Path(..., description="Unique file identifier"),
+    delivery: str = Query("inline", regex=DELIVERY_PATTERN, description="inline JSON, a signed url, or a redirect to it"),
+    patient: Optional[dict] = Depends(get_optional_patient),
+    fields: Optional[str] = Query(None, description=DOCUMENT_FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retrieve the raw OCR data from Cloud Storage (for debugging).
+    Supports If-None-Match like the normalized report.
+    
+    Raw OCR JSON can be megabytes; prefer delivery=url or delivery=redirect so it
+    is fetched straight from storage, or use fields= (e.g. fields=tables,page_count)
+    to leave out raw_text.
     
     Args:
         nic: Patient's NIC (used for GCS folder path)
         file_id: File identifier returned from upload
+        delivery: "inline" (default), "url" or "redirect"
+        fields: Inline only - keep just these dotted paths of the document
         
     Returns:
-        Raw OCR data as JSON
+        Raw OCR data as JSON, or a signed URL
         
     Raises:
         404: If report not found
+        401: url/redirect without a bearer token
+        403: If the bearer token belongs to another patient
     """
+    # Signed URLs outlive the request and can be passed on, so they need the patient's token
+    ensure_nic_access(patient, nic, required=delivery != "inline")
+    if delivery != "inline":
+        return _deliver_signed(processed_json_path(nic, file_id), delivery)
+
     try:
-        raw_data = get_raw_json(nic, file_id)
-        return {
-            "status": "success",
-            "data": raw_data
-        }
+        return await _stored_json_response(get_raw_json_object, nic, file_id, fields, if_none_match)
     except FileNotFoundError as e:
         raise HTTPException(
             status_code=404,
@@ -147,10 +495,31 @@ async def get_raw_report(
         )
 
 
+@router.get("/report/{nic}/{file_id}/pdf")
+async def get_report_pdf(
+    nic: str = Path(..., description="Patient's National Identity Card number"),
+    file_id: str = Path(..., description="Unique file identifier"),
+    delivery: str = Query("redirect", regex="^(url|redirect)$", description="a signed url, or a redirect to it"),
+    patient: dict = Depends(get_current_patient)
+):
+    """
+    Download the original report PDF via a short-lived signed URL.
+
+    The PDF is served by Cloud Storage; the API only checks access and signs.
+
+    Raises:
+        401: Without a valid bearer token
+        403: If the bearer token belongs to another patient
+    """
+    ensure_nic_access(patient, nic)
+    return _deliver_signed(report_pdf_path(nic, file_id), delivery, filename=f"{file_id}.pdf")
+
+
 @router.get("/reports/nic/{nic}")
 async def list_reports_by_nic(
     nic: str = Path(..., description="Patient's National Identity Card number"),
-    source: str = Query("storage", regex="^(database|storage)$")
+    source: str = Query("storage", regex="^(database|storage)$"),
+    columns: str = Depends(select_columns("reports"))
 ):
     """
     List all reports for a patient using their NIC.
@@ -158,6 +527,7 @@ async def list_reports_by_nic(
     Args:
         nic: Patient's NIC
         source: 'database' (from Supabase) or 'storage' (from Cloud Storage)
+        fields / include: Column projection and embedded biomarkers (database source only)
         
     Returns:
         List of reports with metadata
@@ -172,27 +542,27 @@ async def list_reports_by_nic(
             patient_id = patient_result.get("data").get("id")
             
             # Get from Supabase database
-            result = list_reports_by_patient(patient_id, skip=0, limit=100)
+            result = list_reports_by_patient(patient_id, skip=0, limit=100, columns=columns)
             if not result.get("success"):
                 raise HTTPException(status_code=500, detail=result.get("error"))
             
-            return {
+            return json_response({
                 "status": "success",
                 "source": "database",
                 "patient_nic": nic,
                 "count": result.get("count"),
                 "reports": result.get("data")
-            }
+            })
         else:
             # Get from Cloud Storage (uses NIC directly)
             reports = list_user_reports(nic)
-            return {
+            return json_response({
                 "status": "success",
                 "source": "storage",
                 "patient_nic": nic,
                 "count": len(reports),
                 "reports": reports
-            }
+            })
     except HTTPException:
         raise
     except Exception as e:
@@ -207,7 +577,8 @@ async def list_reports(
     patient_id: str = Path(..., description="Patient's UUID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    source: str = Query("database", regex="^(database|storage)$")
+    source: str = Query("database", regex="^(database|storage)$"),
+    columns: str = Depends(select_columns("reports"))
 ):
     """
     List all reports for a patient by patient_id (database only).
@@ -217,22 +588,23 @@ async def list_reports(
         skip: Number of records to skip (pagination)
         limit: Maximum number of records to return
         source: 'database' only (use /reports/nic/{nic} for storage)
+        fields / include: Column projection, e.g. fields=id,report_type,biomarkers.name&include=biomarkers
         
     Returns:
         List of reports with metadata
     """
     try:
         # Get from Supabase database
-        result = list_reports_by_patient(patient_id, skip, limit)
+        result = list_reports_by_patient(patient_id, skip, limit, columns=columns)
         if not result.get("success"):
             raise HTTPException(status_code=500, detail=result.get("error"))
         
-        return {
+        return json_response({
             "status": "success",
             "source": "database",
             "count": result.get("count"),
             "reports": result.get("data")
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -244,10 +616,16 @@ async def list_reports(
 
 @router.get("/report/id/{report_id}")
 async def get_report_by_uuid(
-    report_id: str = Path(..., description="Report UUID from database")
+    report_id: str = Path(..., description="Report UUID from database"),
+    columns: str = Depends(select_columns("reports")),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
     """
     Get a report by its database UUID.
+
+    Conditional GETs (If-None-Match / If-Modified-Since against the report's
+    updated_at) are answered 304 after a version-only lookup.
     
     Args:
         report_id: Report's UUID in Supabase
@@ -256,14 +634,21 @@ async def get_report_by_uuid(
         Report details
     """
     try:
-        result = get_report_by_id(report_id)
+        version = get_report_version(report_id=report_id)
+        if not version.get("success"):
+            raise HTTPException(status_code=404, detail=version.get("error"))
+        etag, last_modified = _report_validator(version["data"], columns)
+        if is_fresh(etag, if_none_match, if_modified_since, last_modified):
+            return not_modified(etag, last_modified)
+
+        result = get_report_by_id(report_id, columns=columns)
         if not result.get("success"):
             raise HTTPException(status_code=404, detail=result.get("error"))
         
-        return {
+        return json_response({
             "status": "success",
             "data": result.get("data")
-        }
+        }, headers=cache_headers(etag, last_modified))
     except HTTPException:
         raise
     except Exception as e:
@@ -275,10 +660,13 @@ async def get_report_by_uuid(
 
 @router.get("/report/file/{file_id}")
 async def get_report_by_file(
-    file_id: str = Path(..., description="File ID from upload")
+    file_id: str = Path(..., description="File ID from upload"),
+    columns: str = Depends(select_columns("reports")),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
     """
-    Get a report by its file_id (from upload).
+    Get a report by its file_id (from upload). Supports conditional GETs.
     
     Args:
         file_id: File identifier from upload response
@@ -287,14 +675,21 @@ async def get_report_by_file(
         Report details
     """
     try:
-        result = get_report_by_file_id(file_id)
+        version = get_report_version(file_id=file_id)
+        if not version.get("success"):
+            raise HTTPException(status_code=404, detail=version.get("error"))
+        etag, last_modified = _report_validator(version["data"], columns)
+        if is_fresh(etag, if_none_match, if_modified_since, last_modified):
+            return not_modified(etag, last_modified)
+
+        result = get_report_by_file_id(file_id, columns=columns)
         if not result.get("success"):
             raise HTTPException(status_code=404, detail=result.get("error"))
         
-        return {
+        return json_response({
             "status": "success",
             "data": result.get("data")
-        }
+        }, headers=cache_headers(etag, last_modified))
     except HTTPException:
         raise
     except Exception as e:
@@ -306,27 +701,43 @@ async def get_report_by_file(
 
 @router.get("/report/id/{report_id}/biomarkers")
 async def get_report_biomarkers(
-    report_id: str = Path(..., description="Report UUID")
+    report_id: str = Path(..., description="Report UUID"),
+    columns: str = Depends(select_columns("biomarkers")),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    units: dict = Depends(display_units)
 ):
     """
     Get all biomarkers for a specific report.
+
+    Biomarkers only change when the report is reprocessed, which bumps the
+    report's updated_at; a matching If-None-Match skips the biomarker query.
     
     Args:
         report_id: Report's UUID
+        units: Display units (?units=mmol/L or ?units=LDL Cholesterol:mmol/L), default canonical
         
     Returns:
         List of biomarkers
     """
     try:
-        result = get_biomarkers_by_report(report_id)
+        version = get_report_version(report_id=report_id)
+        if not version.get("success"):
+            raise HTTPException(status_code=404, detail=version.get("error"))
+        variant = ("biomarkers", columns) + ((display_key(units),) if units else ())
+        etag, last_modified = _report_validator(version["data"], *variant)
+        if is_fresh(etag, if_none_match, if_modified_since, last_modified):
+            return not_modified(etag, last_modified)
+
+        result = get_biomarkers_by_report(report_id, columns=columns)
         if not result.get("success"):
             raise HTTPException(status_code=404, detail=result.get("error"))
         
-        return {
+        return json_response({
             "status": "success",
             "count": result.get("count"),
-            "biomarkers": result.get("data")
-        }
+            "biomarkers": convert_rows(result.get("data") or [], units)
+        }, headers=cache_headers(etag, last_modified))
     except HTTPException:
         raise
     except Exception as e:
@@ -338,26 +749,40 @@ async def get_report_biomarkers(
 
 @router.get("/report/id/{report_id}/complete")
 async def get_complete_report(
-    report_id: str = Path(..., description="Report UUID")
+    report_id: str = Path(..., description="Report UUID"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    units: dict = Depends(display_units)
 ):
     """
-    Get a complete report with all biomarkers.
+    Get a complete report with all biomarkers. Supports conditional GETs.
     
     Args:
         report_id: Report's UUID
+        units: Display units for the biomarkers, as for /biomarkers
         
     Returns:
         Complete report with biomarkers
     """
     try:
+        version = get_report_version(report_id=report_id)
+        if not version.get("success"):
+            raise HTTPException(status_code=404, detail=version.get("error"))
+        variant = ("complete",) + ((display_key(units),) if units else ())
+        etag, last_modified = _report_validator(version["data"], *variant)
+        if is_fresh(etag, if_none_match, if_modified_since, last_modified):
+            return not_modified(etag, last_modified)
+
         result = get_report_with_biomarkers(report_id)
         if not result.get("success"):
             raise HTTPException(status_code=404, detail=result.get("error"))
-        
-        return {
+        data = result["data"]
+        data["biomarkers"] = convert_rows(data.get("biomarkers") or [], units)
+
+        return json_response({
             "status": "success",
-            "data": result.get("data")
-        }
+            "data": data
+        }, headers=cache_headers(etag, last_modified))
     except HTTPException:
         raise
     except Exception as e:
@@ -365,4 +790,3 @@ async def get_complete_report(
             status_code=500,
             detail=f"Error retrieving complete report: {str(e)}"
         )
-
@@ -0,0 +1,40 @@
+# app/api/v1/endpoints/search.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from uuid import UUID
+
+from app.api.deps import get_patient_or_service
+from app.services.search_service import search_reports
+
+router = APIRouter(tags=["Search"])
+
+
+@router.get("/search")
+def search(
+    q: str = Query(..., min_length=2, max_length=200, description='Words (ANDed), "quoted phrases", -excluded words'),
+    patient_id: Optional[UUID] = Query(None, description="Only this patient's reports"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    principal: dict = Depends(get_patient_or_service),
+):
+    """
+    Search report OCR text, best match first, with a highlighted snippet per report (?q=HbA1c&patient_id=).
+    A patient's token only searches their own reports; the service token may search across patients.
+    """
+    if not principal.get("service"):
+        if patient_id is not None and str(patient_id) != principal["id"]:
+            raise HTTPException(status_code=403, detail="Not allowed to search another patient's reports")
+        patient_id = principal["id"]
+
+    result = search_reports(q, str(patient_id) if patient_id else None, limit=limit, offset=offset)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "Search failed"))
+    return {
+        "success": True,
+        "query": q,
+        "patient_id": str(patient_id) if patient_id else None,
+        "data": result["data"],
+        "count": len(result["data"]),
+        "limit": limit,
+        "offset": offset,
+    }
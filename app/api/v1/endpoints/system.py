@@ -0,0 +1,21 @@
+# app/api/v1/endpoints/system.py
+from fastapi import APIRouter
+from app.core.database import get_pool_status
+from app.core.startup import STARTUP
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+@router.get("/db/pool")
+def read_db_pool_status():
+    """Connection pool usage of the worker that serves this request"""
+    return {"success": True, "data": get_pool_status()}
+
+
+@router.get("/startup")
+def read_startup_profile():
+    """
+    Startup profile of the worker that serves this request: when the app was
+    imported, ready and first used (marks_ms, from the start of the import) and
+    how long each client took to build (phases_ms)
+    """
+    return {"success": True, "data": STARTUP.report()}
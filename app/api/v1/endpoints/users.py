@@ -2,20 +2,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.schemas.user import UserCreate, UserOut, UserBase
 from app.crud import crud_user
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=UserOut)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user = crud_user.get_user_by_email(db, email=user.email)
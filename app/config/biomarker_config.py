@@ -108,6 +108,12 @@ FBS_BIOMARKER_MAPPING = {
     "FASTING\nLASMA GLUCOSE (FBS)": "Fasting Plasma Glucose",
 }
 
+# Normal fasting range per reporting unit, used when the report does not print one
+FBS_DEFAULT_RANGES = {
+    "mg/dL": [70.0, 99.0],
+    "mmol/L": [3.9, 5.5],
+}
+
 # ===== COMMON CONFIGURATION =====
 
 # Unit normalization mapping
@@ -152,6 +158,88 @@ UNIT_MAPPING = {
     "%": "%",
     "percent": "%",
     "Percent": "%",
+
+    # SI concentration units
+    "mmol/l": "mmol/L",
+    "mmol/L": "mmol/L",
+    "g/l": "g/L",
+    "g/L": "g/L",
+    "umol/l": "umol/L",
+    "umol/L": "umol/L",
+    "µmol/L": "umol/L",
+    "μmol/L": "umol/L",
+    "nmol/l": "nmol/L",
+    "nmol/L": "nmol/L",
+    "pmol/l": "pmol/L",
+    "pmol/L": "pmol/L",
+    "ng/ml": "ng/mL",
+    "ng/mL": "ng/mL",
+    "pg/ml": "pg/mL",
+    "pg/mL": "pg/mL",
+
+    # Cell counts per litre / microlitre
+    "10^3/ul": "10^3/uL",
+    "10^3/uL": "10^3/uL",
+    "10^9/l": "10^9/L",
+    "10^9/L": "10^9/L",
+    "10^12/l": "10^12/L",
+    "10^12/L": "10^12/L",
+
+    # Body measurements
+    "lb": "lb",
+    "lbs": "lb",
+    "in": "in",
+    "inch": "in",
+    "°C": "C",
+    "°F": "F",
+}
+
+# ===== UNIT CONVERSION =====
+
+# Per analyte: unit -> factor to the canonical unit, which is the first unit listed
+# (canonical value = value * factor). Values are stored in the canonical unit and
+# reference ranges / metric thresholds are expressed in it; see app/utils/units.py.
+# A (scale, offset) pair stands for value * scale + offset (temperatures).
+GLUCOSE_UNITS = {"mg/dL": 1.0, "mmol/L": 18.016}
+CHOLESTEROL_UNITS = {"mg/dL": 1.0, "mmol/L": 38.67}
+CELLS_PER_CU_MM = {"per cu mm": 1.0, "10^3/uL": 1000.0, "10^9/L": 1000.0}
+LENGTH_CM = {"cm": 1.0, "in": 2.54, "m": 100.0}
+
+UNIT_CONVERSIONS = {
+    # Glucose
+    "Fasting Plasma Glucose": GLUCOSE_UNITS,
+    "Blood Glucose": GLUCOSE_UNITS,
+
+    # Lipids
+    "Total Cholesterol": CHOLESTEROL_UNITS,
+    "HDL Cholesterol": CHOLESTEROL_UNITS,
+    "LDL Cholesterol": CHOLESTEROL_UNITS,
+    "VLDL Cholesterol": CHOLESTEROL_UNITS,
+    "Non-HDL Cholesterol": CHOLESTEROL_UNITS,
+    "Triglycerides": {"mg/dL": 1.0, "mmol/L": 88.57},
+
+    # Full blood count
+    "Hemoglobin": {"g/dL": 1.0, "g/L": 0.1, "mmol/L": 1.6114},
+    "MCHC": {"g/dL": 1.0, "g/L": 0.1},
+    "WBC": CELLS_PER_CU_MM,
+    "Platelets": CELLS_PER_CU_MM,
+    "RBC": {"10^6/uL": 1.0, "10^12/L": 1.0, "per cu mm": 0.000001},
+
+    # Chemistry and vitamins
+    "Uric Acid": {"mg/dL": 1.0, "umol/L": 0.016812},
+    "Bilirubin": {"mg/dL": 1.0, "umol/L": 0.05847},
+    "Vitamin D": {"ng/mL": 1.0, "nmol/L": 0.4006},
+    "Vitamin B12": {"pg/mL": 1.0, "pmol/L": 1.355},
+
+    # Body measurements
+    "Body Temp": {"C": 1.0, "F": (5 / 9, -160 / 9)},
+    "Weight": {"kg": 1.0, "lb": 0.45359237},
+    "Hand Strength": {"kg": 1.0, "lb": 0.45359237},
+    "Grip Strength": {"kg": 1.0, "lb": 0.45359237},
+    "Height": LENGTH_CM,
+    "Waist Circumference": LENGTH_CM,
+    "Calf Circumference": LENGTH_CM,
+    "Arm Circumference": LENGTH_CM,
 }
 
 # Flag mapping for lipid profiles (H/L indicators)
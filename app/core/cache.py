@@ -0,0 +1,69 @@
+"""
+Small in-process TTL cache.
+
+Entries live for a fixed number of seconds and the least recently used entry
+is evicted once maxsize is reached. The cache is per worker process: a write
+handled by one worker only invalidates that worker's copy, so the TTL bounds
+how stale another worker can be.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.metrics import REGISTRY
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cache_lookups_total",
+    "In-process cache lookups by cache and outcome (hit, miss, expired)",
+    ("cache", "outcome"),
+)
+
+MISS = object()
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after ttl seconds."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """The cached value, or MISS when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                outcome, value = "miss", MISS
+            elif entry[0] <= time.monotonic():
+                del self._entries[key]
+                outcome, value = "expired", MISS
+            else:
+                self._entries.move_to_end(key)
+                outcome, value = "hit", entry[1]
+        CACHE_LOOKUPS.inc(cache=self.name, outcome=outcome)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,28 +1,164 @@
-from google.cloud import storage, documentai
-from app.core.config import PROJECT_ID, DOC_AI_LOCATION
+import json
 import os
+import threading
 
+from app.core.config import (
+    PROJECT_ID, BUCKET_NAME, DOC_AI_LOCATION, GOOGLE_CREDENTIALS_JSON, GOOGLE_KEY_FILE, HEALTH_CHECK_TIMEOUT_SECONDS,
+    DOCAI_RATE_LIMIT_PER_SEC, DOCAI_MAX_CONCURRENCY, DOCAI_SLOW_CALL_SECONDS, DOCAI_CALL_DEADLINE_SECONDS,
+    GCS_RATE_LIMIT_PER_SEC, GCS_MAX_CONCURRENCY, GCS_SLOW_CALL_SECONDS, GCS_CALL_DEADLINE_SECONDS,
+    RETRY_MAX_ATTEMPTS, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_SECONDS,
+)
+from app.core.resilience import (
+    ResiliencePolicy, ResilientProxy, TokenBucket, AdaptiveConcurrencyLimiter, CircuitBreaker
+)
+from app.core.health import register_check
+from app.core.startup import STARTUP, register_warmup
+
+# The google.cloud SDKs are imported inside the getters below, not at module
+# load, so importing the app does not pay for them (see app/core/startup.py)
 _storage_client = None
 _docai_client = None
+_credentials = None
+_client_lock = threading.Lock()
+
+
+def _policy(service: str, rate: float, max_concurrency: int, slow_call: float, deadline: float) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        service,
+        rate_limiter=TokenBucket(rate, burst=max(1.0, rate * 2)) if rate > 0 else None,
+        limiter=AdaptiveConcurrencyLimiter(
+            initial=max(1, max_concurrency // 2),
+            max_limit=max_concurrency,
+            latency_threshold=slow_call,
+        ),
+        breaker=CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_SECONDS),
+        max_attempts=RETRY_MAX_ATTEMPTS,
+        deadline=deadline,
+    )
+
+
+docai_policy = _policy(
+    "document_ai", DOCAI_RATE_LIMIT_PER_SEC, DOCAI_MAX_CONCURRENCY, DOCAI_SLOW_CALL_SECONDS, DOCAI_CALL_DEADLINE_SECONDS
+)
+gcs_policy = _policy(
+    "gcs", GCS_RATE_LIMIT_PER_SEC, GCS_MAX_CONCURRENCY, GCS_SLOW_CALL_SECONDS, GCS_CALL_DEADLINE_SECONDS
+)
+
+# Blob calls that hit the network and are safe to repeat. patch() is left out:
+# the OCR claim is a conditional patch, and replaying one whose response was lost
+# fails its own precondition.
+_BLOB_METHODS = {
+    name: None
+    for name in (
+        "exists", "reload", "delete",
+        "download_as_bytes", "download_as_string", "download_as_text", "download_to_filename",
+        "upload_from_filename", "upload_from_string",
+        "create_resumable_upload_session",
+    )
+}
+
+
+def _wrap_blob(blob):
+    return ResilientProxy(blob, gcs_policy, _BLOB_METHODS) if blob is not None else None
+
+
+class _ResilientBucket(ResilientProxy):
+    def blob(self, *args, **kwargs):
+        # Creating a blob handle is local; its network methods go through the policy
+        return _wrap_blob(self._target.blob(*args, **kwargs))
+
+
+def get_credentials():
+    """
+    Google credentials and their project, loaded in memory (nothing is written to disk).
+
+    Returns:
+        (credentials, project_id); (None, None) means Application Default Credentials
+    """
+    global _credentials
+    if _credentials is None:
+        import google.auth
+
+        with STARTUP.phase("credentials"):
+            if GOOGLE_CREDENTIALS_JSON:
+                # Production: credentials JSON in an environment variable (Render deployment)
+                try:
+                    info = json.loads(GOOGLE_CREDENTIALS_JSON)
+                except json.JSONDecodeError as e:
+                    print(f"❌ Error parsing GOOGLE_APPLICATION_CREDENTIALS_JSON: {e}")
+                    raise
+                _credentials = google.auth.load_credentials_from_dict(info)
+                print("✅ Using Google credentials from environment variable")
+            elif os.path.exists(GOOGLE_KEY_FILE):
+                # Local development: key.json in the project root
+                _credentials = google.auth.load_credentials_from_file(GOOGLE_KEY_FILE)
+                print(f"✅ Using Google credentials from local file: {GOOGLE_KEY_FILE}")
+            else:
+                print("⚠️  Warning: No Google credentials found (neither env var nor key.json); using Application Default Credentials")
+                _credentials = (None, None)
+    return _credentials
 
 
 def get_storage_client():
     global _storage_client
     if _storage_client is None:
-        _storage_client = storage.Client(project=PROJECT_ID)
+        with _client_lock:
+            if _storage_client is None:
+                with STARTUP.phase("client:gcs"):
+                    from google.cloud import storage
+
+                    credentials, project = get_credentials()
+                    _storage_client = storage.Client(project=PROJECT_ID or project, credentials=credentials)
     return _storage_client
 
 
 def get_docai_client():
     global _docai_client
     if _docai_client is None:
-        _docai_client = documentai.DocumentProcessorServiceClient(
-            client_options={
-                "api_endpoint": f"{DOC_AI_LOCATION}-documentai.googleapis.com"
-            }
-        )
+        with _client_lock:
+            if _docai_client is None:
+                with STARTUP.phase("client:document_ai"):
+                    from google.cloud import documentai
+
+                    credentials, _ = get_credentials()
+                    client = documentai.DocumentProcessorServiceClient(
+                        credentials=credentials,
+                        client_options={
+                            "api_endpoint": f"{DOC_AI_LOCATION}-documentai.googleapis.com"
+                        }
+                    )
+                    _docai_client = ResilientProxy(client, docai_policy, {"process_document": None})
     return _docai_client
 
 
 def get_bucket(bucket_name: str):
-    return get_storage_client().bucket(bucket_name)
+    return _ResilientBucket(
+        get_storage_client().bucket(bucket_name),
+        gcs_policy,
+        {"get_blob": _wrap_blob, "list_blobs": list},
+    )
+
+
+# Readiness checks call the clients directly, not through the resilience policies:
+# they should report the dependency as it is, without retries or tripping breakers
+HEALTH_CHECK_OBJECT = ".healthcheck"
+
+
+def check_gcs():
+    # A metadata lookup of a (normally absent) object: authenticates and opens the HTTP session
+    get_storage_client().bucket(BUCKET_NAME).get_blob(HEALTH_CHECK_OBJECT, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+
+
+def check_document_ai():
+    import grpc
+
+    # Connects the gRPC channel, which is otherwise set up by the first OCR request
+    channel = get_docai_client().transport.grpc_channel
+    grpc.channel_ready_future(channel).result(timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+
+
+register_warmup("gcs", get_storage_client)
+register_warmup("document_ai", get_docai_client)
+register_check("gcs", check_gcs)
+# OCR runs in the background; uploads and reads keep working without Document AI
+register_check("document_ai", check_document_ai, required=False)
@@ -1,5 +1,4 @@
 import os
-import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,31 +8,164 @@ BUCKET_NAME = os.getenv("GCS_BUCKET")
 DOC_AI_LOCATION = os.getenv("DOCAI_LOCATION", "us")
 DOC_AI_PROCESSOR_ID = os.getenv("DOCAI_PROCESSOR_ID")
 
-# Handle Google Cloud credentials for both local and production environments
-credentials_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
-
-if credentials_json:
-    # Production: Use environment variable (Render deployment)
-    # Write credentials to temporary file
-    temp_creds_path = "/tmp/google_credentials.json"
-    try:
-        # Parse to validate JSON
-        creds_dict = json.loads(credentials_json)
-        with open(temp_creds_path, "w") as f:
-            json.dump(creds_dict, f)
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = temp_creds_path
-        print("✅ Using Google credentials from environment variable")
-    except json.JSONDecodeError as e:
-        print(f"❌ Error parsing GOOGLE_APPLICATION_CREDENTIALS_JSON: {e}")
-        raise
-else:
-    # Local development: Use key.json file
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    key_path = os.path.join(BASE_DIR, "key.json")
-    
-    if os.path.exists(key_path):
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
-        print(f"✅ Using Google credentials from local file: {key_path}")
-    else:
-        print("⚠️  Warning: No Google credentials found (neither env var nor key.json)")
+# Google Cloud credentials, resolved when the first client is built (see app/core/cloud.py):
+# GOOGLE_APPLICATION_CREDENTIALS_JSON (Render deployment), else key.json in the project
+# root (local development), else Application Default Credentials
+GOOGLE_CREDENTIALS_JSON = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GOOGLE_KEY_FILE = os.path.join(BASE_DIR, "key.json")
 
+
+# Session token settings (see app/core/security.py)
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+TOKEN_REVOCATION_REFRESH_SECONDS = int(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "30"))
+# Bearer token of back-office services and clinician tools (bulk FHIR export, search
+# across patients; see app/api/deps.py). Unset closes those routes.
+SERVICE_API_TOKEN = os.getenv("SERVICE_API_TOKEN")
+
+# Direct-to-GCS uploads: signed resumable upload URLs and storage notifications
+SIGNED_UPLOAD_EXPIRE_MINUTES = int(os.getenv("SIGNED_UPLOAD_EXPIRE_MINUTES", "15"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+GCS_NOTIFICATION_TOKEN = os.getenv("GCS_NOTIFICATION_TOKEN")
+# Lifetime of signed download URLs for PDFs and stored report JSON
+SIGNED_DOWNLOAD_EXPIRE_SECONDS = int(os.getenv("SIGNED_DOWNLOAD_EXPIRE_SECONDS", "300"))
+
+# Batch uploads (ZIP or multipart sets of PDFs)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_MAX_TOTAL_BYTES = int(os.getenv("BATCH_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "8"))
+BATCH_OCR_CONCURRENCY = int(os.getenv("BATCH_OCR_CONCURRENCY", "4"))
+
+# PDF preflight: pages whose text layer has at least TEXT_LAYER_MIN_CHARS characters
+# are extracted locally; only scanned/image-only pages are sent to Document AI
+LOCAL_EXTRACTION_ENABLED = os.getenv("LOCAL_EXTRACTION_ENABLED", "true").lower() in ("1", "true", "yes")
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "50"))
+
+# Long PDFs are OCR'd as concurrent page-range shards (online requests are page-limited)
+DOCAI_SHARD_PAGES = int(os.getenv("DOCAI_SHARD_PAGES", "10"))
+DOCAI_MAX_PARALLEL_SHARDS = int(os.getenv("DOCAI_MAX_PARALLEL_SHARDS", "4"))
+
+# Client-side resilience for Document AI and GCS (see app/core/resilience.py).
+# Limits are per worker process.
+DOCAI_RATE_LIMIT_PER_SEC = float(os.getenv("DOCAI_RATE_LIMIT_PER_SEC", "5"))
+DOCAI_MAX_CONCURRENCY = int(os.getenv("DOCAI_MAX_CONCURRENCY", "8"))
+DOCAI_SLOW_CALL_SECONDS = float(os.getenv("DOCAI_SLOW_CALL_SECONDS", "60"))
+DOCAI_CALL_DEADLINE_SECONDS = float(os.getenv("DOCAI_CALL_DEADLINE_SECONDS", "180"))
+GCS_RATE_LIMIT_PER_SEC = float(os.getenv("GCS_RATE_LIMIT_PER_SEC", "100"))
+GCS_MAX_CONCURRENCY = int(os.getenv("GCS_MAX_CONCURRENCY", "32"))
+GCS_SLOW_CALL_SECONDS = float(os.getenv("GCS_SLOW_CALL_SECONDS", "10"))
+GCS_CALL_DEADLINE_SECONDS = float(os.getenv("GCS_CALL_DEADLINE_SECONDS", "60"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+
+# Idempotency-Key support: how long a stored response is replayed for retries, and how long
+# an in-progress claim is held without a heartbeat before a retry may take it over (the
+# request that made it crashed)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+
+# Response compression (zstd or gzip, negotiated from Accept-Encoding)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# Cache-Control for report resources that carry an ETag (stored JSON, report rows,
+# biomarkers). Reports are patient data, so shared caches are opted into explicitly
+# (e.g. "public, max-age=300" behind a CDN that keys on Authorization).
+REPORT_CACHE_CONTROL = os.getenv("REPORT_CACHE_CONTROL", "private, max-age=300")
+
+# Warm-up (see app/core/startup.py): build the Supabase/GCS/Document AI clients, open their
+# connections and load reference data once a worker has started, instead of on the first
+# request that needs them. The lifespan hook waits up to WARMUP_TIMEOUT_SECONDS (keep it below
+# gunicorn's worker timeout) before accepting requests; a slower warm-up finishes in the
+# background while /health/ready reports 503.
+WARM_CLIENTS_ON_STARTUP = os.getenv("WARM_CLIENTS_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "20"))
+
+# Readiness checks (/health/ready): per-check timeout and how long results are reused
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "5"))
+
+# metric_references rows are cached per worker and reloaded after this many seconds
+METRIC_REFERENCE_CACHE_SECONDS = float(os.getenv("METRIC_REFERENCE_CACHE_SECONDS", "300"))
+
+# Patient dashboard (GET /patients/{id}/dashboard): each section is cached per patient and
+# worker for DASHBOARD_CACHE_SECONDS and dropped on writes handled by this worker, so another
+# worker serves a change after at most that long. Sections still loading after
+# DASHBOARD_SECTION_TIMEOUT_SECONDS are reported in "errors" instead of holding up the response.
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "30"))
+DASHBOARD_CACHE_MAX_PATIENTS = int(os.getenv("DASHBOARD_CACHE_MAX_PATIENTS", "2000"))
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_SECTION_TIMEOUT_SECONDS", "5"))
+DASHBOARD_REPORT_LIMIT = int(os.getenv("DASHBOARD_REPORT_LIMIT", "5"))
+
+# Outbox relay (app/services/outbox_relay.py): delivers report lifecycle events to the
+# in-process broker and to OUTBOX_WEBHOOK_URLS (comma-separated), signing webhook bodies
+# with OUTBOX_WEBHOOK_SECRET. Failed batches are retried with backoff; an event that still
+# fails after OUTBOX_MAX_ATTEMPTS deliveries is marked dead.
+OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() in ("1", "true", "yes")
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_WEBHOOK_URLS = [url.strip() for url in os.getenv("OUTBOX_WEBHOOK_URLS", "").split(",") if url.strip()]
+OUTBOX_WEBHOOK_SECRET = os.getenv("OUTBOX_WEBHOOK_SECRET", "")
+OUTBOX_WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("OUTBOX_WEBHOOK_TIMEOUT_SECONDS", "10"))
+
+# Abnormal-result notifications to care circle members (app/services/notification_service.py).
+# biomarker.abnormal events are queued per member and sent as one digest per recipient once
+# the oldest queued item is NOTIFY_DIGEST_WINDOW_SECONDS old (so a lab uploading many reports
+# at once produces one email, not hundreds), at most NOTIFY_RATE_LIMIT_PER_SEC digests a second.
+# Off by default: the emails carry patient names and results. Enabling it requires NOTIFY_SENDER
+# ("smtp" sends mail; "file" writes .eml files to NOTIFY_FILE_DIR and is for local development
+# only), otherwise startup fails.
+NOTIFICATIONS_ENABLED = os.getenv("NOTIFICATIONS_ENABLED", "false").lower() in ("1", "true", "yes")
+NOTIFY_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", "300"))
+NOTIFY_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFY_DIGEST_MAX_ITEMS", "100"))
+NOTIFY_POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "10"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+NOTIFY_RATE_LIMIT_PER_SEC = float(os.getenv("NOTIFY_RATE_LIMIT_PER_SEC", "5"))
+NOTIFY_LEASE_SECONDS = float(os.getenv("NOTIFY_LEASE_SECONDS", "120"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+NOTIFY_SENDER = os.getenv("NOTIFY_SENDER", "").lower()
+NOTIFY_FILE_DIR = os.getenv("NOTIFY_FILE_DIR", "outbox_mail")
+NOTIFY_FROM_ADDRESS = os.getenv("NOTIFY_FROM_ADDRESS", "Healix <no-reply@healix.local>")
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# Report text search (GET /api/v1/search, app/services/search_service.py). "postgres" uses
+# report_search_documents (migrations/006_report_search.sql, tsvector + GIN); "local" keeps an
+# in-memory inverted index per process, for development without the migration. Text beyond
+# SEARCH_MAX_CONTENT_CHARS is not indexed (Postgres caps a tsvector at 1 MB).
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres").lower()
+SEARCH_MAX_CONTENT_CHARS = int(os.getenv("SEARCH_MAX_CONTENT_CHARS", "500000"))
+
+# Biomarker analytics export (app/scripts/export_biomarkers.py): Parquet files under
+# ANALYTICS_EXPORT_DIR, partitioned by report type and year. Each run exports the rows created
+# since the previous one, up to ANALYTICS_EXPORT_LAG_SECONDS ago (so transactions still in flight
+# at the cutoff are picked up next time), reading ANALYTICS_EXPORT_PAGE_SIZE rows per query and
+# writing a file per partition every ANALYTICS_EXPORT_ROWS_PER_FILE rows.
+ANALYTICS_EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", "exports/biomarkers")
+ANALYTICS_EXPORT_PAGE_SIZE = int(os.getenv("ANALYTICS_EXPORT_PAGE_SIZE", "5000"))
+ANALYTICS_EXPORT_ROWS_PER_FILE = int(os.getenv("ANALYTICS_EXPORT_ROWS_PER_FILE", "250000"))
+ANALYTICS_EXPORT_LAG_SECONDS = float(os.getenv("ANALYTICS_EXPORT_LAG_SECONDS", "60"))
+# Secret key of the HMAC pseudonyms (patient_key, report_key) in the export; required. Keep it
+# away from the dataset's readers, and re-export with --full after changing it.
+ANALYTICS_EXPORT_KEY = os.getenv("ANALYTICS_EXPORT_KEY")
+
+# FHIR export (app/services/fhir_export.py). A patient's record streams as NDJSON, reading
+# FHIR_EXPORT_PAGE_SIZE rows per query; bulk $export jobs write one NDJSON file per resource
+# type under FHIR_EXPORT_DIR/{job_id}, FHIR_EXPORT_PATIENT_BATCH patients at a time, and are
+# deleted FHIR_EXPORT_RETENTION_SECONDS after they finish. FHIR_NIC_SYSTEM is the identifier
+# system of Patient.identifier for the NIC.
+FHIR_EXPORT_DIR = os.getenv("FHIR_EXPORT_DIR", "exports/fhir")
+FHIR_EXPORT_PAGE_SIZE = int(os.getenv("FHIR_EXPORT_PAGE_SIZE", "500"))
+FHIR_EXPORT_PATIENT_BATCH = int(os.getenv("FHIR_EXPORT_PATIENT_BATCH", "100"))
+FHIR_EXPORT_RETENTION_SECONDS = float(os.getenv("FHIR_EXPORT_RETENTION_SECONDS", "86400"))
+FHIR_NIC_SYSTEM = os.getenv("FHIR_NIC_SYSTEM", "urn:healix:nic")
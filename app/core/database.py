@@ -1,21 +1,208 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
+from app.core.health import register_check
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool settings.
+# Every gunicorn worker (see Procfile) owns its own pool, so the server can open up to
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. Keep that below the
+# Postgres/Supabase connection limit.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Async engine (asyncpg) for the health-metric and report-extracted-data endpoints
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
 
 Base = declarative_base()
 
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": False, "pool_pre_ping": DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _to_async_url(url: str):
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    async_url = make_url(url)
+    connect_args = {}
+    backend = async_url.get_backend_name()
+
+    if backend == "postgresql":
+        async_url = async_url.set(drivername="postgresql+asyncpg")
+        # asyncpg does not understand libpq's sslmode parameter
+        sslmode = async_url.query.get("sslmode")
+        if sslmode:
+            async_url = async_url.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode not in ("disable", "allow")
+    elif backend == "sqlite":
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+
+    return async_url, connect_args
+
+
+# ===== POOL STATISTICS =====
+
+_pool_counters = {}
+
+
+def _track_pool(name: str, target_engine) -> None:
+    counters = _pool_counters.setdefault(name, {"connections_created": 0, "checkouts": 0, "invalidated": 0})
+
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        counters["connections_created"] += 1
+
+    @event.listens_for(target_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(target_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidated"] += 1
+
+
+def _describe_pool(name: str, pool) -> dict:
+    stats = {"pool_class": type(pool).__name__, **_pool_counters.get(name, {})}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_in=pool.checkedin(),
+            checked_out=checked_out,
+            overflow=pool.overflow(),
+            capacity=capacity,
+            saturation=round(checked_out / capacity, 4) if capacity else 0.0,
+        )
+    return stats
+
+
+def get_pool_status() -> dict:
+    """
+    Report connection pool usage for this worker process.
+
+    Returns:
+        Dictionary keyed by engine ("sync", "async") with pool size, checked-out
+        connections, overflow and saturation (checked_out / capacity)
+    """
+    status = {"pid": os.getpid()}
+    if engine is not None:
+        status["sync"] = _describe_pool("sync", engine.pool)
+    if async_engine is not None:
+        status["async"] = _describe_pool("async", async_engine.sync_engine.pool)
+    return status
+
+
+# ===== ENGINES & SESSIONS =====
+
+engine = None
+if DATABASE_URL:
+    engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+    _track_pool("sync", engine)
+else:
+    print("⚠️  Warning: DATABASE_URL is not set; SQLAlchemy sessions are unavailable")
+
+# Repositories flush and the request commits once, so loaded objects stay usable after commit
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def _check_database():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+if engine is not None:
+    register_check("database", _check_database)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC_ENABLED and DATABASE_URL:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    _async_url, _async_connect_args = _to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        _async_url,
+        connect_args=_async_connect_args,
+        **_engine_options(DATABASE_URL)
+    )
+    _track_pool("async", async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
   db = SessionLocal()
   try:
     yield db
+  except Exception:
+    db.rollback()
+    raise
   finally:
     db.close()
+
+
+async def get_session():
+    """
+    Yield an AsyncSession when DB_ASYNC_ENABLED is set, otherwise a regular Session.
+    Use together with run_db() so endpoints work with either.
+    """
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        except Exception:
+            await run_in_threadpool(db.rollback)
+            raise
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def run_db(db, fn, *args, commit: bool = False, **kwargs):
+    """
+    Run a synchronous service/repo call against either session type.
+
+    Sync sessions run in the threadpool so the event loop is never blocked;
+    async sessions use AsyncSession.run_sync. When commit is True the unit of
+    work is committed once, before the response is built.
+    """
+    if AsyncSessionLocal is not None and isinstance(db, AsyncSession):
+        result = await db.run_sync(lambda session: fn(session, *args, **kwargs))
+        if commit:
+            await db.commit()
+        return result
+
+    def _call():
+        result = fn(db, *args, **kwargs)
+        if commit:
+            db.commit()
+        return result
+
+    return await run_in_threadpool(_call)
@@ -0,0 +1,117 @@
+"""
+Liveness and readiness of a worker.
+
+/health/live answers as long as the event loop does. /health/ready runs the
+registered dependency checks (Supabase, GCS, Document AI, the SQLAlchemy
+database) concurrently, each with a timeout, and reports their latencies. It
+returns 503 while the worker is still warming up (see app/core/startup.py) or
+a required dependency is failing, so traffic is only routed to warm workers.
+
+Check results are cached for HEALTH_CHECK_CACHE_SECONDS so frequent probes
+from several load balancers do not turn into a stream of dependency calls.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Tuple
+
+from app.core.config import HEALTH_CHECK_TIMEOUT_SECONDS, HEALTH_CHECK_CACHE_SECONDS, WARM_CLIENTS_ON_STARTUP
+from app.core.metrics import REGISTRY
+from app.core.startup import STARTUP, is_warm
+
+DEPENDENCY_CHECK_DURATION = REGISTRY.histogram(
+    "dependency_check_duration_seconds",
+    "Latency of readiness checks per dependency",
+    ("dependency", "outcome"),
+)
+
+# name -> (check, required); a check raises on failure
+_CHECKS: Dict[str, Tuple[Callable[[], Any], bool]] = {}
+
+_cache_lock = threading.Lock()
+_cached: Dict[str, Any] = {"results": None, "checked_at": 0.0}
+
+
+def register_check(name: str, check: Callable[[], Any], required: bool = True) -> None:
+    """
+    Register a dependency check for /health/ready.
+
+    Args:
+        name: Dependency name in the readiness report
+        check: Callable that makes one cheap round trip and raises on failure
+        required: Whether a failure makes the worker not ready (optional
+            dependencies are reported but do not take the worker out of rotation)
+    """
+    _CHECKS[name] = (check, required)
+
+
+def _run(name: str, check: Callable[[], Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        check()
+        result = {"ok": True}
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    latency = time.perf_counter() - start
+    DEPENDENCY_CHECK_DURATION.observe(latency, dependency=name, outcome="ok" if result["ok"] else "error")
+    result["latency_ms"] = round(latency * 1000, 1)
+    return result
+
+
+def check_dependencies(force: bool = False, timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every registered check concurrently (or return the cached results).
+
+    Returns:
+        {name: {"ok", "latency_ms", "required", "error"?}}; a check still
+        running after timeout seconds is reported as failed
+    """
+    with _cache_lock:
+        cached = _cached["results"]
+        if not force and cached is not None and time.monotonic() - _cached["checked_at"] < HEALTH_CHECK_CACHE_SECONDS:
+            return cached
+
+        checks = dict(_CHECKS)
+        results = {}
+        if checks:
+            executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix="health")
+            futures = {name: executor.submit(_run, name, check) for name, (check, _) in checks.items()}
+            deadline = time.monotonic() + timeout
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    results[name] = {"ok": False, "error": f"timed out after {timeout:g}s", "latency_ms": round(timeout * 1000, 1)}
+                results[name]["required"] = checks[name][1]
+            # Do not wait for checks that timed out; their threads finish on their own
+            executor.shutdown(wait=False)
+
+        _cached["results"] = results
+        _cached["checked_at"] = time.monotonic()
+        return results
+
+
+def liveness() -> Dict[str, Any]:
+    return {"status": "alive", "pid": STARTUP.report()["pid"], "uptime_seconds": round(STARTUP.elapsed(), 1)}
+
+
+def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """
+    Whether this worker should receive traffic, with the report served by /health/ready.
+
+    Not ready while warm-up is running or when a required dependency check fails.
+    """
+    warm = is_warm() or not WARM_CLIENTS_ON_STARTUP
+    dependencies = check_dependencies() if warm else {}
+    ready = warm and all(result["ok"] for result in dependencies.values() if result["required"])
+
+    report = STARTUP.report()
+    return ready, {
+        "status": "ready" if ready else ("warming_up" if not warm else "unavailable"),
+        "pid": report["pid"],
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+        "dependencies": dependencies,
+        "startup_ms": report["marks_ms"],
+    }
@@ -0,0 +1,130 @@
+"""
+HTTP validators and caching headers for report resources.
+
+Stored report JSON is versioned by its GCS object generation and report rows
+by updated_at, so both make cheap ETags. Endpoints compare the client's
+If-None-Match (or If-Modified-Since) against the validator before reading any
+content and answer 304 Not Modified when it still matches.
+
+ETags are weak (W/"..."): the same resource can be sent gzip- or
+zstd-encoded, and projections (fields=/include=) are folded into the tag.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi.responses import Response
+
+from app.core.config import REPORT_CACHE_CONTROL
+
+
+def _digest(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def generation_etag(generation, *variant) -> str:
+    """ETag for a GCS object generation; variant (e.g. fields=) is folded in."""
+    suffix = f"-{_digest(*variant)}" if any(v for v in variant) else ""
+    return f'W/"g{generation}{suffix}"'
+
+
+def generation_from_etags(if_none_match: Optional[str], *variant) -> Optional[int]:
+    """
+    The object generation named by an If-None-Match ETag for the same variant,
+    so the storage read can be made conditional (if_generation_not_match).
+    """
+    if not if_none_match or if_none_match.strip() == "*":
+        return None
+    for tag in if_none_match.split(","):
+        opaque = _opaque(tag).strip('"')
+        generation = opaque[1:].split("-")[0]
+        if opaque.startswith("g") and generation.isdigit() and generation_etag(generation, *variant) == f'W/"{opaque}"':
+            return int(generation)
+    return None
+
+
+def version_etag(*parts) -> str:
+    """ETag from the parts that identify a version of a resource (id, updated_at, projection...)."""
+    return f'W/"{_digest(*parts)}"'
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse a Supabase/ISO timestamp (or pass a datetime through) as an aware UTC datetime."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag ("*" matches anything)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_fresh(etag: str, if_none_match: Optional[str], if_modified_since: Optional[str] = None,
+             last_modified: Optional[datetime] = None) -> bool:
+    """
+    Whether the client's cached copy is current. If-None-Match wins; If-Modified-Since
+    is only used when no If-None-Match was sent (RFC 9110 13.1.3).
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return not_modified_since(if_modified_since, last_modified)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None,
+                  cache_control: str = REPORT_CACHE_CONTROL) -> Dict[str, str]:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        # Responses differ per caller (bearer token) and per encoding
+        "Vary": "Authorization, Accept-Encoding",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None,
+                 cache_control: str = REPORT_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified, cache_control))
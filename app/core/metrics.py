@@ -0,0 +1,312 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are kept per worker process and rendered by
+the `/metrics` endpoint. With several gunicorn workers each scrape reports the
+worker that served it, so aggregate with `sum by (...)` on the Prometheus side.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Point-in-time value. Either set explicitly or computed at scrape time by a
+    callback returning {label values tuple: value}.
+    """
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        values = dict(self._values)
+        if self._callback:
+            try:
+                values.update(self._callback())
+            except Exception as e:
+                print(f"Warning: Failed to collect gauge {self.name}: {str(e)}")
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def collect(self) -> List[str]:
+        lines = self._header()
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics by name and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, description, labelnames, callback))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ===== APPLICATION METRICS =====
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ("method",),
+)
+OCR_STAGE_DURATION = REGISTRY.histogram(
+    "ocr_stage_duration_seconds",
+    "Duration of each OCR worker stage",
+    ("stage", "outcome"),
+)
+OCR_PIPELINE_DURATION = REGISTRY.histogram(
+    "ocr_pipeline_duration_seconds",
+    "Time from upload to report availability, split by phase",
+    ("phase", "outcome"),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+OCR_EXTRACTION_PATH = REGISTRY.counter(
+    "ocr_extraction_path_total",
+    "Documents by extraction path (local text layer, Document AI, or both)",
+    ("path",),
+)
+OCR_EXTRACTION_PAGES = REGISTRY.counter(
+    "ocr_extraction_pages_total",
+    "Pages extracted, by source",
+    ("source",),
+)
+EXTERNAL_CALLS = REGISTRY.counter(
+    "external_calls_total",
+    "Calls to external services (Document AI, GCS, Supabase)",
+    ("service", "operation", "outcome"),
+)
+EXTERNAL_CALL_DURATION = REGISTRY.histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services",
+    ("service", "operation"),
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time one stage of the OCR worker, labelled with its outcome."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        OCR_STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, outcome=outcome)
+
+
+@contextmanager
+def track_external_call(service: str, operation: str):
+    """Count and time a call to an external service."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - start, service=service, operation=operation)
+        EXTERNAL_CALLS.inc(service=service, operation=operation, outcome=outcome)
+
+
+def _db_pool_gauges() -> Dict[Tuple[str, ...], float]:
+    from app.core.database import get_pool_status
+
+    values = {}
+    for engine_name, stats in get_pool_status().items():
+        if not isinstance(stats, dict):
+            continue
+        for stat in ("checked_out", "checked_in", "overflow", "capacity"):
+            if stat in stats:
+                values[(engine_name, stat)] = stats[stat]
+    return values
+
+
+REGISTRY.gauge(
+    "db_pool_connections",
+    "SQLAlchemy connection pool state for this worker",
+    ("engine", "state"),
+    callback=_db_pool_gauges,
+)
+
+
+def _startup_gauges() -> Dict[Tuple[str, ...], float]:
+    from app.core.startup import STARTUP
+
+    values = {("mark", name): value for name, value in STARTUP.marks().items()}
+    values.update({("phase", name): value for name, value in STARTUP.phases().items()})
+    return values
+
+
+REGISTRY.gauge(
+    "startup_seconds",
+    "Worker startup milestones (seconds since import began) and phase durations",
+    ("kind", "name"),
+    callback=_startup_gauges,
+)
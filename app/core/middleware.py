@@ -0,0 +1,216 @@
+"""
+ASGI middleware: request-level instrumentation and response compression.
+"""
+
+import time
+import zlib
+
+from starlette.datastructures import MutableHeaders
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+from app.core.startup import STARTUP
+
+
+def _route_template(scope) -> str:
+    """
+    Resolve the matched route's path template (e.g. /api/v1/patients/{patient_id})
+    so latency is grouped per route rather than per concrete URL.
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+
+    templates = getattr(app.state, "route_templates", None)
+    if templates is None:
+        templates = {}
+        for route in app.routes:
+            route_endpoint = getattr(route, "endpoint", None)
+            if route_endpoint is not None:
+                templates.setdefault(route_endpoint, route.path)
+        app.state.route_templates = templates
+
+    return templates.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    """Records a latency histogram for every HTTP request, labelled by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        STARTUP.mark("first_request")
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(method=method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=_route_template(scope),
+                status=str(status_code),
+            )
+
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/fhir+ndjson",
+    "application/xml",
+    "text/",
+)
+
+
+def _accepted_encodings(header: str) -> dict:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available=("zstd", "gzip")) -> str:
+    """
+    Pick the response coding for an Accept-Encoding header: the highest q wins,
+    ties go to the order of `available` (zstd first). Returns "identity" if none.
+    """
+    accepted = _accepted_encodings(accept_encoding or "")
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compresses compressible responses (JSON, NDJSON, text) at or above
+    minimum_size bytes with zstd or gzip, as negotiated from Accept-Encoding.
+    Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.available = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers") or []:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept, self.available)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                compressible = (
+                    start_message["status"] not in (204, 304)
+                    and "content-encoding" not in headers
+                    and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                )
+                if compressible and "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if not compressible or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    start_message["headers"] = headers.raw
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.zstd_level)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    start_message["headers"] = headers.raw
+                    await send(start_message)
+                else:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    start_message["headers"] = headers.raw
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
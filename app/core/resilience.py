@@ -0,0 +1,394 @@
+"""
+Client-side resilience for calls to Google Cloud services.
+
+Each external service gets a `ResiliencePolicy` combining:
+- TokenBucket: smooths request bursts to a sustained rate
+- AdaptiveConcurrencyLimiter: AIMD limit on in-flight calls, halved on 429s
+  or slow responses and grown by one after a window of healthy calls
+- Retries with full jitter, bounded by attempts and an overall deadline
+- CircuitBreaker: fails fast while a service keeps erroring
+
+`ResilientProxy` wraps client objects so every caller of app/core/cloud.py
+goes through the policy without changing call sites.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from google.api_core import exceptions as gexc
+
+from app.core.metrics import REGISTRY
+
+RESILIENCE_EVENTS = REGISTRY.counter(
+    "resilience_events_total",
+    "Rate limiting, retry, overload and circuit breaker events per service",
+    ("service", "event"),
+)
+RESILIENCE_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "resilience_concurrency_limit",
+    "Current adaptive concurrency limit per service",
+    ("service",),
+)
+RESILIENCE_IN_FLIGHT = REGISTRY.gauge(
+    "resilience_in_flight",
+    "Calls currently in flight per service",
+    ("service",),
+)
+RESILIENCE_CIRCUIT_STATE = REGISTRY.gauge(
+    "resilience_circuit_state",
+    "Circuit breaker state per service (0 closed, 1 half-open, 2 open)",
+    ("service",),
+)
+RESILIENCE_WAIT = REGISTRY.histogram(
+    "resilience_wait_seconds",
+    "Time spent waiting for a rate-limit token or concurrency slot",
+    ("service", "gate"),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# Errors worth retrying: throttling, transient server errors, timeouts, dropped connections
+OVERLOAD_ERRORS = (gexc.TooManyRequests, gexc.ResourceExhausted)
+RETRYABLE_ERRORS = OVERLOAD_ERRORS + (
+    gexc.ServiceUnavailable,
+    gexc.InternalServerError,
+    gexc.BadGateway,
+    gexc.GatewayTimeout,
+    gexc.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose circuit is open."""
+
+
+class ResilienceTimeout(TimeoutError):
+    """Raised when a rate-limit token or concurrency slot is not available before the deadline."""
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if available; otherwise return seconds until one will be."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None, sleep: Callable[[float], None] = time.sleep) -> bool:
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit.
+
+    The limit grows by one after `limit` consecutive healthy calls (roughly one
+    step per round trip of the whole window) and is multiplied by `backoff` on an
+    overload signal (429/resource exhausted or latency above `latency_threshold`),
+    at most once per `cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_threshold: Optional[float] = None,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._healthy = 0
+        self._last_decrease = float("-inf")
+        self._clock = clock
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < int(self._limit), timeout=timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            slow = latency is not None and self.latency_threshold is not None and latency > self.latency_threshold
+            if overloaded or slow:
+                now = self._clock()
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                    self._last_decrease = now
+                self._healthy = 0
+            elif latency is not None:
+                self._healthy += 1
+                if self._healthy >= int(self._limit) and self._limit < self.max_limit:
+                    self._limit = min(float(self.max_limit), self._limit + 1)
+                    self._healthy = 0
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `recovery_timeout` seconds, then lets one trial call through (half-open).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        """End a trial call whose outcome says nothing about the service (e.g. a 404)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+class ResiliencePolicy:
+    """Rate limit, adaptive concurrency, retries and circuit breaking for one service."""
+
+    def __init__(
+        self,
+        service: str,
+        rate_limiter: Optional[TokenBucket] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_attempts: int = 4,
+        base_delay: float = 0.25,
+        max_delay: float = 8.0,
+        deadline: float = 60.0,
+        retryable: Iterable[type] = RETRYABLE_ERRORS,
+        overload: Iterable[type] = OVERLOAD_ERRORS,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service = service
+        self.rate_limiter = rate_limiter
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable = tuple(retryable)
+        self.overload = tuple(overload)
+        self._sleep = sleep
+        self._clock = clock
+        self._publish()
+
+    def _publish(self) -> None:
+        RESILIENCE_CONCURRENCY_LIMIT.set(self.limiter.limit, service=self.service)
+        RESILIENCE_IN_FLIGHT.set(self.limiter.in_flight, service=self.service)
+        RESILIENCE_CIRCUIT_STATE.set(_CIRCUIT_STATE_VALUES[self.breaker.state], service=self.service)
+
+    def _event(self, event: str) -> None:
+        RESILIENCE_EVENTS.inc(service=self.service, event=event)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _remaining(self, started: float) -> float:
+        return self.deadline - (self._clock() - started)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        started = self._clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                self._event("circuit_open")
+                self._publish()
+                raise CircuitOpenError(f"{self.service} circuit is open; not calling")
+
+            try:
+                result = self._attempt(fn, args, kwargs, started)
+            except ResilienceTimeout:
+                # Our own rate/concurrency gates timed out; the service was never called.
+                # Caught before self.retryable (ResilienceTimeout is a TimeoutError).
+                self.breaker.release()
+                self._event("gave_up")
+                raise
+            except self.retryable as e:
+                self.breaker.record_failure()
+                self._publish()
+                if isinstance(e, self.overload):
+                    self._event("overloaded")
+                delay = self.backoff_delay(attempt)
+                if attempt >= self.max_attempts or delay >= self._remaining(started):
+                    self._event("gave_up")
+                    raise
+                self._event("retry")
+                self._sleep(delay)
+                continue
+            except Exception:
+                # Caller errors (not found, bad request) say nothing about service health
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            self._publish()
+            return result
+
+    def _attempt(self, fn, args, kwargs, started: float) -> Any:
+        if self.rate_limiter is not None:
+            wait_start = time.perf_counter()
+            acquired = self.rate_limiter.acquire(timeout=max(0.0, self._remaining(started)), sleep=self._sleep)
+            waited = time.perf_counter() - wait_start
+            RESILIENCE_WAIT.observe(waited, service=self.service, gate="rate_limit")
+            if not acquired:
+                self._event("rate_limited")
+                raise ResilienceTimeout(f"{self.service} rate limit: no token before deadline")
+            if waited > 0.001:
+                self._event("throttled")
+
+        wait_start = time.perf_counter()
+        acquired = self.limiter.acquire(timeout=max(0.0, self._remaining(started)))
+        RESILIENCE_WAIT.observe(time.perf_counter() - wait_start, service=self.service, gate="concurrency")
+        if not acquired:
+            self._event("concurrency_limited")
+            raise ResilienceTimeout(f"{self.service} concurrency limit: no slot before deadline")
+
+        self._publish()
+        call_start = time.perf_counter()
+        overloaded = False
+        latency = None
+        try:
+            result = fn(*args, **kwargs)
+            latency = time.perf_counter() - call_start
+            return result
+        except self.overload:
+            overloaded = True
+            raise
+        finally:
+            self.limiter.release(latency=latency, overloaded=overloaded)
+            self._publish()
+
+
+class ResilientProxy:
+    """
+    Wraps a client object so the named methods run through a ResiliencePolicy.
+
+    `methods` maps method name to an optional post-processing function, e.g.
+    `list` to materialize a paged iterator inside the policy, or a function
+    wrapping the returned object in another proxy.
+    """
+
+    def __init__(self, target: Any, policy: ResiliencePolicy, methods: Dict[str, Optional[Callable[[Any], Any]]]):
+        self._target = target
+        self._policy = policy
+        self._methods = methods
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name not in self._methods or not callable(attribute):
+            return attribute
+        post = self._methods[name]
+
+        def call(*args, **kwargs):
+            if post is None:
+                return self._policy.call(attribute, *args, **kwargs)
+            return self._policy.call(lambda: post(attribute(*args, **kwargs)))
+
+        call.__name__ = name
+        return call
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._target, name, value)
+
+    def __repr__(self) -> str:
+        return f"ResilientProxy({self._target!r}, service={self._policy.service!r})"
@@ -0,0 +1,67 @@
+"""
+JSON responses serialized with orjson.
+
+ORJSONResponse is the application's default response class. FastAPI still runs
+jsonable_encoder over plain dicts returned from an endpoint before handing them
+to the response class, which walks every value of every row; endpoints that
+return rows straight from Supabase or JSON from Cloud Storage return a
+response object instead (json_response / embed_json_response) so the content
+is serialized once, by orjson, without that pass.
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse as _FastAPIORJSONResponse
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not serialize natively (UUID, datetime, dataclasses and numpy are native)."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(_FastAPIORJSONResponse):
+    """ORJSONResponse that also handles Decimal, sets and Pydantic models."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Serialize content directly with orjson (skips FastAPI's jsonable_encoder)."""
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def embed_json(envelope: Dict[str, Any], key: str, raw_json: bytes) -> bytes:
+    """
+    Encode envelope with already-serialized JSON bytes embedded under key.
+
+    Lets stored JSON documents (e.g. OCR output in Cloud Storage) be returned
+    inside the usual {"status": ..., "data": ...} wrapper without parsing and
+    re-encoding them.
+    """
+    head = dumps(envelope)
+    separator = b"," if len(head) > 2 else b""
+    return head[:-1] + separator + dumps(key) + b":" + raw_json.strip() + b"}"
+
+
+def embed_json_response(envelope: Dict[str, Any], key: str, raw_json: bytes,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(embed_json(envelope, key, raw_json), media_type="application/json", headers=headers)
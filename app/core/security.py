@@ -0,0 +1,237 @@
+"""
+Stateless session tokens for patient authentication.
+
+Access and refresh tokens are HS256-signed JWTs carrying the patient's
+identity claims, so an authenticated request can be resolved with a local
+signature check instead of a lookup in the `patients` table. Revoked token
+ids are kept in a small in-process cache that is periodically synced from
+the `revoked_tokens` table, so logouts propagate to every worker.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+from app.core.config import (
+    JWT_SECRET_KEY,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    TOKEN_REVOCATION_REFRESH_SECONDS,
+)
+
+TOKEN_ISSUER = "healix"
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+class TokenError(Exception):
+    """Raised when a token is malformed, tampered with, expired or revoked."""
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(segment: str) -> bytes:
+    padding = "=" * (-len(segment) % 4)
+    return base64.urlsafe_b64decode(segment + padding)
+
+
+def _get_secret() -> bytes:
+    if not JWT_SECRET_KEY:
+        raise ValueError("JWT_SECRET_KEY environment variable is not set")
+    return JWT_SECRET_KEY.encode("utf-8")
+
+
+def _sign(signing_input: bytes, secret: bytes) -> str:
+    return _b64url_encode(hmac.new(secret, signing_input, hashlib.sha256).digest())
+
+
+_ENCODED_HEADER = _b64url_encode(json.dumps(_HEADER, separators=(",", ":")).encode("utf-8"))
+
+
+def create_token(claims: dict, token_type: str, expires_in: int) -> str:
+    """
+    Create a signed token.
+
+    Args:
+        claims: Identity claims to embed (must include "sub")
+        token_type: ACCESS_TOKEN or REFRESH_TOKEN
+        expires_in: Lifetime in seconds
+
+    Returns:
+        Compact JWT string
+    """
+    now = int(time.time())
+    payload = {
+        **claims,
+        "type": token_type,
+        "iss": TOKEN_ISSUER,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + expires_in,
+    }
+    encoded_payload = _b64url_encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{_ENCODED_HEADER}.{encoded_payload}".encode("ascii")
+    return f"{_ENCODED_HEADER}.{encoded_payload}.{_sign(signing_input, _get_secret())}"
+
+
+def create_token_pair(patient: dict) -> dict:
+    """
+    Issue an access/refresh token pair for an authenticated patient.
+
+    Args:
+        patient: Patient row (without password_hash)
+
+    Returns:
+        Dictionary with access_token, refresh_token, token_type and expires_in
+    """
+    claims = {
+        "sub": str(patient["id"]),
+        "email": patient.get("email"),
+        "nic": patient.get("nic"),
+        "name": patient.get("full_name"),
+    }
+    access_ttl = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return {
+        "access_token": create_token(claims, ACCESS_TOKEN, access_ttl),
+        "refresh_token": create_token(claims, REFRESH_TOKEN, REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+        "token_type": "bearer",
+        "expires_in": access_ttl,
+    }
+
+
+def decode_token(token: str, expected_type: str = ACCESS_TOKEN) -> dict:
+    """
+    Verify a token's signature, expiry, type and revocation status.
+
+    Args:
+        token: Compact JWT string
+        expected_type: ACCESS_TOKEN or REFRESH_TOKEN
+
+    Returns:
+        The token claims
+
+    Raises:
+        TokenError: If the token is not valid for use
+    """
+    try:
+        encoded_header, encoded_payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        raise TokenError("Malformed token")
+
+    if encoded_header != _ENCODED_HEADER:
+        raise TokenError("Unsupported token header")
+
+    # Compared as bytes: compare_digest raises TypeError for non-ASCII str
+    signing_input = f"{encoded_header}.{encoded_payload}".encode("utf-8")
+    if not hmac.compare_digest(signature.encode("utf-8"), _sign(signing_input, _get_secret()).encode("ascii")):
+        raise TokenError("Invalid token signature")
+
+    try:
+        claims = json.loads(_b64url_decode(encoded_payload))
+    except (ValueError, TypeError):
+        raise TokenError("Malformed token payload")
+
+    if claims.get("iss") != TOKEN_ISSUER or claims.get("type") != expected_type:
+        raise TokenError("Invalid token type")
+    if claims.get("exp", 0) <= time.time():
+        raise TokenError("Token has expired")
+    if revocation_list.is_revoked(claims.get("jti")):
+        raise TokenError("Token has been revoked")
+
+    return claims
+
+
+def revoke_token(claims: dict) -> None:
+    """Revoke a decoded token until its natural expiry."""
+    revocation_list.revoke(claims["jti"], claims["exp"])
+
+
+# ===== REVOCATION LIST =====
+
+def _load_revoked_from_db() -> Iterable[dict]:
+    from app.db.supabase import supabase
+
+    now = datetime.now(timezone.utc).isoformat()
+    response = supabase.table("revoked_tokens").select("jti, expires_at").gt("expires_at", now).execute()
+    return response.data or []
+
+
+def _persist_revoked_to_db(jti: str, expires_at: int) -> None:
+    from app.db.supabase import supabase
+
+    supabase.table("revoked_tokens").upsert({
+        "jti": jti,
+        "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+    }).execute()
+
+
+class RevocationList:
+    """
+    In-process cache of revoked token ids.
+
+    Lookups never touch the database; the cache is re-synced from the
+    backing store at most once per `refresh_interval` seconds. Entries are
+    dropped once the token they refer to would have expired anyway.
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[], Iterable[dict]]] = _load_revoked_from_db,
+        persister: Optional[Callable[[str, int], None]] = _persist_revoked_to_db,
+        refresh_interval: int = TOKEN_REVOCATION_REFRESH_SECONDS,
+    ):
+        self._loader = loader
+        self._persister = persister
+        self._refresh_interval = refresh_interval
+        self._revoked: Dict[str, float] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: int) -> None:
+        with self._lock:
+            self._revoked[jti] = float(expires_at)
+        if self._persister:
+            self._persister(jti, expires_at)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return True
+        self._maybe_refresh()
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _maybe_refresh(self) -> None:
+        if self._loader is None or time.monotonic() - self._loaded_at < self._refresh_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self._refresh_interval:
+                return
+            # Mark as loaded first so a failing backend is not retried on every request
+            self._loaded_at = time.monotonic()
+            try:
+                rows = self._loader()
+            except Exception as e:
+                print(f"Warning: Failed to refresh token revocation list: {str(e)}")
+                return
+
+            now = time.time()
+            revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            for row in rows:
+                expires_at = row["expires_at"]
+                if isinstance(expires_at, str):
+                    expires_at = datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+                revoked[row["jti"]] = float(expires_at)
+            self._revoked = revoked
+
+
+revocation_list = RevocationList()
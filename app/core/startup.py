@@ -0,0 +1,204 @@
+"""
+Startup profiling, lazily created clients and worker warm-up.
+
+Every gunicorn worker imports app.main on boot, so importing it must stay
+cheap and free of side effects: the Google Cloud SDKs and the Supabase client
+are imported and built on first use (LazyClient, app.core.cloud getters) or by
+warm_up() from the lifespan hook once the worker has started.
+
+warm_up() builds the registered clients, runs the dependency checks once (which
+opens the Supabase/GCS connections and the Document AI gRPC channel, see
+app/core/health.py) and loads registered reference data, then marks the worker
+warm; /health/ready reports 503 until then.
+
+STARTUP times those steps and marks when the app module was imported, when
+the worker was ready and when it served its first request. The report is
+served at /api/v1/system/startup and exported as startup_* metrics.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class StartupProfile:
+    """Milestones (seconds since this module was imported) and timed phases of one worker."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._marks: Dict[str, float] = {}
+        self._phases: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, name: str) -> None:
+        """Record a milestone; only the first occurrence counts."""
+        if name in self._marks:
+            return
+        with self._lock:
+            self._marks.setdefault(name, self.elapsed())
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup step (import, client construction, warm-up)."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self._errors[name] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            with self._lock:
+                self._phases[name] = time.perf_counter() - start
+
+    def marks(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._marks)
+
+    def phases(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "marks_ms": {name: round(value * 1000, 1) for name, value in self._marks.items()},
+                "phases_ms": {name: round(value * 1000, 1) for name, value in self._phases.items()},
+                "errors": dict(self._errors),
+            }
+
+
+STARTUP = StartupProfile()
+
+
+class LazyClient:
+    """
+    Stands in for a module-level client (e.g. `supabase`) and builds it with
+    factory() on first attribute access. Construction happens once per
+    process, under a lock, and is timed as the "client:<name>" phase.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    with STARTUP.phase(f"client:{self._name}"):
+                        self._client = self._factory()
+                client = self._client
+        return client
+
+    def reset(self) -> None:
+        """Drop the client; the next use builds a new one."""
+        with self._lock:
+            self._client = None
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        state = "initialized" if self.initialized else "not initialized"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+# name -> callable that builds (or returns) a client; see register_warmup
+_WARMUPS: Dict[str, Callable[[], Any]] = {}
+# name -> callable that loads reference data into a process-local cache
+_PRELOADS: Dict[str, Callable[[], Any]] = {}
+
+WARM = "warm"
+
+
+def register_warmup(name: str, build: Callable[[], Any]) -> None:
+    """Register a client constructor for warm_clients()."""
+    _WARMUPS[name] = build
+
+
+def register_preload(name: str, load: Callable[[], Any]) -> None:
+    """Register reference data (lookup tables, matchers) to load during warm_up()."""
+    _PRELOADS[name] = load
+
+
+def warm_clients(names: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+    """
+    Build the registered clients now instead of on the first request that needs them.
+
+    Failures are reported, not raised: a worker without (say) Document AI
+    credentials can still serve everything else.
+
+    Returns:
+        {name: None on success, or the error message}
+    """
+    results = {}
+    for name, build in list(_WARMUPS.items()):
+        if names is not None and name not in names:
+            continue
+        try:
+            with STARTUP.phase(f"warm:{name}"):
+                build()
+            results[name] = None
+        except Exception as e:
+            print(f"⚠️  Warm-up of {name} client failed: {e}")
+            results[name] = str(e)
+    STARTUP.mark("clients_warm")
+    return results
+
+
+def preload_reference_data() -> Dict[str, Optional[str]]:
+    """Run the registered preloads; like warm_clients(), failures are reported, not raised."""
+    results = {}
+    for name, load in list(_PRELOADS.items()):
+        try:
+            with STARTUP.phase(f"preload:{name}"):
+                load()
+            results[name] = None
+        except Exception as e:
+            print(f"⚠️  Preloading {name} failed: {e}")
+            results[name] = str(e)
+    return results
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Build clients, open their connections and load reference data.
+
+    Returns:
+        {"clients": {...}, "dependencies": {...}, "preloads": {...}} with
+        None / check results / error messages per entry
+    """
+    from app.core.health import check_dependencies
+
+    clients = warm_clients()
+    with STARTUP.phase("warm:connections"):
+        dependencies = check_dependencies(force=True)
+    preloads = preload_reference_data()
+    STARTUP.mark(WARM)
+    return {"clients": clients, "dependencies": dependencies, "preloads": preloads}
+
+
+def is_warm() -> bool:
+    return WARM in STARTUP.marks()
+
+
+def start_background_warmup() -> threading.Thread:
+    """Run warm_up() on a daemon thread so the worker can accept requests meanwhile."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
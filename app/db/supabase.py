@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from app.core.health import register_check
+from app.core.startup import LazyClient, register_warmup
 
 # Load environment variables from .env file
 load_dotenv()
@@ -8,4 +10,23 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+
+def create_supabase_client():
+    # The SDK (httpx, postgrest, gotrue, realtime...) is imported here rather than
+    # at module load so workers boot without it
+    from supabase import create_client
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+# Used like a supabase.Client; the real client is created on first use
+supabase = LazyClient("supabase", create_supabase_client)
+register_warmup("supabase", supabase.get)
+
+
+def _check_supabase():
+    # One small PostgREST round trip; also opens the client's keep-alive connection
+    supabase.table("patients").select("id").limit(1).execute()
+
+
+register_check("supabase", _check_supabase)
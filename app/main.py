@@ -1,16 +1,75 @@
 
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.core.startup import STARTUP, start_background_warmup
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import (
+    COMPRESSION_MIN_BYTES, GZIP_LEVEL, ZSTD_LEVEL, WARM_CLIENTS_ON_STARTUP, WARMUP_TIMEOUT_SECONDS,
+    OUTBOX_RELAY_ENABLED, NOTIFICATIONS_ENABLED
+)
+from app.core.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from app.core.middleware import MetricsMiddleware, CompressionMiddleware
+from app.core.responses import ORJSONResponse
 
 from app.api.v1.endpoints import reports as ocr
 from app.api.v1.endpoints import patient
 from app.api.v1.endpoints import care_circle
 from app.api.v1.endpoints import medication
+from app.api.v1.endpoints import health_metrics
+from app.api.v1.endpoints import report_extracted_data
+from app.api.v1.endpoints import system
+from app.api.v1.endpoints import search
+from app.api.v1.endpoints import fhir
+from app.api.v1.endpoints import health
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_CLIENTS_ON_STARTUP:
+        # Until startup completes this worker does not accept connections, so the
+        # other (warm) workers take the traffic
+        warmup = start_background_warmup()
+        await asyncio.to_thread(warmup.join, WARMUP_TIMEOUT_SECONDS)
+        if warmup.is_alive():
+            print(f"⚠️  Warm-up still running after {WARMUP_TIMEOUT_SECONDS:g}s; serving while it finishes (/health/ready is 503 until then)")
+    STARTUP.mark("app_ready")
+    print(f"✅ Worker ready in {STARTUP.marks()['app_ready'] * 1000:.0f} ms")
+
+    sender = None
+    if NOTIFICATIONS_ENABLED:
+        # Fail startup rather than queue notifications that no sender delivers
+        from app.services.notification_senders import default_sender
+
+        sender = default_sender()
+
+    background = []
+    if OUTBOX_RELAY_ENABLED:
+        from app.services.outbox_relay import start_relay
+
+        background.append(start_relay())
+        if sender is not None:
+            from app.services.notification_service import NotificationDispatcher, start_dispatcher
+
+            background.append(start_dispatcher(NotificationDispatcher(sender)))
+    try:
+        yield
+    finally:
+        for stop in background:
+            stop.set()
+
 
 app = FastAPI(
     title="Healix Backend API",
     description="AI-powered medical record system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -22,9 +81,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# zstd/gzip for JSON, NDJSON and text responses above the size threshold
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_BYTES,
+    gzip_level=GZIP_LEVEL,
+    zstd_level=ZSTD_LEVEL,
+)
+
+# Per-route latency histograms (exposed at /metrics)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(ocr.router, prefix="/api/v1/ocr", tags=["OCR"])
 app.include_router(patient.router, prefix="/api/v1", tags=["Patients"])
 app.include_router(care_circle.router, prefix="/api/v1", tags=["Care Circle"])
 app.include_router(medication.router, prefix="/api/v1", tags=["Medications"])
+app.include_router(health_metrics.router, prefix="/api/v1", tags=["Health Metrics"])
+app.include_router(report_extracted_data.router, prefix="/api/v1", tags=["Report Extracted Data"])
+app.include_router(system.router, prefix="/api/v1", tags=["System"])
+app.include_router(search.router, prefix="/api/v1", tags=["Search"])
+app.include_router(fhir.router, prefix="/api/v1", tags=["FHIR"])
+# Probes live at the root like /metrics (/api/v1/health/* are the health-metric routes)
+app.include_router(health.router, tags=["Health"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (metrics of the worker serving the request)"""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
+STARTUP.mark("app_imported")
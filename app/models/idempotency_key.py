@@ -0,0 +1,19 @@
+# app/models/idempotency_key.py
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+@dataclass
+class IdempotencyKey:
+    """
+    Stored Idempotency-Key matching Supabase schema (migrations/002_idempotency_keys.sql).
+    Note: This is for documentation only.
+    The actual database schema is managed by Supabase.
+    """
+    scope: str
+    key: str
+    fingerprint: str
+    status: str  # in_progress | completed
+    response: Optional[Dict[str, Any]]
+    created_at: datetime
+    expires_at: datetime
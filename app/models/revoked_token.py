@@ -0,0 +1,14 @@
+# app/models/revoked_token.py
+from dataclasses import dataclass
+from datetime import datetime
+
+@dataclass
+class RevokedToken:
+    """
+    Revoked session token matching Supabase schema (migrations/001_revoked_tokens.sql).
+    Note: This is for documentation only.
+    The actual database schema is managed by Supabase.
+    """
+    jti: str
+    expires_at: datetime
+    revoked_at: datetime
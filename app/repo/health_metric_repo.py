@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.health_metric import HealthMetric, AnatomyCategory, MetricReference
 from app.schemas.health_metric import HealthMetricCreate, HealthMetricUpdate, MetricReferenceBase
 from uuid import UUID
+from sqlalchemy import func
 from typing import List, Optional
 
 class HealthMetricRepo:
@@ -9,7 +10,7 @@ class HealthMetricRepo:
     def create(db: Session, metric_in: HealthMetricCreate) -> HealthMetric:
         db_metric = HealthMetric(**metric_in.model_dump())
         db.add(db_metric)
-        db.commit()
+        db.flush()
         db.refresh(db_metric)
         return db_metric
 
@@ -23,24 +24,43 @@ class HealthMetricRepo:
             query = query.filter(HealthMetric.anatomy_category == anatomy_category)
         return query.offset(skip).limit(limit).all()
 
+    @staticmethod
+    def get_latest_per_metric(db: Session, user_id: UUID) -> List[HealthMetric]:
+        """The most recent reading of each metric a user has recorded, by metric name."""
+        latest = db.query(HealthMetric.metric_name, func.max(HealthMetric.recorded_at).label("recorded_at"))\
+            .filter(HealthMetric.user_id == user_id)\
+            .group_by(HealthMetric.metric_name)\
+            .subquery()
+        rows = db.query(HealthMetric)\
+            .join(latest, (HealthMetric.metric_name == latest.c.metric_name) & (HealthMetric.recorded_at == latest.c.recorded_at))\
+            .filter(HealthMetric.user_id == user_id)\
+            .order_by(HealthMetric.metric_name, HealthMetric.created_at.desc())\
+            .all()
+        # Two readings recorded at the same instant: keep the one created last
+        by_name = {}
+        for row in rows:
+            by_name.setdefault(row.metric_name, row)
+        return list(by_name.values())
+
     @staticmethod
     def update(db: Session, db_metric: HealthMetric, metric_in: HealthMetricUpdate) -> HealthMetric:
         update_data = metric_in.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_metric, key, value)
         db.add(db_metric)
-        db.commit()
+        db.flush()
         db.refresh(db_metric)
         return db_metric
 
     @staticmethod
-    def delete(db: Session, metric_id: UUID) -> bool:
+    def delete(db: Session, metric_id: UUID) -> Optional[UUID]:
+        """Delete a metric; returns its user_id, or None if it did not exist."""
         db_metric = db.query(HealthMetric).filter(HealthMetric.id == metric_id).first()
         if db_metric:
             db.delete(db_metric)
-            db.commit()
-            return True
-        return False
+            db.flush()
+            return db_metric.user_id
+        return None
 
 class MetricReferenceRepo:
     @staticmethod
@@ -52,7 +72,7 @@ class MetricReferenceRepo:
         else:
             db_ref = MetricReference(**ref_in.model_dump())
             db.add(db_ref)
-        db.commit()
+        db.flush()
         db.refresh(db_ref)
         return db_ref
 
@@ -9,7 +9,7 @@ class ReportExtractedDataRepo:
     def create(db: Session, report_in: ReportExtractedDataCreate) -> ReportExtractedData:
         db_report = ReportExtractedData(**report_in.model_dump())
         db.add(db_report)
-        db.commit()
+        db.flush()
         db.refresh(db_report)
         return db_report
 
@@ -38,7 +38,7 @@ class ReportExtractedDataRepo:
         for key, value in update_data.items():
             setattr(db_report, key, value)
         db.add(db_report)
-        db.commit()
+        db.flush()
         db.refresh(db_report)
         return db_report
 
@@ -47,6 +47,6 @@ class ReportExtractedDataRepo:
         db_report = db.query(ReportExtractedData).filter(ReportExtractedData.id == report_id).first()
         if db_report:
             db.delete(db_report)
-            db.commit()
+            db.flush()
             return True
         return False
@@ -41,3 +41,11 @@ class PatientLogin(BaseModel):
     """Schema for patient login"""
     email: EmailStr = Field(..., description="Patient's email address")
     password: str = Field(..., description="Patient's password")
+
+class TokenRefresh(BaseModel):
+    """Schema for exchanging a refresh token"""
+    refresh_token: str = Field(..., description="Refresh token issued at login")
+
+class LogoutRequest(BaseModel):
+    """Schema for logging out (refresh token is optional)"""
+    refresh_token: Optional[str] = Field(None, description="Refresh token to revoke as well")
@@ -61,3 +61,11 @@ class ReportWithBiomarkers(BaseModel):
 
     class Config:
         from_attributes = True
+
+class SignedUploadRequest(BaseModel):
+    """Request a signed URL to upload a report PDF directly to Cloud Storage"""
+    nic: str = Field(..., description="Patient's National Identity Card number")
+
+class UploadFinalizeRequest(BaseModel):
+    """Confirm a direct upload so OCR processing can start"""
+    nic: str = Field(..., description="Patient's National Identity Card number")
@@ -0,0 +1,42 @@
+"""
+Export biomarkers to the Parquet dataset for population-level analytics.
+
+Each run appends the biomarkers created since the previous run (see
+app/services/analytics_export.py); schedule it, e.g. nightly from cron.
+Requires migrations/007_biomarker_export.sql.
+
+Usage:
+    python -m app.scripts.export_biomarkers [--output DIR] [--full] [--page-size N]
+"""
+import argparse
+import os
+import sys
+
+# Ensure we can import from app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.core.config import ANALYTICS_EXPORT_DIR, ANALYTICS_EXPORT_PAGE_SIZE
+from app.services.analytics_export import export_biomarkers
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export biomarkers to partitioned Parquet")
+    parser.add_argument("--output", default=ANALYTICS_EXPORT_DIR, help="Dataset directory")
+    parser.add_argument("--full", action="store_true", help="Discard the existing export and export every row again")
+    parser.add_argument("--page-size", type=int, default=ANALYTICS_EXPORT_PAGE_SIZE, help="Rows per query")
+    args = parser.parse_args(argv)
+
+    result = export_biomarkers(args.output, full=args.full, page_size=args.page_size)
+    if not result.get("success"):
+        print(f"⚠️  Export failed: {result.get('error')}")
+        return 1
+    data = result["data"]
+    if not data["rows"]:
+        print(f"✅ Nothing new to export to {args.output}")
+        return 0
+    print(f"✅ Exported {data['rows']} biomarkers in {len(data['files'])} files to {args.output} (run {data['run_id']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Rebuild patient_latest_biomarkers from reports and biomarkers.
+
+Run after migrations/003_patient_latest_biomarkers.sql if reports were ingested
+before it was applied, or whenever the table may have drifted (e.g. biomarkers
+edited directly in the database).
+
+Usage:
+    python -m app.scripts.rebuild_latest_biomarkers [--patient-id UUID ...]
+"""
+import argparse
+import os
+import sys
+
+# Ensure we can import from app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.latest_biomarker_service import rebuild_latest_biomarkers, rebuild_all_latest_biomarkers
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the latest biomarker value per patient")
+    parser.add_argument("--patient-id", action="append", default=[], help="Only rebuild these patients (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.patient_id:
+        failed = 0
+        for patient_id in args.patient_id:
+            result = rebuild_latest_biomarkers(patient_id)
+            if result.get("success"):
+                print(f"✅ {patient_id}: {result['count']} biomarkers ({result['removed']} removed)")
+            else:
+                failed += 1
+                print(f"⚠️  {patient_id}: {result.get('error')}")
+        return 1 if failed else 0
+
+    result = rebuild_all_latest_biomarkers()
+    if "error" in result:
+        print(f"⚠️  Rebuild failed: {result['error']}")
+        return 1
+    print(f"✅ Rebuilt latest biomarkers for {result['patients']} patients")
+    for patient_id, error in result["errors"].items():
+        print(f"⚠️  {patient_id}: {error}")
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
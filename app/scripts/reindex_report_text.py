@@ -0,0 +1,64 @@
+"""
+Index the OCR text of stored reports for search (report_search_documents).
+
+Run once after migrations/006_report_search.sql for reports ingested before it,
+or for reports whose indexing failed at ingest. The text is read from the raw
+OCR JSON in GCS (users/{nic}/processed/{file_id}.json).
+
+Usage:
+    python -m app.scripts.reindex_report_text [--patient-id UUID ...] [--page-size N]
+"""
+import argparse
+import os
+import sys
+
+# Ensure we can import from app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.db.supabase import supabase
+from app.services.search_service import index_report
+from app.services.upload_service import get_raw_json
+
+REPORT_COLUMNS = "id, patient_id, file_id, report_type, sample_collected_at, patients(nic)"
+
+
+def reports(patient_ids, page_size: int):
+    """Reports in id order, a page at a time."""
+    start = 0
+    while True:
+        query = supabase.table("reports").select(REPORT_COLUMNS)
+        if patient_ids:
+            query = query.in_("patient_id", patient_ids)
+        page = query.order("id").range(start, start + page_size - 1).execute().data
+        yield from page
+        if len(page) < page_size:
+            return
+        start += page_size
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index stored reports' OCR text for search")
+    parser.add_argument("--patient-id", action="append", default=[], help="Only these patients (repeatable)")
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    indexed = failed = 0
+    for report in reports(args.patient_id, args.page_size):
+        nic = (report.get("patients") or {}).get("nic")
+        try:
+            raw = get_raw_json(nic, report["file_id"], fields="raw_text")
+            result = index_report(report, raw.get("raw_text"))
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        if result.get("success"):
+            indexed += 1
+        else:
+            failed += 1
+            print(f"⚠️  {report['file_id']}: {result.get('error')}")
+
+    print(f"✅ Indexed {indexed} reports ({failed} failed)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
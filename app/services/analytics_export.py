@@ -0,0 +1,283 @@
+# app/services/analytics_export.py
+"""
+Incremental export of biomarkers to Parquet for population-level analytics.
+
+Rows come from the biomarker_export_rows view (migrations/007_biomarker_export.sql:
+biomarkers joined with their report and the patient's NIC), read in keyset pages
+on (created_at, id), and are written as a hive-partitioned dataset:
+
+    {root}/report_type=FBS/year=2024/part-{run_id}-0000.parquet
+
+`year` is the year the sample was collected (or the report created). Within a
+file rows are sorted by biomarker name, so readers filtering on name skip most
+row groups. Patients are de-identified: the export has sex and age at the time
+of the sample (with a 10-year age band), derived from the NIC
+(app/utils/nic.py), and pseudonymous patient_key and report_key columns, HMACs
+of the ids under ANALYTICS_EXPORT_KEY. Without the key they cannot be matched
+to patient or report ids seen elsewhere; names, NICs and row ids are not
+exported. A run with a different key than the existing export is refused
+(re-export with full=True).
+
+Each run exports the rows created since the previous run's watermark, kept
+with the list of runs in {root}/_export_state.json. Files are written under a
+temporary name and renamed into place, and the state is saved last: files of
+a run that did not finish are removed by the next run, which exports those
+rows again. A report that is ingested again gets new biomarker rows, so it
+appears again in a later run; keep the rows with the latest ingested_at per
+report_key.
+
+    import pyarrow.dataset as ds
+    ds.dataset("exports/biomarkers", partitioning="hive").to_table(filter=ds.field("name") == "FBS")
+"""
+import hashlib
+import hmac
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+from uuid import uuid4
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.db.supabase import supabase
+from app.core.config import (
+    ANALYTICS_EXPORT_DIR,
+    ANALYTICS_EXPORT_KEY,
+    ANALYTICS_EXPORT_LAG_SECONDS,
+    ANALYTICS_EXPORT_PAGE_SIZE,
+    ANALYTICS_EXPORT_ROWS_PER_FILE,
+)
+from app.core.metrics import track_external_call
+from app.utils.nic import parse_nic
+
+VIEW = "biomarker_export_rows"
+SOURCE_COLUMNS = ("id, report_id, name, value, unit, ref_min, ref_max, flag, created_at, "
+                  "patient_id, report_type, sample_collected_at, report_created_at, nic")
+STATE_FILE = "_export_state.json"
+EPOCH = "1970-01-01T00:00:00+00:00"
+PART_RE = re.compile(r"^\.?part-(\d{8}T\d{6}-[0-9a-f]{6})-\d{4}\.parquet(\.tmp)?$")
+
+AGE_BINS = [0, 10, 20, 30, 40, 50, 60, 70, 80, 200]
+AGE_BANDS = ["0-9", "10-19", "20-29", "30-39", "40-49", "50-59", "60-69", "70-79", "80+"]
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+SCHEMA = pa.schema([
+    ("patient_key", pa.string()),
+    ("report_key", pa.string()),
+    ("sex", pa.string()),
+    ("age_at_sample", pa.int16()),
+    ("age_band", pa.string()),
+    ("name", pa.string()),
+    ("value", pa.float64()),
+    ("unit", pa.string()),
+    ("ref_min", pa.float64()),
+    ("ref_max", pa.float64()),
+    ("flag", pa.string()),
+    ("sample_collected_at", TIMESTAMP),
+    ("report_created_at", TIMESTAMP),
+    ("ingested_at", TIMESTAMP),
+])
+
+
+def pages(after: Optional[dict], until: str, page_size: int = ANALYTICS_EXPORT_PAGE_SIZE) -> Iterator[List[dict]]:
+    """
+    Export rows created after the `after` watermark ({"created_at", "id"}) and
+    at or before `until`, in (created_at, id) order, a page at a time.
+    """
+    created_at = after["created_at"] if after else EPOCH
+    last_id = after["id"] if after else None
+    while True:
+        rows = []
+        if last_id is not None:
+            # The rest of the rows sharing the last timestamp (one report's biomarkers share it)
+            with track_external_call("supabase", "select_export_rows"):
+                rows = supabase.table(VIEW).select(SOURCE_COLUMNS)\
+                    .eq("created_at", created_at)\
+                    .gt("id", last_id)\
+                    .order("id")\
+                    .limit(page_size)\
+                    .execute().data
+        if not rows:
+            with track_external_call("supabase", "select_export_rows"):
+                rows = supabase.table(VIEW).select(SOURCE_COLUMNS)\
+                    .gt("created_at", created_at)\
+                    .lte("created_at", until)\
+                    .order("created_at")\
+                    .order("id")\
+                    .limit(page_size)\
+                    .execute().data
+        if not rows:
+            return
+        yield rows
+        created_at, last_id = rows[-1]["created_at"], rows[-1]["id"]
+
+
+def pseudonym(value: str, key: str) -> str:
+    """Stable pseudonymous key for an id: HMAC-SHA256 under the export key."""
+    return hmac.new(key.encode("utf-8"), str(value).encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def _key_id(key: str) -> str:
+    """Identifies the export key in the state file without revealing it."""
+    return pseudonym("analytics-export-key", key)[:12]
+
+
+def _timestamps(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+
+
+def to_frame(rows: List[dict], key: str) -> pd.DataFrame:
+    """Export rows as the de-identified frame written to Parquet (plus the report_type/year partition columns)."""
+    source = pd.DataFrame.from_records(rows, columns=[c.strip() for c in SOURCE_COLUMNS.split(",")])
+
+    people = {nic: parse_nic(nic) for nic in source["nic"].dropna().unique()}
+    birth = pd.to_datetime(source["nic"].map(lambda nic: (people.get(nic) or {}).get("birth_date")), errors="coerce")
+    sample_at = _timestamps(source["sample_collected_at"])
+    report_created_at = _timestamps(source["report_created_at"])
+    ingested_at = _timestamps(source["created_at"])
+    when = sample_at.fillna(report_created_at).fillna(ingested_at)
+
+    before_birthday = (when.dt.month * 100 + when.dt.day) < (birth.dt.month * 100 + birth.dt.day)
+    age = (when.dt.year - birth.dt.year - before_birthday.astype(int)).where(birth.notna())
+    age = age.where(age >= 0)
+    patients = {pid: pseudonym(pid, key) for pid in source["patient_id"].unique()}
+    reports = {rid: pseudonym(rid, key) for rid in source["report_id"].unique()}
+
+    return pd.DataFrame({
+        "patient_key": source["patient_id"].map(patients),
+        "report_key": source["report_id"].map(reports),
+        "sex": source["nic"].map(lambda nic: (people.get(nic) or {}).get("sex")),
+        "age_at_sample": age.astype("Int16"),
+        "age_band": pd.cut(age, bins=AGE_BINS, labels=AGE_BANDS, right=False).astype(object).where(age.notna(), None),
+        "name": source["name"],
+        "value": pd.to_numeric(source["value"], errors="coerce"),
+        "unit": source["unit"],
+        "ref_min": pd.to_numeric(source["ref_min"], errors="coerce"),
+        "ref_max": pd.to_numeric(source["ref_max"], errors="coerce"),
+        "flag": source["flag"],
+        "sample_collected_at": sample_at,
+        "report_created_at": report_created_at,
+        "ingested_at": ingested_at,
+        "report_type": source["report_type"].fillna("unknown").astype(str),
+        "year": when.dt.year.astype("Int64"),
+    })
+
+
+# ===== FILES =====
+
+def _load_state(root: str) -> dict:
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {"watermark": None, "runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(root: str, state: dict) -> None:
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _part_files(root: str) -> Iterator[tuple]:
+    """(path, run_id) of every part file (and leftover temporary file) under root."""
+    for directory, _, names in os.walk(root):
+        for name in names:
+            match = PART_RE.match(name)
+            if match:
+                yield os.path.join(directory, name), match.group(1)
+
+
+def _remove_files(root: str, keep_runs: set) -> int:
+    removed = 0
+    for path, run_id in _part_files(root):
+        if run_id not in keep_runs:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def write_files(frame: pd.DataFrame, root: str, run_id: str, sequence: int) -> List[str]:
+    """Write one file per (report_type, year) partition; returns their paths relative to root."""
+    written = []
+    for (report_type, year), group in frame.groupby(["report_type", "year"], sort=True):
+        directory = os.path.join(root, f"report_type={quote(report_type, safe='')}", f"year={year}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{run_id}-{sequence:04d}.parquet"
+        table = pa.Table.from_pandas(
+            group.sort_values(["name", "sample_collected_at"], kind="stable")[SCHEMA.names],
+            schema=SCHEMA,
+            preserve_index=False,
+        )
+        temporary = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temporary, compression="zstd")
+        os.replace(temporary, os.path.join(directory, name))
+        written.append(os.path.relpath(os.path.join(directory, name), root))
+    return written
+
+
+def export_biomarkers(root: str = ANALYTICS_EXPORT_DIR, full: bool = False,
+                      page_size: int = ANALYTICS_EXPORT_PAGE_SIZE, rows_per_file: int = ANALYTICS_EXPORT_ROWS_PER_FILE,
+                      lag_seconds: float = ANALYTICS_EXPORT_LAG_SECONDS, now: Optional[datetime] = None,
+                      key: Optional[str] = None) -> dict:
+    """
+    Export the biomarkers created since the last run.
+
+    Args:
+        root: Dataset directory
+        full: Discard the existing export and start again from the first row
+        key: Pseudonym key (default ANALYTICS_EXPORT_KEY)
+
+    Returns:
+        {"success", "data": {"run_id", "rows", "files", "watermark"}}
+    """
+    try:
+        key = key or ANALYTICS_EXPORT_KEY
+        if not key:
+            return {"success": False, "error": "ANALYTICS_EXPORT_KEY is not set"}
+        os.makedirs(root, exist_ok=True)
+        state = {"watermark": None, "runs": []} if full else _load_state(root)
+        if state["runs"] and state.get("key_id") != _key_id(key):
+            return {"success": False, "error": "The export key has changed; export again with full=True (--full)"}
+        state["key_id"] = _key_id(key)
+        _remove_files(root, {run["run_id"] for run in state["runs"]})
+
+        now = now or datetime.now(timezone.utc)
+        until = (now - timedelta(seconds=lag_seconds)).isoformat()
+        run_id = f"{now.strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:6]}"
+
+        files: List[str] = []
+        frames: List[pd.DataFrame] = []
+        buffered = rows = flushes = 0
+        last: Optional[Dict[str, str]] = None
+        for page in pages(state["watermark"], until, page_size):
+            frames.append(to_frame(page, key))
+            buffered += len(page)
+            rows += len(page)
+            last = {"created_at": page[-1]["created_at"], "id": str(page[-1]["id"])}
+            if buffered >= rows_per_file:
+                files += write_files(pd.concat(frames, ignore_index=True), root, run_id, flushes)
+                frames, buffered, flushes = [], 0, flushes + 1
+        if frames:
+            files += write_files(pd.concat(frames, ignore_index=True), root, run_id, flushes)
+
+        if rows:
+            state["runs"].append({
+                "run_id": run_id,
+                "rows": rows,
+                "files": files,
+                "after": state["watermark"],
+                "until": last,
+                "exported_at": now.isoformat(),
+            })
+            state["watermark"] = last
+        _save_state(root, state)
+        return {"success": True, "data": {"run_id": run_id if rows else None, "rows": rows, "files": files,
+                                          "watermark": state["watermark"]}}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,183 @@
+"""
+Batch ingestion of lab result PDFs.
+
+A batch is a list of items (filename, NIC, a callable returning the PDF bytes)
+built from either a multipart set of files with a parallel list of NICs or a
+ZIP archive. All NICs are resolved with one query, PDFs are read and uploaded
+to GCS on a bounded thread pool, and the accepted files are processed by a
+single background job with its own OCR concurrency limit.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import (
+    BATCH_MAX_FILES, BATCH_MAX_TOTAL_BYTES, BATCH_UPLOAD_CONCURRENCY, BATCH_OCR_CONCURRENCY, MAX_UPLOAD_BYTES
+)
+from app.services import patientService, upload_service
+
+MANIFEST_NAMES = ("manifest.csv", "manifest.json")
+
+STATUS_QUEUED = "queued"
+STATUS_REJECTED = "rejected"
+STATUS_FAILED = "failed"
+
+# "kind" of a failed ingest_batch(): the batch is over a limit, or the NIC lookup failed
+ERROR_TOO_LARGE = "too_large"
+ERROR_LOOKUP_FAILED = "lookup_failed"
+
+
+class BatchError(ValueError):
+    """The batch as a whole cannot be accepted (too many files, bad archive, ...)."""
+
+
+def batch_item(filename: str, nic: Optional[str], read: Callable[[], bytes]) -> Dict[str, Any]:
+    return {"filename": filename, "nic": (nic or "").strip() or None, "read": read}
+
+
+def _read_manifest(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """filename -> NIC from manifest.csv (filename,nic) or manifest.json ({filename: nic} or [{filename, nic}])."""
+    names = {os.path.basename(name).lower(): name for name in archive.namelist()}
+    if "manifest.csv" in names:
+        text = archive.read(names["manifest.csv"]).decode("utf-8-sig")
+        return {
+            row["filename"].strip(): row["nic"].strip()
+            for row in csv.DictReader(io.StringIO(text))
+            if row.get("filename") and row.get("nic")
+        }
+    if "manifest.json" in names:
+        data = json.loads(archive.read(names["manifest.json"]))
+        if isinstance(data, dict):
+            return {str(k): str(v) for k, v in data.items()}
+        return {str(row["filename"]): str(row["nic"]) for row in data}
+    return {}
+
+
+def items_from_zip(fileobj) -> List[Dict[str, Any]]:
+    """
+    Build batch items from a ZIP of PDFs.
+
+    The NIC for each PDF comes from a manifest (manifest.csv with filename,nic
+    columns, or manifest.json), otherwise from its folder: {nic}/report.pdf.
+
+    Raises:
+        BatchError: If the archive is invalid or exceeds the file/size limits
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"Invalid ZIP archive: {str(e)}")
+
+    manifest = _read_manifest(archive)
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not os.path.basename(info.filename).startswith(("._", "."))
+    ]
+    if len(entries) > BATCH_MAX_FILES:
+        raise BatchError(f"Archive has {len(entries)} PDFs; limit is {BATCH_MAX_FILES}")
+    if sum(info.file_size for info in entries) > BATCH_MAX_TOTAL_BYTES:
+        raise BatchError(f"Archive expands beyond {BATCH_MAX_TOTAL_BYTES} bytes")
+
+    items = []
+    for info in entries:
+        basename = os.path.basename(info.filename)
+        folder = os.path.basename(os.path.dirname(info.filename))
+        nic = manifest.get(info.filename) or manifest.get(basename) or folder or None
+        items.append(batch_item(info.filename, nic, lambda info=info: archive.read(info)))
+    return items
+
+
+def _check_pdf(content: bytes) -> Optional[str]:
+    if len(content) > MAX_UPLOAD_BYTES:
+        return f"File is {len(content)} bytes; limit is {MAX_UPLOAD_BYTES}"
+    if not content.startswith(b"%PDF"):
+        return "Not a PDF file"
+    return None
+
+
+def _upload_item(item: Dict[str, Any], patient: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"filename": item["filename"], "nic": item["nic"], "patient_id": patient["id"]}
+    try:
+        content = item["read"]()
+        error = _check_pdf(content)
+        if error:
+            return {**result, "status": STATUS_REJECTED, "error": error}
+        upload = upload_service.upload_pdf_bytes(item["nic"], content)
+        return {**result, "status": STATUS_QUEUED, **upload}
+    except Exception as e:
+        return {**result, "status": STATUS_FAILED, "error": str(e)}
+
+
+def ingest_batch(items: List[Dict[str, Any]], concurrency: int = BATCH_UPLOAD_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Validate, resolve NICs (one query) and upload a batch of PDFs concurrently.
+
+    Returns:
+        {"success": True, "batch_id", "files": [...per-file status...], "jobs": [...accepted files...]}
+        or {"success": False, "kind": ERROR_TOO_LARGE | ERROR_LOOKUP_FAILED, "error": ...}
+    """
+    if len(items) > BATCH_MAX_FILES:
+        return {"success": False, "kind": ERROR_TOO_LARGE,
+                "error": f"Batch has {len(items)} files; limit is {BATCH_MAX_FILES}"}
+
+    patients = patientService.get_patients_by_nics([item["nic"] for item in items if item["nic"]])
+    if not patients.get("success"):
+        return {"success": False, "kind": ERROR_LOOKUP_FAILED,
+                "error": f"Could not resolve NICs: {patients.get('error')}"}
+    by_nic = patients["data"]
+
+    files: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        if not item["nic"]:
+            files[index] = {"filename": item["filename"], "nic": None, "status": STATUS_REJECTED, "error": "No NIC given for file"}
+        elif item["nic"] not in by_nic:
+            files[index] = {"filename": item["filename"], "nic": item["nic"], "status": STATUS_REJECTED,
+                            "error": f"Patient not found with NIC: {item['nic']}"}
+        else:
+            pending.append(index)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending))), thread_name_prefix="batch-upload") as pool:
+            uploaded = pool.map(lambda i: _upload_item(items[i], by_nic[items[i]["nic"]]), pending)
+            for index, result in zip(pending, uploaded):
+                files[index] = result
+
+    jobs = [
+        {"gcs_uri": f["gcs_uri"], "nic": f["nic"], "patient_id": f["patient_id"], "file_id": f["file_id"]}
+        for f in files if f["status"] == STATUS_QUEUED
+    ]
+    return {"success": True, "batch_id": str(uuid.uuid4()), "files": files, "jobs": jobs}
+
+
+def process_batch_worker(batch_id: str, jobs: List[Dict[str, Any]], queued_at: Optional[float] = None,
+                         concurrency: int = BATCH_OCR_CONCURRENCY):
+    """
+    Background job running OCR for every accepted file of a batch.
+
+    Files are processed on a bounded pool (Document AI calls are additionally
+    limited by the resilience layer); one failure does not stop the others.
+    """
+    from app.workers.ocr_worker import process_document_worker
+
+    def run(job):
+        try:
+            process_document_worker(job["gcs_uri"], job["nic"], job["patient_id"], job["file_id"], queued_at)
+            return True
+        except Exception as e:
+            print(f"Batch {batch_id}: failed to process {job['file_id']}: {str(e)}")
+            return False
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(jobs) or 1)), thread_name_prefix="batch-ocr") as pool:
+        succeeded = sum(pool.map(run, jobs))
+    print(f"Batch {batch_id}: processed {succeeded}/{len(jobs)} files in {time.time() - started:.1f}s")
@@ -1,6 +1,7 @@
 # app/services/careCircleService.py
 from app.db.supabase import supabase
 from app.schemas.care_circle_member import CareCircleMemberCreate, CareCircleMemberUpdate
+from app.services.dashboard_cache import invalidate_dashboard
 from typing import Optional
 
 def create_care_circle_member(member: CareCircleMemberCreate) -> dict:
@@ -19,35 +20,37 @@ def create_care_circle_member(member: CareCircleMemberCreate) -> dict:
         }).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "care_circle")
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Failed to create member"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_care_circle_member_by_id(member_id: str) -> Optional[dict]:
+def get_care_circle_member_by_id(member_id: str, columns: str = "*") -> Optional[dict]:
     """Get a care circle member by UUID"""
     try:
-        response = supabase.table("care_circle_members").select("*").eq("id", member_id).execute()
+        response = supabase.table("care_circle_members").select(columns).eq("id", member_id).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Member not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_care_circle_member_by_email(email: str) -> Optional[dict]:
+def get_care_circle_member_by_email(email: str, columns: str = "*") -> Optional[dict]:
     """Get a care circle member by email"""
     try:
-        response = supabase.table("care_circle_members").select("*").eq("email", email).execute()
+        response = supabase.table("care_circle_members").select(columns).eq("email", email).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Member not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def list_care_circle_members(skip: int = 0, limit: int = 100, patient_id: Optional[str] = None) -> dict:
+def list_care_circle_members(skip: int = 0, limit: int = 100, patient_id: Optional[str] = None,
+                             columns: str = "*") -> dict:
     """List all care circle members with pagination"""
     try:
-        query = supabase.table("care_circle_members").select("*")
+        query = supabase.table("care_circle_members").select(columns)
         
         if patient_id:
             query = query.eq("patient_id", patient_id)
@@ -75,6 +78,7 @@ def update_care_circle_member(member_id: str, updates: CareCircleMemberUpdate) -
         response = supabase.table("care_circle_members").update(update_data).eq("id", member_id).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "care_circle")
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Member not found or update failed"}
     except Exception as e:
@@ -84,6 +88,8 @@ def delete_care_circle_member(member_id: str) -> dict:
     """Delete a care circle member"""
     try:
         response = supabase.table("care_circle_members").delete().eq("id", member_id).execute()
+        for row in response.data or []:
+            invalidate_dashboard(row.get("patient_id"), "care_circle")
         return {"success": True, "message": "Member deleted successfully"}
     except Exception as e:
         return {"success": False, "error": str(e)}
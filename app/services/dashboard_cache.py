@@ -0,0 +1,34 @@
+# app/services/dashboard_cache.py
+"""
+Per-patient cache of the dashboard sections (see dashboard_service.py).
+
+Kept apart from the dashboard service so the write services can invalidate it
+without importing the services the dashboard reads from.
+"""
+from typing import Union
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import DASHBOARD_CACHE_SECONDS, DASHBOARD_CACHE_MAX_PATIENTS
+
+SECTIONS = ("patient", "reports", "medications", "care_circle", "health_metrics")
+
+DASHBOARD_CACHE = TTLCache("dashboard", DASHBOARD_CACHE_SECONDS, maxsize=DASHBOARD_CACHE_MAX_PATIENTS * len(SECTIONS))
+
+
+def invalidate_dashboard(patient_id: Union[str, UUID, None], *sections: str) -> None:
+    """Drop the cached sections of a patient's dashboard (all of them if none are named)."""
+    if not patient_id:
+        return
+    DASHBOARD_CACHE.invalidate(*((str(patient_id), section) for section in sections or SECTIONS))
+
+
+def invalidate_dashboard_after_commit(db: Session, patient_id: Union[str, UUID, None], *sections: str) -> None:
+    """
+    Invalidate once the session commits, so a dashboard read racing the write
+    cannot cache the rows from before it.
+    """
+    event.listen(db, "after_commit", lambda session: invalidate_dashboard(patient_id, *sections), once=True)
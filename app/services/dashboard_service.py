@@ -0,0 +1,127 @@
+# app/services/dashboard_service.py
+"""
+Patient dashboard: everything the app's home screen shows, in one response.
+
+The sections (patient, latest reports with their abnormal biomarkers,
+medications, care circle, latest health metrics) are independent reads, so
+they are loaded concurrently in worker threads and the response takes about
+as long as the slowest one instead of their sum. Each section is cached per
+patient (dashboard_cache.py) and dropped by the services that write to it.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List
+
+from app.core.config import DASHBOARD_CACHE_SECONDS, DASHBOARD_REPORT_LIMIT, DASHBOARD_SECTION_TIMEOUT_SECONDS
+from app.core.cache import MISS
+from app.services.dashboard_cache import DASHBOARD_CACHE, SECTIONS
+from app.services.patientService import get_patient_by_id
+from app.services.reportService import list_reports_by_patient, get_biomarkers_by_reports
+from app.services.medicationService import get_medications_by_patient
+from app.services.careCircleService import list_care_circle_members
+from app.schemas.health_metric import HealthMetricRead
+from app.utils.biomarker_flags import is_abnormal
+
+REPORT_COLUMNS = "id, file_id, report_type, sample_collected_at, created_at, updated_at"
+BIOMARKER_COLUMNS = "id, report_id, name, value, unit, ref_min, ref_max, flag"
+
+
+def load_reports(patient_id: str) -> dict:
+    """Latest reports, each with its abnormal biomarkers (two queries, not one per report)."""
+    reports = list_reports_by_patient(patient_id, limit=DASHBOARD_REPORT_LIMIT, columns=REPORT_COLUMNS)
+    if not reports.get("success"):
+        return reports
+    biomarkers = get_biomarkers_by_reports([r["id"] for r in reports["data"]], columns=BIOMARKER_COLUMNS)
+    if not biomarkers.get("success"):
+        return biomarkers
+
+    by_report: Dict[str, List[dict]] = {}
+    for biomarker in biomarkers["data"]:
+        by_report.setdefault(str(biomarker["report_id"]), []).append(biomarker)
+
+    data = []
+    for report in reports["data"]:
+        rows = by_report.get(str(report["id"]), [])
+        data.append({
+            **report,
+            "biomarker_count": len(rows),
+            "abnormal_biomarkers": [row for row in rows if is_abnormal(row)],
+        })
+    return {"success": True, "data": data}
+
+
+def load_health_metrics(patient_id: str) -> dict:
+    """Latest reading of each health metric (SQLAlchemy database; user_id is the patient id)."""
+    from app.core.database import SessionLocal, engine
+    from app.repo.health_metric_repo import HealthMetricRepo
+
+    if engine is None:
+        return {"success": False, "error": "Health metrics database is not configured"}
+    db = SessionLocal()
+    try:
+        metrics = HealthMetricRepo.get_latest_per_metric(db, patient_id)
+        return {"success": True, "data": [HealthMetricRead.model_validate(m).model_dump(mode="json") for m in metrics]}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+LOADERS: Dict[str, Callable[[str], dict]] = {
+    "patient": get_patient_by_id,
+    "reports": load_reports,
+    "medications": get_medications_by_patient,
+    "care_circle": lambda patient_id: list_care_circle_members(patient_id=patient_id),
+    "health_metrics": load_health_metrics,
+}
+
+
+async def get_dashboard(patient_id: str, timeout: float = DASHBOARD_SECTION_TIMEOUT_SECONDS) -> dict:
+    """
+    Gather a patient's dashboard.
+
+    Cached sections are served as they are; the rest are loaded concurrently in
+    threads. A section that fails, or is still loading after timeout seconds, is
+    left as None and reported under "errors" (and not cached).
+
+    Returns:
+        {"success", "data": {section: ...}, "errors"?: {section: message}};
+        success is False when the patient itself cannot be loaded
+    """
+    patient_id = str(patient_id)
+    results: Dict[str, dict] = {}
+    pending = {}
+    for section in SECTIONS:
+        cached = DASHBOARD_CACHE.get((patient_id, section))
+        if cached is MISS:
+            pending[section] = asyncio.ensure_future(asyncio.to_thread(LOADERS[section], patient_id))
+        else:
+            results[section] = cached
+
+    if pending:
+        done, not_done = await asyncio.wait(pending.values(), timeout=timeout)
+        for task in not_done:
+            task.cancel()  # the thread finishes on its own; its result is dropped
+        for section, task in pending.items():
+            if task in not_done:
+                results[section] = {"success": False, "error": f"timed out after {timeout:g}s"}
+            elif task.exception() is not None:
+                results[section] = {"success": False, "error": str(task.exception())}
+            else:
+                results[section] = task.result()
+                if results[section].get("success"):
+                    DASHBOARD_CACHE.set((patient_id, section), results[section], DASHBOARD_CACHE_SECONDS)
+
+    patient = results["patient"]
+    if not patient.get("success"):
+        return {"success": False, "error": patient.get("error", "Patient not found")}
+
+    dashboard: Dict[str, Any] = {"success": True, "data": {}}
+    errors = {}
+    for section in SECTIONS:
+        result = results[section]
+        dashboard["data"][section] = result.get("data") if result.get("success") else None
+        if not result.get("success"):
+            errors[section] = result.get("error", "Failed to load")
+    if errors:
+        dashboard["errors"] = errors
+    return dashboard
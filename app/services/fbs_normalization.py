@@ -6,10 +6,19 @@ Helper module for FBS-specific normalization logic.
 import re
 from typing import Dict, List, Optional, Any
 from app.config.biomarker_config import (
-    FBS_BIOMARKER_MAPPING,
+    FBS_DEFAULT_RANGES,
     UNIT_MAPPING,
     OCR_NOISE_PATTERNS,
 )
+from app.utils.biomarker_matching import name_matcher
+from app.utils.units import convert_value
+
+FBS_NAME = "Fasting Plasma Glucose"
+
+
+def _from_mg_dl(value: float, unit: str) -> float:
+    """A glucose value given in mg/dL, expressed in the result's unit."""
+    return convert_value(value, FBS_NAME, "mg/dL", unit)
 
 
 def extract_fbs_patient_info(raw_text: str) -> Dict[str, Optional[Any]]:
@@ -129,8 +138,8 @@ def normalize_fbs_biomarkers(tables: List[List[List[str]]], raw_text: str) -> Li
             if value is None:
                 continue
             
-            # Calculate flag based on reference range
-            flag = calculate_fbs_flag(value, ref_range)
+            # Calculate flag based on reference range, in the result's own unit
+            flag = calculate_fbs_flag(value, ref_range, unit)
             
             # Create biomarker entry
             biomarker = {
@@ -154,21 +163,8 @@ def get_standard_fbs_name(test_name: str) -> Optional[str]:
     # Remove newlines and extra spaces
     clean_name = re.sub(r'\s+', ' ', clean_name)
     
-    # Try exact match
-    if clean_name in FBS_BIOMARKER_MAPPING:
-        return FBS_BIOMARKER_MAPPING[clean_name]
-    
-    # Try case-insensitive match
-    for key, value in FBS_BIOMARKER_MAPPING.items():
-        if key.upper() == clean_name:
-            return value
-    
-    # Try partial match
-    for key, value in FBS_BIOMARKER_MAPPING.items():
-        if key.upper() in clean_name or clean_name in key.upper():
-            return value
-    
-    return None
+    # Try exact, case-insensitive and partial matches
+    return name_matcher("fbs").match(clean_name)
 
 
 def parse_fbs_result_cell(result_cell: str, raw_text: str) -> tuple[Optional[float], Optional[str], Optional[List[float]]]:
@@ -192,7 +188,7 @@ def parse_fbs_result_cell(result_cell: str, raw_text: str) -> tuple[Optional[flo
     value = float(value_match.group(1)) if value_match else None
     
     # Extract unit
-    unit_match = re.search(r'mg/d[Ll]?', cleaned, re.IGNORECASE)
+    unit_match = re.search(r'mg/d[Ll]?|mmol/[Ll]', cleaned, re.IGNORECASE)
     unit = None
     if unit_match:
         unit_str = unit_match.group(0)
@@ -210,10 +206,11 @@ def parse_fbs_result_cell(result_cell: str, raw_text: str) -> tuple[Optional[flo
         unit = "mg/dL"  # Default unit for FBS
     
     # Extract reference range from cell
-    ref_range = extract_ref_range_from_cell(cleaned)
+    ref_range = extract_ref_range_from_cell(cleaned, unit)
     
-    # If reference range looks invalid (e.g., starts with 0), use comment section
-    if not ref_range or (ref_range and ref_range[0] < 10):
+    # If reference range looks invalid (e.g., starts with 0), use comment section.
+    # The "70 - 99 = Normal" comment is in mg/dL, so only mg/dL results use it.
+    if unit == "mg/dL" and (not ref_range or ref_range[0] < 10):
         # Look for "70 - 99 = Normal" in raw_text
         comment_match = re.search(r'(\d{2,3})\s*-\s*(\d{2,3})\s*=\s*Normal', raw_text, re.IGNORECASE)
         if comment_match:
@@ -224,8 +221,8 @@ def parse_fbs_result_cell(result_cell: str, raw_text: str) -> tuple[Optional[flo
     return (value, unit, ref_range)
 
 
-def extract_ref_range_from_cell(cell_text: str) -> Optional[List[float]]:
-    """Extract reference range from result cell."""
+def extract_ref_range_from_cell(cell_text: str, unit: str = "mg/dL") -> Optional[List[float]]:
+    """Extract reference range (in the result's unit) from result cell."""
     if not cell_text:
         return None
     
@@ -241,7 +238,8 @@ def extract_ref_range_from_cell(cell_text: str) -> Optional[List[float]]:
             max_val = float(numbers[-1])
             
             # Validate range makes sense
-            if min_val < max_val and max_val > 50:  # FBS ranges are typically 70-99 or similar
+            # FBS ranges are typically 70-99 mg/dL (3.9-5.5 mmol/L) or similar
+            if min_val < max_val and max_val > _from_mg_dl(50.0, unit):
                 return [min_val, max_val]
         except ValueError:
             pass
@@ -249,7 +247,7 @@ def extract_ref_range_from_cell(cell_text: str) -> Optional[List[float]]:
     return None
 
 
-def calculate_fbs_flag(value: float, ref_range: Optional[List[float]]) -> Optional[str]:
+def calculate_fbs_flag(value: float, ref_range: Optional[List[float]], unit: str = "mg/dL") -> Optional[str]:
     """
     Calculate flag based on FBS reference range.
     
@@ -260,15 +258,16 @@ def calculate_fbs_flag(value: float, ref_range: Optional[List[float]]) -> Option
     - >= 126 mg/dL: Diabetes (High)
     
     Args:
-        value: FBS value in mg/dL
-        ref_range: Reference range [min, max]
+        value: FBS value in unit
+        ref_range: Reference range [min, max] in unit
+        unit: mg/dL or mmol/L
         
     Returns:
         "High", "Low", or None
     """
     if not ref_range or len(ref_range) < 2:
-        # Use standard FBS ranges if not provided
-        ref_range = [70.0, 99.0]
+        # Use standard FBS ranges for the unit if not provided
+        ref_range = FBS_DEFAULT_RANGES.get(unit, FBS_DEFAULT_RANGES["mg/dL"])
     
     min_val, max_val = ref_range
     
@@ -0,0 +1,319 @@
+# app/services/fhir_export.py
+"""
+FHIR export of patient records (resources mapped in app/utils/fhir.py).
+
+A patient's record is streamed as NDJSON, one resource per line: Patient,
+then each DiagnosticReport followed by its Observations, MedicationStatements
+and health metric Observations. Rows are read in keyset pages of
+FHIR_EXPORT_PAGE_SIZE, so memory stays flat however long the history is.
+
+Bulk exports follow the FHIR Bulk Data $export flow: start_export() creates a
+job, run_export() (a background task) walks every patient in batches of
+FHIR_EXPORT_PATIENT_BATCH and writes one NDJSON file per resource type under
+FHIR_EXPORT_DIR/{job_id}. The job's status is a JSON file next to its output,
+so any worker on the host can report it. Deleting a job cancels it.
+"""
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from uuid import UUID, uuid4
+
+import orjson
+
+from app.db.supabase import supabase
+from app.core.config import (
+    FHIR_EXPORT_DIR,
+    FHIR_EXPORT_PAGE_SIZE,
+    FHIR_EXPORT_PATIENT_BATCH,
+    FHIR_EXPORT_RETENTION_SECONDS,
+)
+from app.core.metrics import track_external_call
+from app.utils.fhir import (
+    biomarker_observation,
+    diagnostic_report,
+    medication_statement,
+    metric_observation,
+    operation_outcome,
+    patient_resource,
+)
+
+RESOURCE_TYPES = ("Patient", "DiagnosticReport", "Observation", "MedicationStatement")
+PATIENT_COLUMNS = "id, full_name, email, phone, nic"
+REPORT_COLUMNS = "id, patient_id, file_id, report_type, sample_collected_at, created_at"
+BIOMARKER_COLUMNS = "id, report_id, name, value, unit, ref_min, ref_max, flag"
+MEDICATION_COLUMNS = "id, patient_id, name, dosage_mg, frequency_per_day, instructions, created_at"
+
+STATUS_FILE = "status.json"
+STATUS_IN_PROGRESS = "in-progress"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+CHUNK_BYTES = 64 * 1024
+
+# Values per in_() filter (keeps PostgREST URLs short, as REBUILD_CHUNK_SIZE in latest_biomarker_service)
+IN_CHUNK_SIZE = 100
+
+
+# ===== READING =====
+
+def _pages(table: str, columns: str, column: str, values: List[str], page_size: int) -> Iterator[List[dict]]:
+    """Rows of table whose column is one of values, a page at a time in id order per IN_CHUNK_SIZE values."""
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = values[start:start + IN_CHUNK_SIZE]
+        last_id = None
+        while True:
+            query = supabase.table(table).select(columns).in_(column, chunk)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            with track_external_call("supabase", f"select_{table}"):
+                rows = query.order("id").limit(page_size).execute().data
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+
+
+def _health_metric_pages(patient_ids: List[str], page_size: int) -> Iterator[List[dict]]:
+    """Health metrics (SQLAlchemy database; user_id is the patient id), skipped when it is not configured."""
+    from app.core.database import SessionLocal, engine
+    from app.models.health_metric import HealthMetric
+    from app.schemas.health_metric import HealthMetricRead
+
+    if engine is None:
+        return
+    users = [UUID(str(patient_id)) for patient_id in patient_ids]
+    db = SessionLocal()
+    try:
+        last_id = None
+        while True:
+            query = db.query(HealthMetric).filter(HealthMetric.user_id.in_(users))
+            if last_id is not None:
+                query = query.filter(HealthMetric.id > last_id)
+            rows = query.order_by(HealthMetric.id).limit(page_size).all()
+            if rows:
+                yield [HealthMetricRead.model_validate(row).model_dump(mode="json") for row in rows]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+def patient_resources(patients: List[dict], page_size: int = FHIR_EXPORT_PAGE_SIZE,
+                      types: Iterable[str] = RESOURCE_TYPES) -> Iterator[dict]:
+    """
+    FHIR resources of these patients' records, one at a time.
+
+    Args:
+        patients: patients rows (PATIENT_COLUMNS)
+        types: Only these resource types (sections that produce none are not read)
+    """
+    types = set(types)
+    ids = [str(patient["id"]) for patient in patients]
+    if "Patient" in types:
+        for patient in patients:
+            yield patient_resource(patient)
+
+    if types & {"DiagnosticReport", "Observation"}:
+        for reports in _pages("reports", REPORT_COLUMNS, "patient_id", ids, page_size):
+            by_report: Dict[str, List[dict]] = {}
+            for biomarkers in _pages("biomarkers", BIOMARKER_COLUMNS, "report_id", [str(r["id"]) for r in reports], page_size):
+                for biomarker in biomarkers:
+                    by_report.setdefault(str(biomarker["report_id"]), []).append(biomarker)
+            for report in reports:
+                rows = sorted(by_report.get(str(report["id"]), []), key=lambda b: str(b.get("name")))
+                if "DiagnosticReport" in types:
+                    yield diagnostic_report(report, [str(b["id"]) for b in rows])
+                if "Observation" in types:
+                    for biomarker in rows:
+                        yield biomarker_observation(biomarker, report)
+
+    if "MedicationStatement" in types:
+        for medications in _pages("medications", MEDICATION_COLUMNS, "patient_id", ids, page_size):
+            for medication in medications:
+                yield medication_statement(medication)
+
+    if "Observation" in types:
+        for metrics in _health_metric_pages(ids, page_size):
+            for metric in metrics:
+                yield metric_observation(metric)
+
+
+def ndjson(resources: Iterable[dict], chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Resources as NDJSON, in chunks of about chunk_bytes. An error part way
+    through ends the stream with an OperationOutcome line (the status code has
+    already been sent).
+    """
+    buffer: List[bytes] = []
+    size = 0
+    try:
+        for resource in resources:
+            line = orjson.dumps(resource) + b"\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= chunk_bytes:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+    except Exception as e:
+        buffer.append(orjson.dumps(operation_outcome(f"Export stopped: {str(e)}")) + b"\n")
+    if buffer:
+        yield b"".join(buffer)
+
+
+def stream_patient_record(patient: dict, page_size: int = FHIR_EXPORT_PAGE_SIZE) -> Iterator[bytes]:
+    """A patient's complete record as FHIR NDJSON."""
+    return ndjson(patient_resources([patient], page_size))
+
+
+# ===== BULK $export JOBS =====
+
+def _job_dir(root: str, job_id: str) -> str:
+    return os.path.join(root, job_id)
+
+
+def _save_status(root: str, status: dict) -> None:
+    path = os.path.join(_job_dir(root, status["job_id"]), STATUS_FILE)
+    with open(path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(status))
+    os.replace(path + ".tmp", path)
+
+
+def _remove_expired(root: str, retention_seconds: float) -> None:
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - retention_seconds
+    for job_id in os.listdir(root):
+        path = os.path.join(root, job_id, STATUS_FILE)
+        if os.path.exists(path) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(os.path.join(root, job_id), ignore_errors=True)
+
+
+def start_export(types: Optional[List[str]] = None, root: str = FHIR_EXPORT_DIR,
+                 retention_seconds: float = FHIR_EXPORT_RETENTION_SECONDS) -> dict:
+    """
+    Create a bulk export job; run it with run_export(job_id).
+
+    Args:
+        types: Resource types to export (_type), default all of RESOURCE_TYPES
+
+    Returns:
+        {"success", "data": job status}
+    """
+    try:
+        types = list(types or RESOURCE_TYPES)
+        unknown = [t for t in types if t not in RESOURCE_TYPES]
+        if unknown:
+            return {"success": False, "error": f"Unsupported resource types: {', '.join(unknown)}"}
+        _remove_expired(root, retention_seconds)
+
+        job_id = uuid4().hex
+        os.makedirs(_job_dir(root, job_id))
+        status = {
+            "job_id": job_id,
+            "status": STATUS_IN_PROGRESS,
+            "types": types,
+            "transaction_time": datetime.now(timezone.utc).isoformat(),
+            "patients": 0,
+            "output": [],
+            "error": None,
+        }
+        _save_status(root, status)
+        return {"success": True, "data": status}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def get_export(job_id: str, root: str = FHIR_EXPORT_DIR) -> Optional[dict]:
+    """A job's status, or None if there is no such job."""
+    if not job_id.isalnum():
+        return None
+    path = os.path.join(_job_dir(root, job_id), STATUS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def export_file(job_id: str, file_name: str, root: str = FHIR_EXPORT_DIR) -> Optional[str]:
+    """Path of one of a completed job's output files, or None."""
+    status = get_export(job_id, root)
+    if status is None or status["status"] != STATUS_COMPLETED:
+        return None
+    if file_name not in {output["file"] for output in status["output"]}:
+        return None
+    return os.path.join(_job_dir(root, job_id), file_name)
+
+
+def delete_export(job_id: str, root: str = FHIR_EXPORT_DIR) -> bool:
+    """Delete a job and its files (a running job stops at its next batch)."""
+    if get_export(job_id, root) is None:
+        return False
+    shutil.rmtree(_job_dir(root, job_id), ignore_errors=True)
+    return True
+
+
+def _patient_batches(batch_size: int) -> Iterator[List[dict]]:
+    last_id = None
+    while True:
+        query = supabase.table("patients").select(PATIENT_COLUMNS)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        with track_external_call("supabase", "select_patients"):
+            patients = query.order("id").limit(batch_size).execute().data
+        if patients:
+            yield patients
+        if len(patients) < batch_size:
+            return
+        last_id = patients[-1]["id"]
+
+
+def run_export(job_id: str, root: str = FHIR_EXPORT_DIR, page_size: int = FHIR_EXPORT_PAGE_SIZE,
+               patient_batch: int = FHIR_EXPORT_PATIENT_BATCH) -> None:
+    """Background task writing a job's NDJSON files, one per resource type."""
+    status = get_export(job_id, root)
+    if status is None:
+        return
+    directory = _job_dir(root, job_id)
+    files = {}
+    counts = {resource_type: 0 for resource_type in status["types"]}
+    started = time.time()
+    try:
+        for patients in _patient_batches(patient_batch):
+            if not os.path.isdir(directory):
+                print(f"⚠️  FHIR export {job_id} cancelled")
+                return
+            for resource in patient_resources(patients, page_size, status["types"]):
+                resource_type = resource["resourceType"]
+                if resource_type not in files:
+                    files[resource_type] = open(os.path.join(directory, f"{resource_type}.ndjson.part"), "wb")
+                files[resource_type].write(orjson.dumps(resource) + b"\n")
+                counts[resource_type] += 1
+            status["patients"] += len(patients)
+            _save_status(root, status)
+
+        for resource_type, f in files.items():
+            f.close()
+            os.replace(os.path.join(directory, f"{resource_type}.ndjson.part"), os.path.join(directory, f"{resource_type}.ndjson"))
+        status["output"] = [
+            {"type": resource_type, "file": f"{resource_type}.ndjson", "count": counts[resource_type]}
+            for resource_type in status["types"] if counts[resource_type]
+        ]
+        status["status"] = STATUS_COMPLETED
+        print(f"✅ FHIR export {job_id}: {sum(counts.values())} resources for {status['patients']} patients "
+              f"in {time.time() - started:.1f}s")
+    except Exception as e:
+        status["status"] = STATUS_FAILED
+        status["error"] = str(e)
+        print(f"⚠️  FHIR export {job_id} failed: {str(e)}")
+    finally:
+        for f in files.values():
+            f.close()
+            if status["status"] != STATUS_COMPLETED and os.path.exists(f.name):
+                os.remove(f.name)
+    if os.path.isdir(directory):
+        _save_status(root, status)
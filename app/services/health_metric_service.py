@@ -2,17 +2,123 @@ from sqlalchemy.orm import Session
 from app.repo.health_metric_repo import HealthMetricRepo, MetricReferenceRepo
 from app.schemas.health_metric import HealthMetricCreate, HealthMetricUpdate, MetricReferenceBase
 from app.models.health_metric import HealthMetric, AnatomyCategory, HealthFlag
+from app.core.config import METRIC_REFERENCE_CACHE_SECONDS
+from app.core.startup import register_preload
+from app.services.dashboard_cache import invalidate_dashboard_after_commit
+from app.utils.units import UnitConversionError, canonical_unit, convert_value, normalize_unit
 from uuid import UUID
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from fastapi import HTTPException, status
+import threading
+import time
+
+
+class MetricReferenceSnapshot(NamedTuple):
+    """Detached copy of a metric_references row, safe to share across sessions and threads."""
+    metric_name: str
+    threshold_1: Optional[float]
+    threshold_2: Optional[float]
+    threshold_3: Optional[float]
+    threshold_4: Optional[float]
+    unit: str
+    anatomy_category: Optional[AnatomyCategory]
+
+
+class MetricReferenceCache:
+    """
+    metric_references is a small, rarely changing table read on every metric
+    write (twice: unit/category defaults and the assessment). The whole table is
+    held per worker and reloaded after ttl seconds, or at once after
+    seed_references() in this process.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._refs: Optional[Dict[str, MetricReferenceSnapshot]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> Dict[str, MetricReferenceSnapshot]:
+        refs = {
+            ref.metric_name: MetricReferenceSnapshot(
+                ref.metric_name, ref.threshold_1, ref.threshold_2, ref.threshold_3, ref.threshold_4,
+                ref.unit, ref.anatomy_category,
+            )
+            for ref in MetricReferenceRepo.get_all(db)
+        }
+        with self._lock:
+            self._refs = refs
+            self._loaded_at = time.monotonic()
+        return refs
+
+    def get(self, db: Session, metric_name: str) -> Optional[MetricReferenceSnapshot]:
+        refs = self._refs
+        if refs is None or time.monotonic() - self._loaded_at >= self.ttl:
+            refs = self.load(db)
+        return refs.get(metric_name)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._refs = None
+
+
+METRIC_REFERENCES = MetricReferenceCache(METRIC_REFERENCE_CACHE_SECONDS)
+
+
+def preload_metric_references() -> None:
+    """Load metric_references during worker warm-up (skipped without DATABASE_URL)."""
+    from app.core.database import SessionLocal, engine
+
+    if engine is None:
+        return
+    db = SessionLocal()
+    try:
+        METRIC_REFERENCES.load(db)
+    finally:
+        db.close()
+
+
+register_preload("metric_references", preload_metric_references)
+
+
+def _in_unit(metric_name: str, value: float, unit: Optional[str], target: Optional[str]) -> float:
+    """value (in unit) expressed in target; as it is when there is no conversion between them."""
+    if unit is None or target is None:
+        return value
+    try:
+        return convert_value(value, metric_name, unit, target)
+    except UnitConversionError:
+        return value
+
+
+def stored_value(ref: Optional[MetricReferenceSnapshot], metric_name: str, value: float,
+                 unit: Optional[str]) -> tuple:
+    """
+    (value, unit) as a metric is stored: in the reference's unit, else the
+    canonical unit of app/config/biomarker_config.UNIT_CONVERSIONS. Metrics
+    without a unit table keep the unit they were sent in.
+    """
+    target = ref.unit if ref else canonical_unit(metric_name)
+    if unit is None or target is None or canonical_unit(metric_name) is None:
+        return value, unit
+    if normalize_unit(unit) == normalize_unit(target):
+        return value, target
+    try:
+        return convert_value(value, metric_name, unit, target), target
+    except UnitConversionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 
 class HealthMetricService:
     @staticmethod
-    def calculate_assessment(db: Session, metric_name: str, value: float) -> str:
-        ref = MetricReferenceRepo.get_by_name(db, metric_name)
+    def calculate_assessment(db: Session, metric_name: str, value: float, unit: Optional[str] = None) -> str:
+        ref = METRIC_REFERENCES.get(db, metric_name)
         if not ref:
             return HealthFlag.NULL
-            
+
+        # Thresholds are in the reference's unit
+        value = _in_unit(metric_name, value, unit, ref.unit)
+
         # If no thresholds are defined at all
         if all(t is None for t in [ref.threshold_1, ref.threshold_2, ref.threshold_3, ref.threshold_4]):
             return HealthFlag.NULL
@@ -48,11 +154,13 @@ class HealthMetricService:
 
     @staticmethod
     def create_metric(db: Session, metric_in: HealthMetricCreate) -> HealthMetric:
-        ref = MetricReferenceRepo.get_by_name(db, metric_in.metric_name)
+        ref = METRIC_REFERENCES.get(db, metric_in.metric_name)
         
         # Start with request data
         metric_data = metric_in.model_dump()
-        
+        metric_data["value"], metric_data["unit"] = stored_value(
+            ref, metric_in.metric_name, metric_in.value, metric_in.unit)
+
         # Auto-detect unit if missing
         if metric_data.get("unit") is None and ref:
             metric_data["unit"] = ref.unit
@@ -66,14 +174,16 @@ class HealthMetricService:
             metric_data["anatomy_category"] = AnatomyCategory.GENERAL
             
         # Calculate assessment
-        assessment = HealthMetricService.calculate_assessment(db, metric_in.metric_name, metric_in.value)
+        assessment = HealthMetricService.calculate_assessment(
+            db, metric_in.metric_name, metric_data["value"], metric_data["unit"])
         
         db_metric = HealthMetric(**metric_data)
         db_metric.flag = assessment
         
         db.add(db_metric)
-        db.commit()
+        db.flush()
         db.refresh(db_metric)
+        invalidate_dashboard_after_commit(db, db_metric.user_id, "health_metrics")
         return db_metric
 
     @staticmethod
@@ -103,9 +213,17 @@ class HealthMetricService:
         # Capture current values to see if they change
         new_value = metric_in.value if metric_in.value is not None else db_metric.value
         new_name = metric_in.metric_name if metric_in.metric_name is not None else db_metric.metric_name
-        
+        new_unit = metric_in.unit if metric_in.unit is not None else db_metric.unit
+
+        # Store in the metric's unit (a new unit alone converts the current value)
+        if metric_in.value is not None or metric_in.unit is not None or metric_in.metric_name is not None:
+            ref = METRIC_REFERENCES.get(db, new_name)
+            new_value, new_unit = stored_value(ref, new_name, new_value, new_unit)
+            metric_in = metric_in.model_copy(update={"value": new_value, "unit": new_unit})
+
         # Recalculate assessment
-        db_metric.flag = HealthMetricService.calculate_assessment(db, new_name, new_value)
+        db_metric.flag = HealthMetricService.calculate_assessment(db, new_name, new_value, new_unit)
+        invalidate_dashboard_after_commit(db, db_metric.user_id, "health_metrics")
         
         return HealthMetricRepo.update(db, db_metric, metric_in)
 
@@ -159,12 +277,15 @@ class HealthMetricService:
         ]
         for ref in refs:
             MetricReferenceRepo.create_or_update(db, ref)
+        db.commit()
+        METRIC_REFERENCES.invalidate()
 
     @staticmethod
     def delete_metric(db: Session, metric_id: UUID) -> None:
-        success = HealthMetricRepo.delete(db, metric_id)
-        if not success:
+        user_id = HealthMetricRepo.delete(db, metric_id)
+        if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Health metric not found"
             )
+        invalidate_dashboard_after_commit(db, user_id, "health_metrics")
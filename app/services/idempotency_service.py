@@ -0,0 +1,211 @@
+"""
+Idempotency-Key handling for client-retried requests.
+
+The first request with a key claims it (status in_progress) together with a
+fingerprint of the request body; when the work succeeds the response is
+stored on the row. A retry with the same key and fingerprint replays the
+stored response, a retry while the first attempt is still running is told to
+try again later, and reusing a key for a different request is rejected.
+
+A claim is a lease: it is held until locked_until (IDEMPOTENCY_LEASE_SECONDS,
+extended by heartbeat() while the work runs, see keep_claim()). A request that crashed before completing or
+abandoning its key leaves the lease to run out, after which a retry takes the
+claim over instead of being told the work is still in progress until the key
+expires.
+
+Resource ids derived from a key are deterministic (uuid5), so even a retry
+that gets past a lost claim writes to the same GCS object and report row.
+"""
+
+import hashlib
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import IDEMPOTENCY_KEY_TTL_HOURS, IDEMPOTENCY_LEASE_SECONDS
+from app.core.metrics import track_external_call
+from app.db.supabase import supabase
+
+TABLE = "idempotency_keys"
+MAX_KEY_LENGTH = 255
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# Outcomes of begin()
+NEW = "new"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+_FILE_ID_NAMESPACE = uuid.UUID("5b0c7f4e-2d1a-4c35-9d0e-8f6a1c2b3e47")
+
+
+def fingerprint(*parts) -> str:
+    """SHA-256 over the request parts (str or bytes) that must match on a retry."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def derive_file_id(scope: str, owner: str, key: str) -> str:
+    """Deterministic file_id for an idempotent request."""
+    return str(uuid.uuid5(_FILE_ID_NAMESPACE, f"{scope}:{owner}:{key}"))
+
+
+def _parse_time(value) -> datetime:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _expired(row: Dict[str, Any]) -> bool:
+    expires_at = row.get("expires_at")
+    if not expires_at:
+        return False
+    return _parse_time(expires_at) <= datetime.now(timezone.utc)
+
+
+def _lease_lapsed(row: Dict[str, Any]) -> bool:
+    locked_until = row.get("locked_until")
+    return not locked_until or _parse_time(locked_until) <= datetime.now(timezone.utc)
+
+
+def _claim(scope: str, key: str, request_fingerprint: str) -> list:
+    now = datetime.now(timezone.utc)
+    row = {
+        "scope": scope,
+        "key": key,
+        "fingerprint": request_fingerprint,
+        "status": STATUS_IN_PROGRESS,
+        "response": None,
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)).isoformat(),
+        "locked_until": (now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)).isoformat(),
+    }
+    # ON CONFLICT DO NOTHING: only the first request gets its row back
+    with track_external_call("supabase", "claim_idempotency_key"):
+        response = supabase.table(TABLE).upsert(row, on_conflict="scope,key", ignore_duplicates=True).execute()
+    return response.data
+
+
+def _reclaim(scope: str, key: str) -> list:
+    """Take over an in-progress claim whose lease ran out; only one of several retries gets the row back."""
+    now = datetime.now(timezone.utc)
+    with track_external_call("supabase", "reclaim_idempotency_key"):
+        response = supabase.table(TABLE)\
+            .update({"locked_until": (now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)).isoformat()})\
+            .eq("scope", scope).eq("key", key)\
+            .eq("status", STATUS_IN_PROGRESS)\
+            .lt("locked_until", now.isoformat())\
+            .execute()
+    return response.data
+
+
+def begin(scope: str, key: str, request_fingerprint: str) -> dict:
+    """
+    Claim an idempotency key, or find out what an earlier request with it did.
+
+    Returns:
+        {"success": True, "state": "new"} - this request owns the key and should do the work
+            (also when it took over a claim whose lease ran out)
+        {"success": True, "state": "replay", "response": {...}} - return the stored response
+        {"success": True, "state": "in_progress"} - an earlier request is still running
+        {"success": True, "state": "mismatch"} - the key was used for a different request
+        {"success": False, "error": ...} - the key store is unavailable
+    """
+    try:
+        if _claim(scope, key, request_fingerprint):
+            return {"success": True, "state": NEW}
+
+        response = supabase.table(TABLE).select("*").eq("scope", scope).eq("key", key).execute()
+        if not response.data:
+            # Deleted between the claim and the read (abandoned or expired); try once more
+            if _claim(scope, key, request_fingerprint):
+                return {"success": True, "state": NEW}
+            return {"success": True, "state": IN_PROGRESS}
+
+        existing = response.data[0]
+        if _expired(existing):
+            supabase.table(TABLE).delete().eq("scope", scope).eq("key", key).execute()
+            if _claim(scope, key, request_fingerprint):
+                return {"success": True, "state": NEW}
+            return {"success": True, "state": IN_PROGRESS}
+
+        if existing.get("fingerprint") != request_fingerprint:
+            return {"success": True, "state": MISMATCH}
+        if existing.get("status") == STATUS_COMPLETED:
+            return {"success": True, "state": REPLAY, "response": existing.get("response")}
+        if _lease_lapsed(existing) and _reclaim(scope, key):
+            return {"success": True, "state": NEW}
+        return {"success": True, "state": IN_PROGRESS}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def heartbeat(scope: str, key: str, lease_seconds: float = IDEMPOTENCY_LEASE_SECONDS) -> dict:
+    """Extend the lease of a claimed key while its work is still running."""
+    try:
+        locked_until = datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+        supabase.table(TABLE).update({"locked_until": locked_until.isoformat()})\
+            .eq("scope", scope).eq("key", key)\
+            .eq("status", STATUS_IN_PROGRESS).execute()
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@contextmanager
+def keep_claim(scope: str, key: str, lease_seconds: float = IDEMPOTENCY_LEASE_SECONDS) -> Iterator[None]:
+    """
+    Heartbeat a claimed key from a background thread (every third of the lease)
+    for as long as the block runs, so slow work is not taken over by a retry.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(lease_seconds / 3):
+            result = heartbeat(scope, key, lease_seconds)
+            if not result["success"]:
+                print(f"⚠️  Idempotency lease not extended for {scope}/{key}: {result['error']}")
+
+    thread = threading.Thread(target=loop, name="idempotency-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def complete(scope: str, key: str, response: Dict[str, Any]) -> dict:
+    """Store the response for a claimed key so retries replay it."""
+    try:
+        with track_external_call("supabase", "complete_idempotency_key"):
+            supabase.table(TABLE).update({"status": STATUS_COMPLETED, "response": response})\
+                .eq("scope", scope).eq("key", key).execute()
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def abandon(scope: str, key: str) -> dict:
+    """Release a claimed key after a failure so the client can retry with it."""
+    try:
+        supabase.table(TABLE).delete().eq("scope", scope).eq("key", key)\
+            .eq("status", STATUS_IN_PROGRESS).execute()
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def purge_expired(now: Optional[datetime] = None) -> dict:
+    """Delete keys past their retry window."""
+    try:
+        now = now or datetime.now(timezone.utc)
+        response = supabase.table(TABLE).delete().lt("expires_at", now.isoformat()).execute()
+        return {"success": True, "count": len(response.data or [])}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
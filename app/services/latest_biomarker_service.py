@@ -0,0 +1,108 @@
+# app/services/latest_biomarker_service.py
+"""
+patient_latest_biomarkers: the most recent value of each biomarker per patient
+(migrations/003_patient_latest_biomarkers.sql).
+
+The ingest_report() database function upserts the biomarkers of each ingested
+report here in the same transaction (migrations/008_latest_biomarkers_upsert.sql),
+replacing a row only when its report is at least as recent as the one the
+current value came from; the check is part of the upsert, so concurrent
+ingestions cannot overwrite a newer value. Deleting or re-dating a report
+rebuilds the patient's rows from reports and biomarkers with the same guarded
+upsert (migrations/011_rebuild_latest_biomarkers.sql; recency() below is the
+rule in Python); rebuild_all_latest_biomarkers() does that for every patient
+(python -m app.scripts.rebuild_latest_biomarkers).
+"""
+from app.db.supabase import supabase
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+TABLE = "patient_latest_biomarkers"
+
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _timestamp(value) -> datetime:
+    if not value:
+        return _EPOCH
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return _EPOCH
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def recency(row: dict) -> tuple:
+    """Sort key of a latest-value row: sample date, then when its report was created."""
+    return _timestamp(row.get("sample_collected_at")), _timestamp(row.get("report_created_at"))
+
+
+def latest_rows(report: dict, biomarkers: Iterable[dict]) -> List[dict]:
+    """patient_latest_biomarkers rows for the biomarkers of one report (first of each name)."""
+    rows: Dict[str, dict] = {}
+    for biomarker in biomarkers:
+        name = biomarker.get("name")
+        if not name or biomarker.get("value") is None or name in rows:
+            continue
+        rows[name] = {
+            "patient_id": str(report["patient_id"]),
+            "name": name,
+            "value": biomarker["value"],
+            "unit": biomarker.get("unit"),
+            "ref_min": biomarker.get("ref_min"),
+            "ref_max": biomarker.get("ref_max"),
+            "flag": biomarker.get("flag"),
+            "sample_collected_at": report.get("sample_collected_at") or report.get("created_at"),
+            "report_id": str(report["id"]),
+            "report_created_at": report.get("created_at"),
+        }
+    return list(rows.values())
+
+
+def rebuild_latest_biomarkers(patient_id: str) -> dict:
+    """
+    Recompute a patient's latest values from all of their reports, in the
+    rebuild_latest_biomarkers() database function: values go through the same
+    recency-guarded upsert as ingestion, so a report ingested meanwhile keeps
+    its newer values (migrations/011_rebuild_latest_biomarkers.sql).
+    """
+    try:
+        response = supabase.rpc("rebuild_latest_biomarkers", {"p_patient_id": str(patient_id)}).execute()
+        return {"success": True, "count": response.data["count"], "removed": response.data["removed"]}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def rebuild_all_latest_biomarkers(page_size: int = 500) -> dict:
+    """Rebuild the latest values of every patient; failures are collected per patient."""
+    try:
+        rebuilt, errors, skip = 0, {}, 0
+        while True:
+            page = supabase.table("patients").select("id").order("id").range(skip, skip + page_size - 1).execute().data
+            for patient in page:
+                result = rebuild_latest_biomarkers(patient["id"])
+                if result.get("success"):
+                    rebuilt += 1
+                else:
+                    errors[str(patient["id"])] = result.get("error")
+            if len(page) < page_size:
+                break
+            skip += page_size
+        return {"success": not errors, "patients": rebuilt, "errors": errors}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def get_latest_biomarkers(patient_id: str, names: Optional[List[str]] = None, columns: str = "*") -> dict:
+    """A patient's latest biomarker values, optionally only the given names"""
+    try:
+        query = supabase.table(TABLE).select(columns).eq("patient_id", patient_id)
+        if names:
+            query = query.in_("name", names)
+        response = query.order("name").execute()
+        return {"success": True, "data": response.data, "count": len(response.data)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -7,11 +7,10 @@ import re
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from app.config.biomarker_config import (
-    LIPID_PROFILE_BIOMARKER_MAPPING,
-    UNIT_MAPPING,
     OCR_NOISE_PATTERNS,
     FLAG_MAPPING,
 )
+from app.utils.biomarker_matching import name_matcher, unit_matcher
 
 
 def extract_lipid_patient_info(raw_text: str) -> Dict[str, Optional[Any]]:
@@ -178,21 +177,8 @@ def get_standard_lipid_name(test_name: str) -> Optional[str]:
     # Remove newlines and extra spaces
     clean_name = re.sub(r'\s+', ' ', clean_name)
     
-    # Try exact match
-    if clean_name in LIPID_PROFILE_BIOMARKER_MAPPING:
-        return LIPID_PROFILE_BIOMARKER_MAPPING[clean_name]
-    
-    # Try case-insensitive match
-    for key, value in LIPID_PROFILE_BIOMARKER_MAPPING.items():
-        if key.upper() == clean_name:
-            return value
-    
-    # Try partial match
-    for key, value in LIPID_PROFILE_BIOMARKER_MAPPING.items():
-        if key.upper() in clean_name or clean_name in key.upper():
-            return value
-    
-    return None
+    # Try exact, case-insensitive and partial matches
+    return name_matcher("lipid").match(clean_name)
 
 
 def extract_flag(ref_range_str: str) -> tuple[Optional[str], str]:
@@ -239,16 +225,9 @@ def normalize_unit(unit_str: str) -> Optional[str]:
     if not cleaned:
         return None
     
-    # Check mapping
-    if cleaned in UNIT_MAPPING:
-        return UNIT_MAPPING[cleaned]
-    
-    # Try case-insensitive match
-    for key, value in UNIT_MAPPING.items():
-        if key.lower() == cleaned.lower():
-            return value
-    
-    return cleaned
+    # Check mapping (exact, then case-insensitive)
+    unit = unit_matcher().match(cleaned)
+    return unit if unit is not None else cleaned
 
 
 def clean_numeric_value(value_str: str) -> Optional[float]:
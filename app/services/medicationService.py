@@ -1,6 +1,7 @@
 # app/services/medicationService.py
 from app.db.supabase import supabase
 from app.schemas.medication import MedicationCreate, MedicationUpdate
+from app.services.dashboard_cache import invalidate_dashboard
 from typing import Optional
 
 def create_medication(medication: MedicationCreate) -> dict:
@@ -16,33 +17,34 @@ def create_medication(medication: MedicationCreate) -> dict:
         }).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "medications")
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Failed to create medication"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_medication_by_id(medication_id: str) -> Optional[dict]:
+def get_medication_by_id(medication_id: str, columns: str = "*") -> Optional[dict]:
     """Get a medication by UUID"""
     try:
-        response = supabase.table("medications").select("*").eq("id", medication_id).execute()
+        response = supabase.table("medications").select(columns).eq("id", medication_id).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Medication not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_medications_by_patient(patient_id: str, skip: int = 0, limit: int = 100) -> dict:
+def get_medications_by_patient(patient_id: str, skip: int = 0, limit: int = 100, columns: str = "*") -> dict:
     """Get all medications for a specific patient with pagination"""
     try:
-        response = supabase.table("medications").select("*").eq("patient_id", patient_id).range(skip, skip + limit - 1).order("created_at", desc=True).execute()
+        response = supabase.table("medications").select(columns).eq("patient_id", patient_id).range(skip, skip + limit - 1).order("created_at", desc=True).execute()
         return {"success": True, "data": response.data, "count": len(response.data)}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def list_medications(skip: int = 0, limit: int = 100) -> dict:
+def list_medications(skip: int = 0, limit: int = 100, columns: str = "*") -> dict:
     """List all medications with pagination"""
     try:
-        response = supabase.table("medications").select("*").range(skip, skip + limit - 1).order("created_at", desc=True).execute()
+        response = supabase.table("medications").select(columns).range(skip, skip + limit - 1).order("created_at", desc=True).execute()
         return {"success": True, "data": response.data, "count": len(response.data)}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -59,6 +61,7 @@ def update_medication(medication_id: str, updates: MedicationUpdate) -> dict:
         response = supabase.table("medications").update(update_data).eq("id", medication_id).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "medications")
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Medication not found or update failed"}
     except Exception as e:
@@ -68,6 +71,8 @@ def delete_medication(medication_id: str) -> dict:
     """Delete a medication"""
     try:
         response = supabase.table("medications").delete().eq("id", medication_id).execute()
+        for row in response.data or []:
+            invalidate_dashboard(row.get("patient_id"), "medications")
         return {"success": True, "message": "Medication deleted successfully"}
     except Exception as e:
         return {"success": False, "error": str(e)}
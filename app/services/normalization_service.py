@@ -10,12 +10,13 @@ from typing import Dict, List, Optional, Tuple, Any
 from app.config.biomarker_config import (
     FBC_BIOMARKER_MAPPING,
     LIPID_PROFILE_BIOMARKER_MAPPING,
-    BIOMARKER_NAME_MAPPING,  # Alias for FBC_BIOMARKER_MAPPING
-    UNIT_MAPPING,
     OCR_NOISE_PATTERNS,
     FLAG_MAPPING,
     REPORT_TYPE_KEYWORDS,
 )
+from app.core.startup import register_preload
+from app.utils.biomarker_matching import name_matcher, unit_matcher, preload_matchers
+from app.utils.units import canonicalize_biomarkers
 
 
 def normalize_report(raw_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -27,16 +28,20 @@ def normalize_report(raw_data: Dict[str, Any]) -> Dict[str, Any]:
         
     Returns:
         Structured JSON with patient, report, and biomarkers sections
+        (biomarker values in their canonical units, see app/utils/units.py)
     """
     raw_text = raw_data.get("raw_text", "")
     report_type = _detect_report_type(raw_text)
     
     if report_type == "Serum Lipid Profile":
-        return _normalize_lipid_profile(raw_data)
+        normalized = _normalize_lipid_profile(raw_data)
     elif report_type == "Fasting Plasma Glucose":
-        return _normalize_fbs_report(raw_data)
+        normalized = _normalize_fbs_report(raw_data)
     else:
-        return _normalize_fbc_report(raw_data)
+        normalized = _normalize_fbc_report(raw_data)
+
+    canonicalize_biomarkers(normalized.get("biomarkers") or [])
+    return normalized
 
 
 def _detect_report_type(raw_text: str) -> str:
@@ -345,24 +350,9 @@ def _get_standard_biomarker_name(test_name: str) -> Optional[str]:
     Returns:
         Standardized biomarker name or None if not found
     """
-    # Clean the test name
+    # Clean the test name, then try exact, case-insensitive and partial matches
     clean_name = test_name.strip().upper()
-    
-    # Try exact match
-    if clean_name in BIOMARKER_NAME_MAPPING:
-        return BIOMARKER_NAME_MAPPING[clean_name]
-    
-    # Try case-insensitive match
-    for key, value in BIOMARKER_NAME_MAPPING.items():
-        if key.upper() == clean_name:
-            return value
-    
-    # Try partial match (for merged cells)
-    for key, value in BIOMARKER_NAME_MAPPING.items():
-        if key.upper() in clean_name or clean_name in key.upper():
-            return value
-    
-    return None
+    return name_matcher("fbc").match(clean_name)
 
 
 def _normalize_unit(unit_str: str) -> str:
@@ -385,17 +375,9 @@ def _normalize_unit(unit_str: str) -> str:
     
     cleaned = cleaned.strip()
     
-    # Check mapping
-    if cleaned in UNIT_MAPPING:
-        return UNIT_MAPPING[cleaned]
-    
-    # Try case-insensitive match
-    for key, value in UNIT_MAPPING.items():
-        if key.lower() == cleaned.lower():
-            return value
-    
-    # Return cleaned version if no mapping found
-    return cleaned
+    # Check mapping (exact, then case-insensitive); return cleaned version if no mapping found
+    unit = unit_matcher().match(cleaned)
+    return unit if unit is not None else cleaned
 
 
 def _clean_numeric_value(value_str: str) -> Optional[float]:
@@ -465,3 +447,13 @@ def _parse_reference_range(range_str: str) -> Optional[List[float]]:
             return None
     
     return None
+
+
+def preload_normalizers() -> None:
+    """Import the per-report-type normalizers and build the name/unit matchers (worker warm-up)."""
+    from app.services import lipid_normalization, fbs_normalization  # noqa: F401
+
+    preload_matchers()
+
+
+register_preload("biomarker_matchers", preload_normalizers)
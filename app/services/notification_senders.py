@@ -0,0 +1,135 @@
+# app/services/notification_senders.py
+"""
+Senders for care circle notification digests (see notification_service.py).
+
+A sender takes a batch of digests and returns {recipient_email: error} for the
+ones it could not send; raising fails the whole batch. Both senders render the
+same email, so the file sender shows exactly what SMTP would deliver.
+
+- FileSender: writes one .eml file per digest (local development only: the
+  files hold patient names and results in plain text)
+- SmtpSender: sends the batch over a single SMTP connection
+"""
+import os
+import smtplib
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from app.core.config import (
+    NOTIFY_FILE_DIR,
+    NOTIFY_FROM_ADDRESS,
+    NOTIFY_SENDER,
+    SMTP_HOST,
+    SMTP_PASSWORD,
+    SMTP_PORT,
+    SMTP_TIMEOUT_SECONDS,
+    SMTP_USE_TLS,
+    SMTP_USERNAME,
+)
+
+
+def _number(value) -> str:
+    if value is None:
+        return ""
+    return f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def _describe(item: dict) -> str:
+    value = f"{_number(item.get('value'))} {item.get('unit') or ''}".strip()
+    line = f"  - {item.get('name')}: {value}"
+    if item.get("flag"):
+        line += f" ({item['flag']})"
+    if item.get("ref_min") is not None or item.get("ref_max") is not None:
+        line += f", reference {_number(item.get('ref_min'))}-{_number(item.get('ref_max'))}"
+    return line
+
+
+def render_digest(digest: dict, sender: str = NOTIFY_FROM_ADDRESS) -> EmailMessage:
+    """The email for one recipient's digest."""
+    patients = digest["patients"]
+    count = sum(len(p["items"]) for p in patients)
+    names = ", ".join(p.get("patient_name") or "a patient in your care circle" for p in patients)
+
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = digest["recipient_email"]
+    message["Subject"] = f"Healix: {count} abnormal result{'s' if count != 1 else ''} for {names}"
+
+    greeting = f"Hello {digest['recipient_name']}," if digest.get("recipient_name") else "Hello,"
+    lines = [greeting, ""]
+    for patient in patients:
+        lines.append(f"New lab results for {patient.get('patient_name') or 'a patient in your care circle'} "
+                     "are outside the normal range:")
+        lines.extend(_describe(item) for item in patient["items"])
+        lines.append("")
+    lines.append("Please follow up with them or their doctor.")
+    lines.append("You receive this because you are in their Healix care circle.")
+    message.set_content("\n".join(lines))
+    return message
+
+
+class FileSender:
+    """Writes each digest to NOTIFY_FILE_DIR as an .eml file."""
+
+    name = "file"
+
+    def __init__(self, directory: str = NOTIFY_FILE_DIR):
+        self.directory = directory
+
+    def send(self, digests: List[dict]) -> Dict[str, str]:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        for digest in digests:
+            path = os.path.join(self.directory, f"{stamp}-{uuid4().hex[:12]}.eml")
+            with open(path, "wb") as f:
+                f.write(render_digest(digest).as_bytes())
+        return {}
+
+
+class SmtpSender:
+    """Sends a batch of digests over one SMTP connection."""
+
+    name = "smtp"
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: str = SMTP_USERNAME,
+                 password: str = SMTP_PASSWORD, use_tls: bool = SMTP_USE_TLS, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, digests: List[dict]) -> Dict[str, str]:
+        errors = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for digest in digests:
+                try:
+                    smtp.send_message(render_digest(digest))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    errors[digest["recipient_email"]] = f"{type(e).__name__}: {e}"
+        return errors
+
+
+def default_sender(kind: Optional[str] = None):
+    """
+    The sender chosen by NOTIFY_SENDER ("smtp", or "file" for local development).
+
+    Raises:
+        ValueError: If no sender is configured or it is unknown
+    """
+    kind = NOTIFY_SENDER if kind is None else kind
+    if kind == "smtp":
+        return SmtpSender()
+    if kind == "file":
+        print(f"⚠️  NOTIFY_SENDER=file: notification emails are written to {NOTIFY_FILE_DIR}/ (local development only)")
+        return FileSender()
+    if not kind:
+        raise ValueError("NOTIFICATIONS_ENABLED is set but NOTIFY_SENDER is not (expected 'smtp', or 'file' for local development)")
+    raise ValueError(f"Unknown NOTIFY_SENDER {kind!r} (expected 'smtp', or 'file' for local development)")
@@ -0,0 +1,325 @@
+# app/services/notification_service.py
+"""
+Abnormal-result notifications to care circle members.
+
+1. Queue: CareCircleNotifier is an outbox subscriber (outbox_relay.py). For
+   each batch of events it looks up the care circle members of every patient
+   with biomarker.abnormal events in one query and stores one
+   care_circle_notifications row per event and member
+   (migrations/005_care_circle_notifications.sql). Rows are unique per
+   (event_id, member_id) and ingest event ids are derived from the file and
+   biomarker (outbox_service.ingest_events), so neither a redelivered batch
+   nor a reprocessed report queues anything twice.
+2. Digest: NotificationDispatcher coalesces each recipient's pending rows into
+   one digest once the oldest is NOTIFY_DIGEST_WINDOW_SECONDS old (or
+   NOTIFY_DIGEST_MAX_ITEMS are waiting), so a lab uploading hundreds of
+   reports at once sends each member one email instead of hundreds.
+3. Send: digests go to the sender (notification_senders.py) in batches of
+   NOTIFY_BATCH_SIZE, at most NOTIFY_RATE_LIMIT_PER_SEC a second. A failed
+   digest is retried with exponential backoff and dropped ("dead") after
+   NOTIFY_MAX_ATTEMPTS.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.db.supabase import supabase
+from app.core.config import (
+    NOTIFY_BATCH_SIZE,
+    NOTIFY_DIGEST_MAX_ITEMS,
+    NOTIFY_DIGEST_WINDOW_SECONDS,
+    NOTIFY_LEASE_SECONDS,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_POLL_SECONDS,
+    NOTIFY_RATE_LIMIT_PER_SEC,
+)
+from app.core.metrics import REGISTRY, track_external_call
+from app.core.resilience import TokenBucket
+from app.services.outbox_service import BIOMARKER_ABNORMAL
+
+TABLE = "care_circle_notifications"
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+# Backoff after a failed send: 30s, 1m, 2m ... at most six hours
+RETRY_BASE_SECONDS = 30.0
+RETRY_MAX_SECONDS = 6 * 3600.0
+
+NOTIFICATIONS = REGISTRY.counter(
+    "care_circle_notifications_total",
+    "Care circle notifications by outcome (queued, sent, retried, dead)",
+    ("outcome",),
+)
+NOTIFICATION_DIGESTS = REGISTRY.counter(
+    "care_circle_digests_total",
+    "Notification digests by send outcome",
+    ("outcome",),
+)
+
+ITEM_FIELDS = ("name", "value", "unit", "ref_min", "ref_max", "flag", "report_id")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_time(value) -> datetime:
+    if not value:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# ===== QUEUE =====
+
+def notification_rows(messages: List[dict], members: List[dict], patient_names: Dict[str, str]) -> List[dict]:
+    """One queue row per biomarker.abnormal message and care circle member of its patient."""
+    by_patient: Dict[str, List[dict]] = {}
+    for member in members:
+        by_patient.setdefault(str(member["patient_id"]), []).append(member)
+
+    rows = []
+    for message in messages:
+        patient_id = str(message["patient_id"])
+        data = message["data"]
+        payload = {key: data.get(key) for key in ITEM_FIELDS}
+        payload["patient_name"] = patient_names.get(patient_id)
+        for member in by_patient.get(patient_id, []):
+            rows.append({
+                "event_id": message["event_id"],
+                "member_id": str(member["id"]),
+                "recipient_email": member["email"].lower(),
+                "recipient_name": member.get("name"),
+                "patient_id": patient_id,
+                "payload": payload,
+            })
+    return rows
+
+
+def enqueue(messages: List[dict]) -> int:
+    """
+    Queue notifications for the biomarker.abnormal events among messages.
+    Raises on database errors so the outbox retries the batch.
+
+    Returns:
+        Number of rows written (before duplicates are skipped)
+    """
+    abnormal = [m for m in messages if m.get("type") == BIOMARKER_ABNORMAL and m.get("patient_id")]
+    if not abnormal:
+        return 0
+    patient_ids = sorted({str(m["patient_id"]) for m in abnormal})
+
+    with track_external_call("supabase", "select_care_circles"):
+        members = supabase.table("care_circle_members")\
+            .select("id, patient_id, name, email")\
+            .in_("patient_id", patient_ids)\
+            .execute().data
+    if not members:
+        return 0
+
+    with_members = sorted({str(m["patient_id"]) for m in members})
+    with track_external_call("supabase", "select_patient_names"):
+        patients = supabase.table("patients").select("id, full_name").in_("id", with_members).execute().data
+    names = {str(p["id"]): p.get("full_name") for p in patients}
+
+    rows = notification_rows(abnormal, members, names)
+    with track_external_call("supabase", "queue_notifications"):
+        supabase.table(TABLE).upsert(rows, on_conflict="event_id,member_id", ignore_duplicates=True).execute()
+    NOTIFICATIONS.inc(len(rows), outcome="queued")
+    return len(rows)
+
+
+class CareCircleNotifier:
+    """Outbox subscriber that queues care circle notifications."""
+
+    name = "care_circle_notifier"
+
+    def deliver(self, messages: List[dict]) -> None:
+        enqueue(messages)
+
+
+# ===== DISPATCH QUERIES =====
+
+def fetch_pending(limit: int) -> List[dict]:
+    """The oldest pending notifications, in id order."""
+    return supabase.table(TABLE)\
+        .select("id, recipient_email, recipient_name, patient_id, payload, attempts, next_attempt_at, locked_until, created_at")\
+        .eq("status", PENDING)\
+        .order("id")\
+        .limit(limit)\
+        .execute().data
+
+
+def claim(ids: List[int], lease_seconds: float) -> List[dict]:
+    """Lease notifications for sending; rows leased by another dispatcher are skipped."""
+    if not ids:
+        return []
+    now = _now()
+    return supabase.table(TABLE)\
+        .update({"locked_until": (now + timedelta(seconds=lease_seconds)).isoformat()})\
+        .in_("id", ids)\
+        .eq("status", PENDING)\
+        .lt("locked_until", now.isoformat())\
+        .execute().data
+
+
+def mark_sent(ids: List[int]) -> None:
+    if ids:
+        supabase.table(TABLE).update({"status": SENT, "sent_at": _now().isoformat()}).in_("id", ids).execute()
+
+
+def mark_failed(rows: List[dict], error: str, max_attempts: int) -> None:
+    """Schedule a retry with exponential backoff, or move to "dead" after max_attempts."""
+    now = _now()
+    by_attempts: Dict[int, List[int]] = {}
+    for row in rows:
+        by_attempts.setdefault(row.get("attempts", 0) + 1, []).append(row["id"])
+    for attempts, ids in by_attempts.items():
+        update = {"attempts": attempts, "last_error": error[:1000], "locked_until": now.isoformat()}
+        if attempts >= max_attempts:
+            update["status"] = DEAD
+        else:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            update["next_attempt_at"] = (now + timedelta(seconds=delay)).isoformat()
+        supabase.table(TABLE).update(update).in_("id", ids).execute()
+
+
+def release(ids: List[int]) -> None:
+    """Give back leases on notifications that were claimed but not sent."""
+    if ids:
+        supabase.table(TABLE).update({"locked_until": _now().isoformat()}).in_("id", ids).execute()
+
+
+# ===== DIGESTS =====
+
+def ready_groups(rows: List[dict], now: datetime, window: float, max_items: int, limit: int) -> List[List[dict]]:
+    """
+    Group due rows by recipient and keep the groups that are ready to send: the
+    oldest row has waited `window` seconds or `max_items` rows are waiting.
+    Groups are capped at max_items rows; at most `limit` groups are returned.
+    """
+    groups: Dict[str, List[dict]] = {}
+    for row in rows:
+        if _parse_time(row.get("next_attempt_at")) <= now and _parse_time(row.get("locked_until")) < now:
+            groups.setdefault(row["recipient_email"], []).append(row)
+
+    ready = []
+    for group in groups.values():
+        oldest = min(_parse_time(row.get("created_at")) for row in group)
+        if len(group) >= max_items or oldest <= now - timedelta(seconds=window):
+            ready.append(group[:max_items])
+        if len(ready) >= limit:
+            break
+    return ready
+
+
+def build_digest(rows: List[dict]) -> dict:
+    """One recipient's rows as {recipient_email, recipient_name, patients: [{patient_id, patient_name, items}]}."""
+    patients: Dict[str, dict] = {}
+    for row in rows:
+        patient_id = str(row["patient_id"])
+        patient = patients.setdefault(patient_id, {
+            "patient_id": patient_id,
+            "patient_name": row["payload"].get("patient_name"),
+            "items": [],
+        })
+        patient["items"].append({key: row["payload"].get(key) for key in ITEM_FIELDS})
+    return {
+        "recipient_email": rows[0]["recipient_email"],
+        "recipient_name": rows[0].get("recipient_name"),
+        "patients": list(patients.values()),
+    }
+
+
+class NotificationDispatcher:
+    def __init__(self, sender=None, batch_size: int = NOTIFY_BATCH_SIZE,
+                 window_seconds: float = NOTIFY_DIGEST_WINDOW_SECONDS, max_items: int = NOTIFY_DIGEST_MAX_ITEMS,
+                 rate_limiter: Optional[TokenBucket] = None, lease_seconds: float = NOTIFY_LEASE_SECONDS,
+                 max_attempts: int = NOTIFY_MAX_ATTEMPTS):
+        if sender is None:
+            from app.services.notification_senders import default_sender
+
+            sender = default_sender()
+        self.sender = sender
+        self.batch_size = batch_size
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.rate_limiter = rate_limiter or TokenBucket(NOTIFY_RATE_LIMIT_PER_SEC)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def run_once(self) -> dict:
+        """
+        Send one batch of digests.
+
+        Returns:
+            {"digests", "sent", "retried", "dead"}: digests attempted and notification counts
+        """
+        stats = {"digests": 0, "sent": 0, "retried": 0, "dead": 0}
+        now = _now()
+        groups = ready_groups(fetch_pending(self.batch_size * self.max_items), now,
+                              self.window_seconds, self.max_items, self.batch_size)
+        if not groups:
+            return stats
+
+        claimed = {row["id"] for row in claim([row["id"] for group in groups for row in group], self.lease_seconds)}
+        groups = [[row for row in group if row["id"] in claimed] for group in groups]
+        groups = [group for group in groups if group]
+
+        # Rate limit: wait for a token per digest, but not past the lease
+        batch = []
+        for index, group in enumerate(groups):
+            if not self.rate_limiter.acquire(timeout=self.lease_seconds / 2):
+                release([row["id"] for later in groups[index:] for row in later])
+                break
+            batch.append(group)
+        if not batch:
+            return stats
+
+        digests = [build_digest(group) for group in batch]
+        try:
+            errors = self.sender.send(digests)
+        except Exception as e:
+            error = f"{getattr(self.sender, 'name', type(self.sender).__name__)}: {type(e).__name__}: {e}"
+            print(f"⚠️  Sending {len(digests)} notification digests failed: {error}")
+            errors = {digest["recipient_email"]: error for digest in digests}
+
+        sent_ids = []
+        for group in batch:
+            error = errors.get(group[0]["recipient_email"])
+            if error is None:
+                sent_ids.extend(row["id"] for row in group)
+                NOTIFICATION_DIGESTS.inc(outcome="sent")
+                continue
+            NOTIFICATION_DIGESTS.inc(outcome="failed")
+            mark_failed(group, error, self.max_attempts)
+            for row in group:
+                outcome = "dead" if row.get("attempts", 0) + 1 >= self.max_attempts else "retried"
+                stats[outcome] += 1
+                NOTIFICATIONS.inc(outcome=outcome)
+        mark_sent(sent_ids)
+        NOTIFICATIONS.inc(len(sent_ids), outcome="sent")
+        stats["digests"] = len(digests)
+        stats["sent"] = len(sent_ids)
+        return stats
+
+
+def start_dispatcher(dispatcher: Optional[NotificationDispatcher] = None, poll_seconds: float = NOTIFY_POLL_SECONDS):
+    """Run the dispatcher in a daemon thread until the returned event is set."""
+    dispatcher = dispatcher or NotificationDispatcher()
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                stats = dispatcher.run_once()
+            except Exception as e:
+                print(f"⚠️  Notification dispatch failed: {type(e).__name__}: {e}")
+                stats = {}
+            if not stats.get("digests"):
+                stop.wait(poll_seconds)
+
+    threading.Thread(target=loop, name="notification-dispatcher", daemon=True).start()
+    return stop
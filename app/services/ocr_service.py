@@ -1,21 +1,142 @@
-from google.cloud import documentai
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List
 from app.core.cloud import get_docai_client
-from app.core.config import PROJECT_ID, DOC_AI_LOCATION, DOC_AI_PROCESSOR_ID
+from app.core.config import (
+    PROJECT_ID, DOC_AI_LOCATION, DOC_AI_PROCESSOR_ID, DOCAI_SHARD_PAGES, DOCAI_MAX_PARALLEL_SHARDS
+)
+from app.core.metrics import track_external_call, track_stage
+from app.utils.pdf_utils import split_pdf
+
+# google.cloud.documentai is imported where it is used so the SDK loads with the
+# first OCR job, not when the app starts
+if TYPE_CHECKING:
+    from google.cloud import documentai
+
+logger = logging.getLogger(__name__)
+
+def _process(request_kwargs: dict):
+    from google.cloud import documentai
 
-def process_with_document_ai(gcs_uri: str):
     client = get_docai_client()
 
     name = client.processor_path(
         PROJECT_ID, DOC_AI_LOCATION, DOC_AI_PROCESSOR_ID
     )
 
-    request = documentai.ProcessRequest(
-        name=name,
-        gcs_document=documentai.GcsDocument(
+    request = documentai.ProcessRequest(name=name, **request_kwargs)
+
+    with track_external_call("document_ai", "process_document"):
+        result = client.process_document(request=request)
+    return result.document
+
+
+def process_with_document_ai(gcs_uri: str):
+    from google.cloud import documentai
+
+    return _process({
+        "gcs_document": documentai.GcsDocument(
             gcs_uri=gcs_uri,
             mime_type="application/pdf"
         )
-    )
+    })
 
-    result = client.process_document(request=request)
-    return result.document
+
+def process_pdf_bytes_with_document_ai(content: bytes):
+    """Send PDF bytes inline (e.g. only the scanned pages of a report) to Document AI."""
+    from google.cloud import documentai
+
+    return _process({
+        "raw_document": documentai.RawDocument(
+            content=content,
+            mime_type="application/pdf"
+        )
+    })
+
+
+def merge_documents(documents: List["documentai.Document"]) -> "documentai.Document":
+    """
+    Concatenate shard documents into one, in order.
+
+    Text is joined and every TextSegment offset, page number and PageRef in the
+    pages and entities of later shards is shifted so anchors still point at the
+    right slice of the merged text.
+    """
+    if len(documents) == 1:
+        return documents[0]
+
+    from google.cloud import documentai
+
+    merged = documentai.Document.pb()()
+    texts = []
+    text_offset = 0
+    page_offset = 0
+    for document in documents:
+        pb = documentai.Document.pb(document)
+        if not merged.mime_type:
+            merged.mime_type = pb.mime_type
+        for page in pb.pages:
+            copy = merged.pages.add()
+            copy.CopyFrom(page)
+            _rebase(copy, text_offset, page_offset)
+        for entity in pb.entities:
+            copy = merged.entities.add()
+            copy.CopyFrom(entity)
+            _rebase(copy, text_offset, page_offset)
+        texts.append(pb.text)
+        text_offset += len(pb.text)
+        page_offset += len(pb.pages)
+
+    merged.text = "".join(texts)
+    return documentai.Document.wrap(merged)
+
+
+def _rebase(message, text_offset: int, page_offset: int) -> None:
+    """Shift text offsets and page references in a copied message tree (in place)."""
+    name = message.DESCRIPTOR.name
+    if name == "TextSegment":
+        message.start_index += text_offset
+        message.end_index += text_offset
+        return
+    if name == "PageRef":
+        message.page += page_offset
+    elif name == "Page":
+        message.page_number += page_offset
+
+    for field, value in message.ListFields():
+        if field.type != field.TYPE_MESSAGE or field.message_type.GetOptions().map_entry:
+            continue
+        if hasattr(value, "DESCRIPTOR"):
+            _rebase(value, text_offset, page_offset)
+        else:
+            for item in value:
+                _rebase(item, text_offset, page_offset)
+
+
+def process_pdf_in_shards(
+    pdf_bytes: bytes,
+    shard_pages: int = DOCAI_SHARD_PAGES,
+    max_workers: int = DOCAI_MAX_PARALLEL_SHARDS,
+) -> "documentai.Document":
+    """
+    OCR a PDF as concurrent page-range shards and merge the results.
+
+    Documents with at most shard_pages pages (or none that PyMuPDF can find)
+    are sent as a single request. Otherwise shards run on up to max_workers
+    threads, so latency follows the slowest shard rather than the page count;
+    any failed shard fails the call.
+    """
+    shards = split_pdf(pdf_bytes, shard_pages)
+    if len(shards) <= 1:
+        return process_pdf_bytes_with_document_ai(pdf_bytes)
+
+    logger.info("OCR: splitting %d pages into %d shards of up to %d pages", shards[-1][0][1], len(shards), shard_pages)
+
+    def run_shard(shard):
+        with track_stage("document_ai_shard"):
+            return process_pdf_bytes_with_document_ai(shard[1])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards))), thread_name_prefix="docai-shard") as pool:
+        documents = list(pool.map(run_shard, shards))
+
+    return merge_documents(documents)
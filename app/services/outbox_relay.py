@@ -0,0 +1,247 @@
+# app/services/outbox_relay.py
+"""
+Delivers event_outbox rows (see outbox_service.py) to subscribers.
+
+Each pass leases a batch of due events, hands it to every subscriber and marks
+the events published once all of them accepted it; a failed batch is retried
+with backoff. Delivery is at least once: events can repeat after a failure or
+an expired lease, so subscribers dedupe on event_id.
+
+Events of one patient are delivered in outbox order. An event is only taken
+when every earlier pending event of its patient is in the same batch, so an
+event waiting for a retry (or leased by another worker's relay) holds back the
+patient's later events, while other patients' events keep flowing.
+
+Subscribers:
+- BROKER: in-process publish/subscribe for consumers inside the app
+  (BROKER.subscribe("biomarker.abnormal", handler)); tests use it as a local broker
+- CareCircleNotifier: queues abnormal-result notifications (notification_service.py)
+  when NOTIFICATIONS_ENABLED
+- WebhookSubscriber: POSTs each batch as JSON to OUTBOX_WEBHOOK_URLS, signed with
+  OUTBOX_WEBHOOK_SECRET (X-Healix-Signature: sha256=<hex HMAC of the body>)
+"""
+import hashlib
+import hmac
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+from app.core.config import (
+    NOTIFICATIONS_ENABLED,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_WEBHOOK_SECRET,
+    OUTBOX_WEBHOOK_TIMEOUT_SECONDS,
+    OUTBOX_WEBHOOK_URLS,
+)
+from app.core.metrics import REGISTRY
+from app.services import outbox_service
+from app.services.notification_service import CareCircleNotifier
+
+OUTBOX_EVENTS = REGISTRY.counter(
+    "outbox_events_total",
+    "Outbox events by type and delivery outcome (published, retried, dead)",
+    ("event_type", "outcome"),
+)
+
+# How many pending rows a pass looks at to fill a batch
+SCAN_FACTOR = 4
+
+
+def to_message(row: dict) -> dict:
+    """The JSON shape subscribers receive."""
+    return {
+        "event_id": str(row["event_id"]),
+        "type": row["event_type"],
+        "sequence": row["id"],
+        "patient_id": str(row["patient_id"]) if row.get("patient_id") else None,
+        "occurred_at": row.get("created_at"),
+        "data": row["payload"],
+    }
+
+
+class InProcessBroker:
+    """Synchronous publish/subscribe within the worker process."""
+
+    name = "in_process"
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type: str, handler: Callable[[dict], None]) -> None:
+        """Call handler(message) for each event of event_type ("*" for all)."""
+        with self._lock:
+            self._handlers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: str, handler: Callable[[dict], None]) -> None:
+        with self._lock:
+            if handler in self._handlers.get(event_type, []):
+                self._handlers[event_type].remove(handler)
+
+    def deliver(self, messages: List[dict]) -> None:
+        """Run the matching handlers in order; the first exception fails the batch."""
+        with self._lock:
+            handlers = {event_type: list(items) for event_type, items in self._handlers.items()}
+        for message in messages:
+            for handler in handlers.get(message["type"], []) + handlers.get("*", []):
+                handler(message)
+
+
+class WebhookSubscriber:
+    """POSTs {"events": [...]} to a URL; any non-2xx response fails the batch."""
+
+    def __init__(self, url: str, secret: str = "", timeout: float = 10.0, client=None):
+        self.url = url
+        self.name = f"webhook:{url}"
+        self.secret = secret
+        self.timeout = timeout
+        self._client = client
+
+    def _http(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.Client(timeout=self.timeout)
+        return self._client
+
+    def sign(self, body: bytes) -> str:
+        return "sha256=" + hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+
+    def deliver(self, messages: List[dict]) -> None:
+        body = orjson.dumps({"events": messages})
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            headers["X-Healix-Signature"] = self.sign(body)
+        response = self._http().post(self.url, content=body, headers=headers)
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"{self.url} answered {response.status_code}")
+
+
+BROKER = InProcessBroker()
+
+
+def default_subscribers() -> list:
+    subscribers = [BROKER]
+    if NOTIFICATIONS_ENABLED:
+        subscribers.append(CareCircleNotifier())
+    return subscribers + [
+        WebhookSubscriber(url, OUTBOX_WEBHOOK_SECRET, OUTBOX_WEBHOOK_TIMEOUT_SECONDS)
+        for url in OUTBOX_WEBHOOK_URLS
+    ]
+
+
+def _due(row: dict, now: datetime) -> bool:
+    def parse(value) -> datetime:
+        if not value:
+            return datetime.min.replace(tzinfo=timezone.utc)
+        parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    return parse(row.get("next_attempt_at")) <= now and parse(row.get("locked_until")) < now
+
+
+def deliverable(rows: List[dict], limit: int, now: Optional[datetime] = None) -> List[dict]:
+    """
+    The rows (in id order) that can go out now without overtaking an earlier
+    event of the same patient.
+    """
+    now = now or datetime.now(timezone.utc)
+    blocked = set()
+    batch = []
+    for row in rows:
+        key = str(row.get("patient_id"))
+        if key in blocked:
+            continue
+        if not _due(row, now) or len(batch) >= limit:
+            blocked.add(key)
+            continue
+        batch.append(row)
+    return batch
+
+
+class OutboxRelay:
+    def __init__(self, subscribers: Optional[list] = None, batch_size: int = OUTBOX_BATCH_SIZE,
+                 lease_seconds: float = OUTBOX_LEASE_SECONDS, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.subscribers = default_subscribers() if subscribers is None else subscribers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def run_once(self) -> dict:
+        """
+        Deliver one batch.
+
+        Returns:
+            {"published", "retried", "dead"} event counts
+        """
+        stats = {"published": 0, "retried": 0, "dead": 0}
+        candidates = deliverable(outbox_service.fetch_pending(self.batch_size * SCAN_FACTOR), self.batch_size)
+        if not candidates:
+            return stats
+
+        claimed_ids = {row["id"] for row in outbox_service.claim([row["id"] for row in candidates], self.lease_seconds)}
+        # Another relay took some rows: drop those patients' later rows too, to keep their order
+        lost = {str(row.get("patient_id")) for row in candidates if row["id"] not in claimed_ids}
+        batch = [row for row in candidates if row["id"] in claimed_ids and str(row.get("patient_id")) not in lost]
+        outbox_service.release([row["id"] for row in candidates if row["id"] in claimed_ids and row not in batch])
+        if not batch:
+            return stats
+
+        messages = [to_message(row) for row in batch]
+        try:
+            for subscriber in self.subscribers:
+                subscriber.deliver(messages)
+        except Exception as e:
+            error = f"{getattr(subscriber, 'name', type(subscriber).__name__)}: {type(e).__name__}: {e}"
+            print(f"⚠️  Outbox delivery failed for {len(batch)} events: {error}")
+            outbox_service.mark_failed(batch, error, self.max_attempts)
+            for row in batch:
+                outcome = "dead" if row.get("attempts", 0) + 1 >= self.max_attempts else "retried"
+                stats[outcome] += 1
+                OUTBOX_EVENTS.inc(event_type=row["event_type"], outcome=outcome)
+            return stats
+
+        outbox_service.mark_published([row["id"] for row in batch])
+        stats["published"] = len(batch)
+        for row in batch:
+            OUTBOX_EVENTS.inc(event_type=row["event_type"], outcome="published")
+        return stats
+
+    def drain(self, max_batches: int = 100) -> dict:
+        """Run passes until nothing more can be delivered right now."""
+        totals = {"published": 0, "retried": 0, "dead": 0}
+        for _ in range(max_batches):
+            stats = self.run_once()
+            for key in totals:
+                totals[key] += stats[key]
+            if not stats["published"]:
+                break
+        return totals
+
+
+def start_relay(relay: Optional[OutboxRelay] = None, poll_seconds: float = OUTBOX_POLL_SECONDS):
+    """
+    Run the relay in a daemon thread until the returned event is set.
+    Each gunicorn worker runs one; leases keep them from delivering the same rows.
+    """
+    relay = relay or OutboxRelay()
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                stats = relay.drain()
+            except Exception as e:
+                print(f"⚠️  Outbox relay pass failed: {type(e).__name__}: {e}")
+                stats = {}
+            if not stats.get("published"):
+                stop.wait(poll_seconds)
+
+    threading.Thread(target=loop, name="outbox-relay", daemon=True).start()
+    return stop
@@ -0,0 +1,157 @@
+# app/services/outbox_service.py
+"""
+Transactional outbox for report lifecycle events (migrations/004_event_outbox.sql).
+
+Events are rows of event_outbox written together with the data they describe:
+report.ingested and biomarker.abnormal by the ingest_report() database function
+in the same transaction as the report and its biomarkers, report.failed by the
+OCR worker when processing fails. app/services/outbox_relay.py delivers them.
+
+Event types:
+    report.ingested    {report_id, patient_id, file_id, report_type, sample_collected_at,
+                        biomarker_count, abnormal_count}
+    biomarker.abnormal {report_id, patient_id, name, value, unit, ref_min, ref_max, flag}
+    report.failed      {patient_id, file_id, gcs_uri, stage, error}
+
+Ingest events have ids derived from the file and biomarker they describe, so
+reprocessing a file produces the same event_ids again: ingest_report() skips
+the ones already in the outbox and subscribers that dedupe on event_id see
+each fact once.
+"""
+from app.db.supabase import supabase
+from app.core.metrics import track_external_call
+from app.utils.biomarker_flags import is_abnormal
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+TABLE = "event_outbox"
+
+REPORT_INGESTED = "report.ingested"
+REPORT_FAILED = "report.failed"
+BIOMARKER_ABNORMAL = "biomarker.abnormal"
+
+PENDING = "pending"
+PUBLISHED = "published"
+DEAD = "dead"
+
+# Backoff after a failed delivery: 2, 4, 8 ... seconds, at most an hour
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 3600.0
+
+# Namespace for the uuid5 ids of ingest events
+EVENT_ID_NAMESPACE = uuid5(NAMESPACE_URL, "healix:event_outbox")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def new_event(event_type: str, payload: dict, key: Optional[str] = None) -> dict:
+    """An event; with a key its event_id is the same every time the key is."""
+    event_id = uuid5(EVENT_ID_NAMESPACE, f"{event_type}:{key}") if key is not None else uuid4()
+    return {"event_id": str(event_id), "event_type": event_type, "payload": payload}
+
+
+def ingest_events(report: dict, biomarkers: List[dict]) -> List[dict]:
+    """
+    Events for a report being ingested, for ingest_report() to store with it
+    (the function adds report_id to each payload).
+
+    Args:
+        report: Report fields (patient_id, file_id, report_type, sample_collected_at)
+        biomarkers: Biomarker rows being stored
+    """
+    abnormal = [b for b in biomarkers if is_abnormal(b)]
+    patient_id = str(report["patient_id"])
+    file_id = report["file_id"]
+    events = [new_event(REPORT_INGESTED, {
+        "patient_id": patient_id,
+        "file_id": file_id,
+        "report_type": report.get("report_type"),
+        "sample_collected_at": report.get("sample_collected_at"),
+        "biomarker_count": len(biomarkers),
+        "abnormal_count": len(abnormal),
+    }, key=file_id)]
+    # A name can repeat within a report; its position among the repeats keeps the ids apart
+    seen: Dict[str, int] = {}
+    for biomarker in abnormal:
+        name = biomarker.get("name")
+        seen[name] = seen.get(name, 0) + 1
+        events.append(new_event(BIOMARKER_ABNORMAL, {
+            "patient_id": patient_id,
+            **{k: biomarker.get(k) for k in ("name", "value", "unit", "ref_min", "ref_max", "flag")},
+        }, key=f"{file_id}:{name}:{seen[name]}"))
+    return events
+
+
+def record_event(event_type: str, patient_id: Optional[str], payload: dict) -> dict:
+    """Write a single event that has no other data to share a transaction with (e.g. report.failed)."""
+    try:
+        event = new_event(event_type, payload)
+        with track_external_call("supabase", "insert_outbox_event"):
+            response = supabase.table(TABLE).insert({
+                **event,
+                "patient_id": str(patient_id) if patient_id else None,
+            }).execute()
+        if response.data:
+            return {"success": True, "data": response.data[0]}
+        return {"success": False, "error": "Failed to record event"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# ===== RELAY QUERIES =====
+
+def fetch_pending(limit: int) -> List[dict]:
+    """The oldest pending events (due or not, leased or not), in id order."""
+    return supabase.table(TABLE)\
+        .select("id, event_id, event_type, patient_id, payload, attempts, next_attempt_at, locked_until, created_at")\
+        .eq("status", PENDING)\
+        .order("id")\
+        .limit(limit)\
+        .execute().data
+
+
+def claim(ids: List[int], lease_seconds: float) -> List[dict]:
+    """
+    Lease events for delivery. Only rows whose lease has expired are taken, so
+    when relays race for the same rows each row goes to one of them.
+    """
+    if not ids:
+        return []
+    now = _now()
+    return supabase.table(TABLE)\
+        .update({"locked_until": (now + timedelta(seconds=lease_seconds)).isoformat()})\
+        .in_("id", ids)\
+        .eq("status", PENDING)\
+        .lt("locked_until", now.isoformat())\
+        .execute().data
+
+
+def mark_published(ids: List[int]) -> None:
+    if ids:
+        supabase.table(TABLE).update({"status": PUBLISHED, "published_at": _now().isoformat()}).in_("id", ids).execute()
+
+
+def mark_failed(events: List[dict], error: str, max_attempts: int) -> None:
+    """Schedule a retry with exponential backoff, or move to "dead" after max_attempts."""
+    now = _now()
+    # One update per distinct attempt count (usually the whole batch at once)
+    by_attempts: Dict[int, List[int]] = {}
+    for event in events:
+        by_attempts.setdefault(event.get("attempts", 0) + 1, []).append(event["id"])
+    for attempts, ids in by_attempts.items():
+        update = {"attempts": attempts, "last_error": error[:1000], "locked_until": now.isoformat()}
+        if attempts >= max_attempts:
+            update["status"] = DEAD
+        else:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            update["next_attempt_at"] = (now + timedelta(seconds=delay)).isoformat()
+        supabase.table(TABLE).update(update).in_("id", ids).execute()
+
+
+def release(ids: List[int]) -> None:
+    """Give back leases on events that were claimed but not attempted."""
+    if ids:
+        supabase.table(TABLE).update({"locked_until": _now().isoformat()}).in_("id", ids).execute()
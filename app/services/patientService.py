@@ -2,9 +2,16 @@
 from app.db.supabase import supabase
 from app.schemas.patient import PatientCreate, PatientUpdate, PatientOut, PatientLogin
 from app.utils.auth import hash_password, verify_password
+from app.core.security import create_token_pair, decode_token, revoke_token, TokenError, REFRESH_TOKEN
+from app.services.dashboard_cache import invalidate_dashboard
 from typing import List, Optional
 from uuid import UUID
 
+# Columns returned by patient reads (never password_hash)
+PATIENT_COLUMNS = "id, full_name, email, phone, nic, created_at"
+
+REFRESH_TOKEN_NOT_OWNED = "Refresh token belongs to another patient"
+
 def create_patient(patient: PatientCreate) -> dict:
     """Create a new patient (registration)"""
     try:
@@ -51,44 +58,96 @@ def authenticate_patient(login: PatientLogin) -> dict:
         
         # Remove password_hash from response
         patient.pop('password_hash', None)
-        return {"success": True, "data": patient, "message": "Login successful"}
+        return {
+            "success": True,
+            "data": patient,
+            "tokens": create_token_pair(patient),
+            "message": "Login successful"
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def refresh_session(refresh_token: str) -> dict:
+    """Exchange a refresh token for a new token pair (the old refresh token is revoked)"""
+    try:
+        claims = decode_token(refresh_token, REFRESH_TOKEN)
+        revoke_token(claims)
+        patient = {
+            "id": claims["sub"],
+            "email": claims.get("email"),
+            "nic": claims.get("nic"),
+            "full_name": claims.get("name")
+        }
+        return {"success": True, "tokens": create_token_pair(patient)}
+    except TokenError as e:
+        return {"success": False, "error": str(e)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def logout_patient(access_claims: dict, refresh_token: Optional[str] = None) -> dict:
+    """Revoke the caller's access token and, if given, their refresh token (which must be theirs)"""
+    try:
+        refresh_claims = None
+        if refresh_token:
+            try:
+                refresh_claims = decode_token(refresh_token, REFRESH_TOKEN)
+            except TokenError:
+                pass  # Already expired or revoked
+        if refresh_claims is not None and refresh_claims.get("sub") != access_claims["id"]:
+            return {"success": False, "error": REFRESH_TOKEN_NOT_OWNED}
+
+        revoke_token({"jti": access_claims["token_id"], "exp": access_claims["token_expires_at"]})
+        if refresh_claims is not None:
+            revoke_token(refresh_claims)
+        return {"success": True, "message": "Logged out successfully"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_patient_by_id(patient_id: str) -> Optional[dict]:
+def get_patient_by_id(patient_id: str, columns: str = PATIENT_COLUMNS) -> Optional[dict]:
     """Get a patient by UUID (excludes password_hash)"""
     try:
-        response = supabase.table("patients").select("id, full_name, email, phone, nic, created_at").eq("id", patient_id).execute()
+        response = supabase.table("patients").select(columns).eq("id", patient_id).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Patient not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_patient_by_email(email: str) -> Optional[dict]:
+def get_patient_by_email(email: str, columns: str = PATIENT_COLUMNS) -> Optional[dict]:
     """Get a patient by email (excludes password_hash)"""
     try:
-        response = supabase.table("patients").select("id, full_name, email, phone, nic, created_at").eq("email", email).execute()
+        response = supabase.table("patients").select(columns).eq("email", email).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Patient not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_patient_by_nic(nic: str) -> Optional[dict]:
+def get_patient_by_nic(nic: str, columns: str = PATIENT_COLUMNS) -> Optional[dict]:
     """Get a patient by NIC (excludes password_hash)"""
     try:
-        response = supabase.table("patients").select("id, full_name, email, phone, nic, created_at").eq("nic", nic).execute()
+        response = supabase.table("patients").select(columns).eq("nic", nic).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Patient not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def list_patients(skip: int = 0, limit: int = 100) -> dict:
+def get_patients_by_nics(nics: List[str]) -> dict:
+    """Resolve many NICs with a single query. Returns {"data": {nic: patient}} (unknown NICs are absent)"""
+    try:
+        unique = sorted(set(nics))
+        if not unique:
+            return {"success": True, "data": {}}
+        response = supabase.table("patients").select("id, full_name, nic").in_("nic", unique).execute()
+        return {"success": True, "data": {row["nic"]: row for row in response.data}}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def list_patients(skip: int = 0, limit: int = 100, columns: str = PATIENT_COLUMNS) -> dict:
     """List all patients with pagination (excludes password_hash)"""
     try:
-        response = supabase.table("patients").select("id, full_name, email, phone, nic, created_at").range(skip, skip + limit - 1).execute()
+        response = supabase.table("patients").select(columns).range(skip, skip + limit - 1).execute()
         return {"success": True, "data": response.data, "count": len(response.data)}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -111,6 +170,7 @@ def update_patient(patient_id: str, updates: PatientUpdate) -> dict:
         response = supabase.table("patients").update(update_data).eq("id", patient_id).execute()
         
         if response.data:
+            invalidate_dashboard(patient_id, "patient")
             # Remove password_hash from response
             patient_data = response.data[0]
             patient_data.pop('password_hash', None)
@@ -156,6 +216,7 @@ def delete_patient(patient_id: str) -> dict:
     """Delete a patient"""
     try:
         response = supabase.table("patients").delete().eq("id", patient_id).execute()
+        invalidate_dashboard(patient_id)
         return {"success": True, "message": "Patient deleted successfully"}
     except Exception as e:
         return {"success": False, "error": str(e)}
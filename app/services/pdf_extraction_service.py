@@ -0,0 +1,190 @@
+"""
+PDF preflight and extraction.
+
+Digitally generated lab PDFs already carry a text layer, so their text and
+tables are read locally with pdfplumber. Only scanned or image-only pages are
+sent to Document AI (as a sub-PDF built with PyMuPDF, OCR'd in page-range
+shards when long), and the results are
+merged back in page order into the same shape as build_report_json:
+{raw_text, tables, entities, page_count}, plus an "extraction" record of the
+path the document took.
+
+Tables hold body rows only on both paths: Document AI reports header rows
+separately (extract_tables leaves them out), and the column-label rows
+pdfplumber returns at the top of a table are dropped to match.
+"""
+
+import io
+from typing import Any, Dict, List, Optional
+
+from app.core.config import LOCAL_EXTRACTION_ENABLED, TEXT_LAYER_MIN_CHARS, DOCAI_SHARD_PAGES
+from app.core.metrics import track_stage, OCR_EXTRACTION_PATH, OCR_EXTRACTION_PAGES
+from app.services import ocr_service
+from app.services.nlp_service import build_report_json
+from app.utils.text_utils import extract_tables, extract_entities, extract_pages
+from app.utils.pdf_utils import build_page_subset, count_pages
+
+PATH_LOCAL = "local"
+PATH_DOCUMENT_AI = "document_ai"
+PATH_HYBRID = "hybrid"
+
+# Column labels of lab report tables; a leading row made only of these is a header
+HEADER_LABELS = {
+    "TEST", "TEST NAME", "TESTS", "INVESTIGATION", "PARAMETER", "RESULT", "RESULTS", "VALUE",
+    "UNIT", "UNITS", "FLAG", "ABSOLUTE COUNT", "REFERENCE RANGE", "REFERENCE RANGES",
+    "REFERENCE INTERVAL", "BIOLOGICAL REFERENCE INTERVAL", "NORMAL RANGE", "REF. RANGE",
+}
+
+
+def _is_header_row(row: List[str]) -> bool:
+    labels = [" ".join(cell.upper().split()) for cell in row if cell]
+    return bool(labels) and all(label in HEADER_LABELS for label in labels)
+
+
+def body_rows(table: List[List[str]]) -> List[List[str]]:
+    """A pdfplumber table without its leading header rows."""
+    start = 0
+    while start < len(table) and _is_header_row(table[start]):
+        start += 1
+    return table[start:]
+
+
+def analyze_pdf(pdf_bytes: bytes, min_chars: int = TEXT_LAYER_MIN_CHARS) -> List[Dict[str, Any]]:
+    """
+    Read each page's text layer and tables.
+
+    Args:
+        pdf_bytes: PDF file content
+        min_chars: Minimum non-whitespace characters for a page to count as having a text layer
+
+    Returns:
+        List of {"page_number", "text", "tables", "has_text_layer"} in page order
+    """
+    import pdfplumber  # deferred: only OCR jobs need it, not app startup
+
+    pages = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for index, page in enumerate(pdf.pages):
+            text = page.extract_text() or ""
+            has_text_layer = len("".join(text.split())) >= min_chars
+            tables = []
+            if has_text_layer:
+                tables = [
+                    body_rows([[(cell or "").strip() for cell in row] for row in table])
+                    for table in page.extract_tables()
+                ]
+            pages.append({
+                "page_number": index + 1,
+                "text": text,
+                "tables": tables,
+                "has_text_layer": has_text_layer,
+            })
+    return pages
+
+
+def _page_count(pdf_bytes: bytes) -> int:
+    try:
+        return count_pages(pdf_bytes)
+    except Exception:
+        return 0
+
+
+def _document_ai_full(pdf_bytes: Optional[bytes], gcs_uri: Optional[str], reason: str) -> Dict[str, Any]:
+    with track_stage("document_ai"):
+        if pdf_bytes and (not gcs_uri or _page_count(pdf_bytes) > DOCAI_SHARD_PAGES):
+            document = ocr_service.process_pdf_in_shards(pdf_bytes)
+        else:
+            document = ocr_service.process_with_document_ai(gcs_uri)
+
+    with track_stage("extract_tables"):
+        raw_json = build_report_json(document, extract_tables(document), extract_entities(document))
+
+    raw_json["extraction"] = {
+        "path": PATH_DOCUMENT_AI,
+        "reason": reason,
+        "local_pages": [],
+        "document_ai_pages": list(range(1, raw_json["page_count"] + 1)),
+    }
+    return raw_json
+
+
+def _record(raw_json: Dict[str, Any]) -> Dict[str, Any]:
+    extraction = raw_json["extraction"]
+    OCR_EXTRACTION_PATH.inc(path=extraction["path"])
+    if extraction["local_pages"]:
+        OCR_EXTRACTION_PAGES.inc(len(extraction["local_pages"]), source=PATH_LOCAL)
+    if extraction["document_ai_pages"]:
+        OCR_EXTRACTION_PAGES.inc(len(extraction["document_ai_pages"]), source=PATH_DOCUMENT_AI)
+    print(
+        f"Extraction path: {extraction['path']} "
+        f"(local pages: {extraction['local_pages']}, Document AI pages: {extraction['document_ai_pages']})"
+    )
+    return raw_json
+
+
+def extract_report_data(pdf_bytes: Optional[bytes], gcs_uri: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract text, tables and entities from a report PDF.
+
+    Pages with a text layer are read locally; the rest go to Document AI. When
+    every page needs OCR the whole document is sent (by GCS URI if available).
+
+    Args:
+        pdf_bytes: PDF file content (None skips the preflight)
+        gcs_uri: GCS URI of the same PDF, used when the whole document goes to Document AI
+
+    Returns:
+        {"raw_text", "tables", "entities", "page_count", "extraction": {"path", "local_pages", "document_ai_pages", ...}}
+    """
+    if not LOCAL_EXTRACTION_ENABLED or not pdf_bytes:
+        return _record(_document_ai_full(pdf_bytes, gcs_uri, "local extraction disabled"))
+
+    try:
+        with track_stage("local_text"):
+            pages = analyze_pdf(pdf_bytes)
+    except Exception as e:
+        print(f"⚠️  PDF preflight failed, falling back to Document AI: {str(e)}")
+        return _record(_document_ai_full(pdf_bytes, gcs_uri, f"preflight failed: {str(e)}"))
+
+    scanned = [page["page_number"] for page in pages if not page["has_text_layer"]]
+    local = [page["page_number"] for page in pages if page["has_text_layer"]]
+
+    if not local:
+        return _record(_document_ai_full(pdf_bytes, gcs_uri, "no text layer"))
+
+    entities: List[Dict[str, Any]] = []
+    if scanned:
+        try:
+            subset = build_page_subset(pdf_bytes, scanned)
+        except Exception as e:
+            print(f"⚠️  Could not split scanned pages, sending whole document to Document AI: {str(e)}")
+            return _record(_document_ai_full(pdf_bytes, gcs_uri, f"page split failed: {str(e)}"))
+
+        with track_stage("document_ai"):
+            document = ocr_service.process_pdf_in_shards(subset)
+        with track_stage("extract_tables"):
+            ocr_pages = extract_pages(document)
+            entities = extract_entities(document)
+
+        if len(ocr_pages) != len(scanned):
+            # Pages cannot be matched back to their page numbers; OCR the whole document instead
+            reason = f"Document AI returned {len(ocr_pages)} pages for {len(scanned)} scanned pages"
+            print(f"⚠️  {reason}, sending whole document to Document AI")
+            return _record(_document_ai_full(pdf_bytes, gcs_uri, reason))
+
+        for page_number, ocr_page in zip(scanned, ocr_pages):
+            pages[page_number - 1]["text"] = ocr_page["text"]
+            pages[page_number - 1]["tables"] = ocr_page["tables"]
+
+    raw_json = {
+        "raw_text": "\n".join(page["text"] for page in pages),
+        "tables": [table for page in pages for table in page["tables"]],
+        "entities": entities,
+        "page_count": len(pages),
+        "extraction": {
+            "path": PATH_HYBRID if scanned else PATH_LOCAL,
+            "local_pages": local,
+            "document_ai_pages": scanned,
+        },
+    }
+    return _record(raw_json)
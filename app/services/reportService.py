@@ -3,7 +3,12 @@ from app.db.supabase import supabase
 from app.schemas.report import ReportCreate, ReportUpdate, BiomarkerCreate
 from typing import List, Optional, Dict
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
+from app.core.metrics import track_external_call
+from app.services.dashboard_cache import invalidate_dashboard
+from app.services.latest_biomarker_service import rebuild_latest_biomarkers
+from app.services.outbox_service import ingest_events
+from app.services.search_service import remove_report as remove_report_text
 
 def create_report(report: ReportCreate) -> dict:
     """Create a new report record in Supabase"""
@@ -21,39 +26,81 @@ def create_report(report: ReportCreate) -> dict:
             report_data["sample_collected_at"] = report.sample_collected_at.isoformat()
         
         # Insert into Supabase
-        response = supabase.table("reports").insert(report_data).execute()
+        with track_external_call("supabase", "insert_report"):
+            response = supabase.table("reports").insert(report_data).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "reports")
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Failed to create report"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_report_by_id(report_id: str) -> dict:
-    """Get a report by UUID"""
+def upsert_report(report: ReportCreate) -> dict:
+    """
+    Create the report for report.file_id, or update it if one already exists.
+    Relies on the unique constraint on reports.file_id (migrations/002_idempotency_keys.sql).
+    """
     try:
-        response = supabase.table("reports").select("*").eq("id", report_id).execute()
+        report_data = {
+            "patient_id": str(report.patient_id),
+            "file_id": report.file_id,
+            "report_type": report.report_type,
+            "gcs_path": report.gcs_path,
+            "sample_collected_at": report.sample_collected_at.isoformat() if report.sample_collected_at else None,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        with track_external_call("supabase", "upsert_report"):
+            response = supabase.table("reports").upsert(report_data, on_conflict="file_id").execute()
+
+        if response.data:
+            invalidate_dashboard(report_data["patient_id"], "reports")
+            return {"success": True, "data": response.data[0]}
+        return {"success": False, "error": "Failed to store report"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def get_report_by_id(report_id: str, columns: str = "*") -> dict:
+    """Get a report by UUID (columns: PostgREST select list, see app/utils/projection.py)"""
+    try:
+        response = supabase.table("reports").select(columns).eq("id", report_id).execute()
+        if response.data:
+            return {"success": True, "data": response.data[0]}
+        return {"success": False, "error": "Report not found"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def get_report_version(report_id: Optional[str] = None, file_id: Optional[str] = None) -> dict:
+    """
+    Get just the version columns of a report (id, updated_at, created_at) by id or file_id.
+    Cheap validator lookup for conditional GETs.
+    """
+    try:
+        query = supabase.table("reports").select("id, updated_at, created_at")
+        query = query.eq("id", report_id) if report_id else query.eq("file_id", file_id)
+        response = query.execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Report not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_report_by_file_id(file_id: str) -> dict:
+def get_report_by_file_id(file_id: str, columns: str = "*") -> dict:
     """Get a report by file_id"""
     try:
-        response = supabase.table("reports").select("*").eq("file_id", file_id).execute()
+        response = supabase.table("reports").select(columns).eq("file_id", file_id).execute()
         if response.data:
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Report not found"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def list_reports_by_patient(patient_id: str, skip: int = 0, limit: int = 100) -> dict:
+def list_reports_by_patient(patient_id: str, skip: int = 0, limit: int = 100, columns: str = "*") -> dict:
     """List all reports for a patient"""
     try:
         response = supabase.table("reports")\
-            .select("*")\
+            .select(columns)\
             .eq("patient_id", patient_id)\
             .order("created_at", desc=True)\
             .range(skip, skip + limit - 1)\
@@ -78,6 +125,9 @@ def update_report(report_id: str, updates: ReportUpdate) -> dict:
         response = supabase.table("reports").update(update_data).eq("id", report_id).execute()
         
         if response.data:
+            invalidate_dashboard(response.data[0].get("patient_id"), "reports")
+            if "sample_collected_at" in update_data or "patient_id" in update_data:
+                _refresh_latest(rebuild_latest_biomarkers, response.data[0].get("patient_id"))
             return {"success": True, "data": response.data[0]}
         return {"success": False, "error": "Report not found or update failed"}
     except Exception as e:
@@ -87,10 +137,23 @@ def delete_report(report_id: str) -> dict:
     """Delete a report (cascade deletes biomarkers)"""
     try:
         response = supabase.table("reports").delete().eq("id", report_id).execute()
+        for row in response.data or []:
+            invalidate_dashboard(row.get("patient_id"), "reports")
+            # Values this report provided fall back to the patient's previous reports
+            _refresh_latest(rebuild_latest_biomarkers, row.get("patient_id"))
+            remove_report_text(row["id"])
         return {"success": True, "message": "Report deleted successfully"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _refresh_latest(refresh, *args) -> None:
+    """Update patient_latest_biomarkers; a failure is logged, not raised (the table can be rebuilt)."""
+    if not args[0]:
+        return
+    result = refresh(*args)
+    if not result.get("success"):
+        print(f"⚠️  Latest biomarker values not updated: {result.get('error')}")
+
 # Biomarker functions
 def create_biomarker(biomarker: BiomarkerCreate) -> dict:
     """Create a biomarker record"""
@@ -128,7 +191,8 @@ def create_biomarkers_bulk(biomarkers: List[BiomarkerCreate]) -> dict:
                 "flag": biomarker.flag
             })
         
-        response = supabase.table("biomarkers").insert(biomarker_data).execute()
+        with track_external_call("supabase", "insert_biomarkers"):
+            response = supabase.table("biomarkers").insert(biomarker_data).execute()
         
         if response.data:
             return {"success": True, "data": response.data, "count": len(response.data)}
@@ -136,11 +200,20 @@ def create_biomarkers_bulk(biomarkers: List[BiomarkerCreate]) -> dict:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def get_biomarkers_by_report(report_id: str) -> dict:
+def delete_biomarkers_by_report(report_id: str) -> dict:
+    """Delete all biomarkers of a report (before re-ingesting it)"""
+    try:
+        with track_external_call("supabase", "delete_biomarkers"):
+            response = supabase.table("biomarkers").delete().eq("report_id", report_id).execute()
+        return {"success": True, "count": len(response.data or [])}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def get_biomarkers_by_report(report_id: str, columns: str = "*") -> dict:
     """Get all biomarkers for a specific report"""
     try:
         response = supabase.table("biomarkers")\
-            .select("*")\
+            .select(columns)\
             .eq("report_id", report_id)\
             .order("name")\
             .execute()
@@ -149,6 +222,21 @@ def get_biomarkers_by_report(report_id: str) -> dict:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def get_biomarkers_by_reports(report_ids: List[str], columns: str = "*") -> dict:
+    """Get the biomarkers of several reports in one query"""
+    try:
+        if not report_ids:
+            return {"success": True, "data": [], "count": 0}
+        response = supabase.table("biomarkers")\
+            .select(columns)\
+            .in_("report_id", report_ids)\
+            .order("name")\
+            .execute()
+
+        return {"success": True, "data": response.data, "count": len(response.data)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 def get_report_with_biomarkers(report_id: str) -> dict:
     """Get a complete report with all its biomarkers"""
     try:
@@ -172,6 +260,42 @@ def get_report_with_biomarkers(report_id: str) -> dict:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _safe_float(value):
+    """Safely convert value to float, return None if invalid"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def _biomarker_row(bm: dict) -> dict:
+    """biomarkers row (without report_id) from a normalized biomarker"""
+    # Handle ref_range array format from normalization service
+    # ref_range can be: [min, max] or separate ref_min/ref_max fields
+    ref_min = None
+    ref_max = None
+
+    if "ref_range" in bm and bm["ref_range"] is not None:
+        # Normalization service returns [min, max]
+        ref_range = bm["ref_range"]
+        if isinstance(ref_range, list) and len(ref_range) >= 2:
+            ref_min = _safe_float(ref_range[0])
+            ref_max = _safe_float(ref_range[1])
+    else:
+        # Handle separate ref_min/ref_max fields
+        ref_min = _safe_float(bm.get("ref_min"))
+        ref_max = _safe_float(bm.get("ref_max"))
+
+    return {
+        "name": bm.get("name", ""),
+        "value": float(bm.get("value", 0)),
+        "unit": bm.get("unit"),
+        "ref_min": ref_min,
+        "ref_max": ref_max,
+        "flag": bm.get("flag"),
+    }
+
 def store_normalized_report_to_db(
     patient_id: UUID,
     file_id: str,
@@ -181,6 +305,17 @@ def store_normalized_report_to_db(
     """
     Store normalized report and biomarkers to Supabase.
     This is called after OCR processing is complete.
+
+    The report, its biomarkers and its outbox events (report.ingested and one
+    biomarker.abnormal per abnormal biomarker, see outbox_service.py) are written
+    in one transaction by the ingest_report() database function
+    (migrations/004_event_outbox.sql): either all of them are stored or none.
+    The same transaction updates the patient's latest biomarker values
+    (migrations/008_latest_biomarkers_upsert.sql).
+
+    Safe to retry: the report is upserted on file_id and its biomarkers are
+    replaced, so processing the same file again leaves one report with the
+    latest biomarkers instead of duplicates.
     
     Args:
         patient_id: Patient's UUID
@@ -195,7 +330,6 @@ def store_normalized_report_to_db(
         # Extract metadata from normalized JSON
         # Structure is { "patient":{...}, "report": { "type": "...", ... }, "biomarkers": [...] }
         report_data = normalized_json.get("report", {})
-        report_type = report_data.get("type", "Unknown")
         sample_date_str = report_data.get("sample_collected_at")
         
         # Parse sample collection date if provided
@@ -206,89 +340,32 @@ def store_normalized_report_to_db(
             except:
                 pass  # If parsing fails, keep as None
         
-        # Create report record
-        report_data = ReportCreate(
-            patient_id=patient_id,
-            file_id=file_id,
-            report_type=report_type,
-            sample_collected_at=sample_date,
-            gcs_path=gcs_path
-        )
-        
-        report_result = create_report(report_data)
-        if not report_result.get("success"):
-            return {"success": False, "error": f"Failed to create report: {report_result.get('error')}"}
-        
-        report_id = report_result["data"]["id"]
-        
-        # Extract and create biomarkers
-        biomarkers_data = normalized_json.get("biomarkers", [])
-        if biomarkers_data:
-            biomarkers = []
-            for bm in biomarkers_data:
-                # Safely parse ref_min and ref_max
-                def safe_float(value):
-                    """Safely convert value to float, return None if invalid"""
-                    if value is None or value == "":
-                        return None
-                    try:
-                        return float(value)
-                    except (ValueError, TypeError):
-                        return None
-                
-                # Handle ref_range array format from normalization service
-                # ref_range can be: [min, max] or separate ref_min/ref_max fields
-                ref_min = None
-                ref_max = None
-                
-                if "ref_range" in bm and bm["ref_range"] is not None:
-                    # Normalization service returns [min, max]
-                    ref_range = bm["ref_range"]
-                    if isinstance(ref_range, list) and len(ref_range) >= 2:
-                        ref_min = safe_float(ref_range[0])
-                        ref_max = safe_float(ref_range[1])
-                else:
-                    # Handle separate ref_min/ref_max fields
-                    ref_min = safe_float(bm.get("ref_min"))
-                    ref_max = safe_float(bm.get("ref_max"))
-                
-                biomarker = BiomarkerCreate(
-                    report_id=UUID(report_id),
-                    name=bm.get("name", ""),
-                    value=float(bm.get("value", 0)),
-                    unit=bm.get("unit"),
-                    ref_min=ref_min,
-                    ref_max=ref_max,
-                    flag=bm.get("flag")
-                )
-                biomarkers.append(biomarker)
-            
-            biomarkers_result = create_biomarkers_bulk(biomarkers)
-            if not biomarkers_result.get("success"):
-                # Report created but biomarkers failed - still return success with warning
-                return {
-                    "success": True,
-                    "warning": f"Report created but biomarkers failed: {biomarkers_result.get('error')}",
-                    "data": {
-                        "report": report_result["data"],
-                        "biomarkers": []
-                    }
-                }
-            
-            return {
-                "success": True,
-                "data": {
-                    "report": report_result["data"],
-                    "biomarkers": biomarkers_result["data"]
-                }
-            }
-        
-        # No biomarkers in normalized JSON
+        report = {
+            "patient_id": str(patient_id),
+            "file_id": file_id,
+            "report_type": report_data.get("type", "Unknown"),
+            "gcs_path": gcs_path,
+            "sample_collected_at": sample_date.isoformat() if sample_date else None,
+        }
+        biomarkers = [_biomarker_row(bm) for bm in normalized_json.get("biomarkers", [])]
+
+        with track_external_call("supabase", "ingest_report"):
+            response = supabase.rpc("ingest_report", {
+                "p_report": report,
+                "p_biomarkers": biomarkers,
+                "p_events": ingest_events(report, biomarkers),
+            }).execute()
+
+        stored = response.data
+        if not stored or not stored.get("report"):
+            return {"success": False, "error": "Failed to store report"}
+
+        invalidate_dashboard(patient_id, "reports")
         return {
             "success": True,
             "data": {
-                "report": report_result["data"],
-                "biomarkers": []
+                "report": stored["report"],
+                "biomarkers": stored["biomarkers"]
             }
         }
         
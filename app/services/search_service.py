@@ -0,0 +1,122 @@
+# app/services/search_service.py
+"""
+Full-text search over report OCR text.
+
+The OCR worker indexes each report's raw text right after it is stored, so
+searching never touches the JSON in GCS. Backends (SEARCH_BACKEND):
+
+- postgres: report_search_documents with a tsvector column and GIN index,
+  queried through search_reports() (migrations/006_report_search.sql)
+- local: an in-process inverted index (app/utils/search_index.py), for
+  development without the migration; it only sees reports this process indexed
+
+Both rank matches, return a snippet with the matches wrapped in <mark>, and
+accept web search syntax: words are ANDed, "quoted phrases", -excluded words.
+"""
+from typing import Optional
+
+from app.db.supabase import supabase
+from app.core.config import SEARCH_BACKEND, SEARCH_MAX_CONTENT_CHARS
+from app.core.metrics import track_external_call
+from app.utils.search_index import InvertedIndex
+
+TABLE = "report_search_documents"
+RESULT_FIELDS = ("report_id", "patient_id", "file_id", "report_type", "sample_collected_at")
+
+
+class PostgresSearchBackend:
+    name = "postgres"
+
+    def index(self, report: dict, content: str) -> None:
+        with track_external_call("supabase", "index_report_text"):
+            supabase.table(TABLE).upsert({
+                "report_id": str(report["id"]),
+                "patient_id": str(report["patient_id"]),
+                "content": content,
+            }, on_conflict="report_id").execute()
+
+    def remove(self, report_id: str) -> None:
+        pass  # the row goes with the report (on delete cascade)
+
+    def search(self, query: str, patient_id: Optional[str], limit: int, offset: int) -> list:
+        with track_external_call("supabase", "search_reports"):
+            return supabase.rpc("search_reports", {
+                "p_query": query,
+                "p_patient_id": patient_id,
+                "p_limit": limit,
+                "p_offset": offset,
+            }).execute().data
+
+
+class LocalSearchBackend:
+    name = "local"
+
+    def __init__(self):
+        self.documents = InvertedIndex()
+
+    def index(self, report: dict, content: str) -> None:
+        meta = {field: report.get(field) for field in RESULT_FIELDS[1:]}
+        meta["report_id"] = str(report["id"])
+        meta["patient_id"] = str(report["patient_id"])
+        self.documents.add(meta["report_id"], content, meta)
+
+    def remove(self, report_id: str) -> None:
+        self.documents.remove(str(report_id))
+
+    def search(self, query: str, patient_id: Optional[str], limit: int, offset: int) -> list:
+        filters = {"patient_id": patient_id} if patient_id else None
+        return self.documents.search(query, filters, limit, offset)
+
+
+def _backend(name: str):
+    if name == "postgres":
+        return PostgresSearchBackend()
+    if name == "local":
+        return LocalSearchBackend()
+    raise ValueError(f"Unknown SEARCH_BACKEND {name!r} (expected 'postgres' or 'local')")
+
+
+BACKEND = _backend(SEARCH_BACKEND)
+
+
+def index_report(report: dict, text: Optional[str]) -> dict:
+    """
+    Make a stored report's OCR text searchable (re-indexing replaces the old text).
+
+    Args:
+        report: Report row (id, patient_id, file_id, report_type, sample_collected_at)
+        text: raw_text from the extraction
+    """
+    try:
+        content = (text or "").strip()[:SEARCH_MAX_CONTENT_CHARS]
+        if not content:
+            return {"success": False, "error": "Report has no text to index"}
+        BACKEND.index(report, content)
+        return {"success": True, "data": {"report_id": str(report["id"]), "characters": len(content)}}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def remove_report(report_id: str) -> None:
+    BACKEND.remove(report_id)
+
+
+def search_reports(query: str, patient_id: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Reports whose text matches query, best match first.
+
+    Args:
+        query: Search terms (web search syntax)
+        patient_id: Only this patient's reports (None: all patients)
+
+    Returns:
+        {"success", "data": [{report_id, patient_id, file_id, report_type, sample_collected_at, rank, snippet}]}
+    """
+    try:
+        rows = BACKEND.search(query, str(patient_id) if patient_id else None, limit, offset)
+        return {"success": True, "data": [
+            {**{field: row.get(field) for field in RESULT_FIELDS}, "rank": row.get("rank"), "snippet": row.get("snippet")}
+            for row in rows
+        ]}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
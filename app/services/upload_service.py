@@ -1,24 +1,51 @@
+import re
 import uuid
-import json
-from app.core.cloud import get_bucket
-from app.core.config import BUCKET_NAME
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
+import orjson
+from google.api_core import exceptions as gexc
 
-def upload_pdf_to_bucket(local_pdf_path: str, user_nic: str):
+from app.core.cloud import get_bucket, get_storage_client
+from app.core.config import BUCKET_NAME, SIGNED_UPLOAD_EXPIRE_MINUTES, SIGNED_DOWNLOAD_EXPIRE_SECONDS, MAX_UPLOAD_BYTES
+from app.core.metrics import track_external_call
+from app.utils.projection import project_document
+
+# Blob metadata key marking a PDF whose OCR has been enqueued (set once, atomically)
+OCR_STATUS_KEY = "ocr_status"
+
+_REPORT_PDF_PATH = re.compile(r"^users/(?P<nic>[^/]+)/reports/(?P<file_id>[^/]+)\.pdf$")
+
+
+def report_pdf_path(user_nic: str, file_id: str) -> str:
+    return f"users/{user_nic}/reports/{file_id}.pdf"
+
+
+def parse_report_pdf_path(object_name: str) -> Optional[Tuple[str, str]]:
+    """Return (nic, file_id) for users/{nic}/reports/{file_id}.pdf, else None."""
+    match = _REPORT_PDF_PATH.match(object_name or "")
+    return (match.group("nic"), match.group("file_id")) if match else None
+
+
+def upload_pdf_to_bucket(local_pdf_path: str, user_nic: str, file_id: Optional[str] = None):
     if not BUCKET_NAME:
         raise ValueError("GCS_BUCKET environment variable is not set")
 
     try:
         bucket = get_bucket(BUCKET_NAME)
 
-        file_id = str(uuid.uuid4())
-        gcs_path = f"users/{user_nic}/reports/{file_id}.pdf"
+        # A fixed file_id (idempotent retries) overwrites the same object
+        file_id = file_id or str(uuid.uuid4())
+        gcs_path = report_pdf_path(user_nic, file_id)
 
         blob = bucket.blob(gcs_path)
-        blob.upload_from_filename(
-            local_pdf_path,
-            content_type="application/pdf"
-        )
+        # Processed inline by the upload endpoint; storage notifications should skip it
+        blob.metadata = {OCR_STATUS_KEY: "queued"}
+        with track_external_call("gcs", "upload"):
+            blob.upload_from_filename(
+                local_pdf_path,
+                content_type="application/pdf"
+            )
 
         return {
             "file_id": file_id,
@@ -28,26 +55,274 @@ def upload_pdf_to_bucket(local_pdf_path: str, user_nic: str):
         raise RuntimeError(f"GCS Upload Failed: {str(e)}")
 
 
+def upload_pdf_bytes(user_nic: str, content: bytes, file_id: Optional[str] = None) -> dict:
+    """
+    Upload PDF bytes to users/{nic}/reports/{file_id}.pdf.
+
+    Returns:
+        {"file_id", "gcs_uri"}
+    """
+    if not BUCKET_NAME:
+        raise ValueError("GCS_BUCKET environment variable is not set")
+
+    file_id = file_id or str(uuid.uuid4())
+    path = report_pdf_path(user_nic, file_id)
+
+    blob = get_bucket(BUCKET_NAME).blob(path)
+    blob.metadata = {OCR_STATUS_KEY: "queued"}
+    with track_external_call("gcs", "upload"):
+        blob.upload_from_string(content, content_type="application/pdf")
+
+    return {"file_id": file_id, "gcs_uri": f"gs://{BUCKET_NAME}/{path}"}
+
+
+def _signing_kwargs() -> dict:
+    """
+    Extra generate_signed_url arguments for credentials without a private key
+    (e.g. Compute Engine / Cloud Run metadata credentials sign through IAM).
+    """
+    credentials = getattr(get_storage_client(), "_credentials", None)
+    if credentials is None or getattr(credentials, "signer", None):
+        return {}
+    if not getattr(credentials, "service_account_email", None):
+        return {}
+
+    import google.auth.transport.requests
+
+    if not credentials.valid:
+        credentials.refresh(google.auth.transport.requests.Request())
+    return {"service_account_email": credentials.service_account_email, "access_token": credentials.token}
+
+
+def create_signed_upload(user_nic: str, content_type: str = "application/pdf") -> dict:
+    """
+    Issue a V4 signed URL that starts a resumable upload straight to
+    users/{nic}/reports/{file_id}.pdf, so the PDF never passes through the API.
+
+    The client POSTs to `upload_url` with the returned headers (no body), then
+    PUTs the file to the session URI from the response's Location header.
+
+    Returns:
+        Dictionary with file_id, gcs_uri, upload_url, method, headers, expires_at
+    """
+    if not BUCKET_NAME:
+        raise ValueError("GCS_BUCKET environment variable is not set")
+
+    file_id = str(uuid.uuid4())
+    path = report_pdf_path(user_nic, file_id)
+    expiration = timedelta(minutes=SIGNED_UPLOAD_EXPIRE_MINUTES)
+    headers = {
+        "x-goog-resumable": "start",
+        "x-goog-if-generation-match": "0",  # never overwrite an existing report
+        "x-goog-content-length-range": f"0,{MAX_UPLOAD_BYTES}",
+    }
+
+    blob = get_bucket(BUCKET_NAME).blob(path)
+    upload_url = blob.generate_signed_url(
+        version="v4",
+        expiration=expiration,
+        method="POST",
+        content_type=content_type,
+        headers=headers,
+        **_signing_kwargs()
+    )
+
+    return {
+        "file_id": file_id,
+        "gcs_uri": f"gs://{BUCKET_NAME}/{path}",
+        "upload_url": upload_url,
+        "method": "POST",
+        "headers": {**headers, "Content-Type": content_type},
+        "expires_at": (datetime.now(timezone.utc) + expiration).isoformat(),
+        "max_bytes": MAX_UPLOAD_BYTES,
+    }
+
+
+def claim_uploaded_report(user_nic: str, file_id: str) -> dict:
+    """
+    Mark a directly uploaded PDF as queued for OCR, exactly once.
+
+    The claim is a metadata patch conditioned on the blob's metageneration, so
+    concurrent finalize calls and storage notifications cannot both win.
+
+    Returns:
+        {"claimed": bool, "gcs_uri", "size_bytes", "status"}
+
+    Raises:
+        FileNotFoundError: If nothing has been uploaded at the report path
+        ValueError: If the object is not a PDF or exceeds MAX_UPLOAD_BYTES
+    """
+    path = report_pdf_path(user_nic, file_id)
+    bucket = get_bucket(BUCKET_NAME)
+
+    with track_external_call("gcs", "get_blob"):
+        blob = bucket.get_blob(path)
+    if blob is None:
+        raise FileNotFoundError(f"No upload found for file_id {file_id}")
+    if blob.content_type and blob.content_type != "application/pdf":
+        raise ValueError(f"Uploaded object is {blob.content_type}, expected application/pdf")
+    if blob.size is not None and blob.size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Uploaded file is {blob.size} bytes; limit is {MAX_UPLOAD_BYTES}")
+
+    result = {"claimed": False, "gcs_uri": f"gs://{BUCKET_NAME}/{path}", "size_bytes": blob.size}
+
+    metadata = dict(blob.metadata or {})
+    if metadata.get(OCR_STATUS_KEY):
+        return {**result, "status": metadata[OCR_STATUS_KEY]}
+
+    queued_at = datetime.now(timezone.utc).isoformat()
+    metadata[OCR_STATUS_KEY] = "queued"
+    metadata["queued_at"] = queued_at
+    blob.metadata = metadata
+    try:
+        with track_external_call("gcs", "patch"):
+            blob.patch(if_metageneration_match=blob.metageneration)
+    except gexc.PreconditionFailed:
+        # Either another caller won, or our own patch was applied and the client
+        # library retried it after losing the response: the stored queued_at tells
+        # which.
+        with track_external_call("gcs", "reload"):
+            blob.reload()
+        stored = blob.metadata or {}
+        if stored.get(OCR_STATUS_KEY) == "queued" and stored.get("queued_at") == queued_at:
+            return {**result, "claimed": True, "status": "queued"}
+        return {**result, "status": stored.get(OCR_STATUS_KEY) or "queued"}
+
+    return {**result, "claimed": True, "status": "queued"}
+
+
+def processed_json_path(user_nic: str, file_id: str, normalized: bool = False) -> str:
+    suffix = "_normalized" if normalized else ""
+    return f"users/{user_nic}/processed/{file_id}{suffix}.json"
+
+
+def create_signed_download(path: str, filename: Optional[str] = None) -> dict:
+    """
+    Issue a short-lived V4 signed GET URL for an object in the bucket.
+
+    Signing is local (no storage round trip); a missing object surfaces as a
+    404 from Cloud Storage when the client follows the URL.
+
+    Args:
+        path: Object path inside BUCKET_NAME
+        filename: If set, the browser downloads the object under this name
+
+    Returns:
+        {"url", "expires_at", "expires_in"}
+    """
+    expiration = timedelta(seconds=SIGNED_DOWNLOAD_EXPIRE_SECONDS)
+    options = {}
+    if filename:
+        options["response_disposition"] = f'attachment; filename="{filename}"'
+
+    blob = get_bucket(BUCKET_NAME).blob(path)
+    url = blob.generate_signed_url(
+        version="v4",
+        expiration=expiration,
+        method="GET",
+        **options,
+        **_signing_kwargs()
+    )
+    return {
+        "url": url,
+        "expires_at": (datetime.now(timezone.utc) + expiration).isoformat(),
+        "expires_in": SIGNED_DOWNLOAD_EXPIRE_SECONDS,
+    }
+
+
+def download_pdf(gcs_uri: str) -> bytes:
+    """
+    Download an uploaded PDF by its gs:// URI.
+
+    Args:
+        gcs_uri: URI returned by upload_pdf_to_bucket
+
+    Returns:
+        PDF file content
+    """
+    bucket_name, _, path = gcs_uri[len("gs://"):].partition("/")
+    blob = get_bucket(bucket_name).blob(path)
+    with track_external_call("gcs", "download"):
+        return blob.download_as_bytes()
+
+
 def store_json(user_nic: str, file_id: str, data: dict):
     bucket = get_bucket(BUCKET_NAME)
     path = f"users/{user_nic}/processed/{file_id}.json"
 
     blob = bucket.blob(path)
-    blob.upload_from_string(
-        json.dumps(data, indent=2),
-        content_type="application/json"
-    )
+    with track_external_call("gcs", "upload"):
+        blob.upload_from_string(
+            orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+            content_type="application/json"
+        )
 
     return f"gs://{BUCKET_NAME}/{path}"
 
 
-def get_normalized_json(user_nic: str, file_id: str) -> dict:
+def _download_stored_json(path: str, not_found: str, if_generation_not_match: Optional[int] = None) -> dict:
+    """
+    Download a stored JSON object in one request.
+
+    With if_generation_not_match, GCS answers 304 without a body when the
+    object is still at that generation.
+
+    Returns:
+        {"content": bytes, or None if unchanged, "generation": int}
+    """
+    blob = get_bucket(BUCKET_NAME).blob(path)
+    try:
+        with track_external_call("gcs", "download"):
+            if if_generation_not_match is not None:
+                content = blob.download_as_bytes(if_generation_not_match=if_generation_not_match)
+            else:
+                content = blob.download_as_bytes()
+    except gexc.NotModified:
+        return {"content": None, "generation": if_generation_not_match}
+    except gexc.NotFound:
+        raise FileNotFoundError(not_found)
+    return {"content": content, "generation": blob.generation}
+
+
+def get_normalized_json_object(user_nic: str, file_id: str, if_generation_not_match: Optional[int] = None) -> dict:
+    """
+    Download the normalized JSON report as stored (unparsed) with its GCS
+    generation, for responses that pass it through.
+
+    Returns:
+        {"content": bytes (None if still at if_generation_not_match), "generation": int}
+
+    Raises:
+        FileNotFoundError: If the normalized JSON doesn't exist
+    """
+    return _download_stored_json(
+        processed_json_path(user_nic, file_id, normalized=True),
+        f"Normalized report not found: {file_id}",
+        if_generation_not_match,
+    )
+
+
+def get_raw_json_object(user_nic: str, file_id: str, if_generation_not_match: Optional[int] = None) -> dict:
+    """
+    Download the raw OCR JSON as stored (unparsed) with its GCS generation.
+
+    Returns:
+        {"content": bytes (None if still at if_generation_not_match), "generation": int}
+
+    Raises:
+        FileNotFoundError: If the JSON doesn't exist
+    """
+    return _download_stored_json(processed_json_path(user_nic, file_id), f"Report not found: {file_id}", if_generation_not_match)
+
+
+def get_normalized_json(user_nic: str, file_id: str, fields: Optional[str] = None) -> dict:
     """
     Retrieve normalized JSON report from cloud storage.
     
     Args:
         user_nic: Patient's National Identity Card number
         file_id: Unique file identifier
+        fields: Optional comma-separated dotted paths to keep (see app/utils/projection.py)
         
     Returns:
         Dictionary containing normalized medical report data
@@ -55,26 +330,17 @@ def get_normalized_json(user_nic: str, file_id: str) -> dict:
     Raises:
         FileNotFoundError: If the normalized JSON doesn't exist
     """
-    bucket = get_bucket(BUCKET_NAME)
-    path = f"users/{user_nic}/processed/{file_id}_normalized.json"
-    
-    blob = bucket.blob(path)
-    
-    if not blob.exists():
-        raise FileNotFoundError(f"Normalized report not found: {file_id}")
-    
-    # Download and parse JSON
-    json_string = blob.download_as_string()
-    return json.loads(json_string)
+    return project_document(orjson.loads(get_normalized_json_object(user_nic, file_id)["content"]), fields)
 
 
-def get_raw_json(user_nic: str, file_id: str) -> dict:
+def get_raw_json(user_nic: str, file_id: str, fields: Optional[str] = None) -> dict:
     """
     Retrieve raw OCR JSON from cloud storage.
     
     Args:
         user_nic: Patient's National Identity Card number
         file_id: Unique file identifier
+        fields: Optional comma-separated dotted paths to keep (see app/utils/projection.py)
         
     Returns:
         Dictionary containing raw OCR data
@@ -82,16 +348,7 @@ def get_raw_json(user_nic: str, file_id: str) -> dict:
     Raises:
         FileNotFoundError: If the JSON doesn't exist
     """
-    bucket = get_bucket(BUCKET_NAME)
-    path = f"users/{user_nic}/processed/{file_id}.json"
-    
-    blob = bucket.blob(path)
-    
-    if not blob.exists():
-        raise FileNotFoundError(f"Report not found: {file_id}")
-    
-    json_string = blob.download_as_string()
-    return json.loads(json_string)
+    return project_document(orjson.loads(get_raw_json_object(user_nic, file_id)["content"]), fields)
 
 
 def list_user_reports(user_nic: str) -> list:
@@ -107,7 +364,8 @@ def list_user_reports(user_nic: str) -> list:
     bucket = get_bucket(BUCKET_NAME)
     prefix = f"users/{user_nic}/processed/"
     
-    blobs = bucket.list_blobs(prefix=prefix)
+    with track_external_call("gcs", "list"):
+        blobs = list(bucket.list_blobs(prefix=prefix))
     
     reports = []
     seen_file_ids = set()
@@ -0,0 +1,26 @@
+"""
+Whether a stored biomarker is outside its normal range.
+"""
+
+from typing import Optional
+
+# Flags the normalizers write for in-range values (None when no flag was printed)
+NORMAL_FLAGS = ("", "normal", "null")
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_abnormal(biomarker: dict) -> bool:
+    """Flagged High/Low by the normalizer, or outside its reference range."""
+    if str(biomarker.get("flag") or "").strip().lower() not in NORMAL_FLAGS:
+        return True
+    value = _number(biomarker.get("value"))
+    if value is None:
+        return False
+    ref_min, ref_max = _number(biomarker.get("ref_min")), _number(biomarker.get("ref_max"))
+    return (ref_min is not None and value < ref_min) or (ref_max is not None and value > ref_max)
@@ -0,0 +1,81 @@
+"""
+Precomputed lookups over the mappings in app/config/biomarker_config.py.
+
+The normalizers used to rescan a mapping, upper- or lower-casing every key,
+for each table cell. The matchers build the case-folded indexes once per
+process (preloaded during worker warm-up). Lookup order and results are
+unchanged: exact key, then case-insensitive key, then (for names) the first
+key that contains, or is contained in, the name.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.config.biomarker_config import (
+    BIOMARKER_NAME_MAPPING,
+    LIPID_PROFILE_BIOMARKER_MAPPING,
+    FBS_BIOMARKER_MAPPING,
+    UNIT_MAPPING,
+)
+
+NAME_MAPPINGS: Dict[str, Dict[str, str]] = {
+    "fbc": BIOMARKER_NAME_MAPPING,
+    "lipid": LIPID_PROFILE_BIOMARKER_MAPPING,
+    "fbs": FBS_BIOMARKER_MAPPING,
+}
+
+
+class NameMatcher:
+    """Lab test name -> standard biomarker name."""
+
+    def __init__(self, mapping: Dict[str, str]):
+        self._exact = dict(mapping)
+        self._folded: Dict[str, str] = {}
+        for key, value in mapping.items():
+            self._folded.setdefault(key.upper(), value)
+        self._partial = [(key.upper(), value) for key, value in mapping.items()]
+
+    def match(self, clean_name: str) -> Optional[str]:
+        """Look up an upper-cased, stripped test name; None if nothing matches."""
+        if clean_name in self._exact:
+            return self._exact[clean_name]
+        if clean_name in self._folded:
+            return self._folded[clean_name]
+        # Partial match (for merged cells)
+        for key, value in self._partial:
+            if key in clean_name or clean_name in key:
+                return value
+        return None
+
+
+class UnitMatcher:
+    """Raw unit string -> normalized unit."""
+
+    def __init__(self, mapping: Dict[str, str]):
+        self._exact = dict(mapping)
+        self._folded: Dict[str, str] = {}
+        for key, value in mapping.items():
+            self._folded.setdefault(key.lower(), value)
+
+    def match(self, cleaned: str) -> Optional[str]:
+        """Look up a noise-stripped unit; None if it is not in the mapping."""
+        if cleaned in self._exact:
+            return self._exact[cleaned]
+        return self._folded.get(cleaned.lower())
+
+
+@lru_cache(maxsize=None)
+def name_matcher(report_type: str) -> NameMatcher:
+    """Matcher for "fbc", "lipid" or "fbs" biomarker names."""
+    return NameMatcher(NAME_MAPPINGS[report_type])
+
+
+@lru_cache(maxsize=None)
+def unit_matcher() -> UnitMatcher:
+    return UnitMatcher(UNIT_MAPPING)
+
+
+def preload_matchers() -> None:
+    for report_type in NAME_MAPPINGS:
+        name_matcher(report_type)
+    unit_matcher()
@@ -0,0 +1,174 @@
+# app/utils/fhir.py
+"""
+Healix rows as FHIR R4 resources.
+
+- patients -> Patient (gender and birthDate from the NIC, app/utils/nic.py)
+- reports -> DiagnosticReport, their biomarkers -> laboratory Observation
+- health_metrics -> vital-signs Observation
+- medications -> MedicationStatement
+
+Codes are sent as text only: report types and biomarker names are not mapped
+to LOINC. Resource ids are the row ids, so references between resources
+(Observation/{biomarker id}, Patient/{patient id}) resolve within an export.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from app.core.config import FHIR_NIC_SYSTEM
+from app.utils.nic import parse_nic
+
+INTERPRETATION_SYSTEM = "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation"
+OBSERVATION_CATEGORY_SYSTEM = "http://terminology.hl7.org/CodeSystem/observation-category"
+DIAGNOSTIC_SERVICE_SYSTEM = "http://terminology.hl7.org/CodeSystem/v2-0074"
+UCUM = "http://unitsofmeasure.org"
+
+# Normalizer and health metric flags -> v3 ObservationInterpretation
+INTERPRETATIONS = {
+    "very low": ("LL", "Critical low"),
+    "critical low": ("LL", "Critical low"),
+    "low": ("L", "Low"),
+    "normal": ("N", "Normal"),
+    "null": ("N", "Normal"),
+    "high": ("H", "High"),
+    "very high": ("HH", "Critical high"),
+    "critical high": ("HH", "Critical high"),
+}
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _datetime(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value or None
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def _drop_empty(resource: dict) -> dict:
+    """FHIR does not allow empty or null elements."""
+    return {key: value for key, value in resource.items() if value not in (None, "", [], {})}
+
+
+def _quantity(value, unit: Optional[str]) -> Optional[dict]:
+    number = _number(value)
+    if number is None:
+        return None
+    return _drop_empty({"value": number, "unit": unit})
+
+
+def _concept(text: Optional[str]) -> dict:
+    return {"text": text or "Unknown"}
+
+
+def interpretation(flag: Optional[str], value=None, ref_min=None, ref_max=None) -> Optional[list]:
+    """From the flag, or from the value and reference range when there is no flag."""
+    code = INTERPRETATIONS.get(str(flag or "").strip().lower())
+    if code is None:
+        number, low, high = _number(value), _number(ref_min), _number(ref_max)
+        if number is None or (low is None and high is None):
+            return None
+        if low is not None and number < low:
+            code = INTERPRETATIONS["low"]
+        elif high is not None and number > high:
+            code = INTERPRETATIONS["high"]
+        else:
+            code = INTERPRETATIONS["normal"]
+    return [{"coding": [{"system": INTERPRETATION_SYSTEM, "code": code[0], "display": code[1]}]}]
+
+
+def patient_resource(patient: dict) -> dict:
+    person = parse_nic(patient.get("nic")) or {}
+    telecom = [{"system": "email", "value": patient["email"]}] if patient.get("email") else []
+    if patient.get("phone"):
+        telecom.append({"system": "phone", "value": patient["phone"]})
+    return _drop_empty({
+        "resourceType": "Patient",
+        "id": str(patient["id"]),
+        "identifier": [{"system": FHIR_NIC_SYSTEM, "value": patient["nic"]}] if patient.get("nic") else None,
+        "name": [{"text": patient["full_name"]}] if patient.get("full_name") else None,
+        "telecom": telecom,
+        "gender": {"F": "female", "M": "male"}.get(person.get("sex")),
+        "birthDate": person["birth_date"].isoformat() if person.get("birth_date") else None,
+    })
+
+
+def diagnostic_report(report: dict, biomarker_ids: Iterable[str]) -> dict:
+    return _drop_empty({
+        "resourceType": "DiagnosticReport",
+        "id": str(report["id"]),
+        "status": "final",
+        "category": [{"coding": [{"system": DIAGNOSTIC_SERVICE_SYSTEM, "code": "LAB", "display": "Laboratory"}]}],
+        "code": _concept(report.get("report_type")),
+        "subject": {"reference": f"Patient/{report['patient_id']}"},
+        "effectiveDateTime": _datetime(report.get("sample_collected_at")),
+        "issued": _datetime(report.get("created_at")),
+        "identifier": [{"value": report["file_id"]}] if report.get("file_id") else None,
+        "result": [{"reference": f"Observation/{biomarker_id}"} for biomarker_id in biomarker_ids],
+    })
+
+
+def biomarker_observation(biomarker: dict, report: dict) -> dict:
+    reference_range = _drop_empty({
+        "low": _quantity(biomarker.get("ref_min"), biomarker.get("unit")),
+        "high": _quantity(biomarker.get("ref_max"), biomarker.get("unit")),
+    })
+    return _drop_empty({
+        "resourceType": "Observation",
+        "id": str(biomarker["id"]),
+        "status": "final",
+        "category": [{"coding": [{"system": OBSERVATION_CATEGORY_SYSTEM, "code": "laboratory"}]}],
+        "code": _concept(biomarker.get("name")),
+        "subject": {"reference": f"Patient/{report['patient_id']}"},
+        "effectiveDateTime": _datetime(report.get("sample_collected_at") or report.get("created_at")),
+        "valueQuantity": _quantity(biomarker.get("value"), biomarker.get("unit")),
+        "interpretation": interpretation(biomarker.get("flag"), biomarker.get("value"),
+                                         biomarker.get("ref_min"), biomarker.get("ref_max")),
+        "referenceRange": [reference_range] if reference_range else None,
+        "derivedFrom": [{"reference": f"DiagnosticReport/{report['id']}"}],
+    })
+
+
+def metric_observation(metric: dict) -> dict:
+    return _drop_empty({
+        "resourceType": "Observation",
+        "id": str(metric["id"]),
+        "status": "final",
+        "category": [{"coding": [{"system": OBSERVATION_CATEGORY_SYSTEM, "code": "vital-signs"}]}],
+        "code": _concept(metric.get("metric_name")),
+        "subject": {"reference": f"Patient/{metric['user_id']}"},
+        "effectiveDateTime": _datetime(metric.get("recorded_at") or metric.get("created_at")),
+        "valueQuantity": _quantity(metric.get("value"), metric.get("unit")),
+        "interpretation": interpretation(metric.get("flag")),
+        "bodySite": _concept(metric["anatomy_category"].lower())
+        if metric.get("anatomy_category") not in (None, "GENERAL") else None,
+    })
+
+
+def medication_statement(medication: dict) -> dict:
+    dosage = _drop_empty({
+        "text": medication.get("instructions"),
+        "timing": {"repeat": {"frequency": medication["frequency_per_day"], "period": 1, "periodUnit": "d"}}
+        if medication.get("frequency_per_day") else None,
+        "doseAndRate": [{"doseQuantity": {"value": medication["dosage_mg"], "unit": "mg", "system": UCUM, "code": "mg"}}]
+        if medication.get("dosage_mg") else None,
+    })
+    return _drop_empty({
+        "resourceType": "MedicationStatement",
+        "id": str(medication["id"]),
+        "status": "active",
+        "medicationCodeableConcept": _concept(medication.get("name")),
+        "subject": {"reference": f"Patient/{medication['patient_id']}"},
+        "dateAsserted": _datetime(medication.get("created_at")),
+        "dosage": [dosage] if dosage else None,
+    })
+
+
+def operation_outcome(message: str) -> dict:
+    return {"resourceType": "OperationOutcome",
+            "issue": [{"severity": "error", "code": "exception", "diagnostics": message}]}
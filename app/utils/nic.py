@@ -0,0 +1,42 @@
+# app/utils/nic.py
+"""
+Birth date and sex from a Sri Lankan National Identity Card number.
+
+- Old format: 9 digits and V/X, e.g. 853400937V (born 1985)
+- New format: 12 digits, e.g. 198534000937 (born 1985)
+
+After the year come three digits for the day of the year, plus 500 for women.
+Days are counted as if every year were a leap year (1 March is always day 61).
+"""
+import re
+from datetime import date, timedelta
+from typing import Optional
+
+OLD_NIC = re.compile(r"^(\d{2})(\d{3})\d{4}[VvXx]$")
+NEW_NIC = re.compile(r"^(\d{4})(\d{3})\d{5}$")
+
+
+def parse_nic(nic: Optional[str]) -> Optional[dict]:
+    """
+    Returns:
+        {"birth_date": date, "sex": "F" | "M"}, or None if nic is not a valid NIC
+    """
+    nic = (nic or "").strip()
+    match = OLD_NIC.match(nic) or NEW_NIC.match(nic)
+    if not match:
+        return None
+    year = int(match.group(1)) + (1900 if len(match.group(1)) == 2 else 0)
+    day = int(match.group(2))
+    sex = "F" if day > 500 else "M"
+    day -= 500 if day > 500 else 0
+    if not 1 <= day <= 366:
+        return None
+
+    leap_day = date(2000, 1, 1) + timedelta(days=day - 1)
+    if leap_day.month == 2 and leap_day.day == 29 and not _is_leap(year):
+        return None
+    return {"birth_date": date(year, leap_day.month, leap_day.day), "sex": sex}
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
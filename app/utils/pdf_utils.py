@@ -0,0 +1,43 @@
+"""
+Page-level PDF helpers (PyMuPDF).
+"""
+
+from typing import List, Tuple
+
+
+def _open(pdf_bytes: bytes):
+    import fitz  # PyMuPDF
+
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    with _open(pdf_bytes) as pdf:
+        return pdf.page_count
+
+
+def page_ranges(page_count: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """Split 1..page_count into consecutive inclusive (first, last) ranges of at most shard_pages."""
+    shard_pages = max(1, shard_pages)
+    return [(first, min(first + shard_pages - 1, page_count)) for first in range(1, page_count + 1, shard_pages)]
+
+
+def build_page_subset(pdf_bytes: bytes, page_numbers: List[int]) -> bytes:
+    """Build a PDF containing only the given 1-based page numbers."""
+    with _open(pdf_bytes) as source:
+        source.select([number - 1 for number in page_numbers])
+        return source.tobytes(garbage=3, deflate=True)
+
+
+def split_pdf(pdf_bytes: bytes, shard_pages: int) -> List[Tuple[Tuple[int, int], bytes]]:
+    """
+    Split a PDF into shards of at most shard_pages pages.
+
+    Returns:
+        [((first_page, last_page), shard_bytes), ...] in page order
+    """
+    ranges = page_ranges(count_pages(pdf_bytes), shard_pages)
+    return [
+        ((first, last), build_page_subset(pdf_bytes, list(range(first, last + 1))))
+        for first, last in ranges
+    ]
@@ -0,0 +1,156 @@
+"""
+Sparse fieldsets for read APIs.
+
+`fields=` picks columns and `include=` embeds related resources, e.g.
+
+    GET /report/id/{id}?fields=id,report_type,biomarkers.name,biomarkers.value&include=biomarkers
+
+becomes the PostgREST select list "id,report_type,biomarkers(name,value)", so
+only those columns leave the database. Columns are checked against a per-table
+allowlist (which also keeps password_hash out of patient selects).
+
+The same dotted paths project JSON documents loaded from Cloud Storage
+(project_document), mapping over lists: fields=biomarkers.name,biomarkers.value
+on a normalized report keeps just the name and value of each biomarker.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+# Selectable columns per table
+COLUMNS: Dict[str, tuple] = {
+    "patients": ("id", "full_name", "email", "phone", "nic", "created_at"),
+    "reports": ("id", "patient_id", "file_id", "report_type", "sample_collected_at", "gcs_path", "created_at", "updated_at"),
+    "biomarkers": ("id", "report_id", "name", "value", "unit", "ref_min", "ref_max", "flag"),
+    "medications": ("id", "patient_id", "name", "dosage_mg", "frequency_per_day", "instructions", "created_at"),
+    "care_circle_members": ("id", "patient_id", "name", "email", "created_at"),
+    "patient_latest_biomarkers": ("patient_id", "name", "value", "unit", "ref_min", "ref_max", "flag",
+                                  "sample_collected_at", "report_id", "report_created_at", "updated_at"),
+}
+
+# include= name -> embedded table, per table (foreign keys: *.patient_id -> patients, biomarkers.report_id -> reports)
+RELATIONS: Dict[str, Dict[str, str]] = {
+    "patients": {"reports": "reports", "medications": "medications", "care_circle_members": "care_circle_members"},
+    "reports": {"biomarkers": "biomarkers", "patient": "patients"},
+    "biomarkers": {"report": "reports"},
+    "medications": {"patient": "patients"},
+    "care_circle_members": {"patient": "patients"},
+    "patient_latest_biomarkers": {"report": "reports"},
+}
+
+
+# Tables whose rows must never be selected whole
+RESTRICTED = {"patients"}
+
+
+class ProjectionError(ValueError):
+    """Unknown field or relation in fields=/include=."""
+
+
+def default_columns(table: str) -> str:
+    """Select list when no fields are given: "*", or the allowlist for restricted tables."""
+    return ",".join(COLUMNS[table]) if table in RESTRICTED else "*"
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter, dropping blanks and duplicates (order kept)."""
+    if not value:
+        return []
+    seen = []
+    for item in value.split(","):
+        item = item.strip()
+        if item and item not in seen:
+            seen.append(item)
+    return seen
+
+
+def _columns(table: str, names: Iterable[str]) -> List[str]:
+    allowed = COLUMNS[table]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ProjectionError(f"Unknown field(s) for {table}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return list(names)
+
+
+def select_list(table: str, fields: Optional[str] = None, include: Optional[str] = None) -> str:
+    """
+    Build a PostgREST select list from fields=/include= query parameters.
+
+    Args:
+        table: Table being queried (a key of COLUMNS)
+        fields: Comma-separated columns; "relation.column" picks columns of an included relation
+        include: Comma-separated relations to embed (keys of RELATIONS[table])
+
+    Returns:
+        Select string, e.g. "id,report_type,biomarkers(name,value)". Without
+        fields, the table's default_columns() are selected.
+
+    Raises:
+        ProjectionError: On unknown columns or relations
+    """
+    requested = parse_list(fields)
+    own = [name for name in requested if "." not in name]
+    nested: Dict[str, List[str]] = {}
+    for name in requested:
+        if "." in name:
+            relation, _, column = name.partition(".")
+            nested.setdefault(relation, []).append(column)
+
+    relations = RELATIONS.get(table, {})
+    included = parse_list(include)
+    for relation in list(included) + list(nested):
+        if relation not in relations:
+            allowed = ", ".join(relations) or "none"
+            raise ProjectionError(f"Unknown relation for {table}: {relation}. Allowed: {allowed}")
+    not_included = [relation for relation in nested if relation not in included]
+    if not_included:
+        raise ProjectionError(f"Fields given for relation(s) not in include=: {', '.join(not_included)}")
+
+    if own:
+        parts = _columns(table, own)
+    elif requested:
+        parts = []  # only relation fields were asked for
+    else:
+        parts = [default_columns(table)]
+    for relation in included:
+        target = relations[relation]
+        columns = ",".join(_columns(target, nested[relation])) if relation in nested else default_columns(target)
+        embed = f"{target}({columns})"
+        parts.append(embed if relation == target else f"{relation}:{embed}")
+    return ",".join(parts)
+
+
+def _tree(paths: Iterable[str]) -> Dict[str, Any]:
+    """["a.b", "a.c", "d"] -> {"a": {"b": {}, "c": {}}, "d": {}}; an empty dict means the whole value."""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for index, part in enumerate(parts):
+            if part in node and not node[part]:
+                break  # an ancestor was already requested whole
+            child = node.setdefault(part, {})
+            if index == len(parts) - 1:
+                child.clear()
+            node = child
+    return tree
+
+
+def _apply(value: Any, tree: Dict[str, Any]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_apply(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _apply(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def project_document(document: Any, fields: Optional[str]) -> Any:
+    """
+    Keep only the dotted paths in fields (comma-separated) of a JSON document.
+    Lists are projected element-wise; paths that do not exist are skipped.
+    """
+    paths = parse_list(fields)
+    if not paths:
+        return document
+    return _apply(document, _tree(paths))
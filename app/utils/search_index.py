@@ -0,0 +1,171 @@
+# app/utils/search_index.py
+"""
+In-memory inverted index: the local stand-in for the Postgres full-text search
+in migrations/006_report_search.sql, for development and tests.
+
+Tokens are lowercased runs of letters and digits, like the 'simple' text search
+configuration (no stemming, so "HbA1c" matches "hba1c" but not "hba"). Queries
+follow the same web search syntax as websearch_to_tsquery, minus "or": words
+are ANDed, "quoted phrases" must appear in order and -word excludes. Results
+are ranked with BM25 and carry a snippet with matches wrapped in <mark>.
+"""
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+QUERY_RE = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SNIPPET_WORDS = 20
+MARK_START = "<mark>"
+MARK_STOP = "</mark>"
+
+
+def tokenize(text: str) -> List[str]:
+    return [match.group(0).lower() for match in TOKEN_RE.finditer(text or "")]
+
+
+def parse_query(query: str) -> Tuple[List[List[str]], List[str]]:
+    """
+    Split a query into required phrases (single words are one-token phrases)
+    and excluded tokens.
+    """
+    required: List[List[str]] = []
+    excluded: List[str] = []
+    for match in QUERY_RE.finditer(query or ""):
+        negated = bool(match.group(1) or match.group(3))
+        tokens = tokenize(match.group(2) if match.group(2) is not None else match.group(4))
+        if not tokens:
+            continue
+        if negated:
+            excluded.extend(tokens)
+        else:
+            required.append(tokens)
+    return required, excluded
+
+
+class InvertedIndex:
+    """Thread-safe inverted index of documents keyed by id, each with text and metadata."""
+
+    def __init__(self):
+        # token -> {doc_id: [positions in the text]}
+        self._postings: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        self._meta: Dict[str, dict] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, doc_id: str, text: str, meta: Optional[dict] = None) -> None:
+        """Index (or re-index) a document."""
+        tokens = tokenize(text)
+        with self._lock:
+            self.remove(doc_id)
+            for position, token in enumerate(tokens):
+                self._postings[token].setdefault(doc_id, []).append(position)
+            self._lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+            self._texts[doc_id] = text or ""
+            self._meta[doc_id] = dict(meta or {})
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            if doc_id not in self._texts:
+                return
+            for token in set(tokenize(self._texts[doc_id])):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[token]
+            self._total_length -= self._lengths.pop(doc_id)
+            del self._texts[doc_id], self._meta[doc_id]
+
+    def _phrase_positions(self, phrase: List[str], doc_id: str) -> List[int]:
+        """Start positions of the phrase in the document."""
+        starts = self._postings.get(phrase[0], {}).get(doc_id, [])
+        for offset, token in enumerate(phrase[1:], start=1):
+            positions = set(self._postings.get(token, {}).get(doc_id, []))
+            starts = [start for start in starts if start + offset in positions]
+        return starts
+
+    def _candidates(self, phrase: List[str]) -> set:
+        """Documents containing the phrase."""
+        smallest = min((self._postings.get(token, {}) for token in phrase), key=len)
+        return {doc_id for doc_id in smallest if self._phrase_positions(phrase, doc_id)}
+
+    def _score(self, doc_id: str, phrases: List[List[str]]) -> float:
+        docs = len(self._texts)
+        average = self._total_length / docs if docs else 0
+        length_norm = 1 - B + B * (self._lengths[doc_id] / average if average else 0)
+        score = 0.0
+        for phrase in phrases:
+            for token in phrase:
+                postings = self._postings.get(token, {})
+                idf = math.log(1 + (docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                tf = len(postings.get(doc_id, []))
+                score += idf * tf * (K1 + 1) / (tf + K1 * length_norm)
+        return score
+
+    def snippet(self, doc_id: str, tokens: set, words: int = SNIPPET_WORDS) -> str:
+        """About `words` words of text around the first match, matches wrapped in <mark>."""
+        text = self._texts[doc_id]
+        spans = [(m.start(), m.end(), m.group(0).lower() in tokens) for m in TOKEN_RE.finditer(text)]
+        if not spans:
+            return ""
+        first = next((i for i, span in enumerate(spans) if span[2]), 0)
+        start = max(0, first - words // 4)
+        end = min(len(spans), start + words)
+        parts = []
+        cursor = spans[start][0] if start > 0 else 0
+        for begin, stop, matched in spans[start:end]:
+            parts.append(text[cursor:begin])
+            parts.append(f"{MARK_START}{text[begin:stop]}{MARK_STOP}" if matched else text[begin:stop])
+            cursor = stop
+        if end == len(spans):
+            parts.append(text[cursor:])
+        snippet = " ".join("".join(parts).split())
+        return ("… " if start > 0 else "") + snippet + (" …" if end < len(spans) else "")
+
+    def search(self, query: str, filters: Optional[dict] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+        """
+        Matching documents, best first: {**meta, "rank", "snippet"}.
+
+        Args:
+            query: Web search style query (see module docstring)
+            filters: Metadata values a document must have (e.g. {"patient_id": ...})
+        """
+        required, excluded = parse_query(query)
+        if not required:
+            return []
+        with self._lock:
+            matched = None
+            for phrase in sorted(required, key=lambda p: min(len(self._postings.get(t, {})) for t in p)):
+                found = self._candidates(phrase)
+                matched = found if matched is None else matched & found
+                if not matched:
+                    return []
+            for token in excluded:
+                matched -= set(self._postings.get(token, {}))
+            for key, value in (filters or {}).items():
+                matched = {doc_id for doc_id in matched if str(self._meta[doc_id].get(key)) == str(value)}
+
+            ranked = [(self._score(doc_id, required), doc_id) for doc_id in matched]
+            # Best first; newest first among equal ranks (two stable sorts)
+            ranked.sort(key=lambda item: str(self._meta[item[1]].get("sample_collected_at") or ""), reverse=True)
+            ranked.sort(key=lambda item: -item[0])
+
+            tokens = {token for phrase in required for token in phrase}
+            return [
+                {**self._meta[doc_id], "rank": round(score, 6), "snippet": self.snippet(doc_id, tokens)}
+                for score, doc_id in ranked[offset:offset + limit]
+            ]
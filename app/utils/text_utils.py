@@ -1,32 +1,107 @@
+"""
+Table and entity extraction from Document AI responses.
+
+Works on the underlying protobuf message rather than the proto-plus wrapper:
+every attribute access on a proto-plus object builds a new wrapper, which
+dominates extraction time on large multi-page reports. The document text is
+read once and cell text is sliced from it using the segment offsets.
+"""
+
+import sys
+from typing import Iterator, List
+
+
+def _raw(message):
+    """Return the raw protobuf for a proto-plus message (or the message itself if already raw)."""
+    # proto-plus is not imported here (it is slow to import); if it has not been
+    # loaded yet, no proto-plus message can exist
+    proto = sys.modules.get("proto")
+    if proto is not None and isinstance(message, proto.Message):
+        return type(message).pb(message)
+    return message
+
+
+def _anchor_text(anchor, document_text: str) -> str:
+    segments = anchor.text_segments
+    if len(segments) == 1:
+        segment = segments[0]
+        return document_text[segment.start_index:segment.end_index].strip()
+    return "".join(document_text[s.start_index:s.end_index] for s in segments).strip()
+
+
 def get_text(doc_element, document_text):
     """Slices the document text based on the text_anchor in the element."""
-    text = ""
-    for segment in doc_element.text_anchor.text_segments:
-        start_index = int(segment.start_index) if segment.start_index else 0
-        end_index = int(segment.end_index)
-        text += document_text[start_index:end_index]
-    return text.strip()
-
-def extract_tables(document):
-    tables = []
-    for page in document.pages:
+    return _anchor_text(_raw(doc_element).text_anchor, document_text)
+
+
+def _rows(rows, document_text: str) -> List[List[str]]:
+    return [
+        [_anchor_text(cell.layout.text_anchor, document_text) for cell in row.cells]
+        for row in rows
+    ]
+
+
+def _table(table, document_text: str, include_headers: bool) -> List[List[str]]:
+    rows = _rows(table.body_rows, document_text)
+    if include_headers:
+        rows = _rows(table.header_rows, document_text) + rows
+    return rows
+
+
+def iter_tables(document, include_headers: bool = False) -> Iterator[List[List[str]]]:
+    """
+    Lazily yield tables as lists of rows of cell text, page by page.
+
+    Args:
+        document: Document AI document (proto-plus or raw protobuf)
+        include_headers: Prepend each table's header rows to its body rows
+
+    Yields:
+        One table at a time as [[cell, ...], ...]
+    """
+    pb = _raw(document)
+    text = pb.text
+    for page in pb.pages:
         for table in page.tables:
-            rows = []
-            for row in table.body_rows:
-                cells = []
-                for cell in row.cells:
-                    cells.append(get_text(cell.layout, document.text))
-                rows.append(cells)
-            tables.append(rows)
-    return tables
+            yield _table(table, text, include_headers)
+
+
+def extract_tables(document, include_headers: bool = False) -> List[List[List[str]]]:
+    """
+    Extract all tables in the document.
+
+    Body rows only by default, which is what the normalizers expect; pass
+    include_headers=True to also get the header rows of each table.
+    """
+    return list(iter_tables(document, include_headers=include_headers))
+
+
+def extract_pages(document, include_headers: bool = False) -> List[dict]:
+    """
+    Split the document into per-page text and tables.
+
+    Returns:
+        [{"text": page text, "tables": [[cell, ...], ...]}, ...] in page order
+    """
+    pb = _raw(document)
+    text = pb.text
+    pages = []
+    for page in pb.pages:
+        pages.append({
+            "text": _anchor_text(page.layout.text_anchor, text),
+            "tables": [_table(table, text, include_headers) for table in page.tables],
+        })
+    return pages
 
 
 def extract_entities(document):
+    pb = _raw(document)
+    text = pb.text
     return [
         {
             "type": entity.type_,
-            "value": entity.mention_text if entity.mention_text else get_text(entity, document.text),
+            "value": entity.mention_text if entity.mention_text else _anchor_text(entity.text_anchor, text),
             "confidence": entity.confidence
         }
-        for entity in document.entities
+        for entity in pb.entities
     ]
@@ -0,0 +1,236 @@
+# app/utils/units.py
+"""
+Unit conversion for biomarkers and health metrics, using the per-analyte
+factor table UNIT_CONVERSIONS in app/config/biomarker_config.py.
+
+Every analyte in the table has a canonical unit (the first one listed).
+Normalization and health metric writes convert values into it, so stored
+values, reference ranges and metric thresholds share one unit per analyte.
+Query paths convert rows into the display units a request asks for (?units=),
+a whole column of values per (analyte, unit) group at once with numpy.
+Analytes and units that are not in the table pass through unchanged.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config.biomarker_config import UNIT_CONVERSIONS
+from app.utils.biomarker_matching import unit_matcher
+
+# Value columns converted along with the unit
+VALUE_FIELDS = ("value", "ref_min", "ref_max")
+DECIMALS = 4
+ALL_ANALYTES = "*"
+
+_FOLDED = {name.casefold(): table for name, table in UNIT_CONVERSIONS.items()}
+
+
+class UnitConversionError(ValueError):
+    """A value cannot be converted between the given units."""
+
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """Canonical spelling of a unit (mg/dl -> mg/dL); unknown units are returned stripped."""
+    if unit is None:
+        return None
+    cleaned = str(unit).strip()
+    return unit_matcher().match(cleaned) or cleaned
+
+
+def _table(analyte: Optional[str]) -> Optional[dict]:
+    if not analyte:
+        return None
+    return UNIT_CONVERSIONS.get(analyte) or _FOLDED.get(analyte.casefold())
+
+
+def canonical_unit(analyte: Optional[str]) -> Optional[str]:
+    """The unit an analyte is stored in, or None if it has no conversions."""
+    table = _table(analyte)
+    return next(iter(table)) if table else None
+
+
+def _linear(analyte: str, unit: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(scale, offset) from unit to the canonical unit."""
+    factor = (_table(analyte) or {}).get(normalize_unit(unit))
+    if factor is None:
+        return None
+    return factor if isinstance(factor, tuple) else (factor, 0.0)
+
+
+def can_convert(analyte: str, from_unit: Optional[str], to_unit: Optional[str]) -> bool:
+    return normalize_unit(from_unit) == normalize_unit(to_unit) or (
+        _linear(analyte, from_unit) is not None and _linear(analyte, to_unit) is not None
+    )
+
+
+def convert(values, analyte: str, from_unit: Optional[str], to_unit: Optional[str]) -> np.ndarray:
+    """
+    Convert an array of values (None becomes NaN) of one analyte between units.
+
+    Raises:
+        UnitConversionError: If either unit is not listed for the analyte
+    """
+    array = np.asarray(values, dtype=float)
+    if normalize_unit(from_unit) == normalize_unit(to_unit):
+        return array
+    source, target = _linear(analyte, from_unit), _linear(analyte, to_unit)
+    if source is None or target is None:
+        raise UnitConversionError(f"Cannot convert {analyte} from {from_unit} to {to_unit}")
+    return (array * source[0] + source[1] - target[1]) / target[0]
+
+
+def convert_value(value: Optional[float], analyte: str, from_unit: Optional[str], to_unit: Optional[str]) -> Optional[float]:
+    """Scalar convert(), rounded to DECIMALS."""
+    if value is None:
+        return None
+    return round(float(convert([value], analyte, from_unit, to_unit)[0]), DECIMALS)
+
+
+def _as_list(values: np.ndarray) -> List[Optional[float]]:
+    rounded = np.round(values, DECIMALS)
+    return [None if np.isnan(v) else float(v) for v in rounded]
+
+
+def to_canonical(analyte: str, values: Sequence, units: Sequence[Optional[str]]) -> Tuple[List[Optional[float]], List[Optional[str]]]:
+    """
+    Values of one analyte, each with its own unit, in the canonical unit.
+    Values whose unit is not convertible keep their value and unit.
+    """
+    canonical = canonical_unit(analyte)
+    spellings = {unit: normalize_unit(unit) for unit in set(units)}
+    array = np.asarray(values, dtype=float)
+    spelled = np.array([spellings[unit] for unit in units], dtype=object)
+    out = array.copy()
+    out_units = list(spelled)
+    if canonical is not None:
+        for unit in set(spellings.values()):
+            if unit == canonical or _linear(analyte, unit) is None:
+                continue
+            mask = spelled == unit
+            out[mask] = convert(array[mask], analyte, unit, canonical)
+            for index in np.flatnonzero(mask):
+                out_units[index] = canonical
+    return _as_list(out), out_units
+
+
+def _scaled(value, factor: Tuple[float, float]) -> Optional[float]:
+    if value is None:
+        return None
+    return round(float(value) * factor[0] + factor[1], DECIMALS)
+
+
+def canonicalize_biomarkers(biomarkers: List[dict]) -> List[dict]:
+    """
+    Normalized biomarkers ({name, value, unit, ref_range}) in their canonical
+    units. Converted entries keep what the lab printed under "reported".
+
+    A report has a few dozen rows per analyte at most, almost always already in
+    the canonical unit, so each distinct unit is looked up once per analyte and
+    only rows in another convertible unit are touched.
+    """
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for biomarker in biomarkers:
+        groups[biomarker.get("name")].append(biomarker)
+
+    for name, rows in groups.items():
+        canonical = canonical_unit(name)
+        if canonical is None:
+            continue
+        # reported unit -> (scale, offset) into the canonical unit, for the units that need converting
+        factors = {}
+        for unit in {row.get("unit") for row in rows}:
+            if normalize_unit(unit) != canonical:
+                factor = _linear(name, unit)
+                if factor is not None:
+                    factors[unit] = factor
+        if not factors:
+            continue
+
+        for row in rows:
+            factor = factors.get(row.get("unit"))
+            if factor is None:
+                continue
+            ref_range = row.get("ref_range")
+            row["reported"] = {"value": row.get("value"), "unit": row.get("unit"), "ref_range": ref_range}
+            row["value"] = _scaled(row.get("value"), factor)
+            row["unit"] = canonical
+            if isinstance(ref_range, list) and len(ref_range) >= 2 and ref_range[:2] != [None, None]:
+                row["ref_range"] = [_scaled(ref_range[0], factor), _scaled(ref_range[1], factor)]
+    return biomarkers
+
+
+# ===== DISPLAY UNITS =====
+
+def parse_display_units(spec: Optional[str]) -> Dict[str, str]:
+    """
+    Parse ?units=: comma-separated "Analyte:unit" pairs and/or bare units that
+    apply to every analyte that has them, e.g. "mmol/L,Hemoglobin:g/L".
+
+    Raises:
+        UnitConversionError: For an unknown analyte or a unit it cannot be shown in
+    """
+    display: Dict[str, str] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        analyte, _, unit = part.rpartition(":")
+        unit = normalize_unit(unit)
+        if not analyte:
+            if not any(unit in table for table in UNIT_CONVERSIONS.values()):
+                raise UnitConversionError(f"Unknown unit: {unit}")
+            display[ALL_ANALYTES] = unit
+            continue
+        table = _table(analyte.strip())
+        if table is None:
+            raise UnitConversionError(f"No unit conversions for {analyte.strip()}")
+        if unit not in table:
+            raise UnitConversionError(f"{analyte.strip()} cannot be shown in {unit} (use one of: {', '.join(table)})")
+        display[analyte.strip().casefold()] = unit
+    return display
+
+
+def display_key(display: Optional[Dict[str, str]]) -> str:
+    """A stable string for parsed display units (part of HTTP cache validators)."""
+    return ",".join(f"{analyte}:{unit}" for analyte, unit in sorted((display or {}).items()))
+
+
+def display_unit(analyte: Optional[str], display: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """The unit to show an analyte in: asked for by name, else the bare unit if it applies, else canonical."""
+    table = _table(analyte)
+    if table is None:
+        return None
+    display = display or {}
+    wanted = display.get(analyte.casefold())
+    if wanted is None and display.get(ALL_ANALYTES) in table:
+        wanted = display[ALL_ANALYTES]
+    return wanted or next(iter(table))
+
+
+def convert_rows(rows: Iterable[dict], display: Optional[Dict[str, str]] = None, name_field: str = "name",
+                 fields: Sequence[str] = VALUE_FIELDS) -> List[dict]:
+    """
+    Copies of rows (with name, unit and value columns) in each analyte's display
+    unit. Rows without a name or unit column (?fields= projections) or in a
+    unit the analyte has no conversion for are returned as they are.
+    """
+    rows = [dict(row) for row in rows]
+    groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for index, row in enumerate(rows):
+        if row.get(name_field) and row.get("unit"):
+            groups[(row[name_field], normalize_unit(row["unit"]))].append(index)
+
+    for (name, unit), indexes in groups.items():
+        target = display_unit(name, display)
+        if target is None or target == unit or not can_convert(name, unit, target):
+            continue
+        for field in fields:
+            if field not in rows[indexes[0]]:
+                continue
+            values = _as_list(convert([rows[i].get(field) for i in indexes], name, unit, target))
+            for i, value in zip(indexes, values):
+                rows[i][field] = value
+        for i in indexes:
+            rows[i]["unit"] = target
+    return rows
@@ -1,58 +1,107 @@
-from app.services.ocr_service import process_with_document_ai
-from app.services.upload_service import store_json
-from app.services.nlp_service import build_report_json
+from app.services.pdf_extraction_service import extract_report_data
+from app.services.upload_service import store_json, download_pdf
 from app.services.normalization_service import normalize_fbc_report
 from app.services.reportService import store_normalized_report_to_db
-from app.utils.text_utils import extract_tables, extract_entities
+from app.services.outbox_service import record_event, REPORT_FAILED
+from app.services.search_service import index_report
+from app.core.config import LOCAL_EXTRACTION_ENABLED
+from app.core.metrics import track_stage, OCR_PIPELINE_DURATION
+from typing import Optional
 from uuid import UUID
+import time
 
-def process_document_worker(gcs_uri: str, nic: str, patient_id: str, file_id: str):
+def _report_failed(patient_id: str, file_id: str, gcs_uri: str, stage: str, error: Optional[str]) -> None:
+    """Record a report.failed outbox event (see app/services/outbox_service.py)."""
+    result = record_event(REPORT_FAILED, patient_id, {
+        "patient_id": patient_id,
+        "file_id": file_id,
+        "gcs_uri": gcs_uri,
+        "stage": stage,
+        "error": error,
+    })
+    if not result.get("success"):
+        print(f"Warning: Could not record report.failed for {file_id}: {result.get('error')}")
+
+def process_document_worker(gcs_uri: str, nic: str, patient_id: str, file_id: str, queued_at: Optional[float] = None,
+                            pdf_bytes: Optional[bytes] = None):
     """
     Process medical document: extract OCR data, normalize to structured JSON,
     and save to both cloud storage (organized by NIC) and Supabase database (by patient_id).
-    
+
     Args:
         gcs_uri: Google Cloud Storage URI of the document
         nic: Patient's NIC (for organizing GCS folders)
         patient_id: Patient's UUID (for database foreign key)
         file_id: Unique file identifier
+        queued_at: Unix timestamp when the upload was accepted (for upload-to-availability metrics)
+        pdf_bytes: PDF content if already in memory (otherwise downloaded from gcs_uri)
     """
+    started_at = time.time()
+    if queued_at is not None:
+        OCR_PIPELINE_DURATION.observe(started_at - queued_at, phase="queue_wait", outcome="success")
+
+    outcome = "error"
+    stage = "extraction"
     try:
-        # Extract raw OCR data using Document AI
-        document = process_with_document_ai(gcs_uri)
+        if pdf_bytes is None and LOCAL_EXTRACTION_ENABLED:
+            try:
+                with track_stage("gcs_read"):
+                    pdf_bytes = download_pdf(gcs_uri)
+            except Exception as e:
+                # Document AI can still read the file straight from GCS
+                print(f"Warning: Could not download {gcs_uri} for local extraction: {str(e)}")
 
-        # Extract tables and entities from OCR
-        tables = extract_tables(document)
-        entities = extract_entities(document)
+        # Read pages with a text layer locally; only scanned pages go to Document AI.
+        # raw_json["extraction"] records which path the document took.
+        raw_json = extract_report_data(pdf_bytes, gcs_uri)
 
-        # Build raw JSON (for debugging/archival)
-        raw_json = build_report_json(document, tables, entities)
-        
         # Normalize to clean, structured medical JSON
-        normalized_json = normalize_fbc_report(raw_json)
+        stage = "normalization"
+        with track_stage("normalization"):
+            normalized_json = normalize_fbc_report(raw_json)
 
         # Store both raw and normalized versions in Cloud Storage (organized by NIC)
-        store_json(nic, file_id, raw_json)  # users/{nic}/processed/{file_id}.json
-        store_json(nic, f"{file_id}_normalized", normalized_json)  # users/{nic}/processed/{file_id}_normalized.json
-        
+        stage = "gcs_write"
+        with track_stage("gcs_write"):
+            store_json(nic, file_id, raw_json)  # users/{nic}/processed/{file_id}.json
+            store_json(nic, f"{file_id}_normalized", normalized_json)  # users/{nic}/processed/{file_id}_normalized.json
+
         # Store report and biomarkers in Supabase database (using patient_id)
-        db_result = store_normalized_report_to_db(
-            patient_id=UUID(patient_id),
-            file_id=file_id,
-            gcs_path=gcs_uri,
-            normalized_json=normalized_json
-        )
-        
+        stage = "supabase_write"
+        with track_stage("supabase_write"):
+            db_result = store_normalized_report_to_db(
+                patient_id=UUID(patient_id),
+                file_id=file_id,
+                gcs_path=gcs_uri,
+                normalized_json=normalized_json
+            )
+
         if not db_result.get("success"):
             print(f"Warning: Failed to store to Supabase: {db_result.get('error')}")
             # Continue anyway - data is still in cloud storage
+            outcome = "partial"
+            _report_failed(patient_id, file_id, gcs_uri, stage, db_result.get("error"))
         else:
             print(f"Successfully stored report {file_id} to Supabase for patient {patient_id}")
             print(f"GCS folder: users/{nic}/")
             if db_result.get("warning"):
                 print(f"Warning: {db_result.get('warning')}")
-        
+            outcome = "success"
+
+            # Make the OCR text searchable; a failure leaves the report unsearchable
+            # until app/scripts/reindex_report_text.py runs, but otherwise stored
+            with track_stage("search_index"):
+                indexed = index_report(db_result["data"]["report"], raw_json.get("raw_text"))
+            if not indexed.get("success"):
+                print(f"⚠️  Report {file_id} not indexed for search: {indexed.get('error')}")
+
     except Exception as e:
         print(f"Error processing document {file_id}: {str(e)}")
+        _report_failed(patient_id, file_id, gcs_uri, stage, f"{type(e).__name__}: {e}")
         raise  # Re-raise so the error is logged properly
-    
+    finally:
+        finished_at = time.time()
+        OCR_PIPELINE_DURATION.observe(finished_at - started_at, phase="processing", outcome=outcome)
+        if queued_at is not None:
+            OCR_PIPELINE_DURATION.observe(finished_at - queued_at, phase="upload_to_available", outcome=outcome)
+
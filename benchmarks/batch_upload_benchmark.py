@@ -0,0 +1,102 @@
+"""
+Benchmark batch ingestion against the single-file upload loop.
+
+Both paths run against in-memory Supabase and GCS fakes with simulated
+network latency. The single-file loop does what /ocr/upload does per file
+(patient lookup by NIC, then a GCS upload); the batch path resolves all NICs
+with one query and uploads concurrently.
+
+Usage:
+    python -m benchmarks.batch_upload_benchmark [--files 200] [--patients 50] [--db-latency-ms 20] [--gcs-latency-ms 40]
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fakes import FakeSupabase, FakeBucket, FakeStorageClient
+
+PDF = b"%PDF-1.7\n" + b"0" * 200_000
+
+
+@contextmanager
+def fake_backends(db_latency: float, gcs_latency: float, patients: int):
+    from app.core import cloud
+    from app.services import patientService, upload_service
+
+    db = FakeSupabase(latency=db_latency)
+    for i in range(patients):
+        db.tables["patients"].append({"id": f"patient-{i}", "nic": f"{199000000000 + i}", "full_name": f"Patient {i}"})
+    bucket = FakeBucket("bench-bucket", latency=gcs_latency)
+
+    saved = (patientService.supabase, cloud._storage_client, upload_service.BUCKET_NAME)
+    patientService.supabase = db
+    cloud._storage_client = FakeStorageClient(bucket)
+    upload_service.BUCKET_NAME = bucket.name
+    try:
+        yield db, bucket
+    finally:
+        patientService.supabase, cloud._storage_client, upload_service.BUCKET_NAME = saved
+
+
+def single_file_loop(files: List[tuple]) -> int:
+    from app.services.patientService import get_patient_by_nic
+    from app.services.upload_service import upload_pdf_bytes
+
+    accepted = 0
+    for nic, content in files:
+        if get_patient_by_nic(nic).get("success"):
+            upload_pdf_bytes(nic, content)
+            accepted += 1
+    return accepted
+
+
+def batch(files: List[tuple], concurrency: int) -> int:
+    from app.services.batch_upload_service import batch_item, ingest_batch
+
+    items = [batch_item(f"{i}.pdf", nic, lambda content=content: content) for i, (nic, content) in enumerate(files)]
+    return len(ingest_batch(items, concurrency=concurrency)["jobs"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark batch upload vs the single-file loop")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--gcs-latency-ms", type=float, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args(argv)
+
+    files = [(f"{199000000000 + i % args.patients}", PDF) for i in range(args.files)]
+    db_latency, gcs_latency = args.db_latency_ms / 1000, args.gcs_latency_ms / 1000
+
+    print("=" * 80)
+    print(f"BATCH UPLOAD BENCHMARK: {args.files} files, {args.patients} patients, "
+          f"db {args.db_latency_ms:g} ms, gcs {args.gcs_latency_ms:g} ms per call")
+    print("=" * 80)
+
+    with fake_backends(db_latency, gcs_latency, args.patients) as (db, _):
+        start = time.perf_counter()
+        accepted = single_file_loop(files)
+        elapsed = time.perf_counter() - start
+        print(f"single-file loop        {elapsed:8.2f} s   {accepted / elapsed:8.1f} files/s   "
+              f"{len(db.calls)} patient queries")
+        baseline = elapsed
+
+    for concurrency in args.concurrency:
+        with fake_backends(db_latency, gcs_latency, args.patients) as (db, _):
+            start = time.perf_counter()
+            accepted = batch(files, concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"batch (concurrency {concurrency:>2})  {elapsed:8.2f} s   {accepted / elapsed:8.1f} files/s   "
+                  f"{len(db.calls)} patient queries   {baseline / elapsed:5.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark table/entity extraction from large Document AI responses.
+
+Compares app.utils.text_utils against the previous proto-plus implementation
+(kept below as the reference) on 20+ page lab reports and checks both produce
+identical output.
+
+Usage:
+    python -m benchmarks.extraction_benchmark [--iterations N] [--pages 24 32]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.pipeline_benchmark import percentile
+from benchmarks.synthetic_docai import build_document, document_size
+from app.utils import text_utils
+
+
+def legacy_get_text(doc_element, document_text):
+    text = ""
+    for segment in doc_element.text_anchor.text_segments:
+        start_index = int(segment.start_index) if segment.start_index else 0
+        end_index = int(segment.end_index)
+        text += document_text[start_index:end_index]
+    return text.strip()
+
+
+def legacy_extract_tables(document):
+    tables = []
+    for page in document.pages:
+        for table in page.tables:
+            rows = []
+            for row in table.body_rows:
+                cells = []
+                for cell in row.cells:
+                    cells.append(legacy_get_text(cell.layout, document.text))
+                rows.append(cells)
+            tables.append(rows)
+    return tables
+
+
+def legacy_extract_entities(document):
+    return [
+        {
+            "type": entity.type_,
+            "value": entity.mention_text if entity.mention_text else legacy_get_text(entity, document.text),
+            "confidence": entity.confidence
+        }
+        for entity in document.entities
+    ]
+
+
+def _time(fn, document, iterations: int) -> List[float]:
+    fn(document)  # warm-up
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(document)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run(pages: int, iterations: int) -> dict:
+    document = build_document("lipid", pages=pages, tables_per_page=3, rows_per_table=16)
+
+    legacy = lambda d: (legacy_extract_tables(d), legacy_extract_entities(d))
+    current = lambda d: (text_utils.extract_tables(d), text_utils.extract_entities(d))
+    if legacy(document) != current(document):
+        raise AssertionError("Extraction output differs from the legacy implementation")
+
+    legacy_times = _time(legacy, document, iterations)
+    current_times = _time(current, document, iterations)
+    return {
+        "document": document_size(document),
+        "legacy_p50_ms": percentile(legacy_times, 50) * 1000,
+        "legacy_p99_ms": percentile(legacy_times, 99) * 1000,
+        "current_p50_ms": percentile(current_times, 50) * 1000,
+        "current_p99_ms": percentile(current_times, 99) * 1000,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Document AI table/entity extraction")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[24, 48])
+    args = parser.parse_args(argv)
+
+    print("=" * 100)
+    print("EXTRACTION BENCHMARK (tables + entities)")
+    print("=" * 100)
+    for pages in args.pages:
+        result = run(pages, args.iterations)
+        doc = result["document"]
+        speedup = result["legacy_p50_ms"] / result["current_p50_ms"] if result["current_p50_ms"] else 0
+        print(
+            f"\n{doc['pages']} pages, {doc['tables']} tables, {doc['cells']} cells\n"
+            f"  legacy   p50 {result['legacy_p50_ms']:>9.3f} ms   p99 {result['legacy_p99_ms']:>9.3f} ms\n"
+            f"  current  p50 {result['current_p50_ms']:>9.3f} ms   p99 {result['current_p99_ms']:>9.3f} ms\n"
+            f"  speedup  {speedup:.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
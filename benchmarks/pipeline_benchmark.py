@@ -0,0 +1,239 @@
+"""
+Offline benchmark for the OCR-to-database pipeline.
+
+Drives extract_tables, extract_entities, normalize_report and
+store_normalized_report_to_db over synthetic Document AI payloads, with
+Supabase replaced by an in-memory fake. Reports throughput and p50/p99 per
+stage and compares p50s against a stored baseline.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark                  # run and print
+    python -m benchmarks.pipeline_benchmark --check          # exit 1 on regression
+    python -m benchmarks.pipeline_benchmark --update-baseline
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_docai import build_document, document_size
+from tests.fakes import FakeSupabase
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+STAGES = ("extract_tables", "extract_entities", "normalize_report", "store_normalized_report_to_db")
+
+SCENARIOS = [
+    {"name": "fbc_single_page", "report_type": "fbc", "pages": 1, "tables_per_page": 1, "rows_per_table": 13},
+    {"name": "lipid_single_page", "report_type": "lipid", "pages": 1, "tables_per_page": 1, "rows_per_table": 8},
+    {"name": "fbs_single_page", "report_type": "fbs", "pages": 1, "tables_per_page": 1, "rows_per_table": 1},
+    {"name": "fbc_multi_page", "report_type": "fbc", "pages": 6, "tables_per_page": 2, "rows_per_table": 13},
+    {"name": "lipid_lab_packet_24_pages", "report_type": "lipid", "pages": 24, "tables_per_page": 3, "rows_per_table": 16},
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@contextmanager
+def fake_supabase(latency: float = 0.0):
+    """Point the report services at an in-memory Supabase for the duration of the block."""
+    from app.services import latest_biomarker_service, reportService
+
+    modules = (reportService, latest_biomarker_service)
+    originals = [module.supabase for module in modules]
+    db = FakeSupabase(latency=latency)
+    for module in modules:
+        module.supabase = db
+    try:
+        yield db
+    finally:
+        for module, original in zip(modules, originals):
+            module.supabase = original
+
+
+def run_scenario(scenario: dict, iterations: int = 30, warmup: int = 3, seed: int = 42) -> dict:
+    """
+    Run one scenario and collect per-stage timings.
+
+    Returns:
+        Dictionary with document size, throughput and p50/p99/mean (ms) per stage
+    """
+    from app.utils.text_utils import extract_tables, extract_entities
+    from app.services.nlp_service import build_report_json
+    from app.services.normalization_service import normalize_report
+    from app.services.reportService import store_normalized_report_to_db
+
+    document = build_document(
+        scenario["report_type"],
+        pages=scenario["pages"],
+        tables_per_page=scenario["tables_per_page"],
+        rows_per_table=scenario["rows_per_table"],
+        seed=seed,
+    )
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    totals: List[float] = []
+    patient_id = uuid.UUID(int=seed)
+
+    with fake_supabase():
+        for i in range(warmup + iterations):
+            durations = {}
+
+            start = time.perf_counter()
+            tables = extract_tables(document)
+            durations["extract_tables"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            entities = extract_entities(document)
+            durations["extract_entities"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            normalized = normalize_report(build_report_json(document, tables, entities))
+            durations["normalize_report"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = store_normalized_report_to_db(patient_id, f"bench-{i}", "gs://bench/report.pdf", normalized)
+            durations["store_normalized_report_to_db"] = time.perf_counter() - start
+
+            if not result.get("success"):
+                raise RuntimeError(f"store_normalized_report_to_db failed: {result.get('error')}")
+            if i < warmup:
+                continue
+            for stage, duration in durations.items():
+                timings[stage].append(duration)
+            totals.append(sum(durations.values()))
+
+    stages = {
+        stage: {
+            "p50_ms": round(percentile(values, 50) * 1000, 4),
+            "p99_ms": round(percentile(values, 99) * 1000, 4),
+            "mean_ms": round(statistics.fmean(values) * 1000, 4),
+        }
+        for stage, values in timings.items()
+    }
+    return {
+        "scenario": scenario["name"],
+        "document": document_size(document),
+        "biomarkers": len(normalized.get("biomarkers", [])),
+        "iterations": iterations,
+        "throughput_docs_per_sec": round(len(totals) / sum(totals), 2) if totals else 0.0,
+        "total_p50_ms": round(percentile(totals, 50) * 1000, 4),
+        "total_p99_ms": round(percentile(totals, 99) * 1000, 4),
+        "stages": stages,
+    }
+
+
+def compare_to_baseline(results: List[dict], baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Compare p50 per stage against the baseline.
+
+    A stage regresses when it is more than `tolerance` (fraction) slower than the
+    baseline and the absolute difference exceeds `min_delta_ms`.
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result["scenario"])
+        if not expected:
+            continue
+        for stage, stats in result["stages"].items():
+            base_p50 = expected.get(stage)
+            if base_p50 is None:
+                continue
+            delta = stats["p50_ms"] - base_p50
+            if stats["p50_ms"] > base_p50 * (1 + tolerance) and delta > min_delta_ms:
+                regressions.append(
+                    f"{result['scenario']}/{stage}: p50 {stats['p50_ms']:.3f} ms vs baseline {base_p50:.3f} ms"
+                )
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("p50_ms", {})
+
+
+def save_baseline(results: List[dict], path: str = BASELINE_PATH) -> None:
+    data = {
+        "description": "p50 per stage in milliseconds (python -m benchmarks.pipeline_benchmark --update-baseline)",
+        "python": sys.version.split()[0],
+        "p50_ms": {
+            result["scenario"]: {stage: stats["p50_ms"] for stage, stats in result["stages"].items()}
+            for result in results
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def print_report(results: List[dict]) -> None:
+    print("=" * 100)
+    print("OCR PIPELINE BENCHMARK")
+    print("=" * 100)
+    for result in results:
+        doc = result["document"]
+        print(
+            f"\n{result['scenario']}: {doc['pages']} pages, {doc['tables']} tables, {doc['cells']} cells, "
+            f"{result['biomarkers']} biomarkers -> {result['throughput_docs_per_sec']} docs/sec "
+            f"(total p50 {result['total_p50_ms']:.3f} ms, p99 {result['total_p99_ms']:.3f} ms)"
+        )
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<32} p50 {stats['p50_ms']:>10.3f} ms   p99 {stats['p99_ms']:>10.3f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the OCR-to-database pipeline")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--scenario", action="append", help="Run only the named scenario(s)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any stage regresses against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown as a fraction (default 0.5 = 50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore regressions smaller than this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--json", help="Write raw results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s["name"] in args.scenario]
+    results = [run_scenario(s, args.iterations, args.warmup) for s in scenarios]
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if args.check:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
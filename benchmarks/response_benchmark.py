@@ -0,0 +1,114 @@
+"""
+Benchmark response serialization and compression for the large endpoints.
+
+Compares FastAPI's default path (jsonable_encoder + json.dumps) against
+orjson for a 1000-row report list, and parse + re-encode against passing the
+stored bytes through for a 24-page raw OCR document; then reports the
+gzip/zstd compressed sizes and compression time.
+
+Usage:
+    python -m benchmarks.response_benchmark [--iterations N] [--rows 1000] [--pages 24]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+import zstandard
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.pipeline_benchmark import percentile
+from benchmarks.synthetic_docai import build_document
+from app.core.responses import dumps, embed_json
+from app.services.nlp_service import build_report_json
+from app.utils.text_utils import extract_tables, extract_entities
+
+
+def report_rows(count: int) -> List[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    patient_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "patient_id": patient_id,
+            "file_id": str(uuid.uuid4()),
+            "report_type": "Full Blood Count",
+            "sample_collected_at": (start + timedelta(days=i)).isoformat(),
+            "gcs_path": f"gs://bucket/users/199512345678/reports/{i}.pdf",
+            "created_at": (start + timedelta(days=i, hours=2)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def raw_ocr_json(pages: int) -> bytes:
+    document = build_document("fbc", pages=pages, tables_per_page=2, rows_per_table=20, seed=7)
+    raw = build_report_json(document, extract_tables(document), extract_entities(document))
+    return json.dumps(raw, indent=2).encode()  # as stored before this change
+
+
+def timed(fn: Callable[[], bytes], iterations: int):
+    samples, result = [], b""
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentile(samples, 50), result
+
+
+def compare(name: str, iterations: int, cases):
+    print(f"\n{name}")
+    baseline = None
+    body = b""
+    for label, fn in cases:
+        p50, body = timed(fn, iterations)
+        baseline = baseline or p50
+        print(f"  {label:<34} p50 {p50:>9.3f} ms   {len(body):>10,} bytes   {baseline / p50 if p50 else 0:>5.1f}x")
+
+    for label, compress in (
+        ("gzip level 6", lambda: gzip.compress(body, compresslevel=6)),
+        ("zstd level 3", lambda: zstandard.ZstdCompressor(level=3).compress(body)),
+    ):
+        p50, compressed = timed(compress, iterations)
+        print(f"  {label:<34} p50 {p50:>9.3f} ms   {len(compressed):>10,} bytes   {len(body) / len(compressed):>5.1f}:1")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization and compression")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    print("=" * 100)
+    print("RESPONSE BENCHMARK (serialization + compression)")
+    print("=" * 100)
+
+    rows = report_rows(args.rows)
+    envelope = {"status": "success", "source": "database", "count": len(rows), "reports": rows}
+    compare(f"Report list ({args.rows} rows)", args.iterations, [
+        ("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(envelope)).encode()),
+        ("orjson", lambda: dumps(envelope)),
+    ])
+
+    stored = raw_ocr_json(args.pages)
+    compare(f"Raw OCR JSON ({args.pages} pages, {len(stored):,} bytes stored)", args.iterations, [
+        ("json.loads + encoder + json.dumps",
+         lambda: json.dumps(jsonable_encoder({"status": "success", "data": json.loads(stored)})).encode()),
+        ("orjson.loads + orjson.dumps", lambda: dumps({"status": "success", "data": orjson.loads(stored)})),
+        ("pass-through (embed_json)", lambda: embed_json({"status": "success"}, "data", stored)),
+    ])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Startup profiler: time-to-first-request of a fresh worker process.
+
+Each run starts a new interpreter (as gunicorn does per worker) that imports
+app.main, runs the lifespan startup and serves GET /api/v1/system/startup
+through the ASGI app. Two modes are compared:
+
+- lazy: clients are built on first use only (WARM_CLIENTS_ON_STARTUP=false)
+- warm: the default; the lifespan hook builds clients, opens their connections
+        and preloads reference data before the worker accepts requests
+
+It then lists the slowest modules imported by app.main (python -X importtime)
+and the warm-up phases (client construction, connections, preloads).
+
+Usage:
+    python -m benchmarks.startup_benchmark [--runs 5] [--modes lazy,warm] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.pipeline_benchmark import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("lazy", "warm")
+
+CHILD = r"""
+import asyncio, io, json, sys, time, contextlib
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app.main
+    imported = time.perf_counter()
+
+    async def first_request():
+        messages = []
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": "/api/v1/system/startup", "raw_path": b"/api/v1/system/startup",
+                 "query_string": b"", "root_path": "", "headers": [], "client": ("127.0.0.1", 1),
+                 "server": ("127.0.0.1", 80)}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with app.main.app.router.lifespan_context(app.main.app):
+            await app.main.app(scope, receive, send)
+        return messages[0]["status"]
+
+    status = asyncio.run(first_request())
+    responded = time.perf_counter()
+
+from app.core.startup import STARTUP
+print(json.dumps({
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (responded - started) * 1000,
+    "phases_ms": STARTUP.report()["phases_ms"],
+}))
+"""
+
+
+def run_once(mode: str) -> dict:
+    # The outbox relay polls Supabase in the background; keep it out of startup timings
+    env = dict(os.environ, WARM_CLIENTS_ON_STARTUP="true" if mode == "warm" else "false", OUTBOX_RELAY_ENABLED="false")
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> List[tuple]:
+    """(cumulative ms, module) for the slowest imports under app.main."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and name.strip() != "app.main":
+            rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile worker startup and time-to-first-request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated subset of {','.join(MODES)}")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    print("=" * 100)
+    print("STARTUP BENCHMARK (fresh interpreter per run)")
+    print("=" * 100)
+    print(f"{'mode':<12}{'import p50':>14}{'first request p50':>20}{'first request max':>20}")
+
+    phases: Dict[str, List[float]] = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        runs = [run_once(mode) for _ in range(args.runs)]
+        first = [r["first_request_ms"] for r in runs]
+        print(f"{mode:<12}{percentile([r['import_ms'] for r in runs], 50):>11.0f} ms"
+              f"{percentile(first, 50):>17.0f} ms{max(first):>17.0f} ms")
+        if mode == "warm":
+            for run in runs:
+                for name, value in run["phases_ms"].items():
+                    phases.setdefault(name, []).append(value)
+
+    if phases:
+        print("\nWarm-up phases (p50)")
+        for name, values in sorted(phases.items(), key=lambda item: -percentile(item[1], 50)):
+            print(f"  {name:<40} {percentile(values, 50):>9.0f} ms")
+
+    if args.top:
+        print("\nSlowest imports under app.main (cumulative)")
+        for cumulative, name in slowest_imports(args.top):
+            print(f"  {cumulative:>9.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Synthetic Document AI payloads for benchmarking the OCR pipeline.
+
+Builds `documentai.Document` objects shaped like real lab reports (header text,
+tables with header and body rows, entities) for the report types the
+normalizers understand. Generation is seeded so runs are reproducible.
+"""
+
+import random
+from typing import List, Optional, Sequence
+
+from google.cloud import documentai
+
+# (OCR test name, unit, reference range) per report type
+FBC_ROWS = [
+    ("W.B.C.", "Per Cumm", (4000, 11000)),
+    ("NEUTROPHILS", "%", (40, 75)),
+    ("LYMPHOCYTES", "%", (20, 45)),
+    ("EOSINOPHILS", "%", (1, 6)),
+    ("MONOCYTES", "%", (2, 10)),
+    ("BASOPHILS", "%", (0, 1)),
+    ("HAEMOGLOBIN", "g/dl", (11.0, 16.5)),
+    ("R.B.C.", "10^6 /UL", (3.8, 5.8)),
+    ("P.C.V.", "%", (36, 46)),
+    ("M.C.V.", "fl", (80, 100)),
+    ("M.C.H.", "Pg", (27, 32)),
+    ("M.C.H.C.", "g/dl", (32, 36)),
+    ("PLATELET COUNT", "Per Cumm", (150000, 450000)),
+]
+
+LIPID_ROWS = [
+    ("SERUM CHOLESTEROL - TOTAL", "mg/dL", (140.0, 239.0)),
+    ("SERUM TRIGLYCERIDES", "mg/dL", (10.0, 200.0)),
+    ("CHOLESTEROL-H.D.L.", "mg/dL", (35.0, 85.0)),
+    ("CHOLESTEROL - NON - H.D.L", "mg/dL", (55.0, 189.0)),
+    ("CHOLESTEROL L.D.L", "mg/dL", (50.0, 159.0)),
+    ("CHOLESTEROL - VLDL", "mg/dL", (10.0, 41.0)),
+    ("CHOL/HDL", "", (2.0, 5.0)),
+    ("LDL/HDL", "", (0.01, 3.30)),
+]
+
+FBS_ROWS = [
+    ("FASTING PLASMA GLUCOSE (FBS)", "mg/dl", (70.0, 99.0)),
+]
+
+REPORT_TYPES = ("fbc", "lipid", "fbs")
+
+_HEADERS = {
+    "fbc": (
+        "FULL BLOOD COUNT\n"
+        "PATIENT NAME: MR SYNTHETIC PATIENT {n}\n"
+        "REF.DOCTOR : DR TEST\n"
+        "AGE 62 Y/O M\n"
+        "SAMPLE COLLECTED : 03/06/2025 09:10 AM\n"
+        "PRINTED DATE : 03/06/2025 06:43 PM\n"
+        "SERVICE REF.NO : SRV{n:06d}\n"
+    ),
+    "lipid": (
+        "SERUM LIPID PROFILE\n"
+        "AHH2006215 / AHH2011800\n"
+        "PATIENT : MRS SYNTHETIC PATIENT {n}\n"
+        "AGE : 58 Y/F\n"
+        "UHID : {n:010d}\n"
+        "SAMPLE TYPE : Serum\n"
+        "25/09/2025 08:15\n"
+        "25/09/2025 13:40\n"
+    ),
+    "fbs": (
+        "CLINICAL CHEMISTRY\n"
+        "FASTING PLASMA GLUCOSE\n"
+        "AHH2009957 / AHH2011800\n"
+        "PATIENT : MR SYNTHETIC PATIENT {n}\n"
+        "AGE : 58 Y/M\n"
+        "UHID : {n:010d}\n"
+        "SAMPLE TYPE : Plasma\n"
+        "12/10/2025 07:30\n"
+        "12/10/2025 11:05\n"
+        "70 - 99 = Normal\n"
+    ),
+}
+
+_TABLE_HEADERS = {
+    "fbc": ["TEST NAME", "RESULT", "UNIT", "ABSOLUTE COUNT", "REFERENCE RANGE"],
+    "lipid": ["TEST", "RESULT", "UNIT", "REFERENCE RANGE"],
+    "fbs": ["TEST", "RESULT"],
+}
+
+
+class _DocumentBuilder:
+    """Appends text to the document and returns matching text anchors."""
+
+    def __init__(self):
+        self.pb = documentai.Document.pb()()
+        self._parts: List[str] = []
+        self._length = 0
+
+    def append(self, text: str, anchor=None) -> None:
+        start = self._length
+        self._parts.append(text)
+        self._length += len(text)
+        if anchor is not None:
+            segment = anchor.text_segments.add()
+            if start:
+                segment.start_index = start
+            segment.end_index = self._length
+
+    def add_row(self, row_pb, cells: Sequence[str]) -> None:
+        for value in cells:
+            cell = row_pb.cells.add()
+            cell.row_span = 1
+            cell.col_span = 1
+            self.append(value, cell.layout.text_anchor)
+            self.append("\n")
+
+    @property
+    def offset(self) -> int:
+        return self._length
+
+    def build(self) -> documentai.Document:
+        self.pb.text = "".join(self._parts)
+        return documentai.Document.wrap(self.pb)
+
+
+def _body_row(report_type: str, rng: random.Random, row_index: int) -> List[str]:
+    rows = {"fbc": FBC_ROWS, "lipid": LIPID_ROWS, "fbs": FBS_ROWS}[report_type]
+    name, unit, (low, high) = rows[row_index % len(rows)]
+    value = round(rng.uniform(low * 0.8, high * 1.2), 1)
+
+    if report_type == "fbc":
+        absolute = str(int(value * 80)) if unit == "%" else ""
+        return [name, f"{value}", unit, absolute, f"{low} - {high}"]
+    if report_type == "lipid":
+        flag = "H\n" if value > high else ("L\n" if value < low else "")
+        return [name, f"{value}", unit, f"{flag}{low}\n-\n{high}"]
+    return [name, f"{value}\n{unit}\n{low} - {high}"]
+
+
+def build_document(
+    report_type: str = "fbc",
+    pages: int = 1,
+    tables_per_page: int = 1,
+    rows_per_table: int = 13,
+    seed: int = 42,
+    entities_per_page: int = 2,
+) -> documentai.Document:
+    """
+    Build a synthetic Document AI response.
+
+    Args:
+        report_type: "fbc", "lipid" or "fbs"
+        pages: Number of pages
+        tables_per_page: Tables on each page
+        rows_per_table: Body rows per table (cycles through the known biomarkers)
+        seed: Random seed for values
+        entities_per_page: Entities with text anchors added per page
+
+    Returns:
+        documentai.Document with text, pages, tables and entities populated
+    """
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    rng = random.Random(seed)
+    builder = _DocumentBuilder()
+
+    for page_number in range(1, pages + 1):
+        page = builder.pb.pages.add()
+        page.page_number = page_number
+        page_start = builder.offset
+
+        builder.append(_HEADERS[report_type].format(n=page_number))
+
+        for table_index in range(tables_per_page):
+            table = page.tables.add()
+            builder.add_row(table.header_rows.add(), _TABLE_HEADERS[report_type])
+            for row_index in range(rows_per_table):
+                builder.add_row(table.body_rows.add(), _body_row(report_type, rng, row_index))
+
+        for entity_index in range(entities_per_page):
+            entity = builder.pb.entities.add()
+            entity.type_ = "page_note" if entity_index else "page_footer"
+            entity.confidence = round(rng.uniform(0.8, 1.0), 3)
+            builder.append(f"Page {page_number} of {pages} note {entity_index}", entity.text_anchor)
+            builder.append("\n")
+
+        page_anchor = page.layout.text_anchor.text_segments.add()
+        if page_start:
+            page_anchor.start_index = page_start
+        page_anchor.end_index = builder.offset
+
+    return builder.build()
+
+
+def document_size(document: documentai.Document) -> dict:
+    """Summarize a document's size for benchmark reports."""
+    pb = documentai.Document.pb(document)
+    tables = sum(len(page.tables) for page in pb.pages)
+    cells = sum(
+        len(row.cells)
+        for page in pb.pages
+        for table in page.tables
+        for row in list(table.header_rows) + list(table.body_rows)
+    )
+    return {"pages": len(pb.pages), "tables": tables, "cells": cells, "text_chars": len(pb.text)}
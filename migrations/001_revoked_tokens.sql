@@ -0,0 +1,9 @@
+-- Revoked session tokens (see app/core/security.py)
+-- Rows only need to live until the token would have expired anyway.
+create table if not exists revoked_tokens (
+  jti text primary key,
+  expires_at timestamptz not null,
+  revoked_at timestamptz default now()
+);
+
+create index if not exists idx_revoked_tokens_expires_at on revoked_tokens(expires_at);
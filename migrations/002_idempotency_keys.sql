@@ -0,0 +1,44 @@
+-- Idempotency keys for client-retried requests (see app/services/idempotency_service.py)
+-- A row is claimed as in_progress before the work starts and completed with the
+-- response that retries with the same key replay. Rows only need to outlive
+-- the client's retry window.
+create table if not exists idempotency_keys (
+  scope text not null,
+  key text not null,
+  fingerprint text not null,
+  status text not null default 'in_progress' check (status in ('in_progress', 'completed')),
+  response jsonb,
+  created_at timestamptz default now(),
+  expires_at timestamptz not null,
+  primary key (scope, key)
+);
+
+create index if not exists idx_idempotency_keys_expires_at on idempotency_keys(expires_at);
+
+-- One report per uploaded file, so re-running ingestion for a file_id updates
+-- the existing report instead of adding a duplicate.
+-- Existing duplicates (from earlier retries) keep one row: the newest that has
+-- biomarkers, else the newest. Usually that is the retry that stored the
+-- biomarkers; the others (and their biomarkers, by cascade) are deleted.
+with kept as (
+  select distinct on (r.file_id) r.file_id, r.id
+  from reports r
+  where r.file_id is not null
+  order by r.file_id,
+           exists (select 1 from biomarkers b where b.report_id = r.id) desc,
+           r.created_at desc nulls last,
+           r.id desc
+)
+delete from reports r
+using kept
+where r.file_id = kept.file_id
+  and r.id <> kept.id;
+
+alter table reports add column if not exists updated_at timestamptz default now();
+
+do $$
+begin
+  if not exists (select 1 from pg_constraint where conname = 'reports_file_id_key') then
+    alter table reports add constraint reports_file_id_key unique (file_id);
+  end if;
+end $$;
@@ -0,0 +1,36 @@
+-- Latest value of each biomarker per patient (see app/services/latest_biomarker_service.py)
+-- Maintained by store_normalized_report_to_db as reports are ingested, so
+-- "current LDL for this patient" is one primary-key lookup instead of listing
+-- reports and scanning their biomarkers. Rebuild it at any time with
+-- python -m app.scripts.rebuild_latest_biomarkers
+--
+-- A reading is newer when its report's sample_collected_at (or created_at when
+-- the sample date is unknown) is later; ties go to the report created last.
+create table if not exists patient_latest_biomarkers (
+  patient_id uuid not null references patients(id) on delete cascade,
+  name text not null,
+  value numeric not null,
+  unit text,
+  ref_min numeric,
+  ref_max numeric,
+  flag text,
+  sample_collected_at timestamptz,
+  report_id uuid not null references reports(id) on delete cascade,
+  report_created_at timestamptz,
+  updated_at timestamptz default now(),
+  primary key (patient_id, name)
+);
+
+create index if not exists idx_patient_latest_biomarkers_report_id on patient_latest_biomarkers(report_id);
+
+-- Backfill from existing reports
+insert into patient_latest_biomarkers
+  (patient_id, name, value, unit, ref_min, ref_max, flag, sample_collected_at, report_id, report_created_at)
+select distinct on (r.patient_id, b.name)
+  r.patient_id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag,
+  coalesce(r.sample_collected_at, r.created_at), r.id, r.created_at
+from biomarkers b
+join reports r on r.id = b.report_id
+where r.patient_id is not null
+order by r.patient_id, b.name, coalesce(r.sample_collected_at, r.created_at) desc nulls last, r.created_at desc nulls last
+on conflict (patient_id, name) do nothing;
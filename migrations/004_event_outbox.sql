@@ -0,0 +1,70 @@
+-- Transactional outbox for report lifecycle events (see app/services/outbox_service.py)
+-- Events are written in the same transaction as the data they describe and
+-- delivered afterwards by the relay (app/services/outbox_relay.py), at least
+-- once and in id order per patient. Subscribers dedupe on event_id.
+create table if not exists event_outbox (
+  id bigserial primary key,
+  event_id uuid not null unique default gen_random_uuid(),
+  event_type text not null,
+  patient_id uuid,
+  payload jsonb not null,
+  status text not null default 'pending' check (status in ('pending', 'published', 'dead')),
+  attempts integer not null default 0,
+  next_attempt_at timestamptz not null default now(),
+  locked_until timestamptz not null default 'epoch',
+  last_error text,
+  created_at timestamptz not null default now(),
+  published_at timestamptz
+);
+
+create index if not exists idx_event_outbox_pending on event_outbox(id) where status = 'pending';
+create index if not exists idx_event_outbox_patient on event_outbox(patient_id, id);
+
+-- Store a normalized report, its biomarkers and its events in one transaction.
+-- Same effect as the upsert/delete/insert sequence it replaces: the report is
+-- upserted on file_id and its biomarkers replaced, so re-ingesting a file is safe.
+-- "report_id" is added to the payload of every event.
+create or replace function ingest_report(p_report jsonb, p_biomarkers jsonb, p_events jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_report reports;
+  v_biomarkers jsonb;
+begin
+  insert into reports (patient_id, file_id, report_type, gcs_path, sample_collected_at, updated_at)
+  values (
+    (p_report->>'patient_id')::uuid,
+    p_report->>'file_id',
+    p_report->>'report_type',
+    p_report->>'gcs_path',
+    (p_report->>'sample_collected_at')::timestamptz,
+    now()
+  )
+  on conflict (file_id) do update set
+    patient_id = excluded.patient_id,
+    report_type = excluded.report_type,
+    gcs_path = excluded.gcs_path,
+    sample_collected_at = excluded.sample_collected_at,
+    updated_at = excluded.updated_at
+  returning * into v_report;
+
+  delete from biomarkers where report_id = v_report.id;
+
+  with inserted as (
+    insert into biomarkers (report_id, name, value, unit, ref_min, ref_max, flag)
+    select v_report.id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag
+    from jsonb_to_recordset(coalesce(p_biomarkers, '[]'::jsonb))
+      as b(name text, value numeric, unit text, ref_min numeric, ref_max numeric, flag text)
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_biomarkers from inserted;
+
+  insert into event_outbox (event_id, event_type, patient_id, payload)
+  select (e->>'event_id')::uuid, e->>'event_type', v_report.patient_id,
+         (e->'payload') || jsonb_build_object('report_id', v_report.id)
+  from jsonb_array_elements(coalesce(p_events, '[]'::jsonb)) as e;
+
+  return jsonb_build_object('report', to_jsonb(v_report), 'biomarkers', v_biomarkers);
+end;
+$$;
@@ -0,0 +1,26 @@
+-- Abnormal-result notifications queued for care circle members
+-- (see app/services/notification_service.py). One row per biomarker.abnormal
+-- event and member; the dispatcher sends each recipient's pending rows as one
+-- digest and retries failed sends with backoff.
+create table if not exists care_circle_notifications (
+  id bigserial primary key,
+  event_id uuid not null,
+  member_id uuid not null references care_circle_members(id) on delete cascade,
+  recipient_email text not null,
+  recipient_name text,
+  patient_id uuid not null references patients(id) on delete cascade,
+  payload jsonb not null,
+  status text not null default 'pending' check (status in ('pending', 'sent', 'dead')),
+  attempts integer not null default 0,
+  next_attempt_at timestamptz not null default now(),
+  locked_until timestamptz not null default 'epoch',
+  last_error text,
+  created_at timestamptz not null default now(),
+  sent_at timestamptz,
+  -- the outbox delivers at least once; a redelivered event queues nothing new,
+  -- nor does a reprocessed report, whose events keep their ids (010)
+  unique (event_id, member_id)
+);
+
+create index if not exists idx_care_circle_notifications_pending
+  on care_circle_notifications(recipient_email, id) where status = 'pending';
@@ -0,0 +1,52 @@
+-- Full-text search over report OCR text (see app/services/search_service.py)
+-- The text lives in its own table so the wide column stays out of `select * from reports`;
+-- report fields are joined in at query time. The 'simple' configuration lowercases without
+-- stemming, which keeps analyte names and codes (HbA1c, LDL, eGFR) searchable as written.
+create table if not exists report_search_documents (
+  report_id uuid primary key references reports(id) on delete cascade,
+  patient_id uuid not null references patients(id) on delete cascade,
+  content text not null,
+  search_vector tsvector generated always as (to_tsvector('simple', content)) stored,
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists idx_report_search_vector on report_search_documents using gin(search_vector);
+create index if not exists idx_report_search_patient on report_search_documents(patient_id);
+
+-- Ranked matches with a highlighted snippet; p_patient_id null searches every patient.
+-- p_query uses web search syntax: words are ANDed, "quoted phrases", or, -excluded.
+create or replace function search_reports(p_query text, p_patient_id uuid default null,
+                                          p_limit integer default 20, p_offset integer default 0)
+returns table (
+  report_id uuid,
+  patient_id uuid,
+  file_id text,
+  report_type text,
+  sample_collected_at timestamptz,
+  rank real,
+  snippet text
+)
+language sql
+stable
+as $$
+  with query as (select websearch_to_tsquery('simple', p_query) as q),
+  matches as (
+    select d.report_id, d.patient_id, d.content, ts_rank_cd(d.search_vector, query.q) as rank
+    from report_search_documents d, query
+    where d.search_vector @@ query.q
+      and (p_patient_id is null or d.patient_id = p_patient_id)
+  ),
+  page as (
+    select m.*, r.file_id, r.report_type, r.sample_collected_at
+    from matches m
+    join reports r on r.id = m.report_id
+    order by m.rank desc, r.sample_collected_at desc nulls last, m.report_id
+    limit p_limit offset p_offset
+  )
+  -- ts_headline re-parses the text, so it only runs on the page being returned
+  select p.report_id, p.patient_id, p.file_id, p.report_type, p.sample_collected_at, p.rank,
+         ts_headline('simple', p.content, query.q,
+                     'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5, FragmentDelimiter=" … "')
+  from page p, query
+  order by p.rank desc, p.sample_collected_at desc nulls last, p.report_id;
+$$;
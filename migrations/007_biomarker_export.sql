@@ -0,0 +1,22 @@
+-- Incremental analytics export of biomarkers (see app/services/analytics_export.py)
+-- biomarkers.created_at is the export watermark: each run exports the rows created
+-- after the previous run's last (created_at, id). Existing rows take their report's time.
+alter table biomarkers add column if not exists created_at timestamptz;
+update biomarkers b set created_at = coalesce(r.created_at, now())
+  from reports r
+  where r.id = b.report_id and b.created_at is null;
+alter table biomarkers alter column created_at set default now();
+alter table biomarkers alter column created_at set not null;
+create index if not exists idx_biomarkers_created_at on biomarkers(created_at, id);
+
+-- One row per biomarker with its report and the patient's NIC (for age and sex), so a
+-- page of the export is one query. Read with the service role only.
+create or replace view biomarker_export_rows as
+select b.id, b.report_id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag, b.created_at,
+       r.patient_id, r.report_type, r.sample_collected_at, r.created_at as report_created_at,
+       p.nic
+from biomarkers b
+join reports r on r.id = b.report_id
+join patients p on p.id = r.patient_id;
+
+revoke all on biomarker_export_rows from anon, authenticated;
@@ -0,0 +1,128 @@
+-- Update patient_latest_biomarkers inside ingest_report() (see app/services/latest_biomarker_service.py)
+-- The recency check is the WHERE of the upsert's ON CONFLICT clause, so it runs
+-- against the row it replaces, under that row's lock: two reports of one patient
+-- ingested at the same time can no longer overwrite a newer value with an older
+-- one, as the select-then-upsert from the service could.
+--
+-- A reading is newer when its report's sample_collected_at (or created_at when
+-- the sample date is unknown) is later; ties go to the report created last. Rows
+-- from the same report are always replaced (re-ingestion).
+create or replace function upsert_latest_biomarkers(p_report_id uuid)
+returns integer
+language plpgsql
+as $$
+declare
+  v_report reports;
+  v_dropped text[];
+  v_count integer;
+begin
+  select * into v_report from reports where id = p_report_id;
+  if not found or v_report.patient_id is null then
+    return 0;
+  end if;
+
+  -- Names a re-ingested report no longer has fall back to the patient's other reports
+  with dropped as (
+    delete from patient_latest_biomarkers l
+    where l.patient_id = v_report.patient_id
+      and l.report_id = v_report.id
+      and not exists (
+        select 1 from biomarkers b where b.report_id = v_report.id and b.name = l.name and b.value is not null
+      )
+    returning l.name
+  )
+  select coalesce(array_agg(name), '{}') into v_dropped from dropped;
+
+  if cardinality(v_dropped) > 0 then
+    insert into patient_latest_biomarkers
+      (patient_id, name, value, unit, ref_min, ref_max, flag, sample_collected_at, report_id, report_created_at)
+    select distinct on (b.name)
+      r.patient_id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag,
+      coalesce(r.sample_collected_at, r.created_at), r.id, r.created_at
+    from biomarkers b
+    join reports r on r.id = b.report_id
+    where r.patient_id = v_report.patient_id and b.name = any(v_dropped) and b.value is not null
+    order by b.name, coalesce(r.sample_collected_at, r.created_at) desc nulls last, r.created_at desc nulls last
+    on conflict (patient_id, name) do nothing;
+  end if;
+
+  insert into patient_latest_biomarkers as latest
+    (patient_id, name, value, unit, ref_min, ref_max, flag, sample_collected_at, report_id, report_created_at, updated_at)
+  select distinct on (b.name)
+    v_report.patient_id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag,
+    coalesce(v_report.sample_collected_at, v_report.created_at), v_report.id, v_report.created_at, now()
+  from biomarkers b
+  where b.report_id = v_report.id and b.value is not null
+  order by b.name, b.created_at, b.id
+  on conflict (patient_id, name) do update set
+    value = excluded.value,
+    unit = excluded.unit,
+    ref_min = excluded.ref_min,
+    ref_max = excluded.ref_max,
+    flag = excluded.flag,
+    sample_collected_at = excluded.sample_collected_at,
+    report_id = excluded.report_id,
+    report_created_at = excluded.report_created_at,
+    updated_at = excluded.updated_at
+  where latest.report_id = excluded.report_id
+     or (coalesce(excluded.sample_collected_at, '-infinity'), coalesce(excluded.report_created_at, '-infinity'))
+        >= (coalesce(latest.sample_collected_at, '-infinity'), coalesce(latest.report_created_at, '-infinity'));
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end;
+$$;
+
+-- ingest_report() from 004_event_outbox.sql, now also updating the latest values in
+-- the same transaction. The table can be rebuilt, so an error there is logged
+-- (savepoint) instead of failing the ingestion.
+create or replace function ingest_report(p_report jsonb, p_biomarkers jsonb, p_events jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_report reports;
+  v_biomarkers jsonb;
+begin
+  insert into reports (patient_id, file_id, report_type, gcs_path, sample_collected_at, updated_at)
+  values (
+    (p_report->>'patient_id')::uuid,
+    p_report->>'file_id',
+    p_report->>'report_type',
+    p_report->>'gcs_path',
+    (p_report->>'sample_collected_at')::timestamptz,
+    now()
+  )
+  on conflict (file_id) do update set
+    patient_id = excluded.patient_id,
+    report_type = excluded.report_type,
+    gcs_path = excluded.gcs_path,
+    sample_collected_at = excluded.sample_collected_at,
+    updated_at = excluded.updated_at
+  returning * into v_report;
+
+  delete from biomarkers where report_id = v_report.id;
+
+  with inserted as (
+    insert into biomarkers (report_id, name, value, unit, ref_min, ref_max, flag)
+    select v_report.id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag
+    from jsonb_to_recordset(coalesce(p_biomarkers, '[]'::jsonb))
+      as b(name text, value numeric, unit text, ref_min numeric, ref_max numeric, flag text)
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_biomarkers from inserted;
+
+  insert into event_outbox (event_id, event_type, patient_id, payload)
+  select (e->>'event_id')::uuid, e->>'event_type', v_report.patient_id,
+         (e->'payload') || jsonb_build_object('report_id', v_report.id)
+  from jsonb_array_elements(coalesce(p_events, '[]'::jsonb)) as e;
+
+  begin
+    perform upsert_latest_biomarkers(v_report.id);
+  exception when others then
+    raise warning 'patient_latest_biomarkers not updated for report %: %', v_report.id, sqlerrm;
+  end;
+
+  return jsonb_build_object('report', to_jsonb(v_report), 'biomarkers', v_biomarkers);
+end;
+$$;
@@ -0,0 +1,6 @@
+-- Lease on in-progress idempotency keys (see app/services/idempotency_service.py)
+-- A claim is held until locked_until, which the request extends while it works.
+-- When a request crashes without completing or releasing its key, a retry takes
+-- the claim over once the lease has run out instead of getting 409 until the key
+-- expires. Claims that exist when this runs are treated as already lapsed.
+alter table idempotency_keys add column if not exists locked_until timestamptz not null default 'epoch';
@@ -0,0 +1,55 @@
+-- Ingest event ids are derived from the file and biomarker they describe (see
+-- app/services/outbox_service.py), so reprocessing a file brings the same ids
+-- again. ingest_report() from 008_latest_biomarkers_upsert.sql, now skipping
+-- events that are already in the outbox instead of failing on event_id.
+create or replace function ingest_report(p_report jsonb, p_biomarkers jsonb, p_events jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_report reports;
+  v_biomarkers jsonb;
+begin
+  insert into reports (patient_id, file_id, report_type, gcs_path, sample_collected_at, updated_at)
+  values (
+    (p_report->>'patient_id')::uuid,
+    p_report->>'file_id',
+    p_report->>'report_type',
+    p_report->>'gcs_path',
+    (p_report->>'sample_collected_at')::timestamptz,
+    now()
+  )
+  on conflict (file_id) do update set
+    patient_id = excluded.patient_id,
+    report_type = excluded.report_type,
+    gcs_path = excluded.gcs_path,
+    sample_collected_at = excluded.sample_collected_at,
+    updated_at = excluded.updated_at
+  returning * into v_report;
+
+  delete from biomarkers where report_id = v_report.id;
+
+  with inserted as (
+    insert into biomarkers (report_id, name, value, unit, ref_min, ref_max, flag)
+    select v_report.id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag
+    from jsonb_to_recordset(coalesce(p_biomarkers, '[]'::jsonb))
+      as b(name text, value numeric, unit text, ref_min numeric, ref_max numeric, flag text)
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_biomarkers from inserted;
+
+  insert into event_outbox (event_id, event_type, patient_id, payload)
+  select (e->>'event_id')::uuid, e->>'event_type', v_report.patient_id,
+         (e->'payload') || jsonb_build_object('report_id', v_report.id)
+  from jsonb_array_elements(coalesce(p_events, '[]'::jsonb)) as e
+  on conflict (event_id) do nothing;
+
+  begin
+    perform upsert_latest_biomarkers(v_report.id);
+  exception when others then
+    raise warning 'patient_latest_biomarkers not updated for report %: %', v_report.id, sqlerrm;
+  end;
+
+  return jsonb_build_object('report', to_jsonb(v_report), 'biomarkers', v_biomarkers);
+end;
+$$;
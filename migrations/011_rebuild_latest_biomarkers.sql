@@ -0,0 +1,79 @@
+-- Rebuild a patient's patient_latest_biomarkers rows in the database (see
+-- app/services/latest_biomarker_service.py). The rebuild used to compute the
+-- latest values in the service and upsert them unconditionally, so a report
+-- ingested while it ran could have its newer value overwritten. Here the values
+-- go through the same recency-guarded upsert as upsert_latest_biomarkers() in
+-- 008_latest_biomarkers_upsert.sql.
+--
+-- 1. Rows whose report no longer has that biomarker (deleted or moved reports,
+--    edited biomarkers) are removed.
+-- 2. The remaining rows take their report's current dates, so a report that was
+--    re-dated to an earlier sample can lose to the patient's other reports.
+-- 3. The newest reading of each name is upserted, replacing a row only when it
+--    is at least as recent.
+create or replace function rebuild_latest_biomarkers(p_patient_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_dropped text[];
+  v_count integer;
+  v_removed integer;
+begin
+  with dropped as (
+    delete from patient_latest_biomarkers l
+    where l.patient_id = p_patient_id
+      and not exists (
+        select 1
+        from biomarkers b
+        join reports r on r.id = b.report_id
+        where b.report_id = l.report_id and b.name = l.name and b.value is not null
+          and r.patient_id = p_patient_id
+      )
+    returning l.name
+  )
+  select coalesce(array_agg(name), '{}') into v_dropped from dropped;
+
+  update patient_latest_biomarkers l set
+    sample_collected_at = coalesce(r.sample_collected_at, r.created_at),
+    report_created_at = r.created_at
+  from reports r
+  where r.id = l.report_id
+    and l.patient_id = p_patient_id
+    and (l.sample_collected_at, l.report_created_at)
+        is distinct from (coalesce(r.sample_collected_at, r.created_at), r.created_at);
+
+  insert into patient_latest_biomarkers as latest
+    (patient_id, name, value, unit, ref_min, ref_max, flag, sample_collected_at, report_id, report_created_at, updated_at)
+  select distinct on (b.name)
+    r.patient_id, b.name, b.value, b.unit, b.ref_min, b.ref_max, b.flag,
+    coalesce(r.sample_collected_at, r.created_at), r.id, r.created_at, now()
+  from biomarkers b
+  join reports r on r.id = b.report_id
+  where r.patient_id = p_patient_id and b.value is not null
+  order by b.name, coalesce(r.sample_collected_at, r.created_at) desc nulls last, r.created_at desc nulls last,
+           b.created_at, b.id
+  on conflict (patient_id, name) do update set
+    value = excluded.value,
+    unit = excluded.unit,
+    ref_min = excluded.ref_min,
+    ref_max = excluded.ref_max,
+    flag = excluded.flag,
+    sample_collected_at = excluded.sample_collected_at,
+    report_id = excluded.report_id,
+    report_created_at = excluded.report_created_at,
+    updated_at = excluded.updated_at
+  where latest.report_id = excluded.report_id
+     or (coalesce(excluded.sample_collected_at, '-infinity'), coalesce(excluded.report_created_at, '-infinity'))
+        >= (coalesce(latest.sample_collected_at, '-infinity'), coalesce(latest.report_created_at, '-infinity'));
+
+  select count(*) into v_count
+  from patient_latest_biomarkers where patient_id = p_patient_id;
+
+  select count(*) into v_removed
+  from unnest(v_dropped) as d(name)
+  where not exists (select 1 from patient_latest_biomarkers l where l.patient_id = p_patient_id and l.name = d.name);
+
+  return jsonb_build_object('count', v_count, 'removed', v_removed);
+end;
+$$;
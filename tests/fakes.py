@@ -0,0 +1,695 @@
+"""
+Local fakes for external services used by tests and benchmarks.
+
+FakeSupabase mimics the subset of the supabase-py query builder this code base
+uses (table().select/insert/update/upsert/delete with eq/in_/order/range/limit
+filters, and rpc() for the database functions in FUNCTIONS; the views in VIEWS
+are computed from the tables on select). Rows live in memory; an optional
+per-call latency simulates the network round trip.
+
+FakeStorageClient/FakeBucket/FakeBlob mimic google-cloud-storage objects
+(uploads with generation preconditions, metadata patches with metageneration
+preconditions, downloads) and FakeSigner stands in for V4 URL signing.
+FaultInjectingClient raises queued errors for resilience tests.
+
+SQLiteDatabase stands in for the Postgres database of the SQLAlchemy models
+(health metrics): an in-memory SQLite database shared across threads.
+"""
+
+import copy
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._filters = []
+        self._order = []
+        self._range = None
+
+    # ----- operations -----
+
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self._op = "select"
+        self._columns = columns
+        return self
+
+    def insert(self, data):
+        self._op = "insert"
+        self._payload = data
+        return self
+
+    def upsert(self, data, on_conflict: Optional[str] = None, ignore_duplicates: bool = False):
+        self._op = "upsert"
+        self._payload = data
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data):
+        self._op = "update"
+        self._payload = data
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    # ----- filters -----
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: _cmp(row.get(column)) == _cmp(value))
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: _cmp(row.get(column)) != _cmp(value))
+        return self
+
+    def in_(self, column, values):
+        wanted = {_cmp(v) for v in values}
+        self._filters.append(lambda row: _cmp(row.get(column)) in wanted)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and _cmp(row.get(column)) > _cmp(value))
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and _cmp(row.get(column)) >= _cmp(value))
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and _cmp(row.get(column)) < _cmp(value))
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and _cmp(row.get(column)) <= _cmp(value))
+        return self
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        self._filters.append(lambda row: row.get(column) is expected if expected is None else row.get(column) == expected)
+        return self
+
+    def not_(self):
+        return self
+
+    def order(self, column, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self._range = (start, end)
+        return self
+
+    def limit(self, count: int):
+        self._range = (0, count - 1)
+        return self
+
+    # ----- execution -----
+
+    def _matching(self, rows):
+        return [row for row in rows if all(f(row) for f in self._filters)]
+
+    def execute(self) -> FakeResponse:
+        self._client.calls.append((self._table, self._op))
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        if self._client.fail_tables.get(self._table):
+            raise RuntimeError(self._client.fail_tables[self._table])
+        with self._client.lock:
+            return self._execute()
+
+    def _execute(self) -> FakeResponse:
+        rows = VIEWS[self._table](self._client) if self._table in VIEWS else self._client.tables[self._table]
+
+        if self._op == "insert":
+            return FakeResponse([self._client._insert(self._table, item) for item in _as_list(self._payload)])
+
+        if self._op == "upsert":
+            keys = [k.strip() for k in (self._on_conflict or "id").split(",")]
+            result = []
+            for item in _as_list(self._payload):
+                existing = next((r for r in rows if all(_cmp(r.get(k)) == _cmp(item.get(k)) for k in keys)), None)
+                if existing is not None and self._ignore_duplicates:
+                    continue
+                if existing is not None:
+                    existing.update(copy.deepcopy(item))
+                    result.append(copy.deepcopy(existing))
+                else:
+                    result.append(self._client._insert(self._table, item))
+            return FakeResponse(result)
+
+        matched = self._matching(rows)
+
+        if self._op == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self._payload))
+            return FakeResponse(copy.deepcopy(matched))
+
+        if self._op == "delete":
+            self._client.tables[self._table] = [r for r in rows if r not in matched]
+            return FakeResponse(copy.deepcopy(matched))
+
+        for column, desc in reversed(self._order):
+            matched = sorted(matched, key=lambda r: (r.get(column) is None, _cmp(r.get(column))), reverse=desc)
+        total = len(matched)
+        if self._range is not None:
+            matched = matched[self._range[0]:self._range[1] + 1]
+        return FakeResponse([_project(row, self._columns) for row in matched], count=total)
+
+
+class FakeSupabase:
+    """In-memory stand-in for the supabase client."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.calls: List[tuple] = []
+        self.fail_tables: Dict[str, str] = {}
+        self.sequences: Dict[str, int] = {}
+        self.lock = threading.RLock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> "FakeRpc":
+        return FakeRpc(self, name, params or {})
+
+    def _insert(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        return copy.deepcopy(self._append(table, copy.deepcopy(item)))
+
+    def _append(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Store row itself (no copies) with the column defaults filled in; for rows the fake built."""
+        for column, default in TABLE_DEFAULTS.get(table, {}).items():
+            if column not in row:
+                row[column] = default(self, table) if callable(default) else default
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.tables[table].append(row)
+        return row
+
+
+class FakeRpc:
+    def __init__(self, client: FakeSupabase, name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = copy.deepcopy(params)
+
+    def execute(self) -> FakeResponse:
+        self._client.calls.append(("rpc", self._name))
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        if self._client.fail_tables.get(self._name):
+            raise RuntimeError(self._client.fail_tables[self._name])
+        with self._client.lock:
+            return FakeResponse(FUNCTIONS[self._name](self._client, self._params))
+
+
+def _next_id(client: FakeSupabase, table: str) -> int:
+    """bigserial: starts past any id already in the table and is never reused."""
+    last = client.sequences.get(table)
+    if last is None:
+        last = max((row["id"] for row in client.tables[table]), default=0)
+    client.sequences[table] = last + 1
+    return last + 1
+
+
+def _epoch() -> str:
+    return datetime(1970, 1, 1, tzinfo=timezone.utc).isoformat()
+
+
+# Column defaults from the migrations, for tables whose code relies on them
+TABLE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "event_outbox": {
+        "id": _next_id,  # bigserial
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": lambda client, table: datetime.now(timezone.utc).isoformat(),
+        "locked_until": lambda client, table: _epoch(),
+        "last_error": None,
+        "published_at": None,
+    },
+    "care_circle_notifications": {
+        "id": _next_id,  # bigserial
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": lambda client, table: datetime.now(timezone.utc).isoformat(),
+        "locked_until": lambda client, table: _epoch(),
+        "last_error": None,
+        "sent_at": None,
+    },
+}
+
+
+def _ingest_report(client: FakeSupabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    """ingest_report() from migrations/004_event_outbox.sql, as replaced by 008 and 010."""
+    report = dict(params["p_report"], updated_at=datetime.now(timezone.utc).isoformat())
+    existing = next((r for r in client.tables["reports"] if r.get("file_id") == report["file_id"]), None)
+    if existing is not None:
+        existing.update(report)
+        stored = copy.deepcopy(existing)
+    else:
+        stored = client._insert("reports", report)
+
+    if existing is not None:
+        client.tables["biomarkers"] = [b for b in client.tables["biomarkers"] if b.get("report_id") != stored["id"]]
+    # params were already copied by FakeRpc and biomarker rows are flat, so shallow copies do
+    biomarkers = [dict(client._append("biomarkers", dict(b, report_id=stored["id"])))
+                  for b in params.get("p_biomarkers") or []]
+
+    stored_ids = {e["event_id"] for e in client.tables["event_outbox"]}
+    for event in params.get("p_events") or []:
+        # migrations/010_deterministic_event_ids.sql: on conflict (event_id) do nothing
+        if event["event_id"] in stored_ids:
+            continue
+        stored_ids.add(event["event_id"])
+        client._append("event_outbox", {
+            "event_id": event["event_id"],
+            "event_type": event["event_type"],
+            "patient_id": stored["patient_id"],
+            "payload": dict(event["payload"], report_id=stored["id"]),
+        })
+
+    # migrations/008_latest_biomarkers_upsert.sql: a failure is a warning, not an error
+    if not client.fail_tables.get("patient_latest_biomarkers"):
+        _upsert_latest_biomarkers(client, {"p_report_id": stored["id"]}, biomarkers)
+    return {"report": stored, "biomarkers": biomarkers}
+
+
+def _upsert_latest_biomarkers(client: FakeSupabase, params: Dict[str, Any],
+                              biomarkers: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    upsert_latest_biomarkers() from migrations/008_latest_biomarkers_upsert.sql.
+    ingest_report() passes the report's biomarkers, which the database finds by index.
+    """
+    from app.services.latest_biomarker_service import latest_rows, recency
+
+    report = next((r for r in client.tables["reports"] if str(r["id"]) == str(params["p_report_id"])), None)
+    if report is None or not report.get("patient_id"):
+        return 0
+    patient_id = str(report["patient_id"])
+    table = client.tables["patient_latest_biomarkers"]
+    if biomarkers is None:
+        biomarkers = [b for b in client.tables["biomarkers"] if b.get("report_id") == report["id"]]
+    rows = latest_rows(report, biomarkers)
+    names = {row["name"] for row in rows}
+
+    dropped = {r["name"] for r in table
+               if str(r["patient_id"]) == patient_id and str(r["report_id"]) == str(report["id"]) and r["name"] not in names}
+    if dropped:
+        table[:] = [r for r in table if not (str(r["patient_id"]) == patient_id and r["name"] in dropped)]
+        reports = {r["id"]: r for r in client.tables["reports"] if str(r.get("patient_id")) == patient_id}
+        fallback: Dict[str, Dict[str, Any]] = {}
+        for biomarker in client.tables["biomarkers"]:
+            if biomarker.get("report_id") not in reports or biomarker.get("name") not in dropped:
+                continue
+            for row in latest_rows(reports[biomarker["report_id"]], [biomarker]):
+                if row["name"] not in fallback or recency(row) > recency(fallback[row["name"]]):
+                    fallback[row["name"]] = row
+        table.extend(fallback.values())
+
+    current_rows = {r["name"]: r for r in table if str(r["patient_id"]) == patient_id}
+    now = datetime.now(timezone.utc).isoformat()
+    updated = 0
+    for row in rows:
+        current = current_rows.get(row["name"])
+        if current is None:
+            table.append(dict(row, updated_at=now))
+        elif str(current["report_id"]) == str(row["report_id"]) or recency(row) >= recency(current):
+            current.update(row, updated_at=now)
+        else:
+            continue
+        updated += 1
+    return updated
+
+
+def _rebuild_latest_biomarkers(client: FakeSupabase, params: Dict[str, Any]) -> Dict[str, int]:
+    """rebuild_latest_biomarkers() from migrations/011_rebuild_latest_biomarkers.sql."""
+    from app.services.latest_biomarker_service import latest_rows, recency
+
+    patient_id = str(params["p_patient_id"])
+    table = client.tables["patient_latest_biomarkers"]
+    reports = {str(r["id"]): r for r in client.tables["reports"] if str(r.get("patient_id")) == patient_id}
+    by_report: Dict[str, List[Dict[str, Any]]] = {}
+    for biomarker in client.tables["biomarkers"]:
+        if str(biomarker.get("report_id")) in reports:
+            by_report.setdefault(str(biomarker["report_id"]), []).append(biomarker)
+    current = {(report_id, row["name"]): row
+               for report_id, biomarkers in by_report.items()
+               for row in latest_rows(reports[report_id], biomarkers)}
+
+    mine = [r for r in table if str(r["patient_id"]) == patient_id]
+    dropped = {r["name"] for r in mine if (str(r["report_id"]), r["name"]) not in current}
+    table[:] = [r for r in table
+                if str(r["patient_id"]) != patient_id or (str(r["report_id"]), r["name"]) in current]
+    for row in table:
+        fresh = current.get((str(row["report_id"]), row["name"])) if str(row["patient_id"]) == patient_id else None
+        if fresh is not None:
+            row.update(sample_collected_at=fresh["sample_collected_at"], report_created_at=fresh["report_created_at"])
+
+    best: Dict[str, Dict[str, Any]] = {}
+    for row in current.values():
+        if row["name"] not in best or recency(row) > recency(best[row["name"]]):
+            best[row["name"]] = row
+    stored = {r["name"]: r for r in table if str(r["patient_id"]) == patient_id}
+    now = datetime.now(timezone.utc).isoformat()
+    for name, row in best.items():
+        existing = stored.get(name)
+        if existing is None:
+            table.append(dict(row, updated_at=now))
+        elif str(existing["report_id"]) == str(row["report_id"]) or recency(row) >= recency(existing):
+            existing.update(row, updated_at=now)
+    return {"count": len(best), "removed": len(dropped - set(best))}
+
+
+FUNCTIONS = {
+    "ingest_report": _ingest_report,
+    "upsert_latest_biomarkers": _upsert_latest_biomarkers,
+    "rebuild_latest_biomarkers": _rebuild_latest_biomarkers,
+}
+
+
+def _biomarker_export_rows(client: FakeSupabase) -> List[Dict[str, Any]]:
+    """biomarker_export_rows from migrations/007_biomarker_export.sql."""
+    reports = {str(r["id"]): r for r in client.tables["reports"]}
+    patients = {str(p["id"]): p for p in client.tables["patients"]}
+    rows = []
+    for biomarker in client.tables["biomarkers"]:
+        report = reports.get(str(biomarker.get("report_id")))
+        patient = patients.get(str(report.get("patient_id"))) if report else None
+        if patient is None:
+            continue
+        rows.append({
+            **{k: biomarker.get(k) for k in ("id", "report_id", "name", "value", "unit", "ref_min", "ref_max", "flag", "created_at")},
+            "patient_id": report["patient_id"],
+            "report_type": report.get("report_type"),
+            "sample_collected_at": report.get("sample_collected_at"),
+            "report_created_at": report.get("created_at"),
+            "nic": patient.get("nic"),
+        })
+    return rows
+
+
+# Views, computed from the tables on every select
+VIEWS = {"biomarker_export_rows": _biomarker_export_rows}
+
+
+def _as_list(payload):
+    return payload if isinstance(payload, list) else [payload]
+
+
+def _cmp(value):
+    return str(value) if isinstance(value, uuid.UUID) else value
+
+
+def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+    row = copy.deepcopy(row)
+    if not columns or columns.strip() == "*":
+        return row
+    wanted = [c.strip() for c in columns.split(",")]
+    if "*" in wanted:
+        return row
+    return {c: row.get(c) for c in wanted if "(" not in c}
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    # health_metrics declares postgresql.UUID columns; SQLite stores them as text
+    return "CHAR(32)"
+
+
+class SQLiteDatabase:
+    """In-memory SQLite database with the tables of the given models; one connection (StaticPool) for every thread."""
+
+    def __init__(self, *models):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        for model in models:
+            model.__table__.create(self.engine)
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    def session(self):
+        return self.SessionLocal()
+
+    def install(self, monkeypatch) -> None:
+        """Point app.core.database (engine, SessionLocal) at this database for the test."""
+        from app.core import database
+
+        monkeypatch.setattr(database, "engine", self.engine)
+        monkeypatch.setattr(database, "SessionLocal", self.SessionLocal)
+
+
+class FaultInjectingClient:
+    """
+    Client whose `call()` raises the queued faults in order, then succeeds.
+
+    `faults` items are exception instances (raised) or floats (seconds of
+    simulated latency before succeeding). Tracks peak concurrency.
+    """
+
+    def __init__(self, faults=None, latency: float = 0.0):
+        self.faults = list(faults or [])
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def call(self, value=None):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            fault = self.faults.pop(0) if self.faults else None
+        try:
+            if isinstance(fault, BaseException):
+                raise fault
+            delay = fault if isinstance(fault, (int, float)) else self.latency
+            if delay:
+                time.sleep(delay)
+            return value
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class FakeSigner:
+    """Produces deterministic HMAC-signed URLs in place of service-account V4 signing."""
+
+    def __init__(self, secret: bytes = b"fake-signing-key", host: str = "https://storage.example.test"):
+        self.secret = secret
+        self.host = host
+        self.signed = []
+
+    def sign(self, bucket: str, name: str, method: str, expiration, headers=None, content_type=None, **kwargs) -> str:
+        import hashlib
+        import hmac
+        from urllib.parse import quote
+
+        expires = int(expiration.total_seconds()) if hasattr(expiration, "total_seconds") else int(expiration)
+        payload = f"{method}\n{bucket}/{name}\n{expires}\n{content_type or ''}\n{sorted((headers or {}).items())}"
+        signature = hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+        self.signed.append({"bucket": bucket, "name": name, "method": method, "expires": expires,
+                            "headers": headers or {}, "content_type": content_type, **kwargs})
+        return (
+            f"{self.host}/{bucket}/{quote(name)}?X-Goog-Algorithm=GOOG4-HMAC-SHA256"
+            f"&X-Goog-Expires={expires}&X-Goog-Signature={signature}"
+        )
+
+
+class FakeBlob:
+    """In-memory stand-in for google.cloud.storage.Blob."""
+
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+        self.content_type = None
+        self.cache_control = None
+        self._stored = None
+
+    def _record(self):
+        return self.bucket.objects.get(self.name)
+
+    def _load(self, record):
+        self.metadata = dict(record["metadata"]) if record["metadata"] else None
+        self.content_type = record["content_type"]
+        self.cache_control = record["cache_control"]
+        self._stored = record
+
+    def __getattr__(self, name):
+        if name in ("size", "generation", "metageneration", "updated", "time_created", "etag", "md5_hash"):
+            record = self.__dict__.get("_stored")
+            return record[name] if record else None
+        raise AttributeError(name)
+
+    def _write(self, data: bytes, content_type=None, if_generation_match=None):
+        from google.api_core import exceptions as gexc
+
+        existing = self._record()
+        if if_generation_match is not None:
+            current = existing["generation"] if existing else 0
+            if current != if_generation_match:
+                raise gexc.PreconditionFailed(f"generation mismatch for {self.name}")
+        self.bucket.generation_counter += 1
+        now = datetime.now(timezone.utc)
+        record = {
+            "data": data,
+            "size": len(data),
+            "content_type": content_type or self.content_type,
+            "cache_control": self.cache_control,
+            "metadata": dict(self.metadata) if self.metadata else None,
+            "generation": self.bucket.generation_counter,
+            "metageneration": 1,
+            "updated": now,
+            "time_created": existing["time_created"] if existing else now,
+            "etag": uuid.uuid4().hex,
+            "md5_hash": None,
+        }
+        self.bucket.objects[self.name] = record
+        self._load(record)
+
+    def _network_delay(self):
+        if self.bucket.latency:
+            time.sleep(self.bucket.latency)
+
+    def _require(self):
+        from google.api_core import exceptions as gexc
+
+        record = self._record()
+        if record is None:
+            raise gexc.NotFound(f"No such object: {self.bucket.name}/{self.name}")
+        return record
+
+    # ----- network methods -----
+
+    def exists(self, **kwargs) -> bool:
+        self.bucket.calls.append(("exists", self.name))
+        return self._record() is not None
+
+    def reload(self, **kwargs):
+        self.bucket.calls.append(("reload", self.name))
+        self._load(self._require())
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None, **kwargs):
+        self.bucket.calls.append(("upload", self.name))
+        self._network_delay()
+        self._write(data.encode() if isinstance(data, str) else bytes(data), content_type, if_generation_match)
+
+    def upload_from_filename(self, filename, content_type=None, if_generation_match=None, **kwargs):
+        self.bucket.calls.append(("upload", self.name))
+        self._network_delay()
+        with open(filename, "rb") as f:
+            self._write(f.read(), content_type, if_generation_match)
+
+    def download_as_bytes(self, if_generation_not_match=None, **kwargs) -> bytes:
+        from google.api_core import exceptions as gexc
+
+        self.bucket.calls.append(("download", self.name))
+        self._network_delay()
+        record = self._require()
+        if if_generation_not_match is not None and record["generation"] == if_generation_not_match:
+            raise gexc.NotModified(f"{self.name} not modified")
+        self._load(record)  # like the real client, a download fills in generation etc.
+        return record["data"]
+
+    download_as_string = download_as_bytes
+
+    def download_as_text(self, **kwargs) -> str:
+        return self.download_as_bytes().decode()
+
+    def delete(self, **kwargs):
+        self.bucket.calls.append(("delete", self.name))
+        self._require()
+        del self.bucket.objects[self.name]
+
+    def patch(self, if_metageneration_match=None, **kwargs):
+        from google.api_core import exceptions as gexc
+
+        self.bucket.calls.append(("patch", self.name))
+        record = self._require()
+        if if_metageneration_match is not None and record["metageneration"] != if_metageneration_match:
+            raise gexc.PreconditionFailed(f"metageneration mismatch for {self.name}")
+        record["metadata"] = dict(self.metadata) if self.metadata else None
+        record["content_type"] = self.content_type or record["content_type"]
+        record["cache_control"] = self.cache_control
+        record["metageneration"] += 1
+        self._load(record)
+
+    # ----- local methods -----
+
+    def generate_signed_url(self, expiration=None, method="GET", version="v4", headers=None, content_type=None, **kwargs):
+        if self.bucket.signer is None:
+            raise AttributeError("you need a private key to sign credentials")
+        return self.bucket.signer.sign(self.bucket.name, self.name, method, expiration,
+                                       headers=headers, content_type=content_type, **kwargs)
+
+
+class FakeBucket:
+    """In-memory stand-in for google.cloud.storage.Bucket."""
+
+    def __init__(self, name: str = "test-bucket", signer: Optional[FakeSigner] = None, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.signer = signer if signer is not None else FakeSigner()
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.generation_counter = 0
+        self.calls: List[tuple] = []
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str, **kwargs) -> Optional[FakeBlob]:
+        self.calls.append(("get_blob", name))
+        record = self.objects.get(name)
+        if record is None:
+            return None
+        blob = FakeBlob(self, name)
+        blob._load(record)
+        return blob
+
+    def list_blobs(self, prefix: str = "", **kwargs):
+        self.calls.append(("list", prefix))
+        return iter([self.get_blob(name) for name in sorted(self.objects) if name.startswith(prefix)])
+
+    def put(self, name: str, data, content_type: str = "application/octet-stream", metadata=None) -> FakeBlob:
+        """Seed an object without recording a call."""
+        blob = FakeBlob(self, name)
+        blob.metadata = metadata
+        blob._write(data.encode() if isinstance(data, str) else bytes(data), content_type)
+        return blob
+
+
+class FakeStorageClient:
+    def __init__(self, bucket: Optional[FakeBucket] = None):
+        self.buckets: Dict[str, FakeBucket] = {}
+        if bucket is not None:
+            self.buckets[bucket.name] = bucket
+
+    def bucket(self, name: str) -> FakeBucket:
+        if name not in self.buckets:
+            self.buckets[name] = FakeBucket(name)
+        return self.buckets[name]
@@ -0,0 +1,186 @@
+"""
+Test script for the incremental Parquet export of biomarkers: NIC demographics,
+the partitioned dataset, watermarks across runs and recovery from runs that
+did not finish. Supabase is replaced by tests/fakes.py; files go to tmp_path.
+"""
+
+import sys
+import os
+import hashlib
+from datetime import date, datetime, timezone
+
+import pytest
+import pyarrow.dataset as ds
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import analytics_export
+from app.services.analytics_export import export_biomarkers, pseudonym
+from app.utils.nic import parse_nic
+from tests.fakes import FakeSupabase
+
+PATIENT_A = "11111111-1111-1111-1111-111111111111"  # man born 14 March 1985
+PATIENT_B = "22222222-2222-2222-2222-222222222222"  # woman born 2 February 1962
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+KEY = "test-analytics-export-key"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(analytics_export, "supabase", db)
+    monkeypatch.setattr(analytics_export, "ANALYTICS_EXPORT_KEY", KEY)
+    db.tables["patients"] = [
+        {"id": PATIENT_A, "full_name": "Nimal Perera", "nic": "198507400937"},
+        {"id": PATIENT_B, "full_name": "Kamala Silva", "nic": "625330937V"},
+    ]
+    return db
+
+
+def add_report(db, report_id, patient_id, report_type, sample_collected_at, created_at, biomarkers):
+    db.tables["reports"].append({"id": report_id, "patient_id": patient_id, "report_type": report_type,
+                                 "sample_collected_at": sample_collected_at, "created_at": created_at})
+    for i, (name, value) in enumerate(biomarkers):
+        db.tables["biomarkers"].append({"id": f"{report_id}-{i:02d}", "report_id": report_id, "name": name,
+                                        "value": value, "unit": "mg/dL", "ref_min": 70, "ref_max": 100,
+                                        "flag": "High" if value > 100 else None, "created_at": created_at})
+
+
+def read(root):
+    return ds.dataset(str(root), format="parquet", partitioning="hive").to_table().to_pandas()
+
+
+def ids(frame):
+    """report id-biomarker name of each exported row, recovered from the report_key pseudonyms."""
+    reports = {pseudonym(f"r{i}", KEY): f"r{i}" for i in range(1, 10)}
+    return [f"{reports[key]}-{name}" for key, name in zip(frame["report_key"], frame["name"])]
+
+
+def test_parse_nic():
+    assert parse_nic("198507400937") == {"birth_date": date(1985, 3, 14), "sex": "M"}
+    assert parse_nic("625330937V") == {"birth_date": date(1962, 2, 2), "sex": "F"}
+    assert parse_nic("200006000937")["birth_date"] == date(2000, 2, 29)
+    assert parse_nic("199906000937") is None  # 29 February 1999
+    assert parse_nic("199937000937") is None
+    assert parse_nic("12345") is None and parse_nic(None) is None
+
+
+def test_export_is_partitioned_and_de_identified(db, tmp_path):
+    add_report(db, "r1", PATIENT_A, "FBS", "2024-03-13T08:00:00+00:00", "2024-03-14T09:00:00+00:00", [("FBS", 131)])
+    add_report(db, "r2", PATIENT_A, "Lipid", "2024-03-14T08:00:00+00:00", "2024-03-14T10:00:00+00:00",
+               [("LDL", 170), ("HDL", 52)])
+    add_report(db, "r3", PATIENT_B, "FBS", "2023-12-30T08:00:00+00:00", "2024-01-02T09:00:00+00:00", [("FBS", 95)])
+
+    result = export_biomarkers(str(tmp_path), now=NOW)
+    assert result["success"] and result["data"]["rows"] == 4
+    assert sorted(result["data"]["files"]) == [
+        os.path.join("report_type=FBS", "year=2023", f"part-{result['data']['run_id']}-0000.parquet"),
+        os.path.join("report_type=FBS", "year=2024", f"part-{result['data']['run_id']}-0000.parquet"),
+        os.path.join("report_type=Lipid", "year=2024", f"part-{result['data']['run_id']}-0000.parquet"),
+    ]
+
+    frame = read(tmp_path)
+    for column in ("nic", "full_name", "patient_id", "report_id", "biomarker_id", "id"):
+        assert column not in frame
+    rows = dict(zip(ids(frame), frame.to_dict("records")))
+    assert rows["r1-FBS"]["age_at_sample"] == 38 and rows["r1-FBS"]["age_band"] == "30-39"  # day before the birthday
+    assert rows["r2-LDL"]["age_at_sample"] == 39 and rows["r2-LDL"]["sex"] == "M"
+    assert rows["r3-FBS"]["age_at_sample"] == 61 and rows["r3-FBS"]["age_band"] == "60-69" and rows["r3-FBS"]["sex"] == "F"
+    assert rows["r2-HDL"]["patient_key"] == rows["r1-FBS"]["patient_key"] == pseudonym(PATIENT_A, KEY)
+    assert rows["r2-HDL"]["report_key"] == rows["r2-LDL"]["report_key"] != rows["r1-FBS"]["report_key"]
+    assert str(rows["r3-FBS"]["year"]) == "2023" and rows["r2-LDL"]["value"] == 170.0
+    # sorted by name within a file
+    lipid = ds.dataset(str(tmp_path / "report_type=Lipid"), format="parquet").to_table().to_pandas()
+    assert list(lipid["name"]) == ["HDL", "LDL"]
+
+
+def test_second_run_exports_only_new_rows(db, tmp_path):
+    add_report(db, "r1", PATIENT_A, "FBS", None, "2024-05-01T09:00:00+00:00", [("FBS", 131)])
+    first = export_biomarkers(str(tmp_path), now=NOW)["data"]
+    assert first["watermark"] == {"created_at": "2024-05-01T09:00:00+00:00", "id": "r1-00"}
+
+    assert export_biomarkers(str(tmp_path), now=NOW)["data"]["rows"] == 0
+
+    add_report(db, "r2", PATIENT_B, "FBS", None, "2024-05-02T09:00:00+00:00", [("FBS", 88), ("HbA1c", 5.1)])
+    second = export_biomarkers(str(tmp_path), now=NOW)["data"]
+    assert second["rows"] == 2 and second["run_id"] != first["run_id"]
+    assert sorted(ids(read(tmp_path))) == ["r1-FBS", "r2-FBS", "r2-HbA1c"]
+
+
+def test_rows_sharing_a_timestamp_span_pages_and_runs(db, tmp_path):
+    biomarkers = [(f"B{i:02d}", i) for i in range(7)]
+    add_report(db, "r1", PATIENT_A, "FBC", None, "2024-05-01T09:00:00+00:00", biomarkers)
+    add_report(db, "r2", PATIENT_A, "FBC", None, "2024-05-01T09:00:00+00:00", biomarkers)
+    add_report(db, "r3", PATIENT_A, "FBC", None, "2024-05-01T09:05:00+00:00", biomarkers)
+
+    assert export_biomarkers(str(tmp_path), page_size=3, now=NOW)["data"]["rows"] == 21
+    frame = read(tmp_path)
+    assert len(frame) == 21 and len(set(ids(frame))) == 21
+
+    add_report(db, "r4", PATIENT_A, "FBC", None, "2024-05-01T09:05:00+00:00", biomarkers)  # same time as r3, later id
+    assert export_biomarkers(str(tmp_path), page_size=3, now=NOW)["data"]["rows"] == 7
+    assert len(read(tmp_path)) == 28
+
+
+def test_recent_rows_wait_for_the_lag(db, tmp_path):
+    add_report(db, "r1", PATIENT_A, "FBS", None, "2024-06-01T11:58:00+00:00", [("FBS", 131)])
+    add_report(db, "r2", PATIENT_A, "FBS", None, "2024-06-01T11:59:30+00:00", [("FBS", 99)])
+
+    assert export_biomarkers(str(tmp_path), lag_seconds=60, now=NOW)["data"]["rows"] == 1
+    assert export_biomarkers(str(tmp_path), lag_seconds=0, now=NOW)["data"]["rows"] == 1
+
+
+def test_unfinished_run_is_cleaned_up_and_exported_again(db, tmp_path, monkeypatch):
+    add_report(db, "r1", PATIENT_A, "FBS", None, "2024-05-01T09:00:00+00:00", [("FBS", 131)])
+    add_report(db, "r2", PATIENT_A, "Lipid", None, "2024-05-02T09:00:00+00:00", [("LDL", 170)])
+
+    real_write = analytics_export.write_files
+
+    def crash_on_second_flush(frame, root, run_id, sequence):
+        if sequence == 1:
+            raise OSError("disk full")
+        return real_write(frame, root, run_id, sequence)
+
+    monkeypatch.setattr(analytics_export, "write_files", crash_on_second_flush)
+    failed = export_biomarkers(str(tmp_path), page_size=1, rows_per_file=1, now=NOW)
+    assert failed == {"success": False, "error": "disk full"}
+    assert len(read(tmp_path)) == 1  # the first flush made it to disk
+
+    monkeypatch.setattr(analytics_export, "write_files", real_write)
+    assert export_biomarkers(str(tmp_path), now=NOW)["data"]["rows"] == 2
+    assert sorted(ids(read(tmp_path))) == ["r1-FBS", "r2-LDL"]
+
+
+def test_full_export_starts_again(db, tmp_path):
+    add_report(db, "r1", PATIENT_A, "FBS", None, "2024-05-01T09:00:00+00:00", [("FBS", 131)])
+    export_biomarkers(str(tmp_path), now=NOW)
+    add_report(db, "r2", PATIENT_B, "FBS", None, "2024-05-02T09:00:00+00:00", [("FBS", 88)])
+    export_biomarkers(str(tmp_path), now=NOW)
+
+    rebuilt = export_biomarkers(str(tmp_path), full=True, now=NOW)["data"]
+    assert rebuilt["rows"] == 2 and len(rebuilt["files"]) == 1
+    assert sorted(ids(read(tmp_path))) == ["r1-FBS", "r2-FBS"]
+
+
+
+def test_pseudonyms_need_the_export_key(db, tmp_path, monkeypatch):
+    add_report(db, "r1", PATIENT_A, "FBS", None, "2024-05-01T09:00:00+00:00", [("FBS", 131)])
+    export_biomarkers(str(tmp_path), now=NOW)
+    key = read(tmp_path)["patient_key"][0]
+    assert key != hashlib.sha256(PATIENT_A.encode()).hexdigest()[:len(key)]  # not an unsalted hash of the id
+    assert key != pseudonym(PATIENT_A, "another-key")
+
+    # A different key would give the same patients new keys: only a full export may change it
+    changed = export_biomarkers(str(tmp_path), now=NOW, key="another-key")
+    assert not changed["success"] and "full" in changed["error"]
+    assert export_biomarkers(str(tmp_path), full=True, now=NOW, key="another-key")["data"]["rows"] == 1
+    assert read(tmp_path)["patient_key"][0] == pseudonym(PATIENT_A, "another-key")
+
+    monkeypatch.setattr(analytics_export, "ANALYTICS_EXPORT_KEY", None)
+    assert export_biomarkers(str(tmp_path / "new"), now=NOW) == {"success": False, "error": "ANALYTICS_EXPORT_KEY is not set"}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
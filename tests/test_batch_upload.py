@@ -0,0 +1,127 @@
+"""
+Test script for batch report uploads (multipart sets and ZIP archives).
+Runs against the in-memory Supabase and GCS fakes.
+"""
+
+import sys
+import os
+import io
+import json
+import asyncio
+import zipfile
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+
+from app.core import cloud
+from app.services import patientService, upload_service, batch_upload_service
+from app.services.batch_upload_service import items_from_zip, ingest_batch, batch_item, BatchError
+from app.api.v1.endpoints import reports
+from tests.fakes import FakeSupabase, FakeBucket, FakeStorageClient
+
+PDF = b"%PDF-1.7 test"
+NICS = ["199512345678", "200012345678"]
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    db = FakeSupabase()
+    for i, nic in enumerate(NICS):
+        db.tables["patients"].append({"id": f"patient-{i}", "nic": nic, "full_name": f"Patient {i}"})
+    bucket = FakeBucket("test-bucket")
+    monkeypatch.setattr(patientService, "supabase", db)
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+    return db, bucket
+
+
+def make_zip(files, manifest=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+        if manifest is not None:
+            archive.writestr("manifest.json", json.dumps(manifest))
+    buffer.seek(0)
+    return buffer
+
+
+def test_zip_nics_from_manifest_and_folders():
+    archive = make_zip(
+        {"a.pdf": PDF, f"{NICS[1]}/b.pdf": PDF, "__MACOSX/._a.pdf": b"", "notes.txt": b"x"},
+        manifest={"a.pdf": NICS[0]},
+    )
+    items = items_from_zip(archive)
+
+    assert [(i["filename"], i["nic"]) for i in items] == [("a.pdf", NICS[0]), (f"{NICS[1]}/b.pdf", NICS[1])]
+    assert items[0]["read"]() == PDF
+
+
+def test_zip_limits(monkeypatch):
+    monkeypatch.setattr(batch_upload_service, "BATCH_MAX_FILES", 1)
+    with pytest.raises(BatchError):
+        items_from_zip(make_zip({"a.pdf": PDF, "b.pdf": PDF}))
+    with pytest.raises(BatchError):
+        items_from_zip(io.BytesIO(b"not a zip"))
+
+
+def test_ingest_batch_statuses_and_single_lookup(backends):
+    db, bucket = backends
+    items = [
+        batch_item("ok1.pdf", NICS[0], lambda: PDF),
+        batch_item("ok2.pdf", NICS[1], lambda: PDF),
+        batch_item("unknown.pdf", "000000000V", lambda: PDF),
+        batch_item("image.pdf", NICS[0], lambda: b"GIF89a"),
+        batch_item("no-nic.pdf", None, lambda: PDF),
+    ]
+    result = ingest_batch(items, concurrency=4)
+
+    assert [f["status"] for f in result["files"]] == ["queued", "queued", "rejected", "rejected", "rejected"]
+    assert [call for call in db.calls if call[0] == "patients"] == [("patients", "select")]
+    assert len(result["jobs"]) == 2
+    for job in result["jobs"]:
+        path = f"users/{job['nic']}/reports/{job['file_id']}.pdf"
+        assert bucket.objects[path]["data"] == PDF
+        assert bucket.objects[path]["metadata"] == {"ocr_status": "queued"}
+
+
+def test_batch_endpoint_enqueues_one_job(backends):
+    files = [UploadFile(io.BytesIO(PDF), filename=f"{i}.pdf") for i in range(3)]
+    tasks = BackgroundTasks()
+
+    response = asyncio.run(reports.upload_report_batch(files, [NICS[0]], None, tasks))
+
+    assert response["total"] == 3 and response["queued"] == 3
+    assert len(tasks.tasks) == 1
+    assert tasks.tasks[0].func is reports.process_batch_worker
+    assert len(tasks.tasks[0].args[1]) == 3
+
+
+def test_batch_endpoint_rejects_mismatched_nics(backends):
+    files = [UploadFile(io.BytesIO(PDF), filename=f"{i}.pdf") for i in range(3)]
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.upload_report_batch(files, NICS, None, BackgroundTasks()))
+    assert exc.value.status_code == 400
+
+
+def test_batch_endpoint_maps_error_kinds(backends, monkeypatch):
+    db, _ = backends
+    files = [UploadFile(io.BytesIO(PDF), filename=f"{i}.pdf") for i in range(3)]
+    monkeypatch.setattr(batch_upload_service, "BATCH_MAX_FILES", 2)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.upload_report_batch(files, [NICS[0]], None, BackgroundTasks()))
+    assert exc.value.status_code == 400
+
+    monkeypatch.setattr(batch_upload_service, "BATCH_MAX_FILES", 10)
+    db.fail_tables["patients"] = "connection reset"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.upload_report_batch(files, [NICS[0]], None, BackgroundTasks()))
+    assert exc.value.status_code == 500
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,176 @@
+"""
+Test script for the patient dashboard: concurrent section loading, the per-patient
+cache and its invalidation on writes. Supabase is replaced by tests/fakes.py and
+health metrics use an in-memory SQLite database; no network access.
+"""
+
+import sys
+import os
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fakes import FakeSupabase, SQLiteDatabase
+from app.core.cache import MISS, TTLCache
+from app.models.health_metric import HealthMetric
+from app.repo.health_metric_repo import HealthMetricRepo
+from app.schemas.medication import MedicationCreate
+from app.schemas.patient import PatientUpdate
+from app.services import careCircleService, dashboard_service, medicationService, patientService, reportService
+from app.services.dashboard_cache import DASHBOARD_CACHE, invalidate_dashboard_after_commit
+from app.services.dashboard_service import get_dashboard
+from app.utils.biomarker_flags import is_abnormal
+from app.api.v1.endpoints import patient as patient_endpoints
+
+PATIENT_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    db.tables["patients"] = [{"id": PATIENT_ID, "full_name": "Jane Doe", "email": "jane@example.com", "nic": "199512345678"}]
+    db.tables["reports"] = [
+        {"id": "r1", "patient_id": PATIENT_ID, "file_id": "f1", "report_type": "FBC", "created_at": "2024-05-01T10:00:00+00:00"},
+        {"id": "r2", "patient_id": PATIENT_ID, "file_id": "f2", "report_type": "Lipid", "created_at": "2024-06-01T10:00:00+00:00"},
+    ]
+    db.tables["biomarkers"] = [
+        {"id": "b1", "report_id": "r1", "name": "WBC", "value": 11.2, "ref_min": 4.0, "ref_max": 10.0, "flag": None},
+        {"id": "b2", "report_id": "r1", "name": "RBC", "value": 4.8, "ref_min": 4.5, "ref_max": 5.5, "flag": None},
+        {"id": "b3", "report_id": "r2", "name": "LDL", "value": 170, "ref_min": None, "ref_max": None, "flag": "High"},
+    ]
+    db.tables["medications"] = [{"id": "m1", "patient_id": PATIENT_ID, "name": "Metformin", "created_at": "2024-01-01"}]
+    db.tables["care_circle_members"] = [{"id": "c1", "patient_id": PATIENT_ID, "name": "John", "email": "john@example.com",
+                                         "created_at": "2024-01-01"}]
+    for module in (patientService, reportService, medicationService, careCircleService):
+        monkeypatch.setattr(module, "supabase", db)
+    monkeypatch.setitem(dashboard_service.LOADERS, "health_metrics", lambda patient_id: {"success": True, "data": []})
+    DASHBOARD_CACHE.clear()
+    yield db
+    DASHBOARD_CACHE.clear()
+
+
+def test_dashboard_sections(db):
+    result = asyncio.run(get_dashboard(PATIENT_ID))
+    assert result["success"] and "errors" not in result
+
+    data = result["data"]
+    assert data["patient"]["full_name"] == "Jane Doe"
+    assert [r["id"] for r in data["reports"]] == ["r2", "r1"]
+    assert [b["name"] for b in data["reports"][0]["abnormal_biomarkers"]] == ["LDL"]
+    assert [b["name"] for b in data["reports"][1]["abnormal_biomarkers"]] == ["WBC"]
+    assert data["reports"][1]["biomarker_count"] == 2
+    assert [m["name"] for m in data["medications"]] == ["Metformin"]
+    assert [m["name"] for m in data["care_circle"]] == ["John"]
+    # Biomarkers of all reports come from one query
+    assert db.calls.count(("biomarkers", "select")) == 1
+
+
+def test_sections_load_concurrently(db):
+    db.latency = 0.1
+    started = time.perf_counter()
+    asyncio.run(get_dashboard(PATIENT_ID))
+    # patient, medications, care circle in parallel with reports + biomarkers (two sequential calls)
+    assert time.perf_counter() - started < 0.35
+
+
+def test_cached_until_a_write_invalidates(db):
+    asyncio.run(get_dashboard(PATIENT_ID))
+    calls = len(db.calls)
+    asyncio.run(get_dashboard(PATIENT_ID))
+    assert len(db.calls) == calls
+
+    medicationService.create_medication(MedicationCreate(patient_id=PATIENT_ID, name="Aspirin", dosage_mg=75, frequency_per_day=1))
+    calls = len(db.calls)
+    result = asyncio.run(get_dashboard(PATIENT_ID))
+    assert {m["name"] for m in result["data"]["medications"]} == {"Metformin", "Aspirin"}
+    assert db.calls[calls:] == [("medications", "select")]  # only the written section is reloaded
+
+    patientService.update_patient(PATIENT_ID, PatientUpdate(full_name="Jane Smith"))
+    careCircleService.delete_care_circle_member("c1")
+    reportService.delete_report("r1")
+    result = asyncio.run(get_dashboard(PATIENT_ID))
+    assert result["data"]["patient"]["full_name"] == "Jane Smith"
+    assert result["data"]["care_circle"] == []
+    assert [r["id"] for r in result["data"]["reports"]] == ["r2"]
+
+
+def test_failed_and_slow_sections_are_reported_not_cached(db, monkeypatch):
+    db.fail_tables["medications"] = "connection reset"
+    monkeypatch.setitem(dashboard_service.LOADERS, "care_circle", lambda patient_id: time.sleep(0.5))
+    result = asyncio.run(get_dashboard(PATIENT_ID, timeout=0.1))
+    assert result["success"]
+    assert result["data"]["medications"] is None and result["data"]["care_circle"] is None
+    assert result["errors"] == {"medications": "connection reset", "care_circle": "timed out after 0.1s"}
+    assert DASHBOARD_CACHE.get((PATIENT_ID, "medications")) is MISS
+
+
+def test_endpoint_404_for_unknown_patient(db):
+    unknown = "00000000-0000-0000-0000-000000000000"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(patient_endpoints.read_patient_dashboard(unknown, {"id": unknown}))
+    assert exc.value.status_code == 404
+
+
+def test_endpoint_only_serves_the_callers_dashboard(db):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(patient_endpoints.read_patient_dashboard(PATIENT_ID, {"id": str(uuid.uuid4())}))
+    assert exc.value.status_code == 403
+
+    result = asyncio.run(patient_endpoints.read_patient_dashboard(PATIENT_ID, {"id": PATIENT_ID}))
+    assert result["success"]
+
+
+def test_is_abnormal():
+    assert is_abnormal({"flag": "Low", "value": 1})
+    assert is_abnormal({"flag": None, "value": "3.9", "ref_min": "4.0"})
+    assert not is_abnormal({"flag": "Normal", "value": 5, "ref_min": 4, "ref_max": 10})
+    assert not is_abnormal({"flag": None, "value": None, "ref_max": 1})
+
+
+def test_ttl_cache_expiry_and_eviction():
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISS  # least recently used
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is MISS
+
+
+def test_latest_health_metric_per_name(monkeypatch):
+    metrics_db = SQLiteDatabase(HealthMetric)
+    session = metrics_db.session()
+    user_id = uuid.UUID(PATIENT_ID)
+    now = datetime.now(timezone.utc)
+    for name, value, age in (("Heart Rate", 72, 2), ("Heart Rate", 80, 1), ("Weight", 70, 3)):
+        session.add(HealthMetric(user_id=user_id, metric_name=name, value=value, unit="u", recorded_at=now - timedelta(days=age)))
+    session.add(HealthMetric(user_id=uuid.uuid4(), metric_name="Heart Rate", value=99, unit="u", recorded_at=now))
+    session.commit()
+
+    latest = HealthMetricRepo.get_latest_per_metric(session, user_id)
+    assert [(m.metric_name, m.value) for m in latest] == [("Heart Rate", 80), ("Weight", 70)]
+
+    metrics_db.install(monkeypatch)
+    result = dashboard_service.load_health_metrics(user_id)
+    assert result["success"] and [m["metric_name"] for m in result["data"]] == ["Heart Rate", "Weight"]
+
+    # Metric writes invalidate once their transaction commits
+    DASHBOARD_CACHE.set((PATIENT_ID, "health_metrics"), result)
+    HealthMetricRepo.delete(session, latest[0].id)
+    invalidate_dashboard_after_commit(session, user_id, "health_metrics")
+    assert DASHBOARD_CACHE.get((PATIENT_ID, "health_metrics")) is result
+    session.commit()
+    assert DASHBOARD_CACHE.get((PATIENT_ID, "health_metrics")) is MISS
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
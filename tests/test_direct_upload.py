@@ -0,0 +1,157 @@
+"""
+Test script for the direct-to-GCS upload flow.
+Uses the in-memory bucket and signer from tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+import json
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import BackgroundTasks, HTTPException
+from starlette.requests import Request
+
+from app.core import cloud
+from app.services import upload_service
+from app.api.v1.endpoints import reports
+from app.schemas.report import SignedUploadRequest, UploadFinalizeRequest
+from tests.fakes import FakeBlob, FakeBucket, FakeStorageClient
+
+NIC = "199512345678"
+PATIENT_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket("test-bucket")
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(reports, "GCS_NOTIFICATION_TOKEN", "secret")
+    monkeypatch.setattr(
+        reports, "get_patient_by_nic",
+        lambda nic: {"success": True, "data": {"id": PATIENT_ID, "nic": nic}} if nic == NIC
+        else {"success": False, "error": "Patient not found"},
+    )
+    return bucket
+
+
+def finalize(file_id, tasks):
+    return asyncio.run(reports.finalize_upload(UploadFinalizeRequest(nic=NIC), file_id, tasks))
+
+
+def notify(object_name, token="secret", tasks=None):
+    body = json.dumps({"message": {"attributes": {"eventType": "OBJECT_FINALIZE", "objectId": object_name}}}).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "headers": [], "query_string": b""}, receive)
+    return asyncio.run(reports.storage_notification(request, token, tasks or BackgroundTasks()))
+
+
+def test_signed_url_targets_report_path(bucket):
+    result = asyncio.run(reports.create_upload_url(SignedUploadRequest(nic=NIC)))
+
+    signed = bucket.signer.signed[-1]
+    assert signed["name"] == f"users/{NIC}/reports/{result['file_id']}.pdf"
+    assert signed["method"] == "POST"
+    assert signed["headers"]["x-goog-resumable"] == "start"
+    assert signed["headers"]["x-goog-if-generation-match"] == "0"
+    assert result["upload_url"].startswith("https://storage.example.test/test-bucket/")
+    assert result["headers"]["Content-Type"] == "application/pdf"
+    assert result["finalize_url"].endswith(f"/uploads/{result['file_id']}/finalize")
+
+
+def test_signed_url_requires_known_patient(bucket):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.create_upload_url(SignedUploadRequest(nic="000000000V")))
+    assert exc.value.status_code == 404
+
+
+def test_finalize_enqueues_once(bucket):
+    with pytest.raises(HTTPException) as exc:
+        finalize("missing", BackgroundTasks())
+    assert exc.value.status_code == 404
+
+    bucket.put(f"users/{NIC}/reports/abc.pdf", b"%PDF-1.7 ...", "application/pdf")
+
+    tasks = BackgroundTasks()
+    first = finalize("abc", tasks)
+    second = finalize("abc", tasks)
+
+    assert first["status"] == "processing"
+    assert second["status"] == "already_processing"
+    assert len(tasks.tasks) == 1
+    assert tasks.tasks[0].args[:4] == (f"gs://test-bucket/users/{NIC}/reports/abc.pdf", NIC, PATIENT_ID, "abc")
+    assert bucket.objects[f"users/{NIC}/reports/abc.pdf"]["metadata"]["ocr_status"] == "queued"
+
+
+def test_finalize_rejects_non_pdf(bucket):
+    bucket.put(f"users/{NIC}/reports/img.pdf", b"GIF89a", "image/gif")
+    with pytest.raises(HTTPException) as exc:
+        finalize("img", BackgroundTasks())
+    assert exc.value.status_code == 400
+
+
+def test_notification_enqueues_direct_uploads_only(bucket):
+    with pytest.raises(HTTPException) as exc:
+        notify(f"users/{NIC}/reports/x.pdf", token="wrong")
+    assert exc.value.status_code == 403
+    with pytest.raises(HTTPException) as exc:
+        notify(f"users/{NIC}/reports/x.pdf", token="sécret")
+    assert exc.value.status_code == 403
+
+    bucket.put(f"users/{NIC}/reports/direct.pdf", b"%PDF", "application/pdf")
+    bucket.put(f"users/{NIC}/reports/legacy.pdf", b"%PDF", "application/pdf", metadata={"ocr_status": "queued"})
+
+    tasks = BackgroundTasks()
+    assert notify(f"users/{NIC}/reports/direct.pdf", tasks=tasks)["status"] == "processing"
+    assert notify(f"users/{NIC}/reports/legacy.pdf", tasks=tasks)["status"] == "already_processing"
+    assert notify(f"users/{NIC}/processed/direct.json", tasks=tasks)["status"] == "ignored"
+    assert len(tasks.tasks) == 1
+
+
+def test_claim_survives_a_lost_patch_response(bucket, monkeypatch):
+    from google.api_core import exceptions as gexc
+
+    bucket.put(f"users/{NIC}/reports/lost.pdf", b"%PDF", "application/pdf")
+    applied = FakeBlob.patch
+
+    def patch_then_lose_response(self, if_metageneration_match=None, **kwargs):
+        # The first attempt lands; the library's retry then fails its precondition
+        applied(self, if_metageneration_match=if_metageneration_match, **kwargs)
+        raise gexc.PreconditionFailed("metageneration mismatch")
+
+    monkeypatch.setattr(FakeBlob, "patch", patch_then_lose_response)
+    result = upload_service.claim_uploaded_report(NIC, "lost")
+    assert result["claimed"] is True
+    assert result["status"] == "queued"
+
+
+def test_claim_lost_to_another_caller(bucket, monkeypatch):
+    from google.api_core import exceptions as gexc
+
+    path = f"users/{NIC}/reports/race.pdf"
+    bucket.put(path, b"%PDF", "application/pdf")
+    applied = FakeBlob.patch
+
+    def rival_claims_first(self, if_metageneration_match=None, **kwargs):
+        rival = bucket.blob(path)
+        rival.reload()
+        rival.metadata = {"ocr_status": "processing", "queued_at": "earlier"}
+        applied(rival)
+        raise gexc.PreconditionFailed("metageneration mismatch")
+
+    monkeypatch.setattr(FakeBlob, "patch", rival_claims_first)
+    result = upload_service.claim_uploaded_report(NIC, "race")
+    assert result["claimed"] is False
+    assert result["status"] == "processing"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,105 @@
+"""
+Test script for page-parallel Document AI processing.
+Checks PDF sharding, merged text offsets and bounded shard concurrency.
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from app.services import ocr_service
+from app.utils.pdf_utils import page_ranges, split_pdf, count_pages
+from app.utils.text_utils import extract_tables, extract_entities, extract_pages, get_text
+from benchmarks.synthetic_docai import build_document
+
+
+def make_pdf(pages):
+    with fitz.open() as pdf:
+        for number in range(1, pages + 1):
+            pdf.new_page().insert_text((72, 72), f"Page {number}")
+        return pdf.tobytes()
+
+
+def test_page_ranges():
+    assert page_ranges(25, 10) == [(1, 10), (11, 20), (21, 25)]
+    assert page_ranges(3, 10) == [(1, 3)]
+
+
+def test_split_pdf():
+    shards = split_pdf(make_pdf(25), 10)
+    assert [r for r, _ in shards] == [(1, 10), (11, 20), (21, 25)]
+    assert [count_pages(content) for _, content in shards] == [10, 10, 5]
+
+
+def test_merge_documents_rebases_offsets():
+    shards = [
+        build_document("fbc", pages=2, seed=1),
+        build_document("lipid", pages=1, rows_per_table=8, seed=2),
+        build_document("fbs", pages=3, seed=3),
+    ]
+    merged = ocr_service.merge_documents(shards)
+
+    assert merged.text == "".join(doc.text for doc in shards)
+    assert [page.page_number for page in merged.pages] == [1, 2, 3, 4, 5, 6]
+    assert extract_tables(merged) == [t for doc in shards for t in extract_tables(doc)]
+    assert extract_entities(merged) == [e for doc in shards for e in extract_entities(doc)]
+    assert extract_pages(merged) == [p for doc in shards for p in extract_pages(doc)]
+    assert get_text(merged.entities[-1], merged.text) == "Page 3 of 3 note 1"
+
+
+def test_shards_run_concurrently_with_bound(monkeypatch):
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    def fake_process(content):
+        with lock:
+            state["active"] += 1
+            state["calls"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return build_document("fbc", pages=count_pages(content), rows_per_table=2)
+
+    monkeypatch.setattr(ocr_service, "process_pdf_bytes_with_document_ai", fake_process)
+
+    document = ocr_service.process_pdf_in_shards(make_pdf(25), shard_pages=5, max_workers=3)
+
+    assert state["calls"] == 5
+    assert 1 < state["peak"] <= 3
+    assert [page.page_number for page in document.pages] == list(range(1, 26))
+    assert len(extract_tables(document)) == 25
+
+
+def test_short_pdf_is_single_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        ocr_service, "process_pdf_bytes_with_document_ai",
+        lambda content: calls.append(content) or build_document("fbs", pages=1),
+    )
+    pdf = make_pdf(3)
+    ocr_service.process_pdf_in_shards(pdf, shard_pages=10)
+    assert calls == [pdf]
+
+
+def test_pdf_without_pages_is_single_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        ocr_service, "process_pdf_bytes_with_document_ai",
+        lambda content: calls.append(content) or build_document("fbs", pages=1),
+    )
+    monkeypatch.setattr(ocr_service, "split_pdf", lambda content, shard_pages: [])
+    ocr_service.process_pdf_in_shards(b"%PDF-1.7", shard_pages=10)
+    assert calls == [b"%PDF-1.7"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,272 @@
+"""
+Test script for the FHIR export: resource mapping, the streamed NDJSON record
+of one patient and bulk $export jobs. Supabase is replaced by tests/fakes.py,
+health metrics use an in-memory SQLite database and job files go to tmp_path.
+"""
+
+import sys
+import os
+import asyncio
+import inspect
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from starlette.requests import Request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.deps import SERVICE_PRINCIPAL, get_current_patient, get_service_principal
+from app.api.v1.endpoints import fhir as fhir_endpoints
+from app.core import database
+from app.models.health_metric import HealthMetric
+from app.services import fhir_export, patientService
+from app.services.fhir_export import get_export, patient_resources, run_export, start_export, stream_patient_record
+from app.utils.fhir import biomarker_observation, medication_statement, patient_resource
+from tests.fakes import FakeQuery, FakeSupabase, SQLiteDatabase
+
+PATIENT_A = "11111111-1111-1111-1111-111111111111"
+PATIENT_B = "22222222-2222-2222-2222-222222222222"
+PATIENT_C = "33333333-3333-3333-3333-333333333333"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    for module in (fhir_export, patientService):
+        monkeypatch.setattr(module, "supabase", db)
+    monkeypatch.setattr(database, "engine", None)
+    db.tables["patients"] = [
+        {"id": PATIENT_A, "full_name": "Nimal Perera", "email": "nimal@example.com", "phone": "+94771234567",
+         "nic": "198507400937", "password_hash": "secret"},
+        {"id": PATIENT_B, "full_name": "Kamala Silva", "email": "kamala@example.com", "nic": "625330937V"},
+        {"id": PATIENT_C, "full_name": "No Records", "email": "none@example.com", "nic": None},
+    ]
+    db.tables["reports"] = [
+        {"id": "r1", "patient_id": PATIENT_A, "file_id": "f1", "report_type": "Lipid",
+         "sample_collected_at": "2024-05-01T08:30:00+00:00", "created_at": "2024-05-01T10:00:00+00:00"},
+        {"id": "r2", "patient_id": PATIENT_A, "file_id": "f2", "report_type": "FBS",
+         "sample_collected_at": None, "created_at": "2024-06-01T10:00:00+00:00"},
+        {"id": "r3", "patient_id": PATIENT_B, "file_id": "f3", "report_type": "FBS",
+         "sample_collected_at": "2024-06-02T08:00:00+00:00", "created_at": "2024-06-02T10:00:00+00:00"},
+    ]
+    db.tables["biomarkers"] = [
+        {"id": "b1", "report_id": "r1", "name": "LDL", "value": 170, "unit": "mg/dL", "ref_min": None, "ref_max": 130, "flag": "High"},
+        {"id": "b2", "report_id": "r1", "name": "HDL", "value": 52, "unit": "mg/dL", "ref_min": 40, "ref_max": 60, "flag": None},
+        {"id": "b3", "report_id": "r2", "name": "FBS", "value": 62, "unit": "mg/dL", "ref_min": 70, "ref_max": 100, "flag": None},
+        {"id": "b4", "report_id": "r3", "name": "FBS", "value": 95, "unit": "mg/dL", "ref_min": 70, "ref_max": 100, "flag": None},
+    ]
+    db.tables["medications"] = [
+        {"id": "m1", "patient_id": PATIENT_A, "name": "Atorvastatin", "dosage_mg": 20, "frequency_per_day": 1,
+         "instructions": "At night", "created_at": "2024-05-02T09:00:00+00:00"},
+    ]
+    return db
+
+
+def lines(chunks):
+    return [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+def status_request(path):
+    return Request({"type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80),
+                    "path": path, "root_path": "", "query_string": b"", "headers": []})
+
+
+def test_resource_mapping():
+    patient = patient_resource({"id": PATIENT_B, "full_name": "Kamala Silva", "email": "k@example.com", "nic": "625330937V"})
+    assert patient["gender"] == "female" and patient["birthDate"] == "1962-02-02"
+    assert patient["identifier"] == [{"system": "urn:healix:nic", "value": "625330937V"}]
+    assert "telecom" in patient and "phone" not in json.dumps(patient)
+
+    report = {"id": "r2", "patient_id": PATIENT_A, "created_at": "2024-06-01T10:00:00+00:00"}
+    low = biomarker_observation({"id": "b3", "name": "FBS", "value": 62, "unit": "mg/dL", "ref_min": 70, "ref_max": 100}, report)
+    assert low["interpretation"][0]["coding"][0]["code"] == "L"
+    assert low["referenceRange"] == [{"low": {"value": 70.0, "unit": "mg/dL"}, "high": {"value": 100.0, "unit": "mg/dL"}}]
+    assert low["effectiveDateTime"] == "2024-06-01T10:00:00+00:00" and low["derivedFrom"] == [{"reference": "DiagnosticReport/r2"}]
+    bare = biomarker_observation({"id": "b9", "name": "Note", "value": None}, report)
+    assert "valueQuantity" not in bare and "interpretation" not in bare and "referenceRange" not in bare
+
+    statement = medication_statement({"id": "m1", "patient_id": PATIENT_A, "name": "Metformin", "dosage_mg": 500,
+                                      "frequency_per_day": 2, "instructions": None})
+    assert statement["dosage"] == [{
+        "timing": {"repeat": {"frequency": 2, "period": 1, "periodUnit": "d"}},
+        "doseAndRate": [{"doseQuantity": {"value": 500, "unit": "mg", "system": "http://unitsofmeasure.org", "code": "mg"}}],
+    }]
+
+
+def test_patient_record_streams_as_ndjson(db):
+    resources = lines(stream_patient_record(db.tables["patients"][0]))
+    assert [(r["resourceType"], r["id"]) for r in resources] == [
+        ("Patient", PATIENT_A),
+        ("DiagnosticReport", "r1"), ("Observation", "b2"), ("Observation", "b1"),
+        ("DiagnosticReport", "r2"), ("Observation", "b3"),
+        ("MedicationStatement", "m1"),
+    ]
+    assert resources[1]["result"] == [{"reference": "Observation/b2"}, {"reference": "Observation/b1"}]
+    assert {r["subject"]["reference"] for r in resources[1:]} == {f"Patient/{PATIENT_A}"}
+    assert "secret" not in json.dumps(resources)
+
+
+def test_long_history_is_read_a_page_at_a_time(db):
+    for i in range(1000):
+        db.tables["reports"].append({"id": f"x{i:04d}", "patient_id": PATIENT_A, "file_id": f"x{i}", "report_type": "FBC",
+                                     "created_at": "2024-01-01T00:00:00+00:00"})
+        db.tables["biomarkers"].append({"id": f"xb{i:04d}", "report_id": f"x{i:04d}", "name": "WBC", "value": 7, "unit": "10^3/uL"})
+
+    resources = patient_resources([db.tables["patients"][0]], page_size=100)
+    for _ in range(50):
+        next(resources)
+    assert db.calls.count(("reports", "select")) == 1  # only the first page has been read
+
+    rest = list(resources)
+    assert 50 + len(rest) == 1 + 1002 * 2 + 1 + 1
+    # 11 pages of reports; a full page of biomarkers takes one more (empty) query to find its end
+    assert db.calls.count(("reports", "select")) == 11 and db.calls.count(("biomarkers", "select")) == 21
+
+    chunks = list(stream_patient_record(db.tables["patients"][0], page_size=100))
+    assert len(chunks) > 1 and all(chunk.endswith(b"\n") for chunk in chunks)
+
+
+def test_report_ids_are_queried_in_chunks(db, monkeypatch):
+    for i in range(250):
+        db.tables["reports"].append({"id": f"x{i:04d}", "patient_id": PATIENT_A, "file_id": f"x{i}", "report_type": "FBC",
+                                     "created_at": "2024-01-01T00:00:00+00:00"})
+        db.tables["biomarkers"].append({"id": f"xb{i:04d}", "report_id": f"x{i:04d}", "name": "WBC", "value": 7, "unit": "10^3/uL"})
+
+    filters = []
+    real_in = FakeQuery.in_
+
+    def recording_in(self, column, values):
+        filters.append((self._table, len(values)))
+        return real_in(self, column, values)
+
+    monkeypatch.setattr(FakeQuery, "in_", recording_in)
+    resources = list(patient_resources([db.tables["patients"][0]], types=["Observation"]))
+    assert len([r for r in resources if r.get("code", {}).get("text") == "WBC"]) == 250
+    # One page of 252 reports, its biomarkers read by 100 report ids at a time
+    assert [size for table, size in filters if table == "biomarkers"] == [100, 100, 52]
+
+
+def test_failure_mid_stream_ends_with_operation_outcome(db):
+    db.fail_tables["medications"] = "connection reset"
+    resources = lines(stream_patient_record(db.tables["patients"][0]))
+    assert resources[-2]["resourceType"] == "Observation"
+    assert resources[-1] == {"resourceType": "OperationOutcome", "issue": [
+        {"severity": "error", "code": "exception", "diagnostics": "Export stopped: connection reset"}]}
+
+
+def test_health_metrics_become_observations(db, monkeypatch):
+    metrics_db = SQLiteDatabase(HealthMetric)
+    session = metrics_db.session()
+    for user, name, value, flag in ((PATIENT_A, "Heart Rate", 72, "Null"), (PATIENT_A, "Weight", 91, "High"),
+                                    (PATIENT_B, "Heart Rate", 80, "Null")):
+        session.add(HealthMetric(user_id=uuid.UUID(user), metric_name=name, value=value, unit="u", flag=flag,
+                                 recorded_at=datetime(2024, 5, 1, tzinfo=timezone.utc)))
+    session.commit()
+    metrics_db.install(monkeypatch)
+
+    metrics = [r for r in patient_resources([db.tables["patients"][0]], page_size=1)
+               if r["resourceType"] == "Observation" and r["category"][0]["coding"][0]["code"] == "vital-signs"]
+    assert sorted((m["code"]["text"], m["valueQuantity"]["value"]) for m in metrics) == [("Heart Rate", 72.0), ("Weight", 91.0)]
+    weight = next(m for m in metrics if m["code"]["text"] == "Weight")
+    assert weight["interpretation"][0]["coding"][0]["code"] == "H" and weight["subject"]["reference"] == f"Patient/{PATIENT_A}"
+
+
+def test_patient_endpoint_scopes_tokens(db):
+    response = asyncio.run(fhir_endpoints.export_patient_record(uuid.UUID(PATIENT_B), patient={"id": PATIENT_B}))
+    assert response.media_type == "application/fhir+ndjson"
+
+    async def body():
+        return [chunk async for chunk in response.body_iterator]
+
+    assert [r["id"] for r in lines(asyncio.run(body()))] == [PATIENT_B, "r3", "b4"]
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(fhir_endpoints.export_patient_record(uuid.UUID(PATIENT_B), patient={"id": PATIENT_A}))
+    assert exc.value.status_code == 403
+    missing = uuid.uuid4()
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(fhir_endpoints.export_patient_record(missing, patient={"id": str(missing)}))
+    assert exc.value.status_code == 404
+
+
+def test_export_routes_require_credentials():
+    # $everything needs the patient's own token, bulk routes the service token
+    assert inspect.signature(fhir_endpoints.export_patient_record).parameters["patient"].default.dependency is get_current_patient
+    for endpoint in (fhir_endpoints.kick_off_export, fhir_endpoints.read_export_status,
+                     fhir_endpoints.download_export_file, fhir_endpoints.cancel_export):
+        assert inspect.signature(endpoint).parameters["service"].default.dependency is get_service_principal
+
+
+def test_bulk_export_writes_one_file_per_type(db, tmp_path):
+    job = start_export(root=str(tmp_path))["data"]
+    assert get_export(job["job_id"], str(tmp_path))["status"] == "in-progress"
+
+    run_export(job["job_id"], root=str(tmp_path), patient_batch=2)
+    status = get_export(job["job_id"], str(tmp_path))
+    assert status["status"] == "completed" and status["patients"] == 3
+    assert {o["type"]: o["count"] for o in status["output"]} == {
+        "Patient": 3, "DiagnosticReport": 3, "Observation": 4, "MedicationStatement": 1}
+    with open(tmp_path / job["job_id"] / "Observation.ndjson") as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["b1", "b2", "b3", "b4"]
+    # patients are read in batches, not one query per patient
+    assert db.calls.count(("patients", "select")) == 2 and db.calls.count(("reports", "select")) == 2
+
+
+def test_bulk_export_endpoints(db, tmp_path, monkeypatch):
+    for name in ("start_export", "get_export", "export_file", "delete_export"):
+        real = getattr(fhir_export, name)
+        monkeypatch.setattr(fhir_endpoints, name, lambda *args, real=real, **kwargs: real(*args, root=str(tmp_path), **kwargs))
+    monkeypatch.setattr(fhir_endpoints, "run_export", lambda job_id: run_export(job_id, root=str(tmp_path)))
+
+    tasks = BackgroundTasks()
+    response = fhir_endpoints.kick_off_export(status_request("/api/v1/fhir/$export"), tasks, _type="Patient,MedicationStatement", service=SERVICE_PRINCIPAL)
+    job_id = json.loads(response.body)["job_id"]
+    assert response.status_code == 202
+    assert response.headers["content-location"] == f"http://testserver/api/v1/fhir/$export/{job_id}"
+
+    pending = fhir_endpoints.read_export_status(status_request(f"/api/v1/fhir/$export/{job_id}"), job_id, service=SERVICE_PRINCIPAL)
+    assert pending.status_code == 202 and pending.headers["x-progress"] == "0 patients exported"
+
+    asyncio.run(tasks())
+    manifest = fhir_endpoints.read_export_status(status_request(f"/api/v1/fhir/$export/{job_id}"), job_id, service=SERVICE_PRINCIPAL)
+    assert manifest["request"] == "http://testserver/api/v1/fhir/$export" and manifest["requiresAccessToken"]
+    assert manifest["output"] == [
+        {"type": "Patient", "url": f"http://testserver/api/v1/fhir/$export/{job_id}/Patient.ndjson", "count": 3},
+        {"type": "MedicationStatement", "url": f"http://testserver/api/v1/fhir/$export/{job_id}/MedicationStatement.ndjson", "count": 1},
+    ]
+    assert fhir_endpoints.download_export_file(job_id, "Patient.ndjson", service=SERVICE_PRINCIPAL).media_type == "application/fhir+ndjson"
+    for bad in ("Observation.ndjson", "../status.json", "status.json"):
+        with pytest.raises(HTTPException) as exc:
+            fhir_endpoints.download_export_file(job_id, bad, service=SERVICE_PRINCIPAL)
+        assert exc.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc:
+        fhir_endpoints.kick_off_export(status_request("/"), BackgroundTasks(), _type="Encounter", service=SERVICE_PRINCIPAL)
+    assert exc.value.status_code == 400
+
+    assert fhir_endpoints.cancel_export(job_id, service=SERVICE_PRINCIPAL)["success"]
+    with pytest.raises(HTTPException) as exc:
+        fhir_endpoints.read_export_status(status_request("/"), job_id, service=SERVICE_PRINCIPAL)
+    assert exc.value.status_code == 404
+
+
+def test_cancelled_or_failed_jobs(db, tmp_path):
+    job = start_export(root=str(tmp_path))["data"]
+    fhir_export.delete_export(job["job_id"], str(tmp_path))
+    run_export(job["job_id"], root=str(tmp_path))
+    assert not (tmp_path / job["job_id"]).exists()
+
+    db.fail_tables["reports"] = "statement timeout"
+    job = start_export(root=str(tmp_path))["data"]
+    run_export(job["job_id"], root=str(tmp_path))
+    status = get_export(job["job_id"], str(tmp_path))
+    assert status["status"] == "failed" and status["error"] == "statement timeout"
+    assert os.listdir(tmp_path / job["job_id"]) == ["status.json"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,175 @@
+"""
+Test script for worker warm-up, readiness/liveness probes and preloaded reference data.
+Dependencies are stand-in callables; no network access.
+"""
+
+import sys
+import os
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import health, startup
+from app.core.startup import StartupProfile
+from app.api.v1.endpoints import health as health_endpoints
+from app.config.biomarker_config import BIOMARKER_NAME_MAPPING, UNIT_MAPPING
+from app.models.health_metric import AnatomyCategory, HealthFlag
+from app.services import health_metric_service
+from app.services.health_metric_service import HealthMetricService, MetricReferenceCache
+from app.utils.biomarker_matching import name_matcher, unit_matcher
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Empty check/warm-up registries and a fresh startup profile."""
+    profile = StartupProfile()
+    monkeypatch.setattr(startup, "STARTUP", profile)
+    monkeypatch.setattr(health, "STARTUP", profile)
+    monkeypatch.setattr(health, "_CHECKS", {})
+    monkeypatch.setattr(health, "_cached", {"results": None, "checked_at": 0.0})
+    monkeypatch.setattr(startup, "_WARMUPS", {})
+    monkeypatch.setattr(startup, "_PRELOADS", {})
+    monkeypatch.setattr(health, "WARM_CLIENTS_ON_STARTUP", True)
+    return profile
+
+
+def failing():
+    raise ConnectionError("refused")
+
+
+def test_not_ready_until_warm(probes):
+    calls = []
+    health.register_check("supabase", lambda: calls.append("supabase"))
+
+    ready, report = health.readiness()
+    assert not ready and report["status"] == "warming_up"
+    assert calls == []  # no dependency calls while warming up
+
+    probes.mark(startup.WARM)
+    health._cached["results"] = None
+    ready, report = health.readiness()
+    assert ready and report["status"] == "ready"
+    assert report["dependencies"]["supabase"]["ok"] is True
+    assert report["dependencies"]["supabase"]["latency_ms"] >= 0
+
+
+def test_required_failure_is_unavailable_optional_is_reported(probes):
+    probes.mark(startup.WARM)
+    health.register_check("gcs", lambda: None)
+    health.register_check("document_ai", failing, required=False)
+
+    ready, report = health.readiness()
+    assert ready
+    document_ai = report["dependencies"]["document_ai"]
+    assert (document_ai["ok"], document_ai["required"], document_ai["error"]) == (False, False, "ConnectionError: refused")
+
+    health.register_check("supabase", failing)
+    health._cached["results"] = None
+    ready, report = health.readiness()
+    assert not ready and report["status"] == "unavailable"
+
+
+def test_slow_check_times_out(probes):
+    health.register_check("slow", lambda: time.sleep(1))
+    started = time.perf_counter()
+    results = health.check_dependencies(force=True, timeout=0.05)
+    assert time.perf_counter() - started < 0.5
+    assert results["slow"]["ok"] is False and "timed out" in results["slow"]["error"]
+
+
+def test_results_are_cached(probes):
+    calls = []
+    health.register_check("supabase", lambda: calls.append(1))
+    health.check_dependencies()
+    health.check_dependencies()
+    assert calls == [1]
+    health.check_dependencies(force=True)
+    assert calls == [1, 1]
+
+
+def test_warm_up_builds_connects_and_preloads(probes):
+    order = []
+    startup.register_warmup("supabase", lambda: order.append("client"))
+    health.register_check("supabase", lambda: order.append("check"))
+    startup.register_preload("metric_references", lambda: order.append("preload"))
+
+    summary = startup.warm_up()
+    assert order == ["client", "check", "preload"]
+    assert summary["dependencies"]["supabase"]["ok"] is True
+    assert summary["preloads"] == {"metric_references": None}
+    assert startup.is_warm()
+    assert {"warm:supabase", "warm:connections", "preload:metric_references"} <= set(probes.phases())
+
+
+def test_ready_endpoint_status_codes(probes):
+    health.register_check("supabase", lambda: None)
+    response = health_endpoints.ready()
+    assert response.status_code == 503
+    assert response.headers["cache-control"] == "no-store"
+
+    probes.mark(startup.WARM)
+    response = health_endpoints.ready()
+    assert response.status_code == 200
+    assert json.loads(response.body)["status"] == "ready"
+
+
+def reference(name, t1=None, t2=None, t3=None, t4=None, unit="mg/dL"):
+    return SimpleNamespace(metric_name=name, threshold_1=t1, threshold_2=t2, threshold_3=t3, threshold_4=t4,
+                           unit=unit, anatomy_category=AnatomyCategory.ABDOMEN)
+
+
+def test_metric_reference_cache(monkeypatch):
+    loads = []
+
+    def get_all(db):
+        loads.append(db)
+        return [reference("Blood Glucose", 50.0, 70.0, 99.0, 180.0)]
+
+    cache = MetricReferenceCache(ttl=60)
+    monkeypatch.setattr(health_metric_service, "METRIC_REFERENCES", cache)
+    monkeypatch.setattr(health_metric_service.MetricReferenceRepo, "get_all", staticmethod(get_all))
+
+    assert HealthMetricService.calculate_assessment("db", "Blood Glucose", 120.0) == HealthFlag.HIGH
+    assert HealthMetricService.calculate_assessment("db", "Blood Glucose", 40.0) == HealthFlag.VERY_LOW
+    assert HealthMetricService.calculate_assessment("db", "Unknown", 1.0) == HealthFlag.NULL
+    assert len(loads) == 1
+
+    cache.invalidate()
+    cache.get("db", "Blood Glucose")
+    assert len(loads) == 2
+
+    cache.ttl = 0
+    cache.get("db", "Blood Glucose")
+    assert len(loads) == 3
+
+
+def _old_name_lookup(mapping, clean_name):
+    if clean_name in mapping:
+        return mapping[clean_name]
+    for key, value in mapping.items():
+        if key.upper() == clean_name:
+            return value
+    for key, value in mapping.items():
+        if key.upper() in clean_name or clean_name in key.upper():
+            return value
+    return None
+
+
+def test_matchers_agree_with_linear_scans():
+    names = list(BIOMARKER_NAME_MAPPING) + [k.lower() for k in BIOMARKER_NAME_MAPPING] + ["TOTAL WBC COUNT X", "", "NOPE"]
+    for name in names:
+        clean = name.strip().upper()
+        assert name_matcher("fbc").match(clean) == _old_name_lookup(BIOMARKER_NAME_MAPPING, clean)
+
+    for unit in list(UNIT_MAPPING) + [u.upper() for u in UNIT_MAPPING] + ["furlongs"]:
+        expected = UNIT_MAPPING.get(unit) or next((v for k, v in UNIT_MAPPING.items() if k.lower() == unit.lower()), None)
+        assert unit_matcher().match(unit) == expected
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,135 @@
+"""
+Test script for ETags and conditional GETs on report resources.
+Uses the in-memory Supabase and bucket from tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from app.core import cloud
+from app.core.http_cache import etag_matches, generation_etag, generation_from_etags, http_date
+from app.api.v1.endpoints import reports
+from app.services import reportService, upload_service
+from tests.fakes import FakeBucket, FakeStorageClient, FakeSupabase
+
+NIC = "199512345678"
+REPORT_ID = "22222222-2222-2222-2222-222222222222"
+NORMALIZED_PATH = f"users/{NIC}/processed/abc_normalized.json"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket("test-bucket")
+    bucket.put(NORMALIZED_PATH, '{"biomarkers": [{"name": "WBC", "value": 11.2}]}', "application/json")
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+    return bucket
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    db.tables["reports"] = [{
+        "id": REPORT_ID, "patient_id": "p1", "file_id": "abc", "report_type": "FBC", "gcs_path": "gs://b/abc.pdf",
+        "created_at": "2024-05-01T10:00:00+00:00", "updated_at": "2024-05-01T10:05:00+00:00",
+    }]
+    db.tables["biomarkers"] = [{"id": "b1", "report_id": REPORT_ID, "name": "WBC", "value": 11.2}]
+    monkeypatch.setattr(reportService, "supabase", db)
+    return db
+
+
+def normalized(if_none_match=None, fields=None):
+    return asyncio.run(reports.get_normalized_report(NIC, "abc", "inline", None, fields, if_none_match))
+
+
+def biomarkers(if_none_match=None, if_modified_since=None):
+    return asyncio.run(reports.get_report_biomarkers(REPORT_ID, "*", if_none_match, if_modified_since, {}))
+
+
+def test_etag_matching():
+    assert etag_matches('W/"g5"', '"g5"')
+    assert etag_matches('"x", W/"g5"', 'W/"g5"')
+    assert etag_matches("*", 'W/"g5"')
+    assert not etag_matches('W/"g6"', 'W/"g5"')
+    assert not etag_matches(None, 'W/"g5"')
+
+
+def test_generation_from_etags_requires_same_variant():
+    assert generation_from_etags(generation_etag(7)) == 7
+    assert generation_from_etags(generation_etag(7, "biomarkers.name"), "biomarkers.name") == 7
+    assert generation_from_etags(generation_etag(7, "biomarkers.name")) is None
+    assert generation_from_etags('W/"g7-forged"') is None
+    assert generation_from_etags('W/"other", *') is None
+
+
+def test_stored_json_revalidates_without_body(bucket):
+    first = normalized()
+    etag = first.headers["etag"]
+    assert etag == generation_etag(bucket.objects[NORMALIZED_PATH]["generation"])
+    assert first.headers["cache-control"] == "private, max-age=300"
+    assert json.loads(first.body)["data"]["biomarkers"][0]["name"] == "WBC"
+
+    bucket.calls.clear()
+    second = normalized(if_none_match=etag)
+    assert second.status_code == 304 and second.body == b""
+    assert second.headers["etag"] == etag
+    assert bucket.calls == [("download", NORMALIZED_PATH)]  # one conditional request, answered without a body
+
+
+def test_stored_json_changes_etag_when_rewritten(bucket):
+    etag = normalized().headers["etag"]
+    bucket.put(NORMALIZED_PATH, '{"biomarkers": []}', "application/json")
+
+    refreshed = normalized(if_none_match=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert json.loads(refreshed.body)["data"] == {"biomarkers": []}
+
+
+def test_projection_has_its_own_etag(bucket):
+    full = normalized().headers["etag"]
+    projected = normalized(fields="biomarkers.name")
+    assert projected.headers["etag"] != full
+    assert normalized(if_none_match=full, fields="biomarkers.name").status_code == 200
+    assert normalized(if_none_match=projected.headers["etag"], fields="biomarkers.name").status_code == 304
+
+
+def test_biomarkers_304_skips_biomarker_query(db):
+    first = biomarkers()
+    assert first.status_code == 200
+    assert first.headers["last-modified"] == "Wed, 01 May 2024 10:05:00 GMT"
+
+    db.calls.clear()
+    assert biomarkers(if_none_match=first.headers["etag"]).status_code == 304
+    assert db.calls == [("reports", "select")]
+
+    later = http_date(datetime(2024, 5, 2, tzinfo=timezone.utc))
+    assert biomarkers(if_modified_since=later).status_code == 304
+    earlier = http_date(datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc))
+    assert biomarkers(if_modified_since=earlier).status_code == 200
+
+
+def test_reprocessing_invalidates_etag(db):
+    etag = biomarkers().headers["etag"]
+    db.tables["reports"][0]["updated_at"] = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat()
+    assert biomarkers(if_none_match=etag).status_code == 200
+
+
+def test_missing_report_is_404(db):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.get_report_by_uuid("missing", "*", None, None))
+    assert exc.value.status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,193 @@
+"""
+Test script for Idempotency-Key uploads and retry-safe report ingestion.
+Uses the in-memory Supabase and bucket from tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+import io
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.core import cloud
+from app.services import idempotency_service, latest_biomarker_service, reportService, upload_service
+from app.api.v1.endpoints import reports
+from tests.fakes import FakeBucket, FakeStorageClient, FakeSupabase
+
+NIC = "199512345678"
+PATIENT_ID = "11111111-1111-1111-1111-111111111111"
+PDF = b"%PDF-1.4 test report"
+
+NORMALIZED = {
+    "patient": {},
+    "report": {"type": "FBC", "sample_collected_at": "2024-05-01T08:30:00"},
+    "biomarkers": [
+        {"name": "Hemoglobin", "value": 13.5, "unit": "g/dL", "ref_range": [12, 16], "flag": "NORMAL"},
+        {"name": "WBC", "value": 11.2, "unit": "10^3/uL", "ref_range": [4, 10], "flag": "HIGH"},
+    ],
+}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(idempotency_service, "supabase", db)
+    monkeypatch.setattr(reportService, "supabase", db)
+    monkeypatch.setattr(latest_biomarker_service, "supabase", db)
+    return db
+
+
+@pytest.fixture
+def bucket(monkeypatch, db):
+    bucket = FakeBucket("test-bucket")
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(
+        reports, "get_patient_by_nic",
+        lambda nic: {"success": True, "data": {"id": PATIENT_ID, "nic": nic}},
+    )
+    return bucket
+
+
+def upload(key, content=PDF, tasks=None):
+    file = UploadFile(io.BytesIO(content), filename="report.pdf", headers=Headers({"content-type": "application/pdf"}))
+    return asyncio.run(reports.upload_report(NIC, file, tasks or BackgroundTasks(), key))
+
+
+def test_retry_replays_original_response(bucket, db):
+    first_tasks, retry_tasks = BackgroundTasks(), BackgroundTasks()
+    first = upload("key-1", tasks=first_tasks)
+    retry = upload("key-1", tasks=retry_tasks)
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.body == reports.JSONResponse(first).body
+    assert len(first_tasks.tasks) == 1 and not retry_tasks.tasks
+    assert list(bucket.objects) == [f"users/{NIC}/reports/{first['file_id']}.pdf"]
+    assert db.tables["idempotency_keys"][0]["status"] == idempotency_service.STATUS_COMPLETED
+
+
+def test_without_key_each_upload_is_new(bucket):
+    assert upload(None)["file_id"] != upload(None)["file_id"]
+    assert len(bucket.objects) == 2
+
+
+def test_key_reused_for_different_file_is_rejected(bucket):
+    upload("key-1")
+    with pytest.raises(HTTPException) as exc:
+        upload("key-1", content=b"%PDF-1.4 another report")
+    assert exc.value.status_code == 422
+
+
+def test_retry_while_in_progress_conflicts(bucket):
+    idempotency_service.begin(reports.UPLOAD_IDEMPOTENCY_SCOPE, "key-1", idempotency_service.fingerprint(NIC, PDF))
+    with pytest.raises(HTTPException) as exc:
+        upload("key-1")
+    assert exc.value.status_code == 409
+    assert exc.value.headers["Retry-After"] == "1"
+
+
+def test_failed_upload_releases_key(bucket, db, monkeypatch):
+    real_upload = reports.upload_pdf_to_bucket
+    attempts = []
+
+    def flaky(*args, **kwargs):
+        attempts.append(kwargs["file_id"])
+        if len(attempts) == 1:
+            raise RuntimeError("GCS Upload Failed: boom")
+        return real_upload(*args, **kwargs)
+
+    monkeypatch.setattr(reports, "upload_pdf_to_bucket", flaky)
+    with pytest.raises(RuntimeError):
+        upload("key-1")
+    assert db.tables["idempotency_keys"] == []
+
+    assert upload("key-1")["file_id"] == attempts[0]
+    assert attempts[0] == idempotency_service.derive_file_id(reports.UPLOAD_IDEMPOTENCY_SCOPE, NIC, "key-1")
+
+
+def test_key_store_outage_still_uses_derived_file_id(bucket, db):
+    db.fail_tables["idempotency_keys"] = "connection refused"
+    first = upload("key-1")
+    second = upload("key-1")
+    assert first["file_id"] == second["file_id"]
+    assert len(bucket.objects) == 1
+
+
+def test_expired_key_is_claimed_again(db):
+    fp = idempotency_service.fingerprint(NIC, PDF)
+    assert idempotency_service.begin("scope", "key-1", fp)["state"] == idempotency_service.NEW
+    idempotency_service.complete("scope", "key-1", {"ok": True})
+    assert idempotency_service.begin("scope", "key-1", fp)["state"] == idempotency_service.REPLAY
+
+    db.tables["idempotency_keys"][0]["expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    assert idempotency_service.begin("scope", "key-1", fp)["state"] == idempotency_service.NEW
+    assert idempotency_service.purge_expired(datetime.now(timezone.utc) + timedelta(days=2))["count"] == 1
+
+
+def test_crashed_claim_is_taken_over_after_its_lease(bucket, db):
+    fp = idempotency_service.fingerprint(NIC, PDF)
+    scope = reports.UPLOAD_IDEMPOTENCY_SCOPE
+    # The first request claimed the key and crashed without completing or releasing it
+    assert idempotency_service.begin(scope, "key-1", fp)["state"] == idempotency_service.NEW
+    assert idempotency_service.begin(scope, "key-1", fp)["state"] == idempotency_service.IN_PROGRESS
+
+    # A heartbeat keeps a slow request's claim
+    row = db.tables["idempotency_keys"][0]
+    row["locked_until"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    idempotency_service.heartbeat(scope, "key-1")
+    assert idempotency_service.begin(scope, "key-1", fp)["state"] == idempotency_service.IN_PROGRESS
+
+    row["locked_until"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    retry = upload("key-1")
+    assert retry["file_id"] == idempotency_service.derive_file_id(scope, NIC, "key-1")
+    assert row["status"] == idempotency_service.STATUS_COMPLETED
+    assert upload("key-1").headers["Idempotent-Replayed"] == "true"
+
+
+def test_claim_is_kept_while_the_work_runs(db):
+    fp = idempotency_service.fingerprint(NIC, PDF)
+    assert idempotency_service.begin("scope", "key-1", fp)["state"] == idempotency_service.NEW
+    row = db.tables["idempotency_keys"][0]
+    row["locked_until"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+
+    with idempotency_service.keep_claim("scope", "key-1", lease_seconds=0.15):
+        time.sleep(0.2)
+        assert idempotency_service.begin("scope", "key-1", fp)["state"] == idempotency_service.IN_PROGRESS
+
+    assert not [t for t in threading.enumerate() if t.name == "idempotency-heartbeat"]
+
+
+def test_lapsed_claim_is_taken_over_once(db):
+    fp = idempotency_service.fingerprint(NIC, PDF)
+    idempotency_service.begin("scope", "key-1", fp)
+    db.tables["idempotency_keys"][0]["locked_until"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+
+    states = [idempotency_service.begin("scope", "key-1", fp)["state"] for _ in range(2)]
+    assert states == [idempotency_service.NEW, idempotency_service.IN_PROGRESS]
+    assert idempotency_service.begin("scope", "key-1", "other")["state"] == idempotency_service.MISMATCH
+
+
+def test_ingestion_retry_keeps_one_report(db):
+    for _ in range(3):
+        result = reportService.store_normalized_report_to_db(PATIENT_ID, "file-1", "gs://b/r.pdf", NORMALIZED)
+        assert result["success"]
+
+    assert len(db.tables["reports"]) == 1
+    assert sorted(b["name"] for b in db.tables["biomarkers"]) == ["Hemoglobin", "WBC"]
+    report = db.tables["reports"][0]
+    assert report["report_type"] == "FBC" and report["updated_at"]
+    assert all(b["report_id"] == report["id"] for b in db.tables["biomarkers"])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
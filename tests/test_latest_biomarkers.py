@@ -0,0 +1,134 @@
+"""
+Test script for patient_latest_biomarkers: upserts on ingestion, out-of-order
+reports, rebuilds after deletes and the latest-values endpoint.
+Uses the in-memory Supabase from tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import latest_biomarker_service, reportService
+from app.api.v1.endpoints import patient as patient_endpoints
+from app.schemas.report import ReportUpdate
+from tests.fakes import FakeSupabase
+
+PATIENT_ID = "11111111-1111-1111-1111-111111111111"
+
+
+def normalized(sample_date, **values):
+    return {
+        "patient": {},
+        "report": {"type": "Lipid", "sample_collected_at": sample_date},
+        "biomarkers": [{"name": name, "value": value, "unit": "mg/dL"} for name, value in values.items()],
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    db.tables["patients"] = [{"id": PATIENT_ID}]
+    monkeypatch.setattr(reportService, "supabase", db)
+    monkeypatch.setattr(latest_biomarker_service, "supabase", db)
+    return db
+
+
+def latest(db):
+    return {row["name"]: (row["value"], row["sample_collected_at"][:10]) for row in db.tables["patient_latest_biomarkers"]}
+
+
+def store(file_id, document):
+    result = reportService.store_normalized_report_to_db(PATIENT_ID, file_id, f"gs://b/{file_id}.pdf", document)
+    assert result["success"]
+    return result["data"]["report"]["id"]
+
+
+def test_newer_reports_replace_older_values(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160, HDL=40))
+    store("june", normalized("2024-06-01T08:00:00", LDL=120))
+    # Uploaded last, but sampled before the others
+    store("january", normalized("2024-01-01T08:00:00", LDL=190, Triglycerides=150))
+
+    assert latest(db) == {
+        "LDL": (120, "2024-06-01"),
+        "HDL": (40, "2024-03-01"),
+        "Triglycerides": (150, "2024-01-01"),
+    }
+
+
+def test_reingesting_a_report_updates_its_values(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160, HDL=40))
+    store("march", normalized("2024-03-01T08:00:00", LDL=155))
+    assert latest(db) == {"LDL": (155, "2024-03-01")}
+
+
+def test_ingestion_updates_latest_values_in_the_same_call(db):
+    store("june", normalized("2024-06-01T08:00:00", LDL=120))
+    store("march", normalized("2024-03-01T08:00:00", LDL=160, HDL=40))
+    # Re-ingested without HDL: the value falls back to another report
+    store("june", normalized("2024-06-01T08:00:00", LDL=125, HDL=45))
+    store("june", normalized("2024-06-01T08:00:00", LDL=125))
+
+    assert latest(db) == {"LDL": (125, "2024-06-01"), "HDL": (40, "2024-03-01")}
+    # No select-then-upsert from the service: the recency check is part of the database upsert
+    assert db.calls == [("rpc", "ingest_report")] * 4
+
+
+def test_deleting_a_report_falls_back_to_earlier_values(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160))
+    june = store("june", normalized("2024-06-01T08:00:00", LDL=120, HbA1c=6.1))
+
+    # the real table cascades on report delete; the fake does not
+    db.tables["patient_latest_biomarkers"] = [r for r in db.tables["patient_latest_biomarkers"] if r["report_id"] != june]
+    db.tables["biomarkers"] = [b for b in db.tables["biomarkers"] if b["report_id"] != june]
+    reportService.delete_report(june)
+
+    assert latest(db) == {"LDL": (160, "2024-03-01")}
+
+
+def test_rebuild_matches_incremental_upserts(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160, HDL=40))
+    store("june", normalized("2024-06-01T08:00:00", LDL=120))
+    incremental = latest(db)
+
+    db.tables["patient_latest_biomarkers"] = [{"patient_id": PATIENT_ID, "name": "Stale", "value": 1,
+                                               "sample_collected_at": "2020-01-01", "report_id": "gone"}]
+    result = latest_biomarker_service.rebuild_all_latest_biomarkers()
+    assert result == {"success": True, "patients": 1, "errors": {}}
+    assert latest(db) == incremental
+
+
+def test_redating_a_report_rebuilds_in_the_database(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160))
+    june = store("june", normalized("2024-06-01T08:00:00", LDL=120))
+    db.calls.clear()
+
+    # The June report was really sampled in January: March's value is the latest again
+    result = reportService.update_report(june, ReportUpdate(sample_collected_at=datetime(2024, 1, 1, 8)))
+    assert result["success"]
+    assert latest(db) == {"LDL": (160, "2024-03-01")}
+    # one guarded upsert in the database, no select-then-upsert from the service
+    assert [call for call in db.calls if call[0] in ("rpc", "patient_latest_biomarkers")] == [
+        ("rpc", "rebuild_latest_biomarkers")
+    ]
+
+
+def test_ingestion_survives_latest_table_failure(db):
+    db.fail_tables["patient_latest_biomarkers"] = "relation does not exist"
+    store("march", normalized("2024-03-01T08:00:00", LDL=160))
+    assert len(db.tables["biomarkers"]) == 1
+
+
+def test_latest_endpoint_filters_names(db):
+    store("march", normalized("2024-03-01T08:00:00", LDL=160, HDL=40, HbA1c=5.9))
+    result = patient_endpoints.read_latest_biomarkers(PATIENT_ID, "LDL, HbA1c", "*", {})
+    assert [(row["name"], row["value"]) for row in result["data"]] == [("HbA1c", 5.9), ("LDL", 160)]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,90 @@
+"""
+Test script for request and pipeline instrumentation.
+Checks Prometheus exposition format and per-route latency recording.
+"""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from app.core.metrics import MetricsRegistry, track_stage, OCR_STAGE_DURATION, HTTP_REQUEST_DURATION
+from app.core.middleware import MetricsMiddleware
+
+
+def test_counter_and_histogram_exposition():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("service",))
+    latency = registry.histogram("latency_seconds", "Latency", ("service",), buckets=(0.1, 1.0))
+
+    calls.inc(service="gcs")
+    calls.inc(2, service="gcs")
+    latency.observe(0.05, service="gcs")
+    latency.observe(0.5, service="gcs")
+    latency.observe(5, service="gcs")
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{service="gcs"} 3' in text
+    assert 'latency_seconds_bucket{service="gcs",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{service="gcs",le="1"} 2' in text
+    assert 'latency_seconds_bucket{service="gcs",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{service="gcs"} 3' in text
+
+
+def test_labels_must_match():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("service",))
+    with pytest.raises(ValueError):
+        calls.inc(operation="upload")
+
+
+def test_track_stage_records_outcome():
+    before = OCR_STAGE_DURATION.count(stage="unit_test_stage", outcome="error")
+    with pytest.raises(RuntimeError):
+        with track_stage("unit_test_stage"):
+            raise RuntimeError("boom")
+    assert OCR_STAGE_DURATION.count(stage="unit_test_stage", outcome="error") == before + 1
+
+
+def test_middleware_groups_latency_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+
+    async def request(path):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+            "scheme": "http", "query_string": b"", "headers": [], "server": ("test", 80),
+            "client": ("test", 1234),
+        }
+        await app(scope, receive, send)
+        return messages[0]["status"]
+
+    before = HTTP_REQUEST_DURATION.count(method="GET", route="/items/{item_id}", status="200")
+    assert asyncio.run(request("/items/1")) == 200
+    assert asyncio.run(request("/items/2")) == 200
+    assert HTTP_REQUEST_DURATION.count(method="GET", route="/items/{item_id}", status="200") == before + 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,208 @@
+"""
+Test script for abnormal-result notifications to care circle members: queueing
+from outbox events, per-recipient digests, batching, rate limits and retries.
+Supabase is replaced by tests/fakes.py; no mail is sent.
+"""
+
+import sys
+import os
+import email
+from datetime import datetime, timezone
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.resilience import TokenBucket
+from app.services import latest_biomarker_service, notification_service, outbox_service, reportService
+from app.services.notification_senders import FileSender, SmtpSender, default_sender
+from app.services.notification_service import CareCircleNotifier, NotificationDispatcher
+from app.services.outbox_relay import OutboxRelay
+from tests.fakes import FakeSupabase
+
+PATIENT_A = "11111111-1111-1111-1111-111111111111"
+PATIENT_B = "22222222-2222-2222-2222-222222222222"
+
+NORMALIZED = {
+    "patient": {},
+    "report": {"type": "Lipid", "sample_collected_at": "2024-05-01T08:30:00"},
+    "biomarkers": [
+        {"name": "HDL", "value": 52, "unit": "mg/dL", "ref_range": [40, 60]},
+        {"name": "LDL", "value": 170, "unit": "mg/dL", "flag": "High"},
+        {"name": "Triglycerides", "value": 210, "unit": "mg/dL", "flag": "High"},
+    ],
+}
+
+
+class RecordingSender:
+    name = "recording"
+
+    def __init__(self, failing=()):
+        self.batches = []
+        self.failing = set(failing)
+
+    def send(self, digests):
+        self.batches.append(digests)
+        return {d["recipient_email"]: "550 mailbox unavailable" for d in digests if d["recipient_email"] in self.failing}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    for module in (reportService, latest_biomarker_service, outbox_service, notification_service):
+        monkeypatch.setattr(module, "supabase", db)
+    db.tables["patients"] = [
+        {"id": PATIENT_A, "full_name": "Nimal Perera"},
+        {"id": PATIENT_B, "full_name": "Kamala Silva"},
+    ]
+    db.tables["care_circle_members"] = [
+        {"id": "m1", "patient_id": PATIENT_A, "name": "Sunil", "email": "Sunil@example.com"},
+        {"id": "m2", "patient_id": PATIENT_A, "name": "Dr. Fernando", "email": "gp@example.com"},
+        {"id": "m3", "patient_id": PATIENT_B, "name": "Ruwan", "email": "ruwan@example.com"},
+    ]
+    return db
+
+
+def ingest_and_queue(db, reports):
+    for i, patient_id in enumerate(reports):
+        result = reportService.store_normalized_report_to_db(patient_id, f"f{i}", f"gs://b/f{i}.pdf", NORMALIZED)
+        assert result["success"]
+    return OutboxRelay([CareCircleNotifier()]).drain()
+
+
+def dispatcher(sender, **kwargs):
+    kwargs.setdefault("window_seconds", 0)
+    kwargs.setdefault("rate_limiter", TokenBucket(1000))
+    return NotificationDispatcher(sender, **kwargs)
+
+
+def test_abnormal_events_queue_one_row_per_member(db):
+    ingest_and_queue(db, [PATIENT_A, PATIENT_A, PATIENT_B])
+
+    rows = db.tables["care_circle_notifications"]
+    assert len(rows) == 2 * 2 + 2 * 2 + 2 * 1  # abnormal biomarkers x members, per report
+    assert {r["recipient_email"] for r in rows} == {"sunil@example.com", "gp@example.com", "ruwan@example.com"}
+    assert rows[0]["payload"]["patient_name"] == "Nimal Perera" and rows[0]["payload"]["name"] == "LDL"
+    # care circles of the whole batch in one query
+    assert db.calls.count(("care_circle_members", "select")) == 1
+
+
+def test_redelivered_events_queue_nothing_new(db):
+    ingest_and_queue(db, [PATIENT_A])
+    messages = [{"event_id": e["event_id"], "type": e["event_type"], "patient_id": e["patient_id"], "data": e["payload"]}
+                for e in db.tables["event_outbox"]]
+    CareCircleNotifier().deliver(messages)
+    assert len(db.tables["care_circle_notifications"]) == 4
+
+
+def test_reprocessed_report_notifies_nobody_again(db):
+    ingest_and_queue(db, [PATIENT_A])
+    # even once its delivered events have been cleared from the outbox
+    db.tables["event_outbox"] = []
+    ingest_and_queue(db, [PATIENT_A])
+    assert len(db.tables["event_outbox"]) == 3
+    assert len(db.tables["care_circle_notifications"]) == 4
+
+
+def test_patient_without_care_circle_queues_nothing(db):
+    db.tables["care_circle_members"] = []
+    ingest_and_queue(db, [PATIENT_A])
+    assert db.tables["care_circle_notifications"] == []
+    assert ("patients", "select") not in db.calls
+
+
+def test_lab_dump_becomes_one_digest_per_recipient(db):
+    ingest_and_queue(db, [PATIENT_A] * 5 + [PATIENT_B] * 3)
+    sender = RecordingSender()
+
+    assert dispatcher(sender, window_seconds=300).run_once()["digests"] == 0  # still coalescing
+
+    stats = dispatcher(sender).run_once()
+    assert stats == {"digests": 3, "sent": 26, "retried": 0, "dead": 0}
+    [batch] = sender.batches
+    digests = {d["recipient_email"]: d for d in batch}
+    assert [len(p["items"]) for p in digests["sunil@example.com"]["patients"]] == [10]
+    assert digests["ruwan@example.com"]["patients"][0]["patient_name"] == "Kamala Silva"
+    assert {r["status"] for r in db.tables["care_circle_notifications"]} == {"sent"}
+
+    assert dispatcher(sender).run_once()["digests"] == 0
+
+
+def test_queries_grow_with_batches_not_reports(db):
+    ingest_and_queue(db, [PATIENT_A, PATIENT_B] * 100)  # 600 outbox events, 100 per relay pass
+    assert db.calls.count(("care_circle_members", "select")) == 6
+    assert db.calls.count(("care_circle_notifications", "upsert")) == 6
+
+    sender = RecordingSender()
+    stats = dispatcher(sender, max_items=500).run_once()
+    assert stats["digests"] == 3 and stats["sent"] == 600
+    assert db.calls.count(("care_circle_notifications", "update")) == 2  # lease + mark sent
+
+
+def test_full_digest_goes_out_before_the_window(db):
+    ingest_and_queue(db, [PATIENT_A] * 3)
+    sender = RecordingSender()
+    stats = dispatcher(sender, window_seconds=300, max_items=4).run_once()
+    assert stats["digests"] == 2
+    assert all(len(d["patients"][0]["items"]) == 4 for d in sender.batches[0])
+
+
+def test_failed_recipient_is_retried_then_dead(db):
+    ingest_and_queue(db, [PATIENT_A])
+    sender = RecordingSender(failing={"gp@example.com"})
+
+    assert dispatcher(sender, max_attempts=2).run_once() == {"digests": 2, "sent": 2, "retried": 2, "dead": 0}
+    failed = [r for r in db.tables["care_circle_notifications"] if r["recipient_email"] == "gp@example.com"]
+    assert all(r["status"] == "pending" and r["attempts"] == 1 and "550" in r["last_error"] for r in failed)
+    assert dispatcher(sender, max_attempts=2).run_once()["digests"] == 0  # backing off
+
+    for row in failed:
+        row["next_attempt_at"] = datetime.now(timezone.utc).isoformat()
+    assert dispatcher(sender, max_attempts=2).run_once() == {"digests": 1, "sent": 0, "retried": 0, "dead": 2}
+    assert {r["status"] for r in failed} == {"dead"}
+
+
+def test_sender_exception_fails_the_batch(db):
+    ingest_and_queue(db, [PATIENT_A])
+
+    class Down:
+        def send(self, digests):
+            raise ConnectionRefusedError("smtp down")
+
+    assert dispatcher(Down()).run_once()["retried"] == 4
+    assert all("smtp down" in r["last_error"] for r in db.tables["care_circle_notifications"])
+
+
+def test_rate_limit_defers_the_rest_of_the_batch(db):
+    ingest_and_queue(db, [PATIENT_A, PATIENT_B])
+    sender = RecordingSender()
+    limited = dispatcher(sender, rate_limiter=TokenBucket(1, burst=2), lease_seconds=0.1)
+
+    assert limited.run_once()["digests"] == 2
+    waiting = [r for r in db.tables["care_circle_notifications"] if r["status"] == "pending"]
+    assert len(waiting) == 2 and all(datetime.fromisoformat(r["locked_until"]) <= datetime.now(timezone.utc) for r in waiting)
+
+
+def test_file_sender_writes_eml(tmp_path, db):
+    ingest_and_queue(db, [PATIENT_B])
+    dispatcher(FileSender(str(tmp_path))).run_once()
+
+    [path] = list(tmp_path.iterdir())
+    message = email.message_from_bytes(path.read_bytes())
+    assert message["To"] == "ruwan@example.com"
+    assert message["Subject"] == "Healix: 2 abnormal results for Kamala Silva"
+    body = message.get_payload()
+    assert "LDL: 170 mg/dL (High)" in body and "Hello Ruwan," in body
+
+
+
+def test_sender_must_be_chosen():
+    assert isinstance(default_sender("smtp"), SmtpSender) and isinstance(default_sender("file"), FileSender)
+    for kind in ("", "carrier-pigeon"):
+        with pytest.raises(ValueError):
+            default_sender(kind)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
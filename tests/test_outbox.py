@@ -0,0 +1,197 @@
+"""
+Test script for the report event outbox: events stored with the ingest, relay
+delivery order, retries, leases and webhooks. Supabase is replaced by
+tests/fakes.py and the in-process broker stands in for consumers; no network access.
+"""
+
+import sys
+import os
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import latest_biomarker_service, outbox_service, reportService
+from app.services.outbox_relay import InProcessBroker, OutboxRelay, WebhookSubscriber
+from app.workers import ocr_worker
+from tests.fakes import FakeSupabase
+
+PATIENT_A = "11111111-1111-1111-1111-111111111111"
+PATIENT_B = "22222222-2222-2222-2222-222222222222"
+
+NORMALIZED = {
+    "patient": {},
+    "report": {"type": "FBC", "sample_collected_at": "2024-05-01T08:30:00"},
+    "biomarkers": [
+        {"name": "Hemoglobin", "value": 13.5, "unit": "g/dL", "ref_range": [12, 16]},
+        {"name": "WBC", "value": 11.2, "unit": "10^3/uL", "ref_range": [4, 10]},
+        {"name": "LDL", "value": 170, "unit": "mg/dL", "flag": "High"},
+    ],
+}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    for module in (reportService, latest_biomarker_service, outbox_service):
+        monkeypatch.setattr(module, "supabase", db)
+    return db
+
+
+@pytest.fixture
+def broker():
+    received = []
+    broker = InProcessBroker()
+    broker.subscribe("*", received.append)
+    broker.received = received
+    return broker
+
+
+def ingest(patient_id, file_id):
+    result = reportService.store_normalized_report_to_db(patient_id, file_id, f"gs://b/{file_id}.pdf", NORMALIZED)
+    assert result["success"]
+    return result["data"]
+
+
+def test_events_are_stored_with_the_report(db):
+    data = ingest(PATIENT_A, "f1")
+
+    # report, biomarkers and events in one round trip
+    assert db.calls.count(("rpc", "ingest_report")) == 1
+    assert not [call for call in db.calls if call[0] in ("reports", "biomarkers", "event_outbox")]
+
+    events = db.tables["event_outbox"]
+    assert [e["event_type"] for e in events] == ["report.ingested", "biomarker.abnormal", "biomarker.abnormal"]
+    assert all(e["payload"]["report_id"] == data["report"]["id"] and e["patient_id"] == PATIENT_A for e in events)
+    assert events[0]["payload"]["abnormal_count"] == 2
+    assert [e["payload"]["name"] for e in events[1:]] == ["WBC", "LDL"]
+    assert len(data["biomarkers"]) == 3
+
+
+def test_reprocessing_a_file_reuses_its_event_ids(db):
+    ingest(PATIENT_A, "f1")
+    first = [e["event_id"] for e in db.tables["event_outbox"]]
+    ingest(PATIENT_A, "f1")
+
+    assert [e["event_id"] for e in db.tables["event_outbox"]] == first
+    assert len(set(first)) == 3
+
+    ingest(PATIENT_A, "f2")
+    assert len(db.tables["event_outbox"]) == 6
+
+
+def test_relay_delivers_in_order_once(db, broker):
+    ingest(PATIENT_A, "f1")
+    ingest(PATIENT_B, "f2")
+    relay = OutboxRelay([broker], batch_size=100)
+
+    assert relay.run_once() == {"published": 6, "retried": 0, "dead": 0}
+    assert [m["sequence"] for m in broker.received] == [1, 2, 3, 4, 5, 6]
+    assert broker.received[0]["type"] == "report.ingested" and broker.received[0]["data"]["file_id"] == "f1"
+    assert all(e["status"] == "published" and e["published_at"] for e in db.tables["event_outbox"])
+
+    assert relay.run_once()["published"] == 0
+
+
+def test_failed_batch_is_retried_with_backoff(db, broker):
+    ingest(PATIENT_A, "f1")
+    failures = ["webhook down"]
+
+    def flaky(message):
+        if failures:
+            raise ConnectionError(failures.pop())
+
+    broker.subscribe("biomarker.abnormal", flaky)
+    relay = OutboxRelay([broker])
+    assert relay.run_once() == {"published": 0, "retried": 3, "dead": 0}
+    event = db.tables["event_outbox"][0]
+    assert event["attempts"] == 1 and "webhook down" in event["last_error"]
+    assert relay.run_once()["published"] == 0  # not due yet
+
+    for row in db.tables["event_outbox"]:
+        row["next_attempt_at"] = datetime.now(timezone.utc).isoformat()
+    assert relay.run_once()["published"] == 3
+    # at-least-once: the events before the failure were seen again
+    assert [m["sequence"] for m in broker.received] == [1, 1, 2, 3]
+
+
+def test_waiting_event_holds_back_its_patient_only(db, broker):
+    ingest(PATIENT_A, "f1")
+    ingest(PATIENT_B, "f2")
+    ingest(PATIENT_A, "f3")
+    later = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+    db.tables["event_outbox"][1]["next_attempt_at"] = later  # second event of patient A awaits a retry
+
+    relay = OutboxRelay([broker])
+    relay.run_once()
+    assert [m["sequence"] for m in broker.received] == [1, 4, 5, 6]
+
+    db.tables["event_outbox"][1]["next_attempt_at"] = datetime.now(timezone.utc).isoformat()
+    relay.run_once()
+    assert [m["sequence"] for m in broker.received][4:] == [2, 3, 7, 8, 9]
+
+
+def test_leased_events_are_not_delivered_twice(db, broker):
+    ingest(PATIENT_A, "f1")
+    assert len(outbox_service.claim([1, 2], lease_seconds=60)) == 2  # another worker's relay
+    assert outbox_service.claim([1], lease_seconds=60) == []
+
+    relay = OutboxRelay([broker])
+    relay.run_once()
+    assert broker.received == []  # event 3 waits behind the leased events of its patient
+
+
+def test_events_die_after_max_attempts(db):
+    ingest(PATIENT_A, "f1")
+
+    class Down:
+        def deliver(self, messages):
+            raise RuntimeError("gone")
+
+    relay = OutboxRelay([Down()], max_attempts=1)
+    assert relay.run_once() == {"published": 0, "retried": 0, "dead": 3}
+    assert {e["status"] for e in db.tables["event_outbox"]} == {"dead"}
+
+
+def test_webhook_signs_batches_and_fails_on_error_status():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200 if len(requests) == 1 else 503)
+
+    subscriber = WebhookSubscriber("https://hooks.example.test/healix", secret="s3cret",
+                                   client=httpx.Client(transport=httpx.MockTransport(handler)))
+    messages = [{"event_id": "e1", "type": "report.ingested", "data": {"file_id": "f1"}}]
+    subscriber.deliver(messages)
+
+    body = requests[0].content
+    assert json.loads(body) == {"events": messages}
+    expected = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert requests[0].headers["X-Healix-Signature"] == expected
+
+    with pytest.raises(RuntimeError):
+        subscriber.deliver(messages)
+
+
+def test_worker_records_report_failed(db, monkeypatch):
+    def broken(pdf_bytes, gcs_uri):
+        raise ValueError("unreadable PDF")
+
+    monkeypatch.setattr(ocr_worker, "extract_report_data", broken)
+    with pytest.raises(ValueError):
+        ocr_worker.process_document_worker("gs://b/f9.pdf", "199512345678", PATIENT_A, "f9", pdf_bytes=b"%PDF")
+
+    [event] = db.tables["event_outbox"]
+    assert event["event_type"] == "report.failed" and event["patient_id"] == PATIENT_A
+    assert event["payload"]["stage"] == "extraction" and "unreadable PDF" in event["payload"]["error"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
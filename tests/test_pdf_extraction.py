@@ -0,0 +1,145 @@
+"""
+Test script for the PDF preflight / local text-layer extraction.
+Builds small PDFs with reportlab (digital pages with a text layer and
+image-only pages) and checks which pages go to Document AI.
+"""
+
+import sys
+import os
+import io
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Image, PageBreak
+
+from app.services import pdf_extraction_service, ocr_service
+from app.services.normalization_service import normalize_report
+from benchmarks.synthetic_docai import build_document
+
+HEADER = [
+    "FULL BLOOD COUNT",
+    "PATIENT NAME: MR JOHN DOE",
+    "AGE 62 Y/O M",
+    "SAMPLE COLLECTED : 03/06/2025 09:10 AM",
+    "PRINTED DATE : 03/06/2025 06:43 PM",
+]
+
+
+def make_pdf(pages):
+    """pages: list of "digital" / "scanned"."""
+    styles = getSampleStyleSheet()
+    story = []
+    for index, kind in enumerate(pages):
+        if index:
+            story.append(PageBreak())
+        if kind == "digital":
+            story.extend(Paragraph(line, styles["Normal"]) for line in HEADER)
+            table = Table([
+                ["TEST NAME", "RESULT", "UNIT", "ABSOLUTE COUNT", "REFERENCE RANGE"],
+                ["HAEMOGLOBIN", "13.5", "g/dl", "", "11.0 - 16.5"],
+                ["W.B.C.", "7500", "Per Cumm", "", "4000 - 11000"],
+            ])
+            table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black)]))
+            story.append(table)
+        else:
+            image = io.BytesIO()
+            PILImage.new("RGB", (200, 100), "white").save(image, "PNG")
+            image.seek(0)
+            story.append(Image(image, 200, 100))
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def document_ai_calls(monkeypatch):
+    calls = []
+
+    def fake_bytes(content):
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            pages = len(pdf.pages)
+        calls.append(("bytes", pages))
+        return build_document("fbc", pages=pages, rows_per_table=2)
+
+    def fake_gcs(gcs_uri):
+        calls.append(("gcs", gcs_uri))
+        return build_document("fbc", pages=1, rows_per_table=2)
+
+    monkeypatch.setattr(ocr_service, "process_pdf_bytes_with_document_ai", fake_bytes)
+    monkeypatch.setattr(ocr_service, "process_with_document_ai", fake_gcs)
+    return calls
+
+
+def test_digital_pdf_skips_document_ai(document_ai_calls):
+    result = pdf_extraction_service.extract_report_data(make_pdf(["digital"]), "gs://bucket/report.pdf")
+
+    assert document_ai_calls == []
+    assert result["extraction"]["path"] == "local"
+    assert result["page_count"] == 1
+    assert set(result) >= {"raw_text", "tables", "entities", "page_count"}
+
+    normalized = normalize_report(result)
+    assert normalized["report"]["type"] == "Full Blood Count"
+    assert normalized["patient"]["name"] == "MR JOHN DOE"
+    assert [b["name"] for b in normalized["biomarkers"]] == ["Hemoglobin", "WBC"]
+    # Body rows only, as Document AI tables are
+    assert result["tables"] == [[["HAEMOGLOBIN", "13.5", "g/dl", "", "11.0 - 16.5"],
+                                 ["W.B.C.", "7500", "Per Cumm", "", "4000 - 11000"]]]
+
+
+def test_header_rows_are_stripped():
+    body = [["HAEMOGLOBIN", "13.5", "g/dl", "11.0 - 16.5"]]
+    assert pdf_extraction_service.body_rows([["TEST NAME", "RESULT", "UNIT", "REFERENCE RANGE"]] + body) == body
+    assert pdf_extraction_service.body_rows([["Test", "Result", ""], ["", "Units", "Normal  Range"]] + body) == body
+    assert pdf_extraction_service.body_rows([["WHITE BLOOD CELLS", "", ""]] + body)[0] == ["WHITE BLOOD CELLS", "", ""]
+
+
+def test_only_scanned_pages_sent_to_document_ai(document_ai_calls):
+    result = pdf_extraction_service.extract_report_data(make_pdf(["digital", "scanned", "digital", "scanned"]))
+
+    assert document_ai_calls == [("bytes", 2)]
+    assert result["extraction"] == {"path": "hybrid", "local_pages": [1, 3], "document_ai_pages": [2, 4]}
+    assert result["page_count"] == 4
+    assert len(result["tables"]) == 4
+    assert "PATIENT NAME: MR SYNTHETIC PATIENT 1" in result["raw_text"]
+
+
+def test_ocr_page_count_mismatch_falls_back_to_whole_document(document_ai_calls, monkeypatch):
+    def one_page_short(content):
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            pages = len(pdf.pages)
+        document_ai_calls.append(("bytes", pages))
+        return build_document("fbc", pages=pages - 1, rows_per_table=2)
+
+    monkeypatch.setattr(ocr_service, "process_pdf_bytes_with_document_ai", one_page_short)
+    result = pdf_extraction_service.extract_report_data(make_pdf(["digital", "scanned", "scanned"]), "gs://bucket/report.pdf")
+
+    assert document_ai_calls == [("bytes", 2), ("gcs", "gs://bucket/report.pdf")]
+    assert result["extraction"]["path"] == "document_ai"
+    assert result["extraction"]["reason"] == "Document AI returned 1 pages for 2 scanned pages"
+
+
+def test_image_only_pdf_uses_gcs_document(document_ai_calls):
+    result = pdf_extraction_service.extract_report_data(make_pdf(["scanned"]), "gs://bucket/report.pdf")
+
+    assert document_ai_calls == [("gcs", "gs://bucket/report.pdf")]
+    assert result["extraction"]["path"] == "document_ai"
+
+
+def test_unreadable_pdf_falls_back_to_document_ai(document_ai_calls):
+    result = pdf_extraction_service.extract_report_data(b"not a pdf", "gs://bucket/report.pdf")
+
+    assert document_ai_calls == [("gcs", "gs://bucket/report.pdf")]
+    assert result["extraction"]["path"] == "document_ai"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,65 @@
+"""
+Test script for the offline pipeline benchmark.
+Runs each synthetic report type through the benchmark once and checks
+the regression comparison.
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_docai import build_document, document_size
+from benchmarks.pipeline_benchmark import SCENARIOS, run_scenario, compare_to_baseline, percentile
+from app.services import reportService
+from app.services.nlp_service import build_report_json
+from app.services.normalization_service import normalize_report
+from app.utils.text_utils import extract_tables, extract_entities
+
+
+@pytest.mark.parametrize("report_type,expected", [
+    ("fbc", "Full Blood Count"),
+    ("lipid", "Serum Lipid Profile"),
+    ("fbs", "Fasting Plasma Glucose"),
+])
+def test_synthetic_documents_normalize(report_type, expected):
+    document = build_document(report_type, pages=2)
+    tables = extract_tables(document)
+    normalized = normalize_report(build_report_json(document, tables, extract_entities(document)))
+
+    assert normalized["report"]["type"] == expected
+    assert normalized["biomarkers"]
+    assert document_size(document)["pages"] == 2
+
+
+def test_run_scenario_uses_fake_supabase():
+    original = reportService.supabase
+    result = run_scenario(SCENARIOS[0], iterations=2, warmup=0)
+
+    assert reportService.supabase is original
+    assert result["biomarkers"] == 13
+    assert result["throughput_docs_per_sec"] > 0
+    assert set(result["stages"]) == {
+        "extract_tables", "extract_entities", "normalize_report", "store_normalized_report_to_db"
+    }
+
+
+def test_compare_to_baseline_flags_slow_stages():
+    results = [{"scenario": "s", "stages": {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 1.2}}}]
+    baseline = {"s": {"a": 2.0, "b": 1.0}}
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.5, min_delta_ms=0.5)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("s/a")
+
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 99) == 99
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,103 @@
+"""
+Test script for fields=/include= projection on read APIs.
+Uses the in-memory Supabase and bucket from tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+import json
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from app.core import cloud
+from app.api.deps import select_columns
+from app.api.v1.endpoints import reports
+from app.services import reportService, upload_service
+from app.utils.projection import ProjectionError, project_document, select_list
+from tests.fakes import FakeBucket, FakeStorageClient, FakeSupabase
+
+NIC = "199512345678"
+
+NORMALIZED = {
+    "patient": {"name": "A. Perera", "age": 41},
+    "report": {"type": "FBC", "sample_collected_at": "2024-05-01T08:30:00"},
+    "biomarkers": [
+        {"name": "Hemoglobin", "value": 13.5, "unit": "g/dL", "ref_range": [12, 16], "flag": "NORMAL"},
+        {"name": "WBC", "value": 11.2, "unit": "10^3/uL", "ref_range": [4, 10], "flag": "HIGH"},
+    ],
+}
+
+
+@pytest.mark.parametrize("table, fields, include, expected", [
+    ("reports", None, None, "*"),
+    ("reports", "id, report_type,id", None, "id,report_type"),
+    ("reports", "id,biomarkers.name,biomarkers.value", "biomarkers", "id,biomarkers(name,value)"),
+    ("reports", "id", "biomarkers", "id,biomarkers(*)"),
+    ("reports", "biomarkers.value", "biomarkers", "biomarkers(value)"),
+    ("reports", None, "patient", "*,patient:patients(id,full_name,email,phone,nic,created_at)"),
+    ("patients", None, None, "id,full_name,email,phone,nic,created_at"),
+    ("patients", "id,nic", "medications", "id,nic,medications(*)"),
+])
+def test_select_list(table, fields, include, expected):
+    assert select_list(table, fields, include) == expected
+
+
+@pytest.mark.parametrize("table, fields, include", [
+    ("patients", "id,password_hash", None),
+    ("reports", "raw_text", None),
+    ("reports", None, "medications"),
+    ("reports", "biomarkers.name", None),
+    ("reports", "biomarkers.secret", "biomarkers"),
+])
+def test_select_list_rejects_unknown_names(table, fields, include):
+    with pytest.raises(ProjectionError):
+        select_list(table, fields, include)
+
+
+def test_select_columns_dependency_returns_400():
+    with pytest.raises(HTTPException) as exc:
+        select_columns("patients")(fields="password_hash", include=None)
+    assert exc.value.status_code == 400
+
+
+def test_project_document():
+    assert project_document(NORMALIZED, "report.type,biomarkers.name,biomarkers.value") == {
+        "report": {"type": "FBC"},
+        "biomarkers": [{"name": "Hemoglobin", "value": 13.5}, {"name": "WBC", "value": 11.2}],
+    }
+    assert project_document(NORMALIZED, "report,report.type") == {"report": NORMALIZED["report"]}
+    assert project_document(NORMALIZED, "missing,patient.age") == {"patient": {"age": 41}}
+    assert project_document(NORMALIZED, None) is NORMALIZED
+
+
+def test_service_passes_select_list(monkeypatch):
+    db = FakeSupabase()
+    db.tables["reports"] = [{"id": "r1", "patient_id": "p1", "report_type": "FBC", "gcs_path": "gs://b/x.pdf",
+                             "created_at": "2024-05-01T10:00:00+00:00"}]
+    monkeypatch.setattr(reportService, "supabase", db)
+
+    result = reportService.list_reports_by_patient("p1", columns=select_list("reports", "id,report_type"))
+    assert result["data"] == [{"id": "r1", "report_type": "FBC"}]
+
+
+def test_normalized_endpoint_projects_document(monkeypatch):
+    bucket = FakeBucket("test-bucket")
+    bucket.put(f"users/{NIC}/processed/abc_normalized.json", json.dumps(NORMALIZED), "application/json")
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+
+    response = asyncio.run(reports.get_normalized_report(NIC, "abc", "inline", None, "biomarkers.name", None))
+    assert json.loads(response.body) == {
+        "status": "success",
+        "data": {"biomarkers": [{"name": "Hemoglobin"}, {"name": "WBC"}]},
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,185 @@
+"""
+Test script for the client-side resilience layer.
+Uses a fault-injecting fake client to exercise retries, deadlines, AIMD
+concurrency, token-bucket rate limiting and the circuit breaker.
+"""
+
+import sys
+import os
+import threading
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.api_core import exceptions as gexc
+
+from app.core.resilience import (
+    ResiliencePolicy, ResilientProxy, TokenBucket, AdaptiveConcurrencyLimiter, CircuitBreaker,
+    CircuitOpenError, ResilienceTimeout, RESILIENCE_EVENTS,
+)
+from tests.fakes import FaultInjectingClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_policy(clock, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=3, recovery_timeout=10, clock=clock))
+    kwargs.setdefault("base_delay", 0.1)
+    return ResiliencePolicy("test", sleep=clock.sleep, clock=clock, **kwargs)
+
+
+def test_retries_transient_errors_then_succeeds():
+    clock = FakeClock()
+    client = FaultInjectingClient([gexc.ServiceUnavailable("down"), gexc.TooManyRequests("slow down")])
+    before = RESILIENCE_EVENTS.value(service="test", event="retry")
+
+    assert make_policy(clock).call(client.call, "ok") == "ok"
+    assert client.calls == 3
+    assert RESILIENCE_EVENTS.value(service="test", event="retry") == before + 2
+    assert all(0 <= s <= 0.2 for s in clock.sleeps)
+
+
+def test_non_retryable_error_is_raised_immediately():
+    clock = FakeClock()
+    client = FaultInjectingClient([gexc.NotFound("missing")])
+    policy = make_policy(clock)
+
+    with pytest.raises(gexc.NotFound):
+        policy.call(client.call)
+    assert client.calls == 1
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gives_up_at_max_attempts():
+    clock = FakeClock()
+    client = FaultInjectingClient([gexc.ServiceUnavailable("down")] * 10)
+
+    with pytest.raises(gexc.ServiceUnavailable):
+        make_policy(clock, max_attempts=3, breaker=CircuitBreaker(100, clock=clock)).call(client.call)
+    assert client.calls == 3
+
+
+def test_deadline_stops_retries():
+    clock = FakeClock()
+    client = FaultInjectingClient([gexc.ServiceUnavailable("down")] * 10)
+    policy = make_policy(clock, max_attempts=10, base_delay=5, max_delay=5, deadline=6,
+                         breaker=CircuitBreaker(100, clock=clock))
+
+    with pytest.raises(gexc.ServiceUnavailable):
+        policy.call(client.call)
+    assert clock.now <= 6
+    assert client.calls < 10
+
+
+def test_circuit_opens_and_recovers():
+    clock = FakeClock()
+    policy = make_policy(clock, max_attempts=1)
+    failing = FaultInjectingClient([gexc.InternalServerError("boom")] * 3)
+
+    for _ in range(3):
+        with pytest.raises(gexc.InternalServerError):
+            policy.call(failing.call)
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        policy.call(failing.call)
+    assert failing.calls == 3
+
+    clock.now += 10
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.call(FaultInjectingClient().call, 1) == 1
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_local_limits_do_not_open_the_circuit():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial=1, max_limit=1)
+    rate = TokenBucket(rate=0.001, burst=1, clock=clock)
+    client = FaultInjectingClient()
+
+    # Saturated concurrency: no slot before the deadline
+    limiter.acquire()
+    saturated = make_policy(clock, limiter=limiter, deadline=0)
+    for _ in range(5):
+        with pytest.raises(ResilienceTimeout):
+            saturated.call(client.call)
+    assert saturated.breaker.state == CircuitBreaker.CLOSED
+
+    # Exhausted rate limit: no token before the deadline
+    rate.acquire(timeout=0, sleep=clock.sleep)
+    throttled = make_policy(clock, rate_limiter=rate, deadline=0)
+    for _ in range(5):
+        with pytest.raises(ResilienceTimeout):
+            throttled.call(client.call)
+    assert throttled.breaker.state == CircuitBreaker.CLOSED
+    assert client.calls == 0
+
+
+def test_aimd_limit_halves_on_overload_and_grows_when_healthy():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial=8, max_limit=16, latency_threshold=1.0, cooldown=0, clock=clock)
+
+    limiter.acquire()
+    limiter.release(latency=0.1, overloaded=True)
+    assert limiter.limit == 4
+
+    limiter.acquire()
+    limiter.release(latency=2.0)
+    assert limiter.limit == 2
+
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 3
+
+
+def test_concurrency_is_bounded():
+    policy = ResiliencePolicy("test_bounded", limiter=AdaptiveConcurrencyLimiter(initial=2, max_limit=2))
+    client = FaultInjectingClient(latency=0.02)
+
+    threads = [threading.Thread(target=policy.call, args=(client.call,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert client.calls == 8
+    assert client.peak <= 2
+
+
+def test_token_bucket_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    for _ in range(6):
+        assert bucket.acquire(sleep=clock.sleep)
+    # 2 from the burst, 4 more at 2/sec
+    assert clock.now == pytest.approx(2.0)
+    assert not bucket.acquire(timeout=0.1, sleep=clock.sleep)
+
+
+def test_proxy_wraps_only_named_methods():
+    clock = FakeClock()
+    client = FaultInjectingClient([gexc.ServiceUnavailable("down")])
+    proxy = ResilientProxy(client, make_policy(clock), {"call": None})
+
+    assert proxy.call("ok") == "ok"
+    assert proxy.calls == 2
+    assert proxy.latency == 0.0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
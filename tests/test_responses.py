@@ -0,0 +1,135 @@
+"""
+Test script for orjson responses and zstd/gzip response compression.
+Drives the ASGI middleware directly; no server or network access.
+"""
+
+import sys
+import os
+import gzip
+import json
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+import zstandard
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.core.middleware import CompressionMiddleware, choose_encoding
+from app.core.responses import embed_json, json_response
+
+ROWS = [{"id": str(uuid.uuid4()), "name": "Hemoglobin", "value": 13.5, "unit": "g/dL"} for _ in range(200)]
+
+
+def call(app, accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""}
+    messages = []
+    received = []
+
+    async def receive():
+        if received:
+            await asyncio.Event().wait()  # no disconnect; cancelled when the response completes
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, body
+
+
+def decode(headers, body):
+    encoding = headers.get("content-encoding")
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+def test_json_response_serializes_db_types():
+    report_id = uuid.uuid4()
+    collected = datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc)
+    response = json_response({"id": report_id, "at": collected, "value": Decimal("13.5"), 1: "x"})
+    assert json.loads(response.body) == {
+        "id": str(report_id), "at": "2024-05-01T08:30:00+00:00", "value": 13.5, "1": "x"
+    }
+
+
+def test_embed_json_passes_stored_bytes_through():
+    stored = b'{\n  "raw_text": "Hb 13.5",\n  "tables": []\n}\n'
+    assert json.loads(embed_json({"status": "success"}, "data", stored)) == {
+        "status": "success", "data": {"raw_text": "Hb 13.5", "tables": []}
+    }
+    assert json.loads(embed_json({}, "data", b"[1, 2]")) == {"data": [1, 2]}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip", "gzip"),
+    ("zstd;q=0.5, gzip;q=0.8", "gzip"),
+    ("zstd;q=0, gzip;q=0", "identity"),
+    ("*", "zstd"),
+    ("", "identity"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_large_json_is_compressed(encoding):
+    app = CompressionMiddleware(json_response({"reports": ROWS}), minimum_size=1024)
+    status, headers, body = call(app, encoding)
+
+    assert status == 200
+    assert headers["content-encoding"] == encoding
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body)
+    assert json.loads(decode(headers, body)) == {"reports": ROWS}
+    assert len(body) < len(json_response({"reports": ROWS}).body) / 3
+
+
+def test_small_or_unaccepted_responses_are_untouched():
+    small = CompressionMiddleware(json_response({"status": "ok"}), minimum_size=1024)
+    _, headers, body = call(small, "gzip")
+    assert "content-encoding" not in headers and json.loads(body) == {"status": "ok"}
+    assert headers["vary"] == "Accept-Encoding"
+
+    _, headers, body = call(CompressionMiddleware(json_response({"reports": ROWS})), None)
+    assert "content-encoding" not in headers and json.loads(body) == {"reports": ROWS}
+
+
+def test_non_compressible_types_are_untouched():
+    pdf = PlainTextResponse(b"%PDF" * 1000, media_type="application/pdf")
+    _, headers, body = call(CompressionMiddleware(pdf, minimum_size=10), "gzip")
+    assert "content-encoding" not in headers and body == b"%PDF" * 1000
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_streaming_response_is_compressed_incrementally(encoding):
+    lines = [json.dumps(row).encode() + b"\n" for row in ROWS]
+
+    async def stream():
+        for line in lines:
+            yield line
+
+    app = CompressionMiddleware(StreamingResponse(stream(), media_type="application/x-ndjson"), minimum_size=1024)
+    _, headers, body = call(app, encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    assert decode(headers, body) == b"".join(lines)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
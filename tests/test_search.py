@@ -0,0 +1,178 @@
+"""
+Test script for report text search: the local inverted index, the search
+service backends, the OCR worker indexing at ingest and GET /api/v1/search.
+Supabase is replaced by tests/fakes.py; no network access.
+"""
+
+import sys
+import os
+import inspect
+
+import pytest
+from fastapi import HTTPException
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.deps import SERVICE_PRINCIPAL, get_patient_or_service
+from app.api.v1.endpoints import search as search_endpoint
+from app.services import latest_biomarker_service, outbox_service, reportService, search_service
+from app.services.search_service import LocalSearchBackend, PostgresSearchBackend, index_report, search_reports
+from app.utils.search_index import InvertedIndex, parse_query
+from app.workers import ocr_worker
+from tests import fakes
+from tests.fakes import FakeSupabase
+
+PATIENT_A = "11111111-1111-1111-1111-111111111111"
+PATIENT_B = "22222222-2222-2222-2222-222222222222"
+
+DIABETES_PANEL = "Glycated Haemoglobin (HbA1c) 6.9 % 4.0 - 5.6 High. Fasting Blood Sugar 131 mg/dL."
+LIPID_PANEL = "Total Cholesterol 232 mg/dL. LDL Cholesterol 170 mg/dL High. HDL Cholesterol 52 mg/dL."
+FBC = "Full Blood Count. Haemoglobin 13.5 g/dL. White Cell Count 11.2 10^3/uL High."
+
+
+def report(report_id, patient_id, when="2024-05-01T08:30:00", report_type="FBC"):
+    return {"id": report_id, "patient_id": patient_id, "file_id": f"file-{report_id}",
+            "report_type": report_type, "sample_collected_at": when}
+
+
+@pytest.fixture
+def local(monkeypatch):
+    backend = LocalSearchBackend()
+    monkeypatch.setattr(search_service, "BACKEND", backend)
+    return backend
+
+
+def test_query_syntax():
+    assert parse_query('HbA1c "fasting blood sugar" -lipid') == ([["hba1c"], ["fasting", "blood", "sugar"]], ["lipid"])
+    assert parse_query("LDL-C") == ([["ldl", "c"]], [])
+
+
+def test_index_matches_all_words_phrases_and_exclusions():
+    index = InvertedIndex()
+    index.add("d1", DIABETES_PANEL, {"id": "d1"})
+    index.add("d2", LIPID_PANEL, {"id": "d2"})
+    index.add("d3", FBC + " Fasting sample.", {"id": "d3"})
+
+    assert [r["id"] for r in index.search("hba1c")] == ["d1"]
+    assert [r["id"] for r in index.search("cholesterol high")] == ["d2"]
+    assert {r["id"] for r in index.search("fasting")} == {"d1", "d3"}
+    assert [r["id"] for r in index.search('"fasting blood sugar"')] == ["d1"]
+    assert [r["id"] for r in index.search('"blood fasting"')] == []
+    assert [r["id"] for r in index.search("fasting -count")] == ["d1"]
+    assert index.search("-fasting") == []
+
+
+def test_index_ranks_and_highlights():
+    index = InvertedIndex()
+    index.add("once", "Comments: repeat HbA1c in three months. " + "Other results normal. " * 20, {"id": "once"})
+    index.add("twice", "HbA1c 6.9 %. Previous HbA1c 7.2 %.", {"id": "twice"})
+
+    results = index.search("HBA1C")
+    assert [r["id"] for r in results] == ["twice", "once"]
+    assert results[0]["rank"] > results[1]["rank"] > 0
+    assert results[0]["snippet"] == "<mark>HbA1c</mark> 6.9 %. Previous <mark>HbA1c</mark> 7.2 %."
+    assert results[1]["snippet"].startswith("Comments: repeat <mark>HbA1c</mark>") and results[1]["snippet"].endswith(" …")
+
+
+def test_reindex_and_remove():
+    index = InvertedIndex()
+    index.add("d1", DIABETES_PANEL)
+    index.add("d1", LIPID_PANEL)
+    assert index.search("hba1c") == [] and len(index.search("ldl")) == 1
+    index.remove("d1")
+    assert index.search("ldl") == [] and len(index) == 0
+
+
+def test_thousands_of_documents():
+    index = InvertedIndex()
+    for i in range(3000):
+        text = DIABETES_PANEL if i % 100 == 0 else (LIPID_PANEL if i % 2 else FBC)
+        index.add(f"d{i}", text, {"id": f"d{i}", "patient_id": PATIENT_A if i % 200 == 0 else PATIENT_B})
+
+    assert len(index.search("hba1c", limit=100)) == 30
+    assert len(index.search("hba1c", {"patient_id": PATIENT_A}, limit=100)) == 15
+    page = index.search("cholesterol", limit=10, offset=1490)
+    assert len(page) == 10
+
+
+def test_service_filters_by_patient(local):
+    assert index_report(report("r1", PATIENT_A), DIABETES_PANEL)["success"]
+    assert index_report(report("r2", PATIENT_B, "2024-06-01T09:00:00"), DIABETES_PANEL)["success"]
+    assert index_report(report("r3", PATIENT_B), "   ") == {"success": False, "error": "Report has no text to index"}
+
+    everyone = search_reports("HbA1c")["data"]
+    assert [r["report_id"] for r in everyone] == ["r2", "r1"]  # equal rank: newest first
+    assert set(everyone[0]) == {"report_id", "patient_id", "file_id", "report_type", "sample_collected_at", "rank", "snippet"}
+    assert [r["report_id"] for r in search_reports("HbA1c", patient_id=PATIENT_A)["data"]] == ["r1"]
+
+
+def test_postgres_backend_uses_table_and_rpc(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(search_service, "supabase", db)
+    monkeypatch.setattr(search_service, "BACKEND", PostgresSearchBackend())
+    calls = []
+
+    def fake_search(client, params):
+        calls.append(params)
+        return [{"report_id": "r1", "patient_id": PATIENT_A, "file_id": "f1", "report_type": "FBC",
+                 "sample_collected_at": None, "rank": 0.2, "snippet": "<mark>HbA1c</mark> 6.9 %"}]
+
+    monkeypatch.setitem(fakes.FUNCTIONS, "search_reports", fake_search)
+    monkeypatch.setattr(search_service, "SEARCH_MAX_CONTENT_CHARS", 10)
+
+    index_report(report("r1", PATIENT_A), DIABETES_PANEL)
+    index_report(report("r1", PATIENT_A), LIPID_PANEL)
+    [document] = db.tables["report_search_documents"]  # upserted on report_id
+    assert (document["report_id"], document["patient_id"], document["content"]) == ("r1", PATIENT_A, LIPID_PANEL[:10])
+
+    result = search_reports("HbA1c", PATIENT_A, limit=5, offset=10)
+    assert calls == [{"p_query": "HbA1c", "p_patient_id": PATIENT_A, "p_limit": 5, "p_offset": 10}]
+    assert result["data"][0]["snippet"] == "<mark>HbA1c</mark> 6.9 %"
+
+
+def test_worker_indexes_text_at_ingest(local, monkeypatch):
+    db = FakeSupabase()
+    for module in (reportService, latest_biomarker_service, outbox_service):
+        monkeypatch.setattr(module, "supabase", db)
+    monkeypatch.setattr(ocr_worker, "extract_report_data", lambda pdf_bytes, gcs_uri: {"raw_text": DIABETES_PANEL})
+    monkeypatch.setattr(ocr_worker, "normalize_fbc_report", lambda raw: {
+        "patient": {}, "report": {"type": "HbA1c", "sample_collected_at": "2024-05-01T08:30:00"},
+        "biomarkers": [{"name": "HbA1c", "value": 6.9, "unit": "%", "ref_range": [4.0, 5.6]}],
+    })
+    monkeypatch.setattr(ocr_worker, "store_json", lambda nic, file_id, data: None)
+
+    ocr_worker.process_document_worker("gs://b/f1.pdf", "199512345678", PATIENT_A, "f1", pdf_bytes=b"%PDF")
+
+    [hit] = search_reports("hba1c", patient_id=PATIENT_A)["data"]
+    assert hit["file_id"] == "f1" and hit["report_id"] == db.tables["reports"][0]["id"]
+
+    reportService.delete_report(hit["report_id"])
+    assert search_reports("hba1c")["data"] == []
+
+
+def test_endpoint_scopes_patients_to_their_own_reports(local):
+    index_report(report("r1", PATIENT_A), DIABETES_PANEL)
+    index_report(report("r2", PATIENT_B), DIABETES_PANEL)
+
+    clinician = search_endpoint.search(q="HbA1c", patient_id=None, limit=20, offset=0, principal=SERVICE_PRINCIPAL)
+    assert clinician["count"] == 2 and clinician["patient_id"] is None
+
+    own = search_endpoint.search(q="HbA1c", patient_id=None, limit=20, offset=0, principal={"id": PATIENT_A})
+    assert [r["report_id"] for r in own["data"]] == ["r1"] and own["patient_id"] == PATIENT_A
+
+    with pytest.raises(HTTPException) as exc:
+        search_endpoint.search(q="HbA1c", patient_id=PATIENT_B, limit=20, offset=0, principal={"id": PATIENT_A})
+    assert exc.value.status_code == 403
+
+
+def test_endpoint_rejects_anonymous_requests():
+    dependency = inspect.signature(search_endpoint.search).parameters["principal"].default.dependency
+    assert dependency is get_patient_or_service
+    with pytest.raises(HTTPException) as exc:
+        dependency(None)
+    assert exc.value.status_code == 401
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
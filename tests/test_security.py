@@ -0,0 +1,155 @@
+"""
+Test script for stateless session tokens.
+Checks issuance, verification, tampering, expiry and revocation without a database.
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import deps
+from app.core import security
+from app.core.security import (
+    RevocationList,
+    TokenError,
+    create_token,
+    create_token_pair,
+    decode_token,
+    revoke_token,
+    ACCESS_TOKEN,
+    REFRESH_TOKEN,
+)
+
+PATIENT = {
+    "id": "7f1c5a2e-1d3b-4c55-9a47-0d6f4f6e2b10",
+    "email": "patient@example.com",
+    "nic": "200012345678",
+    "full_name": "Test Patient",
+}
+
+
+@pytest.fixture(autouse=True)
+def token_env(monkeypatch):
+    monkeypatch.setattr(security, "JWT_SECRET_KEY", "test-secret")
+    monkeypatch.setattr(security, "revocation_list", RevocationList(loader=None, persister=None))
+
+
+def test_token_pair_round_trip():
+    tokens = create_token_pair(PATIENT)
+
+    claims = decode_token(tokens["access_token"], ACCESS_TOKEN)
+    assert claims["sub"] == PATIENT["id"]
+    assert claims["nic"] == PATIENT["nic"]
+    assert tokens["token_type"] == "bearer"
+
+    refresh_claims = decode_token(tokens["refresh_token"], REFRESH_TOKEN)
+    assert refresh_claims["sub"] == PATIENT["id"]
+
+
+def test_token_type_is_enforced():
+    tokens = create_token_pair(PATIENT)
+    with pytest.raises(TokenError):
+        decode_token(tokens["refresh_token"], ACCESS_TOKEN)
+
+
+def test_tampered_token_is_rejected():
+    token = create_token_pair(PATIENT)["access_token"]
+    header, payload, signature = token.split(".")
+    forged = create_token({"sub": "someone-else"}, ACCESS_TOKEN, 60).split(".")[1]
+
+    with pytest.raises(TokenError):
+        decode_token(f"{header}.{forged}.{signature}")
+
+
+def test_wrong_secret_is_rejected(monkeypatch):
+    token = create_token_pair(PATIENT)["access_token"]
+    monkeypatch.setattr(security, "JWT_SECRET_KEY", "another-secret")
+    with pytest.raises(TokenError):
+        decode_token(token)
+
+
+def test_expired_token_is_rejected():
+    token = create_token({"sub": PATIENT["id"]}, ACCESS_TOKEN, -1)
+    with pytest.raises(TokenError):
+        decode_token(token)
+
+
+def test_revoked_token_is_rejected():
+    token = create_token_pair(PATIENT)["access_token"]
+    revoke_token(decode_token(token))
+    with pytest.raises(TokenError):
+        decode_token(token)
+
+
+def test_revocation_list_syncs_from_backing_store():
+    rows = []
+    revocations = RevocationList(loader=lambda: rows, persister=None, refresh_interval=0)
+
+    assert not revocations.is_revoked("abc")
+    rows.append({"jti": "abc", "expires_at": time.time() + 60})
+    assert revocations.is_revoked("abc")
+
+    # Expired entries are no longer reported (the token itself is expired)
+    rows[0]["expires_at"] = time.time() - 1
+    assert not revocations.is_revoked("abc")
+
+
+def test_non_ascii_token_is_rejected():
+    header, payload, _ = create_token_pair(PATIENT)["access_token"].split(".")
+    for token in (f"{header}.{payload}.sïgnature", f"{header}.pâyload.{_}", "é.é.é"):
+        with pytest.raises(TokenError):
+            decode_token(token)
+
+
+def test_logout_only_revokes_the_callers_refresh_token():
+    from app.api.v1.endpoints import patient as patient_endpoints
+    from app.schemas.patient import LogoutRequest
+
+    def caller(tokens):
+        return deps.get_current_patient(bearer(tokens["access_token"]))
+
+    mine = create_token_pair(PATIENT)
+    theirs = create_token_pair(dict(PATIENT, id="0b4e4c1a-8d7f-4f0e-9d6c-3a2b1c0d9e8f"))
+
+    with pytest.raises(HTTPException) as exc:
+        patient_endpoints.logout(LogoutRequest(refresh_token=theirs["refresh_token"]), caller(mine))
+    assert exc.value.status_code == 403
+    assert decode_token(theirs["refresh_token"], REFRESH_TOKEN) and decode_token(mine["access_token"])
+
+    patient_endpoints.logout(LogoutRequest(refresh_token=mine["refresh_token"]), caller(mine))
+    for token, kind in ((mine["access_token"], ACCESS_TOKEN), (mine["refresh_token"], REFRESH_TOKEN)):
+        with pytest.raises(TokenError):
+            decode_token(token, kind)
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_service_credential(monkeypatch):
+    patient_token = create_token_pair(PATIENT)["access_token"]
+    for credentials, code in ((None, 401), (bearer(patient_token), 403), (bearer("service-secret"), 403)):
+        with pytest.raises(HTTPException) as exc:
+            deps.get_service_principal(credentials)  # SERVICE_API_TOKEN unset: closed
+        assert exc.value.status_code == code
+
+    monkeypatch.setattr(deps, "SERVICE_API_TOKEN", "service-secret")
+    assert deps.get_service_principal(bearer("service-secret")) is deps.SERVICE_PRINCIPAL
+    assert deps.get_patient_or_service(bearer("service-secret")) is deps.SERVICE_PRINCIPAL
+    assert deps.get_patient_or_service(bearer(patient_token))["id"] == PATIENT["id"]
+    for credentials in (None, bearer("wrong")):
+        with pytest.raises(HTTPException) as exc:
+            deps.get_patient_or_service(credentials)
+        assert exc.value.status_code == 401
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
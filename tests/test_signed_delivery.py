@@ -0,0 +1,89 @@
+"""
+Test script for signed-URL delivery of report PDFs and stored JSON.
+Checks that url/redirect modes never read the object through the API.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import inspect
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from fastapi.responses import RedirectResponse
+
+from app.api.deps import get_current_patient
+from app.core import cloud
+from app.services import upload_service
+from app.api.v1.endpoints import reports
+from tests.fakes import FakeBucket, FakeStorageClient
+
+NIC = "199512345678"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket("test-bucket")
+    bucket.put(f"users/{NIC}/processed/abc_normalized.json", '{"biomarkers": []}', "application/json")
+    bucket.calls.clear()
+    monkeypatch.setattr(cloud, "_storage_client", FakeStorageClient(bucket))
+    monkeypatch.setattr(upload_service, "BUCKET_NAME", "test-bucket")
+    return bucket
+
+
+def test_inline_delivery_unchanged(bucket):
+    result = asyncio.run(reports.get_normalized_report(NIC, "abc", "inline", None, None, None))
+    assert json.loads(result.body) == {"status": "success", "data": {"biomarkers": []}}
+
+
+def test_url_delivery_signs_without_reading(bucket):
+    result = asyncio.run(reports.get_raw_report(NIC, "abc", "url", {"nic": NIC}))
+
+    assert result["delivery"] == "url"
+    assert result["expires_in"] == 300
+    assert bucket.signer.signed[-1]["name"] == f"users/{NIC}/processed/abc.json"
+    assert bucket.signer.signed[-1]["method"] == "GET"
+    assert bucket.calls == []
+
+
+def test_redirect_delivery(bucket):
+    response = asyncio.run(reports.get_normalized_report(NIC, "abc", "redirect", {"nic": NIC}))
+
+    assert isinstance(response, RedirectResponse)
+    assert response.status_code == 307
+    assert "abc_normalized.json" in response.headers["location"]
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_pdf_download_sets_filename(bucket):
+    asyncio.run(reports.get_report_pdf(NIC, "abc", "url", {"nic": NIC}))
+
+    signed = bucket.signer.signed[-1]
+    assert signed["name"] == f"users/{NIC}/reports/abc.pdf"
+    assert signed["response_disposition"] == 'attachment; filename="abc.pdf"'
+
+
+def test_token_for_other_patient_is_rejected(bucket):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(reports.get_report_pdf(NIC, "abc", "url", {"nic": "200012345678"}))
+    assert exc.value.status_code == 403
+    assert bucket.signer.signed == []
+
+
+def test_signed_delivery_requires_a_token(bucket):
+    for endpoint in (reports.get_normalized_report, reports.get_raw_report):
+        for delivery in ("url", "redirect"):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(endpoint(NIC, "abc", delivery, None))
+            assert exc.value.status_code == 401
+    assert inspect.signature(reports.get_report_pdf).parameters["patient"].default.dependency is get_current_patient
+    assert bucket.signer.signed == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,147 @@
+"""
+Test script for side-effect-free startup, lazily built clients and the startup profile.
+Imports of app.main are checked in a fresh interpreter; no network access.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import subprocess
+import threading
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import startup
+from app.core.startup import LazyClient, StartupProfile
+from app.api.v1.endpoints import system
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("supabase", "google.cloud.storage", "google.cloud.documentai", "pdfplumber", "proto")
+
+
+def test_importing_app_has_no_side_effects(tmp_path):
+    env = dict(os.environ, GOOGLE_APPLICATION_CREDENTIALS_JSON='{"type": "service_account"}', TMPDIR=str(tmp_path))
+    env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+    code = (
+        "import json, os, sys, app.main; "
+        f"print(json.dumps({{'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules], "
+        "'env': 'GOOGLE_APPLICATION_CREDENTIALS' in os.environ}))"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert result == {"loaded": [], "env": False}
+
+
+def test_lazy_client_builds_once_across_threads(monkeypatch):
+    monkeypatch.setattr(startup, "STARTUP", StartupProfile())
+    built = []
+
+    class Client:
+        def table(self, name):
+            return f"table:{name}"
+
+    def factory():
+        built.append(1)
+        return Client()
+
+    client = LazyClient("test", factory)
+    assert not client.initialized and built == []
+
+    threads = [threading.Thread(target=client.table, args=("reports",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.table("reports") == "table:reports"
+    assert built == [1]
+    assert "client:test" in startup.STARTUP.phases()
+
+    client.reset()
+    client.get()
+    assert built == [1, 1]
+
+
+def test_warm_clients_reports_failures(monkeypatch):
+    monkeypatch.setattr(startup, "STARTUP", StartupProfile())
+    monkeypatch.setattr(startup, "_WARMUPS", {})
+
+    def broken():
+        raise RuntimeError("no credentials")
+
+    startup.register_warmup("ok", lambda: object())
+    startup.register_warmup("broken", broken)
+
+    assert startup.warm_clients() == {"ok": None, "broken": "no credentials"}
+    report = startup.STARTUP.report()
+    assert set(report["phases_ms"]) == {"warm:ok", "warm:broken"}
+    assert report["errors"] == {"warm:broken": "RuntimeError: no credentials"}
+    assert "clients_warm" in report["marks_ms"]
+
+
+def test_marks_keep_first_occurrence():
+    profile = StartupProfile()
+    profile.mark("first_request")
+    first = profile.marks()["first_request"]
+    profile.mark("first_request")
+    assert profile.marks()["first_request"] == first
+
+
+def test_lifespan_marks_ready_and_first_request(monkeypatch):
+    from app import main
+
+    profile = StartupProfile()
+    monkeypatch.setattr(main, "STARTUP", profile)
+    monkeypatch.setattr(main, "WARM_CLIENTS_ON_STARTUP", False)
+    monkeypatch.setattr(main, "OUTBOX_RELAY_ENABLED", False)
+    monkeypatch.setattr(system, "STARTUP", profile)
+    monkeypatch.setattr("app.core.middleware.STARTUP", profile)
+
+    async def run():
+        messages = []
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/system/startup", "raw_path": b"/api/v1/system/startup",
+                 "query_string": b"", "root_path": "", "headers": [], "scheme": "http", "http_version": "1.1",
+                 "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with main.app.router.lifespan_context(main.app):
+            await main.app(scope, receive, send)
+        return messages
+
+    messages = asyncio.run(run())
+    assert messages[0]["status"] == 200
+    data = json.loads(messages[1]["body"])["data"]
+    assert {"app_ready", "first_request"} <= set(data["marks_ms"])
+
+
+
+def test_notifications_without_a_sender_fail_startup(monkeypatch):
+    from app import main
+    from app.services import notification_senders
+
+    monkeypatch.setattr(main, "WARM_CLIENTS_ON_STARTUP", False)
+    monkeypatch.setattr(main, "OUTBOX_RELAY_ENABLED", False)
+    monkeypatch.setattr(main, "NOTIFICATIONS_ENABLED", True)
+    monkeypatch.setattr(notification_senders, "NOTIFY_SENDER", "")
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            pass
+
+    with pytest.raises(ValueError, match="NOTIFY_SENDER"):
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,63 @@
+"""
+Test script for Document AI table/entity extraction.
+Checks the protobuf-based extraction against the previous implementation
+and covers multi-segment anchors, header rows and lazy iteration.
+"""
+
+import sys
+import os
+import types
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import documentai
+
+from app.utils.text_utils import get_text, extract_tables, extract_entities, iter_tables
+from benchmarks.synthetic_docai import build_document
+from benchmarks.extraction_benchmark import legacy_extract_tables, legacy_extract_entities
+
+
+@pytest.mark.parametrize("report_type", ["fbc", "lipid", "fbs"])
+def test_matches_legacy_extraction(report_type):
+    document = build_document(report_type, pages=3, tables_per_page=2)
+
+    assert extract_tables(document) == legacy_extract_tables(document)
+    assert extract_entities(document) == legacy_extract_entities(document)
+
+
+def test_header_rows_and_generator():
+    document = build_document("lipid", pages=2, tables_per_page=1, rows_per_table=3)
+
+    tables = iter_tables(document, include_headers=True)
+    assert isinstance(tables, types.GeneratorType)
+
+    first = next(tables)
+    assert first[0] == ["TEST", "RESULT", "UNIT", "REFERENCE RANGE"]
+    assert len(first) == 4
+    assert len(list(tables)) == 1
+    assert extract_tables(document)[0] == first[1:]
+
+
+def test_multi_segment_anchor():
+    document = documentai.Document(
+        text="HAEMO  GLOBIN  ",
+        entities=[
+            documentai.Document.Entity(
+                type_="test",
+                text_anchor=documentai.Document.TextAnchor(text_segments=[
+                    documentai.Document.TextAnchor.TextSegment(start_index=0, end_index=5),
+                    documentai.Document.TextAnchor.TextSegment(start_index=7, end_index=13),
+                ]),
+            )
+        ],
+    )
+
+    assert extract_entities(document)[0]["value"] == "HAEMOGLOBIN"
+    assert get_text(document.entities[0], document.text) == "HAEMOGLOBIN"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
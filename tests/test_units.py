@@ -0,0 +1,196 @@
+"""
+Test script for unit conversion: the per-analyte factor table, canonical units
+at normalization and on health metric writes, and ?units= display units on the
+read paths. Supabase is replaced by tests/fakes.py and health metrics use an
+in-memory SQLite database; no network access.
+"""
+
+import sys
+import os
+import asyncio
+import json
+import uuid
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fakes import FakeSupabase, SQLiteDatabase
+from app.api.deps import display_units
+from app.api.v1.endpoints import health_metrics, reports
+from app.models.health_metric import HealthFlag, HealthMetric, MetricReference
+from app.schemas.health_metric import HealthMetricCreate, HealthMetricUpdate
+from app.services import reportService
+from app.services.fbs_normalization import parse_fbs_result_cell
+from app.services.normalization_service import normalize_report
+from app.services.health_metric_service import METRIC_REFERENCES, HealthMetricService
+from app.utils.units import (
+    UnitConversionError,
+    canonical_unit,
+    canonicalize_biomarkers,
+    convert,
+    convert_rows,
+    convert_value,
+    parse_display_units,
+    to_canonical,
+)
+
+REPORT_ID = "44444444-4444-4444-4444-444444444444"
+USER_ID = uuid.UUID("11111111-1111-1111-1111-111111111111")
+
+
+@pytest.fixture
+def session():
+    session = SQLiteDatabase(MetricReference, HealthMetric).session()
+    HealthMetricService.seed_references(session)
+    yield session
+    session.close()
+    METRIC_REFERENCES.invalidate()
+
+
+def test_convert_arrays_between_units():
+    glucose = convert([5.0, 7.0, None], "Fasting Plasma Glucose", "mmol/l", "mg/dL")
+    assert np.allclose(glucose[:2], [90.08, 126.112]) and np.isnan(glucose[2])
+    assert np.allclose(convert(glucose[:2], "Fasting Plasma Glucose", "mg/dL", "mmol/L"), [5.0, 7.0])
+    assert np.allclose(convert([98.6, 32], "Body Temp", "°F", "C"), [37.0, 0.0])
+    assert convert_value(37.0, "body temp", "C", "F") == 98.6
+    assert convert_value(8.0, "WBC", "10^9/L", "per cu mm") == 8000.0
+    assert canonical_unit("LDL Cholesterol") == "mg/dL" and canonical_unit("MCV") is None
+
+    with pytest.raises(UnitConversionError):
+        convert([1.0], "Hemoglobin", "mg/dL", "g/dL")
+    with pytest.raises(UnitConversionError):
+        convert([1.0], "MCV", "fL", "pL")
+
+
+def test_to_canonical_keeps_unconvertible_values():
+    values, units = to_canonical("Total Cholesterol", [5.2, 201, 4.0, 3], ["mmol/L", "mg/dl", None, "mg%"])
+    assert values == [201.084, 201.0, 4.0, 3.0]
+    assert units == ["mg/dL", "mg/dL", None, "mg%"]
+
+
+def test_canonicalize_biomarkers_keeps_reported_values():
+    biomarkers = [
+        {"name": "Fasting Plasma Glucose", "value": 5.5, "unit": "mmol/L", "ref_range": [3.9, 5.5], "flag": None},
+        {"name": "Hemoglobin", "value": 13.5, "unit": "g/dL", "ref_range": [12.0, 16.0], "flag": None},
+        {"name": "MCV", "value": 88.0, "unit": "fL", "ref_range": [80.0, 100.0], "flag": None},
+    ]
+    canonicalize_biomarkers(biomarkers)
+
+    glucose, hemoglobin, mcv = biomarkers
+    assert glucose["unit"] == "mg/dL" and glucose["value"] == 99.088
+    assert glucose["ref_range"] == [70.2624, 99.088]
+    assert glucose["reported"] == {"value": 5.5, "unit": "mmol/L", "ref_range": [3.9, 5.5]}
+    assert "reported" not in hemoglobin and hemoglobin["value"] == 13.5
+    assert mcv == {"name": "MCV", "value": 88.0, "unit": "fL", "ref_range": [80.0, 100.0], "flag": None}
+
+
+def test_fbs_cell_in_mmol():
+    value, unit, _ = parse_fbs_result_cell("5.6\nmmol/l\n3.9\n-\n5.5", "")
+    assert (value, unit) == (5.6, "mmol/L")
+    assert parse_fbs_result_cell("102.9\nmg/d\n", "")[1] == "mg/dL"
+
+
+def test_fbs_report_in_mmol_is_flagged_in_its_own_unit():
+    def glucose(cell, raw_text="FASTING PLASMA GLUCOSE"):
+        raw = {"raw_text": raw_text, "tables": [[["FASTING PLASMA GLUCOSE", cell]]], "entities": [], "page_count": 1}
+        return normalize_report(raw)["biomarkers"][0]
+
+    # The "70 - 99 = Normal" comment is mg/dL and must not become the mmol/L range
+    normal = glucose("5.4\nmmol/L\n3.9\n-\n5.5", "FASTING PLASMA GLUCOSE\n70 - 99 = Normal fasting glucose.")
+    assert normal["flag"] is None
+    assert (normal["value"], normal["unit"]) == (97.2864, "mg/dL")
+    assert normal["ref_range"] == [70.2624, 99.088]
+    assert normal["reported"] == {"value": 5.4, "unit": "mmol/L", "ref_range": [3.9, 5.5]}
+
+    # Without a printed range, the default range for mmol/L applies
+    assert glucose("5.4\nmmol/L")["flag"] is None and glucose("5.4\nmmol/L")["ref_range"] is None
+    assert glucose("7.2\nmmol/L")["flag"] == "High" and glucose("3.1\nmmol/L")["flag"] == "Low"
+    assert glucose("102.9\nmg/d\n0.\n-\n99.", "FASTING PLASMA GLUCOSE\n70 - 99 = Normal")["ref_range"] == [70.0, 99.0]
+
+
+def test_display_units():
+    display = parse_display_units("mmol/l, Hemoglobin:g/L")
+    assert display == {"*": "mmol/L", "hemoglobin": "g/L"}
+    rows = [
+        {"name": "LDL Cholesterol", "value": 116.01, "unit": "mg/dL", "ref_min": None, "ref_max": 100},
+        {"name": "Hemoglobin", "value": 13.5, "unit": "g/dL", "ref_min": 12.0, "ref_max": 16.0},
+        {"name": "WBC", "value": 8000, "unit": "per cu mm", "ref_min": 4000, "ref_max": 10000},
+        {"name": "MCV", "value": 88.0, "unit": "fL"},
+        {"name": "LDL Cholesterol", "value": 120},
+    ]
+    converted = convert_rows(rows, display)
+    assert converted[0] == {"name": "LDL Cholesterol", "value": 3.0, "unit": "mmol/L", "ref_min": None, "ref_max": 2.586}
+    assert converted[1]["unit"] == "g/L" and converted[1]["value"] == 135.0 and converted[1]["ref_max"] == 160.0
+    assert converted[2] == rows[2]  # no mmol/L for WBC: canonical
+    assert converted[3:] == rows[3:]
+    assert rows[0]["unit"] == "mg/dL"  # rows are copied
+
+    for spec in ("furlongs", "MCV:fL", "Hemoglobin:mg/dL"):
+        with pytest.raises(HTTPException) as error:
+            display_units(spec)
+        assert error.value.status_code == 400
+
+
+def test_report_biomarkers_in_display_units(monkeypatch):
+    db = FakeSupabase()
+    db.tables["reports"] = [{"id": REPORT_ID, "patient_id": "p1", "file_id": "abc", "report_type": "Lipid",
+                             "created_at": "2024-05-01T10:00:00+00:00", "updated_at": None}]
+    db.tables["biomarkers"] = [{"id": "b1", "report_id": REPORT_ID, "name": "Triglycerides", "value": 177.14,
+                                "unit": "mg/dL", "ref_min": None, "ref_max": 150}]
+    monkeypatch.setattr(reportService, "supabase", db)
+
+    def fetch(units, if_none_match=None):
+        return asyncio.run(reports.get_report_biomarkers(REPORT_ID, "*", if_none_match, None, parse_display_units(units)))
+
+    canonical = fetch(None)
+    converted = fetch("mmol/L")
+    assert json.loads(converted.body)["biomarkers"][0] == {
+        "id": "b1", "report_id": REPORT_ID, "name": "Triglycerides", "value": 2.0, "unit": "mmol/L",
+        "ref_min": None, "ref_max": 1.6936}
+    assert json.loads(canonical.body)["biomarkers"] == db.tables["biomarkers"]
+    assert converted.headers["etag"] != canonical.headers["etag"]
+    assert fetch("mmol/L", canonical.headers["etag"]).status_code == 200
+    assert fetch("mmol/L", converted.headers["etag"]).status_code == 304
+
+
+def test_assessment_compares_in_the_reference_unit(session):
+    # 5.0 mmol/L is 90 mg/dL: normal, not below the 50 mg/dL critical threshold
+    assert HealthMetricService.calculate_assessment(session, "Blood Glucose", 5.0, "mmol/L") == HealthFlag.NULL
+    assert HealthMetricService.calculate_assessment(session, "Blood Glucose", 5.0) == HealthFlag.VERY_LOW
+    assert HealthMetricService.calculate_assessment(session, "Body Temp", 101.3, "F") == HealthFlag.HIGH
+
+
+def test_metrics_are_stored_in_the_reference_unit(session):
+    metric = HealthMetricService.create_metric(session, HealthMetricCreate(
+        user_id=USER_ID, metric_name="Blood Glucose", value=5.0, unit="mmol/l"))
+    assert (metric.value, metric.unit, metric.flag) == (90.08, "mg/dL", HealthFlag.NULL)
+
+    weight = HealthMetricService.create_metric(session, HealthMetricCreate(
+        user_id=USER_ID, metric_name="Weight", value=154.32, unit="lbs"))
+    assert (round(weight.value, 2), weight.unit) == (70.0, "kg")
+
+    # Metrics without a unit table keep the unit they were sent in
+    steps = HealthMetricService.create_metric(session, HealthMetricCreate(
+        user_id=USER_ID, metric_name="Step Count", value=9000, unit="Steps"))
+    assert steps.unit == "Steps"
+
+    with pytest.raises(HTTPException) as error:
+        HealthMetricService.create_metric(session, HealthMetricCreate(
+            user_id=USER_ID, metric_name="Blood Glucose", value=5.0, unit="g/dL"))
+    assert error.value.status_code == 400
+
+    updated = HealthMetricService.update_metric(session, metric.id, HealthMetricUpdate(value=11.1, unit="mmol/L"))
+    assert (updated.value, updated.unit, updated.flag) == (199.9776, "mg/dL", HealthFlag.VERY_HIGH)
+
+    shown = asyncio.run(health_metrics.get_health_metrics(
+        USER_ID, None, 0, 100, session, parse_display_units("Blood Glucose:mmol/L,lb")))
+    assert [(m["metric_name"], round(m["value"], 2), m["unit"]) for m in shown] == [
+        ("Blood Glucose", 11.1, "mmol/L"), ("Weight", 154.32, "lb"), ("Step Count", 9000.0, "Steps")]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))